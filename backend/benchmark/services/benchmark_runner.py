@@ -310,7 +310,8 @@ class BenchmarkRunner:
                         {"role": "system", "content": "You are a helpful assistant."},
                         {"role": "user", "content": sample["input_text"]}
                     ],
-                    stream=False
+                    stream=False,
+                    dedupe=True
                 )
                 execution_time = (time.time() - execution_start_time) * 1000  # Convert to ms
                 
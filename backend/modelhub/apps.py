@@ -1,6 +1,15 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class ModelhubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modelhub'
+
+    def ready(self):
+        import modelhub.signals  # noqa
+        from modelhub.services.client_pool import close_client_pool
+
+        # Release pooled provider connections on shutdown
+        atexit.register(close_client_pool)
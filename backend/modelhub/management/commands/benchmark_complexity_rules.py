@@ -0,0 +1,113 @@
+"""
+Management command to benchmark rule-based complexity pattern matching.
+
+Builds long synthetic prompts (multi-line and single-line) and times one pass
+of every rule pattern with its own re.search against the compiled matcher,
+then times RuleBasedComplexityAnalyzer.analyze_complexity on the same prompts.
+
+Usage:
+    python manage.py benchmark_complexity_rules
+    python manage.py benchmark_complexity_rules --tokens 20000 --runs 50
+"""
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from modelhub.services.complexity.rule_analyzer import RuleBasedComplexityAnalyzer
+from modelhub.services.complexity.types import RequestContext
+
+
+FILLER = (
+    "the contractor shall provide all concrete steel rebar formwork drywall framing insulation "
+    "roofing windows doors per the schedule with quantity unit price and total for each building "
+    "floor area wall height and thickness as shown on the drawings"
+).split()
+SIGNALS = (
+    "analyze compare then also data code function api report strategy considering however "
+    "these mentioned documents sources multiple factors step-by-step detailed review"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-pattern regex search against the compiled complexity matcher"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tokens",
+            type=int,
+            default=10000,
+            help="Words per synthetic prompt",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=20,
+            help="Timed runs per prompt",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=7,
+            help="Random seed",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        analyzer = RuleBasedComplexityAnalyzer()
+        matcher = analyzer._matcher
+        self.stdout.write(
+            f"{len(matcher.patterns)} patterns: {len(matcher.keywords)} keyword, "
+            f"{len(matcher.conjunctions)} conjunction branches, {len(matcher.regexes)} regex"
+        )
+
+        for label, line_words in (("multi-line", 15), ("single-line", 0)):
+            prompt = self._prompt(rng, options["tokens"], line_words)
+            text = prompt.lower()
+
+            reference = frozenset(
+                pattern_id for pattern_id, pattern in matcher.patterns if pattern.search(text)
+            )
+            if matcher.scan(text).hits != reference:
+                self.stdout.write(self.style.ERROR(f"{label}: compiled matcher disagrees with re.search"))
+                continue
+
+            per_pattern = self._time(options["runs"], lambda: [p.search(text) for _, p in matcher.patterns])
+            compiled = self._time(options["runs"], lambda: matcher.scan(text))
+            analysis = self._time(
+                options["runs"], lambda: analyzer.analyze_complexity(prompt, RequestContext())
+            )
+            self.stdout.write(
+                f"{label} ({options['tokens']} words, {len(reference)} patterns hit): "
+                f"per-pattern p50 {self._percentile(per_pattern, 50):.1f}ms, "
+                f"compiled p50 {self._percentile(compiled, 50):.1f}ms "
+                f"p95 {self._percentile(compiled, 95):.1f}ms, "
+                f"analyze_complexity p50 {self._percentile(analysis, 50):.1f}ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def _prompt(self, rng, tokens, line_words):
+        """Mostly filler with a sprinkling of pattern keywords; newline every line_words words"""
+        words = [rng.choice(SIGNALS if rng.random() < 0.02 else FILLER) for _ in range(tokens)]
+        if line_words:
+            for index in range(line_words, tokens, line_words):
+                words[index] += "\n"
+        return " ".join(words)
+
+    @staticmethod
+    def _time(runs, func):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    @staticmethod
+    def _percentile(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
@@ -0,0 +1,182 @@
+"""
+Management command to benchmark per-call LLM client overhead.
+
+Starts a local OpenAI-compatible mock server and makes the same chat calls
+twice: once building a fresh AsyncOpenAI client per call (the old provider
+behaviour) and once through the pooled long-lived clients. Reports per-call
+latency and how many TCP connections each mode opened. The mock server is
+plain HTTP, so TLS handshake savings against real providers come on top.
+
+Usage:
+    python manage.py benchmark_llm_clients
+    python manage.py benchmark_llm_clients --calls 200 --concurrency 8 --server-latency-ms 5
+"""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modelhub.services.client_pool import ProviderClientPool
+
+
+CHAT_RESPONSE = {
+    'id': 'chatcmpl-mock',
+    'object': 'chat.completion',
+    'created': 0,
+    'model': 'mock-model',
+    'choices': [{
+        'index': 0,
+        'message': {'role': 'assistant', 'content': 'ok'},
+        'finish_reason': 'stop',
+    }],
+    'usage': {'prompt_tokens': 5, 'completion_tokens': 1, 'total_tokens': 6},
+}
+
+
+class MockLLMServer:
+    """
+    OpenAI-compatible chat completions endpoint on a local port.
+
+    Keeps connections alive (HTTP/1.1) and counts how many were opened.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                body = json.dumps(CHAT_RESPONSE).encode('utf-8')
+                with server.lock:
+                    server.requests += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class CountingServer(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                request = super().get_request()
+                with server.lock:
+                    server.connections += 1
+                return request
+
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.httpd = CountingServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def reset_counts(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Command(BaseCommand):
+    help = "Benchmark fresh-per-call vs pooled LLM SDK clients against a local mock server"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--calls",
+            type=int,
+            default=100,
+            help="Chat calls per mode",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Calls in flight at once",
+        )
+        parser.add_argument(
+            "--server-latency-ms",
+            type=float,
+            default=0.0,
+            help="Simulated model latency per request",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import openai
+        except ImportError:
+            raise CommandError("openai is not installed")
+
+        with MockLLMServer(latency_ms=options["server_latency_ms"]) as server:
+            self.stdout.write(f"Mock server at {server.base_url}")
+            self.stdout.write(f"{'mode':>8} {'p50':>9} {'p95':>9} {'mean':>9} {'calls/s':>9} {'conns':>6}")
+
+            for mode in ('fresh', 'pooled'):
+                server.reset_counts()
+                timings, elapsed = asyncio.run(
+                    self._run(mode, openai, server.base_url, options["calls"], options["concurrency"])
+                )
+                self.stdout.write(
+                    f"{mode:>8} {self._percentile(timings, 50):>7.2f}ms {self._percentile(timings, 95):>7.2f}ms "
+                    f"{statistics.mean(timings):>7.2f}ms {len(timings) / elapsed:>9.1f} {server.connections:>6}"
+                )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    async def _run(self, mode, openai, base_url, calls, concurrency):
+        pool = ProviderClientPool(idle_ttl=0)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        messages = [{'role': 'user', 'content': 'ping'}]
+
+        async def one_call():
+            async with semaphore:
+                start = time.perf_counter()
+                if mode == 'fresh':
+                    client = openai.AsyncOpenAI(api_key='benchmark-key', base_url=base_url)
+                    try:
+                        await client.chat.completions.create(model='mock-model', messages=messages, max_tokens=1)
+                    finally:
+                        await client.close()
+                else:
+                    client = pool.get_openai_client('benchmark-key', base_url=base_url, provider='mock')
+                    await client.chat.completions.create(model='mock-model', messages=messages, max_tokens=1)
+                return (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        try:
+            timings = await asyncio.gather(*(one_call() for _ in range(calls)))
+        finally:
+            await pool.aclose()
+        return list(timings), time.perf_counter() - started
+
+    @staticmethod
+    def _percentile(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
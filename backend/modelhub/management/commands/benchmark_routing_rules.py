@@ -0,0 +1,158 @@
+"""
+Management command to benchmark compiled routing rule decisions.
+
+Compiles a synthetic rule set (hundreds of rules across organizations, each
+with conditions and weighted models) or the rules in the database, then times
+rule matching plus weighted model selection for random requests.
+
+Usage:
+    python manage.py benchmark_routing_rules
+    python manage.py benchmark_routing_rules --rules 1000 --organizations 50 --requests 50000
+    python manage.py benchmark_routing_rules --from-db
+"""
+
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from modelhub.services.routing.rule_engine import RoutingRuleEngine, RuleSnapshot, compile_rule
+
+
+CONTENT_TYPES = ['code', 'business', 'technical', 'creative', 'general', 'analysis']
+STRATEGIES = ['cost_first', 'balanced', 'quality_first', 'performance_first']
+MODELS = [
+    ('openai', 'gpt-4o-mini'), ('openai', 'gpt-4o'), ('anthropic', 'claude-3-5-haiku'),
+    ('anthropic', 'claude-3-5-sonnet'), ('qwen', 'qwen-2.5-72b'), ('google', 'gemini-1.5-flash'),
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark routing-decision latency of the compiled rule engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rules",
+            type=int,
+            default=500,
+            help="Synthetic rules to compile",
+        )
+        parser.add_argument(
+            "--organizations",
+            type=int,
+            default=20,
+            help="Organizations the synthetic rules are spread over (plus system-wide rules)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20000,
+            help="Routing decisions to time",
+        )
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Compile the active rules in the database instead of synthetic ones",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=7,
+            help="Random seed",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        engine = RoutingRuleEngine(use_redis=False, rng=random.Random(options["seed"]))
+
+        start = time.perf_counter()
+        if options["from_db"]:
+            snapshot = engine.refresh(force=True)
+            organizations = sorted({org for org, _ in snapshot.index if org is not None}) or [None]
+        else:
+            organizations = [str(uuid.UUID(int=i + 1)) for i in range(options["organizations"])]
+            snapshot = RuleSnapshot.build(self._synthetic_rules(rng, options["rules"], organizations))
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        if not snapshot.rule_count:
+            raise CommandError("No active routing rules to benchmark")
+        self.stdout.write(f"Compiled {snapshot.rule_count} rules in {compile_ms:.1f}ms")
+
+        requests = [
+            (
+                rng.choice(organizations + [None]),
+                round(rng.random(), 2),
+                rng.choice(CONTENT_TYPES),
+                rng.choice(STRATEGIES),
+            )
+            for _ in range(options["requests"])
+        ]
+
+        timings = []
+        matched = 0
+        picks = Counter()
+        for organization_id, complexity, content_type, strategy in requests:
+            started = time.perf_counter()
+            rule, choice = engine.select(snapshot, organization_id, 'TEXT', complexity, content_type, strategy)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            if choice:
+                matched += 1
+                picks[(rule.id, choice)] += 1
+
+        self.stdout.write(
+            f"{len(timings)} decisions, {matched} matched a rule: "
+            f"p50 {self._percentile(timings, 50):.1f}us, p95 {self._percentile(timings, 95):.1f}us, "
+            f"p99 {self._percentile(timings, 99):.1f}us, mean {statistics.mean(timings):.1f}us"
+        )
+        self._report_weights(snapshot, picks)
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def _synthetic_rules(self, rng, count, organizations):
+        """Rules with threshold, membership and strategy conditions; ~1/4 system-wide"""
+        rules = []
+        for i in range(count):
+            low = round(rng.uniform(0, 0.8), 2)
+            conditions = [
+                {'field': 'complexity_score', 'operator': 'gte', 'value': low},
+                {'field': 'complexity_score', 'operator': 'lt', 'value': round(low + rng.uniform(0.1, 0.4), 2)},
+                {'field': 'content_type', 'operator': 'in', 'value': rng.sample(CONTENT_TYPES, 3)},
+            ]
+            if rng.random() < 0.5:
+                conditions.append({'field': 'optimization_strategy', 'operator': 'eq', 'value': rng.choice(STRATEGIES)})
+            models = [(provider, name, rng.randint(1, 100)) for provider, name in rng.sample(MODELS, 3)]
+            rules.append(compile_rule(
+                rule_id=f'rule-{i}',
+                name=f'Synthetic rule {i}',
+                priority=rng.randint(1, 100),
+                organization_id=None if rng.random() < 0.25 else rng.choice(organizations),
+                model_type='TEXT',
+                conditions=conditions,
+                models=models,
+            ))
+        return rules
+
+    def _report_weights(self, snapshot, picks):
+        """Compare observed pick shares with configured weights for the busiest rule"""
+        by_rule = Counter()
+        for (rule_id, _), hits in picks.items():
+            by_rule[rule_id] += hits
+        if not by_rule:
+            return
+        rule_id, total = by_rule.most_common(1)[0]
+        rule = next(r for rules in snapshot.index.values() for r in rules if r.id == rule_id)
+        previous = 0
+        self.stdout.write(f"Weighted picks for {rule.name} ({total} decisions):")
+        for choice, cumulative in zip(rule.choices, rule.cumulative_weights):
+            expected = (cumulative - previous) / rule.cumulative_weights[-1]
+            previous = cumulative
+            observed = picks[(rule_id, choice)] / total
+            self.stdout.write(f"  {choice[0]}/{choice[1]}: expected {expected:.0%}, observed {observed:.0%}")
+
+    @staticmethod
+    def _percentile(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
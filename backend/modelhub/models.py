@@ -416,23 +416,9 @@ class APIKey(BaseModel):
     @property
     def quota_status(self):
         """Get quota status for dashboard"""
+        from .services.quota_service import build_quota_status
         usage = self.get_usage_this_month()
-        monthly_used = usage['total_cost'] or 0
-        monthly_quota = self.monthly_quota or 0
-        
-        if monthly_quota > 0:
-            usage_percent = (monthly_used / monthly_quota) * 100
-            status = 'healthy' if usage_percent < 75 else ('warning' if usage_percent < 90 else 'critical')
-        else:
-            usage_percent = 0
-            status = 'no_limit'
-        
-        return {
-            'used': float(monthly_used),
-            'quota': float(monthly_quota),
-            'usage_percent': usage_percent,
-            'status': status
-        }
+        return build_quota_status(usage['total_cost'], self.monthly_quota)
 
     @classmethod
     @database_sync_to_async
@@ -681,11 +667,11 @@ class ModelMetrics(BaseModel):
         }
     
     @classmethod
-    @database_sync_to_async
-    def log_embedding_usage_async(cls, model, organization, tokens_processed, 
-                                 cost, latency_ms, api_key=None):
-        """Log embedding-specific usage metrics"""
-        return cls.objects.acreate(
+    async def log_embedding_usage_async(cls, model, organization, tokens_processed, 
+                                        cost, latency_ms, api_key=None):
+        """Log embedding-specific usage metrics (written in batches, see metrics_writer)"""
+        from .services.metrics_writer import arecord_metrics
+        return await arecord_metrics(
             model=model,
             organization=organization,
             api_key=api_key,
@@ -725,12 +711,12 @@ class ModelMetrics(BaseModel):
         )
 
     @classmethod
-    @database_sync_to_async
-    def log_vision_usage_async(cls, model, organization, tokens_input, tokens_output,
-                            image_count, cost, latency_ms, api_key=None, 
-                            metadata=None):
-        """Log vision-specific usage metrics"""
-        return cls.objects.acreate(
+    async def log_vision_usage_async(cls, model, organization, tokens_input, tokens_output,
+                                     image_count, cost, latency_ms, api_key=None, 
+                                     metadata=None):
+        """Log vision-specific usage metrics (written in batches, see metrics_writer)"""
+        from .services.metrics_writer import arecord_metrics
+        return await arecord_metrics(
             model=model,
             organization=organization,
             api_key=api_key,
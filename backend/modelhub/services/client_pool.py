@@ -0,0 +1,377 @@
+# File: backend/modelhub/services/client_pool.py
+"""
+Provider Client Pool
+
+Long-lived async SDK clients for the UnifiedLLMClient providers, so calls reuse
+TLS sessions and keep-alive connections instead of building a new client (and
+a new connection pool) on every request:
+
+- One shared, tuned HTTP connection pool per SDK (max connections, keep-alive
+  expiry, HTTP/2 when the h2 package is installed)
+- SDK clients keyed by (provider, API key hash, base URL) on top of it
+- Clients for a key are evicted when the key is rotated, deactivated or
+  deleted (see modelhub.signals); idle and least recently used clients are
+  dropped past IDLE_TTL / MAX_CLIENTS
+- aclose() / close_all() release the connections at shutdown
+
+Async connections belong to the event loop that opened them, so the pool is
+kept per event loop. Each loop's pool closes its clients when the loop shuts
+down (asyncio.run() and async_to_sync() finalize async generators before
+closing the loop); pools of loops closed without that are dropped on the
+next use of the pool.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CLIENT_POOL_SETTINGS = {
+    'MAX_CLIENTS': 256,
+    'IDLE_TTL': 900,
+    'MAX_CONNECTIONS': 100,
+    'MAX_KEEPALIVE_CONNECTIONS': 20,
+    'KEEPALIVE_EXPIRY': 60.0,
+    'HTTP2': True,
+}
+
+
+def get_client_pool_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['CLIENT_POOL'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('CLIENT_POOL', {})
+    return {**DEFAULT_CLIENT_POOL_SETTINGS, **configured}
+
+
+def hash_api_key(api_key: str) -> str:
+    """Stable, non-reversible pool key for an API key"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package"""
+    try:
+        importlib.import_module('h2')
+        return True
+    except ImportError:
+        return False
+
+
+@dataclass
+class PooledClient:
+    """An SDK client and its usage"""
+    client: Any
+    provider: str
+    key_hash: str
+    base_url: Optional[str]
+    created_at: float
+    last_used: float
+    uses: int = 0
+
+
+class _LoopPool:
+    """Clients and shared HTTP pools belonging to one event loop"""
+
+    def __init__(self):
+        self.http_clients: Dict[str, Any] = {}
+        self.clients: 'OrderedDict[Tuple[str, str, Optional[str]], PooledClient]' = OrderedDict()
+        # Async generator finalized by the loop at shutdown (the loop only keeps a weak reference)
+        self.shutdown_hook: Optional[AsyncGenerator] = None
+
+    async def close(self) -> None:
+        """Finish the shutdown hook, which closes the clients"""
+        await self.shutdown_hook.aclose()
+
+    async def aclose(self) -> None:
+        self.clients.clear()
+        http_clients = list(self.http_clients.values())
+        self.http_clients.clear()
+        for http_client in http_clients:
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing pooled HTTP client: {e}")
+
+
+def _step(awaitable) -> None:
+    """Run a coroutine step that completes without suspending"""
+    try:
+        awaitable.send(None)
+    except StopIteration:
+        pass
+
+
+class ProviderClientPool:
+    """
+    Long-lived provider SDK clients over shared HTTP connection pools.
+    """
+
+    def __init__(
+        self,
+        max_clients: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        """
+        Args:
+            max_clients: SDK clients kept per event loop (least recently used go first)
+            idle_ttl: Seconds an unused client is kept
+            max_connections: Connections per shared HTTP pool
+            max_keepalive_connections: Idle connections kept open per shared HTTP pool
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Negotiate HTTP/2 when the h2 package is installed
+        """
+        config = get_client_pool_settings()
+        self.max_clients = max_clients if max_clients is not None else config['MAX_CLIENTS']
+        self.idle_ttl = idle_ttl if idle_ttl is not None else config['IDLE_TTL']
+        self.limits = httpx.Limits(
+            max_connections=max_connections if max_connections is not None else config['MAX_CONNECTIONS'],
+            max_keepalive_connections=(
+                max_keepalive_connections if max_keepalive_connections is not None
+                else config['MAX_KEEPALIVE_CONNECTIONS']
+            ),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else config['KEEPALIVE_EXPIRY'],
+        )
+        self.http2 = (http2 if http2 is not None else config['HTTP2']) and http2_available()
+
+        self._loops: Dict[asyncio.AbstractEventLoop, _LoopPool] = {}
+        # Re-entered when a closed loop's shutdown hook is finished under it
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+
+    def get_openai_client(self, api_key: str, base_url: Optional[str] = None, provider: str = 'openai'):
+        """AsyncOpenAI client for OpenAI or an OpenAI-compatible base URL"""
+        def build(sdk, http_client):
+            client_kwargs = {'api_key': api_key, 'http_client': http_client}
+            if base_url:
+                client_kwargs['base_url'] = base_url
+            return sdk.AsyncOpenAI(**client_kwargs)
+
+        return self.get_client(provider, 'openai', api_key, base_url, build)
+
+    def get_anthropic_client(self, api_key: str, base_url: Optional[str] = None, provider: str = 'anthropic'):
+        """AsyncAnthropic client"""
+        def build(sdk, http_client):
+            client_kwargs = {'api_key': api_key, 'http_client': http_client}
+            if base_url:
+                client_kwargs['base_url'] = base_url
+            return sdk.AsyncAnthropic(**client_kwargs)
+
+        return self.get_client(provider, 'anthropic', api_key, base_url, build)
+
+    def get_client(
+        self,
+        provider: str,
+        sdk_name: str,
+        api_key: str,
+        base_url: Optional[str],
+        build: Callable[[Any, Any], Any]
+    ):
+        """
+        Return the pooled client for (provider, key, base URL), building it on first use.
+
+        Must be called from the event loop the client will be used on.
+
+        Args:
+            provider: Provider slug
+            sdk_name: SDK module ('openai', 'anthropic'); clients of one SDK share an HTTP pool
+            api_key: API key (only its hash is kept as the pool key)
+            base_url: Custom endpoint, if any
+            build: Creates the client from (sdk module, shared HTTP client)
+        """
+        loop_pool = self._loop_pool()
+        key = (provider, hash_api_key(api_key), base_url or None)
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire_idle(loop_pool, now)
+            entry = loop_pool.clients.get(key)
+            if entry is not None:
+                loop_pool.clients.move_to_end(key)
+                entry.last_used = now
+                entry.uses += 1
+                self.stats['hits'] += 1
+                return entry.client
+
+        sdk = importlib.import_module(sdk_name)
+        http_client = loop_pool.http_clients.get(sdk_name)
+        if http_client is None or http_client.is_closed:
+            http_client = self._build_http_client(sdk)
+            loop_pool.http_clients[sdk_name] = http_client
+        client = build(sdk, http_client)
+
+        with self._lock:
+            loop_pool.clients[key] = PooledClient(
+                client=client,
+                provider=provider,
+                key_hash=key[1],
+                base_url=key[2],
+                created_at=now,
+                last_used=now,
+                uses=1
+            )
+            self.stats['misses'] += 1
+            while len(loop_pool.clients) > self.max_clients:
+                loop_pool.clients.popitem(last=False)
+                self.stats['evictions'] += 1
+
+        logger.debug(f"Created pooled {sdk_name} client for {provider} (key {key[1]}, base_url {base_url})")
+        return client
+
+    def _build_http_client(self, sdk):
+        """
+        Shared HTTP client for one SDK.
+
+        The SDK's own DefaultAsyncHttpxClient keeps its timeout and redirect
+        defaults; only the connection pool is tuned.
+        """
+        factory = getattr(sdk, 'DefaultAsyncHttpxClient', None) or httpx.AsyncClient
+        return factory(limits=self.limits, http2=self.http2)
+
+    def _loop_pool(self) -> _LoopPool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_closed_loops()
+            loop_pool = self._loops.get(loop)
+            if loop_pool is not None:
+                return loop_pool
+            loop_pool = self._loops[loop] = _LoopPool()
+
+        loop_pool.shutdown_hook = self._close_at_loop_shutdown(loop, loop_pool)
+        # Run to the first yield, which registers the generator with the loop
+        _step(loop_pool.shutdown_hook.__anext__())
+        return loop_pool
+
+    async def _close_at_loop_shutdown(self, loop: asyncio.AbstractEventLoop, loop_pool: _LoopPool):
+        """Suspended until the loop's shutdown_asyncgens(), then closes the loop's clients"""
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._loops.get(loop) is loop_pool:
+                    del self._loops[loop]
+            await loop_pool.aclose()
+
+    def _drop_closed_loops(self) -> None:
+        """Forget pools of loops closed without shutting down their async generators"""
+        closed = [loop for loop in self._loops if loop.is_closed()]
+        for loop in closed:
+            loop_pool = self._loops.pop(loop)
+            loop_pool.clients.clear()
+            loop_pool.http_clients.clear()
+            # Nothing left to await, so the hook finishes without the loop
+            _step(loop_pool.shutdown_hook.aclose())
+        if closed:
+            logger.debug(f"Dropped LLM client pools of {len(closed)} closed event loop(s)")
+
+    def _expire_idle(self, loop_pool: _LoopPool, now: float) -> None:
+        if not self.idle_ttl:
+            return
+        expired = [key for key, entry in loop_pool.clients.items() if now - entry.last_used > self.idle_ttl]
+        for key in expired:
+            del loop_pool.clients[key]
+        self.stats['evictions'] += len(expired)
+
+    # ------------------------------------------------------------------
+    # Eviction and shutdown
+    # ------------------------------------------------------------------
+
+    def evict_key(self, api_key: str, provider: Optional[str] = None) -> int:
+        """
+        Drop every client built with api_key (on all event loops).
+
+        Clients share their loop's HTTP pool, so nothing needs closing here;
+        the next call with a replacement key builds a fresh client.
+
+        Returns:
+            Number of clients evicted
+        """
+        key_hash = hash_api_key(api_key)
+        evicted = 0
+        with self._lock:
+            for loop_pool in list(self._loops.values()):
+                for key, entry in list(loop_pool.clients.items()):
+                    if entry.key_hash == key_hash and (provider is None or entry.provider == provider):
+                        del loop_pool.clients[key]
+                        evicted += 1
+            self.stats['evictions'] += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} pooled LLM client(s) for rotated key {key_hash}")
+        return evicted
+
+    async def aclose(self) -> None:
+        """Close the clients and connections of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loop_pool = self._loops.pop(loop, None)
+        if loop_pool is not None:
+            await loop_pool.close()
+
+    def close_all(self) -> None:
+        """
+        Close every event loop's clients (process shutdown).
+
+        Pools of closed loops are just dropped; a running loop closes its own
+        pool as a scheduled task.
+        """
+        with self._lock:
+            self._drop_closed_loops()
+            pools = list(self._loops.items())
+            self._loops.clear()
+        for loop, loop_pool in pools:
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(loop_pool.close(), loop)
+                else:
+                    loop.run_until_complete(loop_pool.close())
+            except Exception as e:
+                logger.warning(f"Error closing LLM client pool: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._drop_closed_loops()
+            pools = list(self._loops.values())
+            return {
+                **self.stats,
+                'event_loops': len(pools),
+                'clients': sum(len(p.clients) for p in pools),
+                'http_pools': sum(len(p.http_clients) for p in pools),
+                'http2': self.http2,
+            }
+
+
+_client_pool: Optional[ProviderClientPool] = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ProviderClientPool:
+    """Process-wide client pool"""
+    global _client_pool
+    if _client_pool is None:
+        with _client_pool_lock:
+            if _client_pool is None:
+                _client_pool = ProviderClientPool()
+    return _client_pool
+
+
+def close_client_pool() -> None:
+    """Close the process-wide pool, if one was created"""
+    if _client_pool is not None:
+        _client_pool.close_all()
@@ -2,12 +2,20 @@
 """
 Caching service for complexity analysis results.
 Improves performance by caching identical requests.
+
+Two tiers: a bounded in-process LRU shared by every ComplexityCacheService in
+the process, in front of the Django cache (Redis). Misses are remembered
+briefly in the LRU, and concurrent identical requests share one analysis.
 """
+import asyncio
 import hashlib
 import json
+import threading
 import time
 import logging
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Awaitable, Callable, Tuple
 from decimal import Decimal
 
 from django.core.cache import cache
@@ -17,6 +25,117 @@ from .types import ComplexityResult, RequestContext, CacheKey, AnalysisPath
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_COMPLEXITY_CACHE_SETTINGS = {
+    'LOCAL_MAX_ENTRIES': 4096,
+    'NEGATIVE_TTL': 10,
+}
+
+
+def get_complexity_cache_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['COMPLEXITY_CACHE'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('COMPLEXITY_CACHE', {})
+    return {**DEFAULT_COMPLEXITY_CACHE_SETTINGS, **configured}
+
+
+# Marker for a remembered miss
+_MISS = object()
+
+
+class LocalResultCache:
+    """
+    Process-local tier: LRU of serialized results with per-entry expiry,
+    remembered misses, and the keys currently being analyzed.
+    """
+    
+    def __init__(self, max_entries: int = 4096, negative_ttl: float = 10):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'errors': 0,
+            'local_hits': 0,
+            'negative_hits': 0,
+            'redis_hits': 0,
+            'redis_misses': 0,
+            'coalesced': 0,
+            'evictions': 0
+        }
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Serialized result, _MISS for a remembered miss, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def set_miss(self, key: str) -> None:
+        self.set(key, _MISS, self.negative_ttl)
+    
+    def join(self, key: str) -> Tuple[Future, bool]:
+        """(future for the key's analysis, True if the caller must run it)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+    
+    def leave(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_local_cache: Optional[LocalResultCache] = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_complexity_cache() -> LocalResultCache:
+    """Process-wide local tier"""
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                config = get_complexity_cache_settings()
+                _local_cache = LocalResultCache(
+                    max_entries=config['LOCAL_MAX_ENTRIES'],
+                    negative_ttl=config['NEGATIVE_TTL']
+                )
+    return _local_cache
+
+
+class LeaderFailed(Exception):
+    """The request analyzing a key failed or was cancelled"""
+
 
 class ComplexityCacheService:
     """
@@ -25,8 +144,10 @@ class ComplexityCacheService:
     Features:
     - Content-based cache keys
     - Context-aware caching  
-    - TTL based on confidence
-    - Performance metrics
+    - TTL based on confidence, in both tiers
+    - In-process LRU in front of the Django cache
+    - Negative caching and single-flight analysis
+    - Performance metrics per tier
     """
     
     # Cache configuration
@@ -34,14 +155,11 @@ class ComplexityCacheService:
     HIGH_CONFIDENCE_TTL = 7200  # 2 hours for high confidence results
     LOW_CONFIDENCE_TTL = 1800   # 30 minutes for low confidence results
     
-    def __init__(self):
+    def __init__(self, local_cache: Optional[LocalResultCache] = None):
         self.cache_prefix = "complexity_analysis"
-        self.stats = {
-            'hits': 0,
-            'misses': 0,
-            'sets': 0,
-            'errors': 0
-        }
+        self.local_cache = local_cache if local_cache is not None else get_local_complexity_cache()
+        # Shared with every service using the same local tier
+        self.stats = self.local_cache.stats
     
     def get_cached_result(
         self, 
@@ -55,7 +173,22 @@ class ComplexityCacheService:
         """
         try:
             cache_key = self._generate_cache_key(request_text, context)
-            cache_data = cache.get(str(cache_key))
+            key = str(cache_key)
+            
+            cache_data = self.local_cache.get(key)
+            if cache_data is _MISS:
+                self.stats['negative_hits'] += 1
+                self.stats['misses'] += 1
+                return None
+            if cache_data is not None:
+                self.stats['local_hits'] += 1
+            else:
+                cache_data = cache.get(key)
+                if cache_data:
+                    self.stats['redis_hits'] += 1
+                    self.local_cache.set(key, cache_data, self._remaining_ttl(cache_data))
+                else:
+                    self.stats['redis_misses'] += 1
             
             if cache_data:
                 # Deserialize and validate cached result
@@ -69,6 +202,7 @@ class ComplexityCacheService:
                     logger.debug(f"✅ Cache HIT for key: {cache_key}")
                     return result
             
+            self.local_cache.set_miss(key)
             self.stats['misses'] += 1
             logger.debug(f"❌ Cache MISS for key: {cache_key}")
             return None
@@ -96,19 +230,14 @@ class ComplexityCacheService:
             cache_key = self._generate_cache_key(request_text, context)
             cache_data = self._serialize_result(result)
             
-            # Determine TTL based on confidence
-            if result.confidence > 0.9:
-                ttl = self.HIGH_CONFIDENCE_TTL
-            elif result.confidence > 0.7:
-                ttl = self.DEFAULT_TTL
-            else:
-                ttl = self.LOW_CONFIDENCE_TTL
+            ttl = self._ttl_for_confidence(result.confidence)
             
             # Don't cache LLM escalation results if they're placeholder
             if result.analysis_path == AnalysisPath.LLM_ESCALATION and "placeholder" in result.reasoning:
                 logger.debug(f"Skipping cache for LLM placeholder result")
                 return False
             
+            self.local_cache.set(str(cache_key), cache_data, ttl)
             success = cache.set(str(cache_key), cache_data, ttl)
             
             if success:
@@ -125,6 +254,68 @@ class ComplexityCacheService:
             logger.warning(f"Cache storage error: {e}")
             return False
     
+    async def get_or_analyze(
+        self,
+        request_text: str,
+        context: RequestContext,
+        analyze: Callable[[], Awaitable[ComplexityResult]]
+    ) -> ComplexityResult:
+        """
+        Cached result, or the result of analyze() cached in both tiers.
+        
+        Concurrent calls for the same key run analyze() once (including any
+        LLM escalation); the others wait for it, in any thread or event loop.
+        If that analysis fails, each waiting call runs its own.
+        """
+        cached_result = self.get_cached_result(request_text, context)
+        if cached_result:
+            return cached_result
+        
+        key = str(self._generate_cache_key(request_text, context))
+        future, leader = self.local_cache.join(key)
+        
+        if not leader:
+            try:
+                result = self._deserialize_result(await asyncio.wrap_future(future))
+                if result:
+                    logger.debug(f"🔗 Shared in-flight analysis for key: {key}")
+                    result.cache_hit = True
+                    return result
+            except LeaderFailed:
+                logger.debug(f"In-flight analysis failed, analyzing again: {key}")
+            return await analyze()
+        
+        error = 'analysis did not complete'
+        try:
+            result = await analyze()
+            self.cache_result(request_text, context, result)
+            future.set_result(self._serialize_result(result))
+            return result
+        except BaseException as e:
+            error = str(e)
+            raise
+        finally:
+            # Followers must be released whatever failed, serialization included
+            if not future.done():
+                future.set_exception(LeaderFailed(error))
+            self.local_cache.leave(key, future)
+    
+    def _ttl_for_confidence(self, confidence: float) -> int:
+        """Cache TTL for a result, used by both tiers (see cache_result)"""
+        if confidence > 0.9:
+            return self.HIGH_CONFIDENCE_TTL
+        elif confidence > 0.7:
+            return self.DEFAULT_TTL
+        return self.LOW_CONFIDENCE_TTL
+    
+    def _remaining_ttl(self, cache_data: Dict[str, Any]) -> float:
+        """Seconds a result read from the Django cache has left there"""
+        try:
+            ttl = self._ttl_for_confidence(cache_data['confidence'])
+            return ttl - (time.time() - cache_data.get('cached_at', time.time()))
+        except (KeyError, TypeError):
+            return 0
+    
     def _generate_cache_key(self, request_text: str, context: RequestContext) -> CacheKey:
         """
         Generate cache key based on request content and relevant context.
@@ -201,13 +392,31 @@ class ComplexityCacheService:
         total_requests = self.stats['hits'] + self.stats['misses']
         hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
         
+        # Local tier sees every lookup; Redis only those the local tier missed
+        local_hit_rate = (self.stats['local_hits'] / total_requests * 100) if total_requests > 0 else 0
+        redis_lookups = self.stats['redis_hits'] + self.stats['redis_misses']
+        redis_hit_rate = (self.stats['redis_hits'] / redis_lookups * 100) if redis_lookups > 0 else 0
+        
         return {
             'total_requests': total_requests,
             'cache_hits': self.stats['hits'],
             'cache_misses': self.stats['misses'],
             'cache_sets': self.stats['sets'],
             'cache_errors': self.stats['errors'],
-            'hit_rate_percent': round(hit_rate, 2)
+            'hit_rate_percent': round(hit_rate, 2),
+            'local': {
+                'hits': self.stats['local_hits'],
+                'negative_hits': self.stats['negative_hits'],
+                'hit_rate_percent': round(local_hit_rate, 2),
+                'entries': len(self.local_cache),
+                'evictions': self.stats['evictions']
+            },
+            'redis': {
+                'lookups': redis_lookups,
+                'hits': self.stats['redis_hits'],
+                'hit_rate_percent': round(redis_hit_rate, 2)
+            },
+            'coalesced_requests': self.stats['coalesced']
         }
     
     def clear_cache(self, organization_id: Optional[str] = None) -> bool:
@@ -225,6 +434,7 @@ class ComplexityCacheService:
                 return True
             else:
                 # Clear all complexity cache
+                self.local_cache.clear()
                 cache.delete_many(cache.keys(f"{self.cache_prefix}:*"))
                 logger.info("Cleared all complexity analysis cache")
                 return True
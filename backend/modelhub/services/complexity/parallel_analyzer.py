@@ -28,7 +28,8 @@ class ParallelComplexityAnalyzer:
     
     Architecture:
     1. Fast-path checks (synchronous, <1ms)
-    2. Cache lookup
+    2. Cache lookup (in-process LRU, then Redis); concurrent identical
+       requests share one analysis
     3. Parallel execution of 4 components:
        - Pattern Analysis
        - Content Type Detection  
@@ -92,47 +93,47 @@ class ParallelComplexityAnalyzer:
             
             logger.info("Fast path not matched, launching parallel analysis components")
             
-            # 2. Check cache
-            cached_result = await self._check_cache(request_text, context)
-            if cached_result:
-                logger.info("Cache hit for complexity analysis")
-                cached_result.cache_hit = True
-                return cached_result
-            
-            # 3. Launch parallel analysis
-            logger.info("Running parallel analysis components")
-            component_results = await self._run_parallel_analysis(request_text, context)
-            logger.info(f"Completed {len(component_results)} parallel analysis components")
-            
-            # 4. Apply weighted consensus
-            logger.info("Applying weighted consensus to component results")
-            consensus_result = self._apply_weighted_consensus(component_results, start_time)
-            
-            # 5. Check for conflicts and adjust
-            logger.info("Applying conflict resolution")
-            final_result = self._resolve_conflicts(consensus_result, component_results)
-            
-            # 6. Determine if LLM escalation needed
-            logger.info("Checking escalation criteria")
-            if (final_result.confidence < self.config.universal_confidence_threshold or 
-                component_results.get('escalation_patterns', {}).get('should_escalate', False)):
-                logger.info("Escalating to LLM for complexity analysis")
-                final_result = await self._escalate_to_llm(request_text, context, final_result)
-            
-            # 7. Cache and return
-            logger.info("Caching final complexity result")
-            await self._cache_result(request_text, context, final_result)
-            
-            analysis_time_ms = (time.time() - start_time) * 1000
-            logger.info(f"Parallel complexity analysis completed in {analysis_time_ms:.2f}ms")
-            final_result.analysis_time_ms = analysis_time_ms
-            return final_result
+            # 2. Cache, or one analysis shared by concurrent identical requests
+            return await self.cache_service.get_or_analyze(
+                request_text, context,
+                lambda: self._analyze_uncached(request_text, context, start_time)
+            )
             
         except Exception as e:
             logger.error("Error in parallel complexity analysis: %s", str(e))
             # Fallback to simple result
             return self._create_fallback_result(request_text, start_time, str(e))
     
+    async def _analyze_uncached(
+        self, request_text: str, context: RequestContext, start_time: float
+    ) -> ComplexityResult:
+        """Steps 3-7: parallel components, consensus and LLM escalation"""
+        # 3. Launch parallel analysis
+        logger.info("Running parallel analysis components")
+        component_results = await self._run_parallel_analysis(request_text, context)
+        logger.info(f"Completed {len(component_results)} parallel analysis components")
+        
+        # 4. Apply weighted consensus
+        logger.info("Applying weighted consensus to component results")
+        consensus_result = self._apply_weighted_consensus(component_results, start_time)
+        
+        # 5. Check for conflicts and adjust
+        logger.info("Applying conflict resolution")
+        final_result = self._resolve_conflicts(consensus_result, component_results)
+        
+        # 6. Determine if LLM escalation needed
+        logger.info("Checking escalation criteria")
+        if (final_result.confidence < self.config.universal_confidence_threshold or 
+            component_results.get('escalation_patterns', {}).get('should_escalate', False)):
+            logger.info("Escalating to LLM for complexity analysis")
+            final_result = await self._escalate_to_llm(request_text, context, final_result)
+        
+        # 7. Return; get_or_analyze caches it
+        analysis_time_ms = (time.time() - start_time) * 1000
+        logger.info(f"Parallel complexity analysis completed in {analysis_time_ms:.2f}ms")
+        final_result.analysis_time_ms = analysis_time_ms
+        return final_result
+    
     def _check_fast_path(self, text: str) -> FastPathResult:
         """
         Fast-path optimization checks that bypass full analysis for obvious cases.
@@ -875,16 +876,6 @@ class ParallelComplexityAnalyzer:
             component_name=component_name
         )
     
-    async def _check_cache(self, text: str, context: RequestContext) -> Optional[ComplexityResult]:
-        """Check cache for existing results"""
-        try:
-            # Make cache service call synchronous since it's not actually async
-            cached_result = self.cache_service.get_cached_result(text, context)
-            return cached_result
-        except Exception as e:
-            logger.debug("Cache check failed: %s", str(e))
-            return None
-    
     async def _cache_result(self, text: str, context: RequestContext, result: ComplexityResult):
         """Cache the analysis result"""
         try:
@@ -0,0 +1,391 @@
+# backend/modelhub/services/complexity/pattern_matcher.py
+"""
+Compiled pattern matcher for rule-based complexity analysis.
+
+Evaluating every pattern with its own re.search costs one pass over the
+text per pattern, and `\\b(a|b)\\b.*\\b(c|d)\\b` style patterns go quadratic on
+long single-line prompts when they fail. The matcher compiles the pattern
+groups once and answers "which patterns occur in this text":
+
+- Keyword parts (`\\b(word|phrase|...)\\b` and the pieces of `X.*Y`) are
+  indexed by their first word. One pass over the words of the text records
+  where every part occurs
+- Keyword patterns hit when their part occurs at all
+- Conjunctions (`X.*Y.*Z`) take the first occurrence of each part after the
+  previous one, on the same line, with a bisect instead of backtracking
+- Anything else (anchored patterns, non-literal alternatives) keeps its regex
+
+Results are identical to calling search() on each pattern.
+"""
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+# Regex syntax that makes an alternative more than a literal phrase
+_META = set('.^$*+?{}[]()|\\')
+
+_WORD = re.compile(r'\w+')
+
+# Characters that match an ASCII letter under re.I but not after lower(),
+# or whose lower() changes the length of the text
+_FOLDS_TO_ASCII = re.compile('[\u0130\u0131\u017f\u212a]')
+
+PatternGroups = Dict[str, Dict[Any, List[Pattern]]]
+PatternId = Tuple[str, Any, int]  # (group, category, index in category)
+
+
+def _split_top_level(source: str, separator: str) -> List[str]:
+    """Split a regex source on a separator outside groups and character classes"""
+    parts, depth, start, i, in_class = [], 0, 0, 0, False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and source.startswith(separator, i):
+            parts.append(source[start:i])
+            i += len(separator)
+            start = i
+            continue
+        i += 1
+    parts.append(source[start:])
+    return parts
+
+
+def _literal(source: str) -> Optional[str]:
+    """The phrase a regex source matches when it is a plain literal, else None"""
+    chars, i = [], 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            escaped = source[i + 1:i + 2]
+            if not escaped or escaped.isalnum():  # \b, \w, \d ... are not literals
+                return None
+            chars.append(escaped)
+            i += 2
+            continue
+        if char in _META:
+            return None
+        chars.append(char)
+        i += 1
+    return ''.join(chars)
+
+
+def _strip_group(source: str) -> str:
+    """`(x)` -> `x` when one capturing group encloses the whole source"""
+    if not (source.startswith('(') and source.endswith(')')) or source.startswith('(?'):
+        return source
+    depth, i = 0, 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0 and i != len(source) - 1:
+                return source  # e.g. (a)|(b)
+        i += 1
+    return source[1:-1]
+
+
+def _word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _head(phrase: str) -> str:
+    """Leading word characters of a phrase"""
+    end = 0
+    while end < len(phrase) and _word_char(phrase[end]):
+        end += 1
+    return phrase[:end]
+
+
+@dataclass(frozen=True)
+class _Part:
+    """Literal alternatives with an optional \\b on each side"""
+    alternatives: Tuple[str, ...]
+    pattern: Pattern
+    left_boundary: bool
+    right_boundary: bool
+
+    @property
+    def indexable(self) -> bool:
+        # Found from word starts only if it begins there
+        return self.left_boundary and all(_word_char(a[0]) for a in self.alternatives)
+
+
+def _parse_part(source: str, flags: int, exclusive: bool = True) -> Optional[_Part]:
+    body = source
+    left_boundary = body.startswith(r'\b')
+    if left_boundary:
+        body = body[2:]
+    right_boundary = body.endswith(r'\b') and not body.endswith(r'\\b')
+    if right_boundary:
+        body = body[:-2]
+    body = _strip_group(body)
+    alternatives = []
+    for alternative in _split_top_level(body, '|'):
+        phrase = _literal(alternative)
+        if not phrase:
+            return None
+        alternatives.append(phrase.lower() if flags & re.I else phrase)
+    # In a chain, a later occurrence could end before an earlier one if one
+    # alternative contains another; taking the first would then not be exact
+    if exclusive:
+        for a in alternatives:
+            if any(a != b and a in b for b in alternatives):
+                return None
+    return _Part(tuple(alternatives), re.compile(source, flags), left_boundary, right_boundary)
+
+
+class _Occurrences:
+    """Start and end offsets of one part, in text order"""
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+    def add(self, start: int, end: int):
+        self.starts.append(start)
+        self.ends.append(end)
+
+
+@dataclass
+class PatternHits:
+    """Patterns found in one text"""
+    hits: FrozenSet[PatternId]
+
+    def count(self, group: str, categories: Optional[Iterable[Any]] = None) -> int:
+        """Matched patterns in a group, optionally limited to some categories"""
+        wanted = None if categories is None else set(categories)
+        return sum(
+            1 for hit_group, category, _ in self.hits
+            if hit_group == group and (wanted is None or category in wanted)
+        )
+
+    def category_counts(self, group: str) -> Dict[Any, int]:
+        counts: Dict[Any, int] = {}
+        for hit_group, category, _ in self.hits:
+            if hit_group == group:
+                counts[category] = counts.get(category, 0) + 1
+        return counts
+
+
+class CompiledPatternMatcher:
+    """
+    All pattern groups of an analyzer compiled into one matcher.
+    """
+
+    def __init__(self, groups: PatternGroups):
+        """
+        Args:
+            groups: {group name: {category: [compiled patterns]}}, e.g.
+                {'simple': SIMPLE_PATTERNS, 'complex': COMPLEX_PATTERNS}
+        """
+        self.patterns: List[Tuple[PatternId, Pattern]] = []
+        self.parts: List[_Part] = []
+        self.keywords: List[Tuple[PatternId, int]] = []
+        self.conjunctions: List[Tuple[PatternId, Tuple[int, ...]]] = []
+        self.regexes: List[Tuple[PatternId, Pattern]] = []
+
+        for group, categories in groups.items():
+            for category, patterns in categories.items():
+                for index, pattern in enumerate(patterns):
+                    pattern_id = (group, category, index)
+                    self.patterns.append((pattern_id, pattern))
+                    if not self._add_keywords(pattern_id, pattern) and not self._add_conjunction(
+                        pattern_id, pattern
+                    ):
+                        self.regexes.append((pattern_id, pattern))
+
+        # First word -> (phrase, part) for phrases that end where the word ends
+        # or continue past it; word prefix -> parts for one-word phrases
+        # without a trailing \b, which also match the start of longer words
+        self._by_word: Dict[str, List[Tuple[str, int]]] = {}
+        self._by_prefix: Dict[str, List[int]] = {}
+        for part_index, part in enumerate(self.parts):
+            if not part.indexable:
+                continue
+            for phrase in part.alternatives:
+                self._by_word.setdefault(_head(phrase), []).append((phrase, part_index))
+                if not part.right_boundary and _head(phrase) == phrase:
+                    self._by_prefix.setdefault(phrase, []).append(part_index)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix})
+        self.keyword_count = sum(len(entries) for entries in self._by_word.values())
+
+    def _add_part(self, part: _Part) -> int:
+        self.parts.append(part)
+        return len(self.parts) - 1
+
+    def _add_keywords(self, pattern_id: PatternId, pattern: Pattern) -> bool:
+        """Keyword patterns: case-insensitive `\\b(alternatives)\\b` of literals"""
+        source = pattern.pattern
+        if not (pattern.flags & re.I) or not (source.startswith(r'\b') and source.endswith(r'\b')):
+            return False
+        body = _strip_group(source[2:-2])
+        phrases, rest = [], []
+        for alternative in _split_top_level(body, '|'):
+            phrase = _literal(alternative)
+            if phrase and _word_char(phrase[0]):
+                phrases.append(re.escape(phrase))
+            else:
+                rest.append(alternative)
+        if not phrases:
+            return False
+        part = _parse_part(r'\b(' + '|'.join(phrases) + r')\b', pattern.flags, exclusive=False)
+        self.keywords.append((pattern_id, self._add_part(part)))
+        if rest:
+            # e.g. trade.?offs? keeps a regex of its own
+            self.regexes.append((pattern_id, re.compile(r'\b(?:' + '|'.join(rest) + r')\b', pattern.flags)))
+        return True
+
+    def _add_conjunction(self, pattern_id: PatternId, pattern: Pattern) -> bool:
+        """
+        `\\b(a|b)\\b.*\\b(c|d)\\b` and `\\b(x.*y|z.*w)\\b` style patterns: every
+        alternative is a chain of keyword parts joined by `.*`
+        """
+        if not pattern.flags & re.I:
+            return False
+        source = pattern.pattern
+        chains = []
+        branches = _split_top_level(source, '|')
+        if len(branches) == 1 and source.startswith(r'\b(') and source.endswith(r')\b'):
+            inner = _strip_group(source[2:-2])
+            if inner != source[2:-2]:
+                branches = [r'\b' + branch + r'\b' for branch in _split_top_level(inner, '|')]
+        for branch in branches:
+            sources = _split_top_level(branch, '.*')
+            parts = [_parse_part(part, pattern.flags) for part in sources]
+            if len(sources) < 2 or not all(parts):
+                return False
+            chains.append(parts)
+        for parts in chains:
+            self.conjunctions.append((pattern_id, tuple(self._add_part(part) for part in parts)))
+        return True
+
+    def scan(self, text: str) -> PatternHits:
+        """Every pattern that re.search would find in the text"""
+        if _FOLDS_TO_ASCII.search(text):
+            # Offsets and case folding of text.lower() would not line up with re.I
+            return PatternHits(frozenset(
+                pattern_id for pattern_id, pattern in self.patterns if pattern.search(text)
+            ))
+
+        lowered = text.lower()
+        occurrences = self._find_parts(lowered)
+        hits = {pattern_id for pattern_id, part_index in self.keywords if part_index in occurrences}
+
+        line_ends = None
+        lines = None
+        for pattern_id, chain in self.conjunctions:
+            if pattern_id in hits:
+                continue
+            if all(self.parts[part_index].indexable for part_index in chain):
+                if line_ends is None:
+                    line_ends = [match.start() for match in re.finditer('\n', text)] + [len(text)]
+                found = self._chain_in_occurrences(chain, occurrences, line_ends)
+            else:
+                if lines is None:
+                    lines = text.split('\n')  # '.' stops at newlines
+                patterns = tuple(self.parts[part_index].pattern for part_index in chain)
+                found = any(self._chain_matches(line, patterns) for line in lines)
+            if found:
+                hits.add(pattern_id)
+
+        for pattern_id, pattern in self.regexes:
+            if pattern_id not in hits and pattern.search(text):
+                hits.add(pattern_id)
+
+        return PatternHits(frozenset(hits))
+
+    def _find_parts(self, lowered: str) -> Dict[int, _Occurrences]:
+        """{part index: occurrences} from one pass over the words of the text"""
+        occurrences: Dict[int, _Occurrences] = {}
+        candidates: Dict[str, List[Tuple[str, int, bool, bool]]] = {}
+        size = len(lowered)
+
+        for match in _WORD.finditer(lowered):
+            word = match.group()
+            entries = candidates.get(word)
+            if entries is None:
+                entries = candidates[word] = self._candidates(word)
+            if not entries:
+                continue
+            start = match.start()
+            for phrase, part_index, check_rest, check_boundary in entries:
+                end = start + len(phrase)
+                if check_rest and not lowered.startswith(phrase, start):
+                    continue
+                if check_boundary and end < size and _word_char(phrase[-1]) == _word_char(lowered[end]):
+                    continue
+                found = occurrences.get(part_index)
+                if found is None:
+                    found = occurrences[part_index] = _Occurrences()
+                found.add(start, end)
+
+        return occurrences
+
+    def _candidates(self, word: str) -> List[Tuple[str, int, bool, bool]]:
+        """
+        (phrase, part index, check_rest, check_boundary) for parts that can
+        start at this word. A phrase equal to the word already matches and
+        ends on a boundary; a longer one still has to be compared with the text
+        """
+        entries = []
+        for phrase, part_index in self._by_word.get(word, ()):
+            longer = len(phrase) != len(word)
+            entries.append((phrase, part_index, longer, longer and self.parts[part_index].right_boundary))
+        for length in self._prefix_lengths:
+            if length >= len(word):
+                break
+            for part_index in self._by_prefix.get(word[:length], ()):
+                entries.append((word[:length], part_index, False, False))
+        return entries
+
+    @staticmethod
+    def _chain_in_occurrences(
+        chain: Tuple[int, ...], occurrences: Dict[int, _Occurrences], line_ends: List[int]
+    ) -> bool:
+        """Each part found after the end of the previous one, all on one line"""
+        found = [occurrences.get(part_index) for part_index in chain]
+        if not all(found):
+            return False
+        first = found[0]
+        index = 0
+        while index < len(first.starts):
+            line_end = line_ends[bisect_left(line_ends, first.starts[index])]
+            position = first.ends[index]
+            for part in found[1:]:
+                next_index = bisect_left(part.starts, position)
+                if next_index == len(part.starts) or part.ends[next_index] > line_end:
+                    break
+                position = part.ends[next_index]
+            else:
+                return True
+            # Earlier parts end earliest at the first occurrence on a line
+            index = bisect_left(first.starts, line_end + 1)
+        return False
+
+    @staticmethod
+    def _chain_matches(line: str, chain: Tuple[Pattern, ...]) -> bool:
+        """Each part found after the end of the previous one"""
+        position = 0
+        for part in chain:
+            match = part.search(line, position)
+            if match is None:
+                return False
+            position = match.end()
+        return True
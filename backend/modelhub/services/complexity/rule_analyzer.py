@@ -13,6 +13,7 @@ from .types import (
     ComplexityResult, ComplexityLevel, AnalysisPath, ContentType, 
     RequestContext, PatternCategory, CacheKey
 )
+from .pattern_matcher import CompiledPatternMatcher, PatternHits
 
 logger = logging.getLogger(__name__)
 
@@ -212,6 +213,15 @@ class RuleBasedComplexityAnalyzer:
                 re.compile(r'\b(feel|think|believe|prefer)\b', re.I)
             ]
         }
+        
+        # All groups in one matcher, so a request scans its text once
+        self._matcher = CompiledPatternMatcher({
+            'simple': self.SIMPLE_PATTERNS,
+            'complex': self.COMPLEX_PATTERNS,
+            'context': self.CONTEXT_PATTERNS,
+            'content_type': self.CONTENT_TYPE_PATTERNS,
+            'escalation': self.ESCALATION_PATTERNS,
+        })
     
     def analyze_complexity(self, text: str, context: RequestContext) -> ComplexityResult:
         """
@@ -229,32 +239,36 @@ class RuleBasedComplexityAnalyzer:
         char_count = len(text)
         word_count = len(text.split())
         
+        # Every pattern group is answered from one scan
+        hits = self._matcher.scan(text_lower)
+        content_type = self._content_type_from_hits(hits)
+        
         # ===========================================
         # PHASE 1: HIGH-CONFIDENCE SIMPLE DETECTION
         # ===========================================
         
         # Very short queries - likely simple
         if char_count < 20:
-            simple_score = self._check_pattern_matches(text_lower, self.SIMPLE_PATTERNS)
+            simple_score = hits.count('simple')
             if simple_score > 0:
                 return self._create_result(
                     score=0.1, 
                     reasoning=f"very_short_simple:chars={char_count},patterns={simple_score}",
                     confidence=0.95,
-                    content_type=self._detect_content_type(text_lower),
+                    content_type=content_type,
                     pattern_matches={'simple': simple_score},
                     start_time=start_time
                 )
         
         # Basic factual patterns under 100 chars
         if char_count < 100:
-            simple_matches = self._check_pattern_matches(text_lower, self.SIMPLE_PATTERNS)
+            simple_matches = hits.count('simple')
             if simple_matches >= 2:  # Multiple simple indicators
                 return self._create_result(
                     score=0.15,
                     reasoning=f"multiple_simple_patterns:{simple_matches}",
                     confidence=0.90,
-                    content_type=self._detect_content_type(text_lower),
+                    content_type=content_type,
                     pattern_matches={'simple': simple_matches},
                     start_time=start_time
                 )
@@ -265,25 +279,25 @@ class RuleBasedComplexityAnalyzer:
         
         # Long requests are likely complex
         if char_count > 1000:
-            complex_matches = self._check_pattern_matches(text_lower, self.COMPLEX_PATTERNS)
+            complex_matches = hits.count('complex')
             if complex_matches > 0:
                 return self._create_result(
                     score=0.85,
                     reasoning=f"long_complex_request:chars={char_count},patterns={complex_matches}",
                     confidence=0.90,
-                    content_type=self._detect_content_type(text_lower),
+                    content_type=content_type,
                     pattern_matches={'complex': complex_matches},
                     start_time=start_time
                 )
         
         # Multiple complex indicators
-        complex_score = self._check_pattern_matches(text_lower, self.COMPLEX_PATTERNS)
+        complex_score = hits.count('complex')
         if complex_score >= 3:  # Multiple complex patterns
             return self._create_result(
                 score=0.80,
                 reasoning=f"multiple_complex_patterns:{complex_score}",
                 confidence=0.88,
-                content_type=self._detect_content_type(text_lower),
+                content_type=content_type,
                 pattern_matches={'complex': complex_score},
                 start_time=start_time
             )
@@ -292,7 +306,6 @@ class RuleBasedComplexityAnalyzer:
         # PHASE 3: CONTENT TYPE ANALYSIS
         # ===========================================
         
-        content_type = self._detect_content_type(text_lower)
         content_complexity = self._get_content_type_complexity(content_type, char_count, word_count)
         
         if content_complexity['confidence'] > 0.85:
@@ -309,7 +322,7 @@ class RuleBasedComplexityAnalyzer:
         # PHASE 4: CONTEXT-AWARE ANALYSIS
         # ===========================================
         
-        context_complexity = self._analyze_context_complexity(text_lower, context)
+        context_complexity = self._analyze_context_complexity(text_lower, context, hits)
         if context_complexity['confidence'] > 0.85:
             return self._create_result(
                 score=context_complexity['score'],
@@ -335,9 +348,9 @@ class RuleBasedComplexityAnalyzer:
             base_score = 0.7
         
         # Adjust based on patterns
-        simple_matches = self._check_pattern_matches(text_lower, self.SIMPLE_PATTERNS)
-        complex_matches = self._check_pattern_matches(text_lower, self.COMPLEX_PATTERNS)
-        escalation_matches = self._check_escalation_patterns(text_lower)
+        simple_matches = hits.count('simple')
+        complex_matches = hits.count('complex')
+        escalation_matches = hits.count('escalation')
         
         final_score = base_score
         confidence = 0.70  # Medium confidence
@@ -389,11 +402,16 @@ class RuleBasedComplexityAnalyzer:
     
     def _detect_content_type(self, text: str) -> ContentType:
         """Detect the primary content type"""
+        return self._content_type_from_hits(self._matcher.scan(text))
+    
+    def _content_type_from_hits(self, hits: PatternHits) -> ContentType:
+        """Content type with the most matched patterns; the first one wins ties"""
+        counts = hits.category_counts('content_type')
         max_matches = 0
         detected_type = ContentType.GENERAL
         
-        for content_type, patterns in self.CONTENT_TYPE_PATTERNS.items():
-            matches = sum(1 for pattern in patterns if pattern.search(text))
+        for content_type in self.CONTENT_TYPE_PATTERNS:
+            matches = counts.get(content_type, 0)
             if matches > max_matches:
                 max_matches = matches
                 detected_type = content_type
@@ -434,15 +452,17 @@ class RuleBasedComplexityAnalyzer:
             'confidence': base_info['confidence']
         }
     
-    def _analyze_context_complexity(self, text: str, context: RequestContext) -> Dict:
+    def _analyze_context_complexity(
+        self, text: str, context: RequestContext, hits: Optional[PatternHits] = None
+    ) -> Dict:
         """Analyze complexity based on conversation/RAG context"""
+        if hits is None:
+            hits = self._matcher.scan(text)
         
         # RAG context complexity
         if context.rag_documents:
             doc_count = len(context.rag_documents)
-            rag_complex_matches = self._check_pattern_matches(text, {
-                'rag_complex': self.CONTEXT_PATTERNS[PatternCategory.RAG_COMPLEX]
-            })
+            rag_complex_matches = hits.count('context', [PatternCategory.RAG_COMPLEX])
             
             if doc_count > 5 and rag_complex_matches > 0:
                 return {
@@ -469,9 +489,7 @@ class RuleBasedComplexityAnalyzer:
         # Session context complexity
         if context.conversation_history:
             history_length = len(context.conversation_history)
-            session_matches = self._check_pattern_matches(text, {
-                'session': self.CONTEXT_PATTERNS[PatternCategory.SESSION_BUILDING]
-            })
+            session_matches = hits.count('context', [PatternCategory.SESSION_BUILDING])
             
             if history_length > 10 and session_matches > 0:
                 return {
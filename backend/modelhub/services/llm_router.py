@@ -15,6 +15,8 @@ Supports multiple entity types:
 - workflow_execution: Agentic workflow processing
 - workspace_chat: Workspace-specific conversations
 """
+import asyncio
+import dataclasses
 import time
 import logging
 from typing import List, Dict, Optional, Callable, Tuple, Union
@@ -22,7 +24,11 @@ from decimal import Decimal
 
 from .complexity import RequestContext as ComplexityContext
 from .complexity import get_complexity_analyzer
+from .model_catalog import get_model_catalog
+from .phase_graph import PhaseGraph
+from .provider_health import get_provider_health, is_error_response, run_hedged
 from .routing import EnhancedModelRouter, EnhancedSessionManager
+from .routing.rule_engine import get_routing_rule_engine
 from .routing.types import (
     RequestContext, RoutingDecision, OptimizationStrategy, EntityType
 )
@@ -42,12 +48,18 @@ class EnhancedLLMRouter:
     - Enhanced session management
     - Performance optimization
     - Cost protection
+    - Provider health: circuit breakers and hedged requests
     """
     
+    # Used when routing fails, and as the last fallback for open circuits and hedging
+    FALLBACK_PROVIDER = "openai"
+    FALLBACK_MODEL = "gpt-3.5-turbo"
+    
     def __init__(self):
         self.complexity_analyzer = get_complexity_analyzer()
         self.model_router = EnhancedModelRouter()
         self.session_manager = EnhancedSessionManager()
+        self.provider_health = get_provider_health()
         
         # Performance tracking
         self.total_requests = 0
@@ -105,83 +117,21 @@ class EnhancedLLMRouter:
                 f"org={organization.id if organization else 'none'}"
             )
             
-            # Phase 1: Prepare request text for analysis
-            request_text = self._prepare_request_text(prompt, messages)
-            
-            # Phase 2: Enhanced complexity analysis (5-15ms rule-based, 150-300ms if escalated)
-            complexity_context = self._create_complexity_context(request_context)
-            complexity_result = await self.complexity_analyzer.analyze_complexity(
-                request_text, complexity_context
+            # Phases 1-6: independent steps run concurrently (see _build_phase_graph)
+            phase_graph = self._build_phase_graph(
+                organization, request_context, strategy, prompt, messages, total_start_time
             )
+            phase_results = await phase_graph.run()
             
-            logger.info(
-                f"📊 Complexity analysis: "
-                f"score={complexity_result.score:.2f}, "
-                f"level={complexity_result.level.value}, "
-                f"confidence={complexity_result.confidence:.2f}, "
-                f"path={complexity_result.analysis_path.value}, "
-                f"time={complexity_result.analysis_time_ms}ms"
-            )
+            complexity_result = phase_results['complexity']
+            routing_decision = phase_results['routing']
+            api_key = phase_results['api_key']
+            context_metadata = phase_results.get('context')
             
-            # Phase 3: Check session stickiness (2-5ms)
-            should_stick, sticky_provider, sticky_model = await self.session_manager.should_stick_to_model(
-                request_context, complexity_result.score
-            )
-            
-            routing_decision = None
-            
-            if should_stick and sticky_provider and sticky_model:
-                # Use sticky session model
-                decision_time = int((time.time() - total_start_time) * 1000)
-                routing_decision = RoutingDecision(
-                    selected_model=sticky_model,
-                    selected_provider=sticky_provider,
-                    api_type="CHAT",
-                    confidence_score=0.95,
-                    reasoning=f"session_sticky,entity={request_context.entity_type}",
-                    estimated_cost=Decimal('0.01'),  # Rough estimate
-                    estimated_tokens=request_context.max_tokens,
-                    complexity_score=complexity_result.score,
-                    content_type=complexity_result.content_type.value,
-                    fallback_chain=[],
-                    decision_time_ms=decision_time,
-                    session_sticky=True,
-                    entity_type=request_context.entity_type
-                )
-                
-                logger.info(f"✅ Using session sticky model: {sticky_provider}:{sticky_model}")
-            else:
-                # Phase 4: Intelligent model routing (20-40ms)
-                routing_decision = await self.model_router.route_request(
-                    organization=organization,
-                    complexity_score=complexity_result.score,
-                    content_type=complexity_result.content_type.value,
-                    context=request_context,
-                    strategy=strategy
-                )
-            
-            # Phase 5: Get API key for selected model
-            api_key = await self._get_api_key_for_model(
-                organization, routing_decision.selected_provider
-            )
-            if not api_key:
-                raise Exception(f"No API key found for provider {routing_decision.selected_provider}")
-            
-            # Phase 6: Prepare context using context manager (if session_id provided)
-            context_metadata = None
-            if request_context.session_id and (messages or prompt):
-                try:
-                    context_metadata = await self._prepare_context_integration(
-                        request_context, routing_decision, messages, prompt
-                    )
-                    logger.info(f"✅ Context prepared: {context_metadata.get('strategy_used', 'none')}")
-                except Exception as e:
-                    logger.error(f"❌ Context preparation failed: {e}")
-                    # Continue without context if preparation fails
-            
-            # Phase 7: Execute LLM call
+            # Phase 7: Execute LLM call (diverted or hedged by provider health)
             execution_start = time.time()
-            response = await self._execute_llm_call(
+            response, routing_decision = await self._execute_with_provider_health(
+                organization=organization,
                 routing_decision=routing_decision,
                 api_key=api_key,
                 messages=messages,
@@ -219,6 +169,7 @@ class EnhancedLLMRouter:
                 total_time=total_time,
                 performance_score=performance_score
             )
+            metadata['performance']['phases'] = phase_graph.timings_ms()
             
             logger.info(
                 f"✅ Enhanced routing complete: "
@@ -244,6 +195,128 @@ class EnhancedLLMRouter:
             
             return fallback_response, fallback_metadata
     
+    def _build_phase_graph(
+        self,
+        organization,
+        request_context: RequestContext,
+        strategy: OptimizationStrategy,
+        prompt: str,
+        messages: Optional[List[Dict]],
+        total_start_time: float
+    ) -> PhaseGraph:
+        """
+        Pre-call phases as a dependency graph.
+        
+        complexity, session (stickiness state) and routing_data (compiled
+        rules and model catalog) are independent and run concurrently;
+        routing needs all three. api_key and context both only need the
+        routing decision, so they run alongside each other. A failure in any
+        phase cancels the rest.
+        """
+        graph = PhaseGraph()
+        
+        async def analyze_complexity(_):
+            # Phase 1: Prepare request text for analysis
+            request_text = self._prepare_request_text(prompt, messages)
+            
+            # Phase 2: Enhanced complexity analysis (5-15ms rule-based, 150-300ms if escalated)
+            complexity_context = self._create_complexity_context(request_context)
+            complexity_result = await self.complexity_analyzer.analyze_complexity(
+                request_text, complexity_context
+            )
+            
+            logger.info(
+                f"📊 Complexity analysis: "
+                f"score={complexity_result.score:.2f}, "
+                f"level={complexity_result.level.value}, "
+                f"confidence={complexity_result.confidence:.2f}, "
+                f"path={complexity_result.analysis_path.value}, "
+                f"time={complexity_result.analysis_time_ms}ms"
+            )
+            return complexity_result
+        
+        async def load_session_state(_):
+            if not request_context.session_id:
+                return None
+            return await self.session_manager.get_session_state(
+                request_context.session_id, request_context.entity_type
+            )
+        
+        async def load_routing_data(_):
+            # Reloads only when rules or models changed; otherwise served from memory.
+            # Best effort: routing reports its own errors and falls back
+            try:
+                await asyncio.gather(get_routing_rule_engine().aget(), get_model_catalog().aget())
+            except Exception as e:
+                logger.warning(f"Could not preload routing data: {e}")
+        
+        async def route(results):
+            complexity_result = results['complexity']
+            
+            # Phase 3: Check session stickiness (2-5ms)
+            should_stick, sticky_provider, sticky_model = await self.session_manager.decide_stickiness(
+                request_context, results['session'], complexity_result.score
+            )
+            
+            if should_stick and sticky_provider and sticky_model:
+                # Use sticky session model
+                decision_time = int((time.time() - total_start_time) * 1000)
+                logger.info(f"✅ Using session sticky model: {sticky_provider}:{sticky_model}")
+                return RoutingDecision(
+                    selected_model=sticky_model,
+                    selected_provider=sticky_provider,
+                    api_type="CHAT",
+                    confidence_score=0.95,
+                    reasoning=f"session_sticky,entity={request_context.entity_type}",
+                    estimated_cost=Decimal('0.01'),  # Rough estimate
+                    estimated_tokens=request_context.max_tokens,
+                    complexity_score=complexity_result.score,
+                    content_type=complexity_result.content_type.value,
+                    fallback_chain=[],
+                    decision_time_ms=decision_time,
+                    session_sticky=True,
+                    entity_type=request_context.entity_type
+                )
+            
+            # Phase 4: Intelligent model routing (20-40ms)
+            return await self.model_router.route_request(
+                organization=organization,
+                complexity_score=complexity_result.score,
+                content_type=complexity_result.content_type.value,
+                context=request_context,
+                strategy=strategy
+            )
+        
+        async def resolve_api_key(results):
+            # Phase 5: Get API key for selected model
+            provider = results['routing'].selected_provider
+            api_key = await self._get_api_key_for_model(organization, provider)
+            if not api_key:
+                raise Exception(f"No API key found for provider {provider}")
+            return api_key
+        
+        async def prepare_context(results):
+            # Phase 6: Prepare context using context manager
+            try:
+                context_metadata = await self._prepare_context_integration(
+                    request_context, results['routing'], messages, prompt
+                )
+                logger.info(f"✅ Context prepared: {context_metadata.get('strategy_used', 'none')}")
+                return context_metadata
+            except Exception as e:
+                logger.error(f"❌ Context preparation failed: {e}")
+                # Continue without context if preparation fails
+                return None
+        
+        graph.add('complexity', analyze_complexity)
+        graph.add('session', load_session_state)
+        graph.add('routing_data', load_routing_data)
+        graph.add('routing', route, depends_on=('complexity', 'session', 'routing_data'))
+        graph.add('api_key', resolve_api_key, depends_on=('routing',))
+        if request_context.session_id and (messages or prompt):
+            graph.add('context', prepare_context, depends_on=('routing',))
+        return graph
+    
     def _prepare_request_text(self, prompt: str, messages: Optional[List[Dict]]) -> str:
         """Prepare request text for complexity analysis"""
         if prompt:
@@ -320,6 +393,139 @@ class EnhancedLLMRouter:
             logger.debug(f"Context integration failed: {e}")
             return {}
     
+    async def _execute_with_provider_health(
+        self,
+        organization,
+        routing_decision: RoutingDecision,
+        api_key: str,
+        messages: Optional[List[Dict]],
+        prompt: Optional[str],
+        stream: bool,
+        stream_callback: Optional[Callable],
+        context_metadata: Optional[Dict],
+        **llm_kwargs
+    ) -> Tuple[LLMResponse, RoutingDecision]:
+        """
+        Execute the LLM call with provider health in the loop.
+        
+        - If the selected model's circuit is open, the call goes to a healthy
+          fallback model instead (the selected model is still used when there
+          is none)
+        - With hedging enabled, a non-streaming call still running after the
+          model's p95 latency is also sent to a fallback model; the first good
+          response wins and the other call is cancelled. The half-open probe
+          is never hedged, so its outcome is always known
+        
+        Returns the response and the routing decision of the model that
+        produced it.
+        """
+        health = self.provider_health
+        call_args = dict(
+            messages=messages, prompt=prompt, stream=stream, stream_callback=stream_callback,
+            context_metadata=context_metadata, **llm_kwargs
+        )
+        provider, model = routing_decision.selected_provider, routing_decision.selected_model
+        
+        allowed, probe_id = health.admit(provider, model)
+        if not allowed:
+            fallback = await self._healthy_fallback(organization, routing_decision, api_key, 'circuit_open')
+            if fallback:
+                fallback_decision, fallback_key = fallback
+                logger.warning(
+                    f"⚡ Circuit open for {provider}:{model}, using "
+                    f"{fallback_decision.selected_provider}:{fallback_decision.selected_model}"
+                )
+                response = await self._execute_and_record(fallback_decision, fallback_key, **call_args)
+                return response, fallback_decision
+        
+        delay = None if stream or probe_id is not None else health.hedge_delay(provider, model)
+        if delay is None:
+            response = await self._execute_and_record(routing_decision, api_key, probe_id=probe_id, **call_args)
+            return response, routing_decision
+        
+        hedged = {}
+        
+        async def hedge():
+            fallback = await self._healthy_fallback(organization, routing_decision, api_key, 'hedged')
+            if not fallback:
+                return None  # Nothing to hedge with: the primary's response is used
+            hedged['decision'], fallback_key = fallback
+            logger.info(
+                f"🏁 {provider}:{model} past its p95 ({delay * 1000:.0f}ms), hedging with "
+                f"{hedged['decision'].selected_provider}:{hedged['decision'].selected_model}"
+            )
+            return await self._execute_and_record(hedged['decision'], fallback_key, **call_args)
+        
+        response, hedge_won = await run_hedged(
+            lambda: self._execute_and_record(routing_decision, api_key, **call_args), hedge, delay
+        )
+        return response, (hedged['decision'] if hedge_won else routing_decision)
+    
+    async def _healthy_fallback(
+        self,
+        organization,
+        routing_decision: RoutingDecision,
+        api_key: str,
+        reason: str
+    ) -> Optional[Tuple[RoutingDecision, str]]:
+        """
+        (decision, api key) for the first fallback model whose circuit is not
+        open: the decision's fallback_chain, then the router's fallback model.
+        """
+        primary = (routing_decision.selected_provider, routing_decision.selected_model)
+        candidates = list(routing_decision.fallback_chain) + [(self.FALLBACK_PROVIDER, self.FALLBACK_MODEL)]
+        
+        for provider, model in candidates:
+            if (provider, model) == primary or self.provider_health.is_open(provider, model):
+                continue
+            if provider == routing_decision.selected_provider:
+                key = api_key
+            else:
+                key = await self._get_api_key_for_model(organization, provider)
+            if not key:
+                continue
+            return dataclasses.replace(
+                routing_decision,
+                selected_provider=provider,
+                selected_model=model,
+                reasoning=f"{routing_decision.reasoning},{reason}={primary[0]}:{primary[1]}",
+                fallback_chain=[],
+                session_sticky=False
+            ), key
+        return None
+    
+    async def _execute_and_record(
+        self,
+        routing_decision: RoutingDecision,
+        api_key: str,
+        probe_id: Optional[int] = None,
+        **call_args
+    ) -> LLMResponse:
+        """
+        _execute_llm_call, with its latency and outcome recorded for the model.
+        
+        probe_id marks the call as the model's half-open probe.
+        """
+        provider, model = routing_decision.selected_provider, routing_decision.selected_model
+        call_start = time.monotonic()
+        
+        def elapsed_ms():
+            return (time.monotonic() - call_start) * 1000
+        
+        try:
+            response = await self._execute_llm_call(
+                routing_decision=routing_decision, api_key=api_key, **call_args
+            )
+        except asyncio.CancelledError:
+            # Lost a hedge: a latency of at least elapsed_ms(), no outcome
+            self.provider_health.record(provider, model, elapsed_ms(), None, probe_id)
+            raise
+        except Exception:
+            self.provider_health.record(provider, model, elapsed_ms(), False, probe_id)
+            raise
+        self.provider_health.record(provider, model, elapsed_ms(), not is_error_response(response), probe_id)
+        return response
+    
     async def _execute_llm_call(
         self,
         routing_decision: RoutingDecision,
@@ -552,13 +758,14 @@ Please respond to this current question, using the conversation context above fo
         
         try:
             # Simple fallback: use GPT-3.5-turbo
-            fallback_provider = "openai"
-            fallback_model = "gpt-3.5-turbo"
+            fallback_provider = self.FALLBACK_PROVIDER
+            fallback_model = self.FALLBACK_MODEL
             
             api_key = await self._get_api_key_for_model(organization, fallback_provider)
             if not api_key:
                 raise Exception("No fallback API key available")
             
+            call_start = time.monotonic()
             response = await UnifiedLLMClient.call_llm(
                 provider_slug=fallback_provider,
                 model_name=fallback_model,
@@ -568,6 +775,10 @@ Please respond to this current question, using the conversation context above fo
                 stream=False,
                 **llm_kwargs
             )
+            self.provider_health.record(
+                fallback_provider, fallback_model,
+                (time.monotonic() - call_start) * 1000, not is_error_response(response)
+            )
             
             metadata = {
                 'routing': {
@@ -592,18 +803,18 @@ Please respond to this current question, using the conversation context above fo
         """Get API key for the selected provider"""
         from channels.db import database_sync_to_async
         from ..models import APIKey
+        from .quota_service import get_quota_service
         
         @database_sync_to_async
         def get_key():
             # Try organization key first
+            api_key = None
             if organization:
                 api_key = APIKey.objects.filter(
                     organization=organization,
                     provider__slug=provider_slug,
                     is_active=True
                 ).first()
-                if api_key and api_key.quota_status.get('status') != 'exceeded':
-                    return api_key.key
             
             # Try Dataelan fallback key
             dataelan_key = APIKey.objects.filter(
@@ -612,8 +823,11 @@ Please respond to this current question, using the conversation context above fo
                 is_active=True
             ).first()
             
-            if dataelan_key and dataelan_key.quota_status.get('status') != 'exceeded':
-                return dataelan_key.key
+            candidates = [key for key in (api_key, dataelan_key) if key]
+            statuses = get_quota_service().get_quota_statuses(candidates)
+            for key in candidates:
+                if statuses[str(key.pk)]['status'] != 'exceeded':
+                    return key.key
             
             return None
         
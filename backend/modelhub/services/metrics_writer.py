@@ -0,0 +1,426 @@
+# File: backend/modelhub/services/metrics_writer.py
+"""
+Buffered ModelMetrics Writer
+
+Usage rows are logged off the request path:
+
+- record()/arecord() append an event to an in-process buffer; no database
+  or Redis I/O happens on the caller's path
+- A background thread writes the buffer with one bulk_create per batch when
+  BATCH_SIZE events are waiting or every FLUSH_INTERVAL seconds
+- bulk_create skips post_save, so API key quota counters are updated by the
+  writer after each batch is stored
+- If the database is unavailable, batches are appended to a JSON-lines spill
+  file in SPILL_DIR and written once the database is back (by this or any
+  other process sharing the directory). Rows carry their primary key from
+  the start, so a batch written twice is stored once; replayed rows that are
+  already stored are skipped, so they are not counted against quotas again
+- The buffer is flushed when the process exits; Celery's prefork children
+  leave without running atexit, so worker shutdown signals flush it there
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Deque, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_METRICS_WRITER_SETTINGS = {
+    'ENABLED': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_BUFFER': 20000,
+    'SPILL_DIR': '',
+    'RETRY_INTERVAL': 30,
+}
+
+# Foreign keys accepted as model instances or ids
+FOREIGN_KEYS = ('model', 'organization', 'api_key', 'session')
+
+# Events written this long after they were recorded get their timestamps
+# back (auto_now_add sets them to the time of the insert)
+BACKDATE_AFTER = 5
+
+# Spill files of other processes are taken over once untouched this long
+ORPHAN_SPILL_AGE = 60
+
+
+def get_metrics_writer_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['METRICS_WRITER'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('METRICS_WRITER', {})
+    return {**DEFAULT_METRICS_WRITER_SETTINGS, **configured}
+
+
+def build_event(**fields) -> Dict[str, Any]:
+    """
+    JSON-serialisable ModelMetrics values.
+
+    Foreign keys may be passed as instances (model=...) or ids (model_id=...).
+    """
+    event = {
+        'id': str(uuid.uuid4()),
+        'timestamp': timezone.now().isoformat(),
+        'image_count': 0,
+        'status': 'SUCCESS',
+        'error_type': '',
+        'error_message': '',
+        'optimization_metadata': {},
+    }
+    for name in FOREIGN_KEYS:
+        if name in fields:
+            instance = fields.pop(name)
+            fields[f'{name}_id'] = instance.pk if instance is not None else None
+        value = fields.get(f'{name}_id')
+        fields[f'{name}_id'] = str(value) if value is not None else None
+    if 'cost' in fields:
+        fields['cost'] = str(fields['cost'])
+    event.update(fields)
+    return event
+
+
+class MetricsWriter:
+    """
+    In-process buffer of ModelMetrics rows with batched, spill-backed writes.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        max_buffer: int = 20000,
+        spill_dir: str = '',
+        retry_interval: float = 30,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            batch_size: Events per bulk_create; a full batch wakes the writer
+            flush_interval: Seconds between flushes of a partial batch
+            max_buffer: Events held in memory before the oldest go to the spill file
+            spill_dir: Directory for spill files (default: system temp dir)
+            retry_interval: Seconds to spill instead of writing after a database error
+            enabled: False writes each event immediately (no thread, no buffer)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spill_dir = spill_dir or os.path.join(tempfile.gettempdir(), 'modelhub-metrics')
+        self.retry_interval = retry_interval
+        self.enabled = enabled
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Held while the spill file is appended to or claimed for replay
+        self._spill_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._db_down_until = 0.0
+        self._spill_name = f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl'
+        self.stats = {'recorded': 0, 'written': 0, 'flushes': 0, 'spilled': 0, 'replayed': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, **fields) -> Dict[str, Any]:
+        """
+        Queue one ModelMetrics row; returns the event (its 'id' is the row's pk).
+
+        Accepts ModelMetrics field values; see build_event().
+        """
+        event = build_event(**fields)
+        self.stats['recorded'] += 1
+
+        if not self.enabled:
+            self._write_or_spill([event])
+            return event
+
+        with self._lock:
+            self._buffer.append(event)
+            size = len(self._buffer)
+            overflow = [self._buffer.popleft() for _ in range(size - self.max_buffer)] if size > self.max_buffer else []
+        if overflow:
+            # The writer is not keeping up; keep memory bounded
+            self._spill(overflow)
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wake.set()
+        return event
+
+    async def arecord(self, **fields) -> Dict[str, Any]:
+        """record() for async callers; writes in a worker thread when disabled"""
+        if self.enabled:
+            return self.record(**fields)
+        from channels.db import database_sync_to_async
+        return await database_sync_to_async(self.record)(**fields)
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write every buffered event, then any spilled ones; returns rows written"""
+        with self._flush_lock:
+            written = 0
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    break
+                written += self._write_or_spill(batch)
+            written += self._replay_spill()
+            if written:
+                self.stats['flushes'] += 1
+            return written
+
+    def _write_or_spill(self, batch: List[Dict[str, Any]], replay: bool = False) -> int:
+        if time.monotonic() < self._db_down_until:
+            self._spill(batch)
+            return 0
+        try:
+            return self._write(batch, replay)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self._db_down_until = time.monotonic() + self.retry_interval
+            logger.warning(f"⚠️ Could not write {len(batch)} metrics rows, spilling to disk: {e}")
+            self._spill(batch)
+            return 0
+
+    def _write(self, events: List[Dict[str, Any]], replay: bool = False) -> int:
+        """
+        bulk_create the events, restore late timestamps, count API key usage.
+
+        Args:
+            replay: The events come from a spill file and may already be
+                stored (a write that failed after its insert, or a batch
+                spilled twice); stored ones are skipped before counting
+        """
+        from django.db import models, transaction
+        from ..models import ModelMetrics
+        from .quota_service import record_api_key_usage
+
+        if replay:
+            stored = {
+                str(pk) for pk in
+                ModelMetrics.objects.filter(pk__in=[event['id'] for event in events]).values_list('pk', flat=True)
+            }
+            events = [event for event in events if event['id'] not in stored]
+            if not events:
+                return 0
+
+        rows = [ModelMetrics(**self._row_fields(event)) for event in events]
+        now = timezone.now()
+        late = [
+            (row.pk, event['timestamp']) for row, event in zip(rows, events)
+            if (now - datetime.fromisoformat(event['timestamp'])).total_seconds() > BACKDATE_AFTER
+        ]
+        if late:
+            # Insert and backdating succeed or fail together, so a spilled
+            # batch is either fully stored (and counted) or not stored at all
+            when = models.Case(
+                *[models.When(pk=pk, then=models.Value(datetime.fromisoformat(ts))) for pk, ts in late],
+                output_field=models.DateTimeField()
+            )
+            with transaction.atomic():
+                ModelMetrics.objects.bulk_create(rows, ignore_conflicts=True)
+                ModelMetrics.objects.filter(pk__in=[pk for pk, _ in late]).update(timestamp=when, created_at=when)
+        else:
+            ModelMetrics.objects.bulk_create(rows, ignore_conflicts=True)
+
+        for event in events:
+            if event.get('api_key_id'):
+                try:
+                    record_api_key_usage(
+                        event['api_key_id'], Decimal(event['cost']), datetime.fromisoformat(event['timestamp'])
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not count usage for API key {event['api_key_id']}: {e}")
+
+        self.stats['written'] += len(rows)
+        return len(rows)
+
+    @staticmethod
+    def _row_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+        fields = {key: value for key, value in event.items() if key != 'timestamp'}
+        fields['cost'] = Decimal(fields['cost'])
+        return fields
+
+    # ------------------------------------------------------------------
+    # Spill file
+    # ------------------------------------------------------------------
+
+    def _spill(self, events: List[Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with self._spill_lock, \
+                    open(os.path.join(self.spill_dir, self._spill_name), 'a', encoding='utf-8') as spill:
+                for event in events:
+                    spill.write(json.dumps(event, default=str) + '\n')
+            self.stats['spilled'] += len(events)
+        except OSError as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Lost {len(events)} metrics rows, spill file not writable: {e}")
+
+    def _replay_spill(self) -> int:
+        """Write spilled events back to the database; returns rows written"""
+        if time.monotonic() < self._db_down_until or not os.path.isdir(self.spill_dir):
+            return 0
+
+        written = 0
+        for name in sorted(os.listdir(self.spill_dir)):
+            path = os.path.join(self.spill_dir, name)
+            if not self._claimable(name, path):
+                continue
+            claimed = f'{path}.{os.getpid()}.claimed'
+            try:
+                # Not while record() is appending to our own file, or the
+                # lines it writes after the read below would be removed with it
+                with self._spill_lock:
+                    os.rename(path, claimed)
+            except OSError:
+                continue  # Taken by another process
+
+            events = self._read_spill(claimed)
+            for start in range(0, len(events), self.batch_size):
+                count = self._write_or_spill(events[start:start + self.batch_size], replay=True)
+                written += count
+                self.stats['replayed'] += count
+            os.remove(claimed)
+
+        if written:
+            logger.info(f"📥 Wrote {written} spilled metrics rows")
+        return written
+
+    @staticmethod
+    def _read_spill(path: str) -> List[Dict[str, Any]]:
+        events = []
+        with open(path, encoding='utf-8') as spill:
+            for line in spill:
+                try:
+                    if line.strip():
+                        events.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash
+                    logger.warning(f"Skipping unreadable metrics spill line in {path}")
+        return events
+
+    def _claimable(self, name: str, path: str) -> bool:
+        """Own spill file, or another process's file that has been left alone"""
+        if not (name.startswith('metrics-') and (name.endswith('.jsonl') or name.endswith('.claimed'))):
+            return False
+        if name == self._spill_name:
+            return True
+        try:
+            return time.time() - os.path.getmtime(path) > ORPHAN_SPILL_AGE
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='modelhub-metrics-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Metrics writer flush failed: {e}")
+            finally:
+                close_old_connections()
+
+    def close(self, timeout: float = 10) -> None:
+        """Stop the thread and write (or spill) everything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Metrics writer final flush failed: {e}")
+            with self._lock:
+                remaining = list(self._buffer)
+                self._buffer.clear()
+            self._spill(remaining)
+
+
+_writer: Optional[MetricsWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_metrics_writer() -> MetricsWriter:
+    """Process-wide metrics writer; flushed when the process or Celery worker exits"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_metrics_writer_settings()
+                _writer = MetricsWriter(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_buffer=config['MAX_BUFFER'],
+                    spill_dir=config['SPILL_DIR'],
+                    retry_interval=config['RETRY_INTERVAL'],
+                    enabled=config['ENABLED'],
+                )
+                atexit.register(_writer.close)
+                _connect_worker_shutdown()
+    return _writer
+
+
+def _close_writer(**kwargs) -> None:
+    if _writer is not None:
+        _writer.close()
+
+
+def _connect_worker_shutdown() -> None:
+    """Flush on Celery worker shutdown (prefork children exit without atexit)"""
+    try:
+        from celery.signals import worker_process_shutdown, worker_shutdown
+    except ImportError:
+        return
+    worker_process_shutdown.connect(_close_writer)
+    worker_shutdown.connect(_close_writer)
+
+
+def record_metrics(**fields) -> Dict[str, Any]:
+    """Queue a ModelMetrics row on the process-wide writer"""
+    return get_metrics_writer().record(**fields)
+
+
+async def arecord_metrics(**fields) -> Dict[str, Any]:
+    """record_metrics() for async callers"""
+    return await get_metrics_writer().arecord(**fields)
@@ -0,0 +1,193 @@
+# File: backend/modelhub/services/model_catalog.py
+"""
+Model Catalog Cache
+
+In-process snapshot of providers, models, API types and pricing, so the per-
+request lookups in UnifiedLLMClient and EnhancedModelRouter (provider config,
+API type, cost, model info) are dict reads instead of database queries:
+
+- One refresh loads every Provider and Model row (two queries) into an
+  immutable snapshot
+- Snapshots expire after MODEL_CATALOG['TTL'] seconds as a backstop
+- Saving or deleting a Provider/Model (see modelhub.signals) invalidates the
+  snapshot in every worker through a shared Redis version (see versioned_cache)
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .versioned_cache import VersionedSnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CATALOG_SETTINGS = {
+    'TTL': 300,
+    'VERSION_KEY': 'modelhub:catalog:version',
+    'CHANNEL': 'modelhub:catalog',
+}
+
+
+def get_catalog_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['MODEL_CATALOG'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('MODEL_CATALOG', {})
+    return {**DEFAULT_CATALOG_SETTINGS, **configured}
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    """Catalog view of a Model row"""
+    provider_slug: str
+    name: str
+    version: str
+    status: str
+    model_type: str
+    api_type: str
+    capabilities: List[str]
+    cost_input: Decimal
+    cost_output: Decimal
+    cost_image: Optional[Decimal]
+    context_window: int
+
+    def to_model_info(self) -> Dict[str, Any]:
+        """Shape returned by EnhancedModelRouter._get_model_info"""
+        return {
+            'provider': self.provider_slug,
+            'model': self.name,
+            'cost_input': float(self.cost_input),
+            'cost_output': float(self.cost_output),
+            'context_window': self.context_window,
+            'capabilities': self.capabilities,
+            'api_type': self.api_type,
+        }
+
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable-by-convention lookup tables built by ModelCatalog.refresh()"""
+    providers: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    models: Dict[Tuple[str, str], ModelEntry] = field(default_factory=dict)
+    version: int = 0
+    loaded_at: float = 0.0
+
+    def provider_config(self, provider_slug: str) -> Optional[Dict[str, Any]]:
+        """Active provider's name/slug/config, as UnifiedLLMClient._get_provider_config returned"""
+        provider = self.providers.get(provider_slug)
+        if not provider or provider['status'] != 'ACTIVE':
+            return None
+        return {'name': provider['name'], 'slug': provider['slug'], 'config': provider['config']}
+
+    def get_model(self, provider_slug: str, model_name: str, active_only: bool = True) -> Optional[ModelEntry]:
+        entry = self.models.get((provider_slug, model_name))
+        if entry is None or (active_only and entry.status != 'ACTIVE'):
+            return None
+        return entry
+
+    def api_type(self, provider_slug: str, model_name: str) -> str:
+        """Same answer as Model.get_api_type_for_model"""
+        entry = self.get_model(provider_slug, model_name)
+        if entry is not None:
+            return entry.api_type
+        if provider_slug not in self.providers:
+            return 'CHAT'
+        return _fallback_api_type(provider_slug, model_name)
+
+    def model_info(self, provider_slug: str, model_name: str) -> Optional[Dict[str, Any]]:
+        entry = self.get_model(provider_slug, model_name)
+        return entry.to_model_info() if entry else None
+
+    def cost(self, provider_slug: str, model_name: str, tokens_input: int, tokens_output: int) -> Decimal:
+        """Cost from per-1K token rates; zero for unknown models"""
+        entry = self.get_model(provider_slug, model_name, active_only=False)
+        if entry is None:
+            return Decimal('0.00')
+        return (Decimal(str(tokens_input)) / 1000 * entry.cost_input +
+                Decimal(str(tokens_output)) / 1000 * entry.cost_output)
+
+
+def _fallback_api_type(provider_slug: str, model_name: str) -> str:
+    """Model._get_fallback_api_type for a model that is not in the catalog"""
+    from ..models import Model, Provider
+    return Model(provider=Provider(slug=provider_slug), name=model_name)._get_fallback_api_type()
+
+
+class ModelCatalog(VersionedSnapshotCache[CatalogSnapshot]):
+    """
+    Versioned, TTL-bounded in-process cache of the model catalog.
+    """
+
+    label = 'model catalog'
+
+    def __init__(self, ttl: Optional[float] = None, redis_client: Any = None, use_redis: bool = True):
+        """
+        Args:
+            ttl: Seconds a snapshot is served before reloading
+            redis_client: Redis connection for the shared version (default: MODELHUB_SETTINGS)
+            use_redis: Coordinate invalidation across processes
+        """
+        config = get_catalog_settings()
+        super().__init__(
+            ttl=ttl if ttl is not None else config['TTL'],
+            version_key=config['VERSION_KEY'],
+            channel=config['CHANNEL'],
+            redis_client=redis_client,
+            use_redis=use_redis
+        )
+
+    def _load(self, version: int) -> CatalogSnapshot:
+        from ..models import Model, Provider
+
+        snapshot = CatalogSnapshot(version=version, loaded_at=time.monotonic())
+        for provider in Provider.objects.all():
+            snapshot.providers[provider.slug] = {
+                'name': provider.name,
+                'slug': provider.slug,
+                'status': provider.status,
+                'config': provider.config,
+            }
+
+        # Several versions of a model may exist; an ACTIVE row wins the (provider, name) slot
+        for model in Model.objects.select_related('provider').order_by('provider__slug', 'name', '-created_at'):
+            key = (model.provider.slug, model.name)
+            current = snapshot.models.get(key)
+            if current is not None and (current.status == 'ACTIVE' or model.status != 'ACTIVE'):
+                continue
+            snapshot.models[key] = ModelEntry(
+                provider_slug=model.provider.slug,
+                name=model.name,
+                version=model.version,
+                status=model.status,
+                model_type=model.model_type,
+                api_type=model.get_preferred_api_type(),
+                capabilities=list(model.capabilities or []),
+                cost_input=model.cost_input,
+                cost_output=model.cost_output,
+                cost_image=model.cost_image,
+                context_window=model.context_window,
+            )
+        return snapshot
+
+
+_catalog: Optional[ModelCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Process-wide model catalog"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ModelCatalog()
+    return _catalog
+
+
+def invalidate_model_catalog() -> None:
+    """Mark the catalog stale here and in every other worker"""
+    get_model_catalog().invalidate()
@@ -0,0 +1,117 @@
+# File: backend/modelhub/services/phase_graph.py
+"""
+Phase Graph
+
+Runs the steps of a request as a small dependency graph:
+
+- Each phase is a coroutine function that receives the results of the
+  phases it depends on
+- A phase starts as soon as its dependencies have finished, so independent
+  phases run concurrently
+- The first failing phase cancels every phase still running or waiting and
+  its exception is raised to the caller
+- Start offset and duration of every phase are recorded in milliseconds
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+PhaseFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Phase:
+    name: str
+    func: PhaseFunc
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class PhaseTiming:
+    started_ms: float
+    duration_ms: float
+
+
+class PhaseGraph:
+    """
+    Dependency-ordered phases with concurrent execution.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Phase] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, PhaseTiming] = {}
+        self._started_at = 0.0
+
+    def add(self, name: str, func: PhaseFunc, depends_on: Tuple[str, ...] = ()) -> 'PhaseGraph':
+        """
+        Register a phase.
+
+        Args:
+            name: Phase name, used as the key of its result
+            func: Coroutine function called with {dependency name: result}
+            depends_on: Phases that must finish first; they must already be registered
+        """
+        if name in self.phases:
+            raise ValueError(f"Phase {name} is already registered")
+        missing = [dependency for dependency in depends_on if dependency not in self.phases]
+        if missing:
+            raise ValueError(f"Phase {name} depends on unknown phases: {', '.join(missing)}")
+        self.phases[name] = Phase(name, func, tuple(depends_on))
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run every phase; returns {phase name: result}.
+
+        Raises the first phase failure after cancelling the remaining phases.
+        """
+        self._started_at = time.perf_counter()
+        finished = {name: asyncio.Event() for name in self.phases}
+        tasks = [
+            asyncio.create_task(self._run_phase(phase, finished), name=f"phase:{phase.name}")
+            for phase in self.phases.values()
+        ]
+
+        try:
+            # A failure leaves its dependents waiting, so stop at the first one
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task in done and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            cancelled = [task for task in tasks if not task.done()]
+            for task in cancelled:
+                task.cancel()
+            if cancelled:
+                await asyncio.gather(*cancelled, return_exceptions=True)
+                logger.debug(f"Cancelled phases: {', '.join(t.get_name() for t in cancelled)}")
+
+        return dict(self.results)
+
+    async def _run_phase(self, phase: Phase, finished: Dict[str, asyncio.Event]) -> None:
+        for dependency in phase.depends_on:
+            await finished[dependency].wait()
+
+        started = time.perf_counter()
+        self.results[phase.name] = await phase.func(
+            {dependency: self.results[dependency] for dependency in phase.depends_on}
+        )
+        ended = time.perf_counter()
+        self.timings[phase.name] = PhaseTiming(
+            started_ms=round((started - self._started_at) * 1000, 2),
+            duration_ms=round((ended - started) * 1000, 2),
+        )
+        finished[phase.name].set()
+
+    def timings_ms(self) -> Dict[str, Dict[str, float]]:
+        """{phase name: {'started_ms', 'duration_ms'}} for finished phases"""
+        return {
+            name: {'started_ms': timing.started_ms, 'duration_ms': timing.duration_ms}
+            for name, timing in self.timings.items()
+        }
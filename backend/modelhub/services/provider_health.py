@@ -0,0 +1,345 @@
+# File: backend/modelhub/services/provider_health.py
+"""
+Provider Health Tracker
+
+Latency and error tracking per (provider, model), kept in process memory:
+
+- A rolling window of recent calls (at most WINDOW_SIZE calls, none older
+  than WINDOW_SECONDS) gives latency percentiles and the error rate
+- A circuit breaker opens when, with at least MIN_SAMPLES calls in the
+  window, the error rate reaches ERROR_RATE_THRESHOLD or p99 latency
+  reaches P99_LATENCY_THRESHOLD_MS. While open the router sends traffic to a
+  fallback model; after OPEN_SECONDS one probe call is let through
+  (half-open), and its outcome closes or re-opens the circuit. Only the
+  probe itself (identified by the probe id admit() hands out) resolves the
+  half-open state; late results of calls started earlier do not
+- A cancelled call (one that lost a hedge) is a censored sample: its
+  elapsed time is a lower bound on its latency, so it counts toward the
+  latency percentiles (and can open the circuit on p99) but not toward the
+  error rate, and it never resolves a half-open probe. Without it a hedged
+  model's window would only hold calls that beat the hedge deadline
+- hedge_delay() is the primary's p95: the deadline after which the router
+  may send the same request to the fallback model (HEDGING_ENABLED)
+- run_hedged() races the two calls, returns the first good response and
+  cancels the other
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROVIDER_HEALTH_SETTINGS = {
+    'WINDOW_SIZE': 200,
+    'WINDOW_SECONDS': 300,
+    'MIN_SAMPLES': 20,
+    'ERROR_RATE_THRESHOLD': 0.5,
+    'P99_LATENCY_THRESHOLD_MS': 60000,
+    'OPEN_SECONDS': 30,
+    'HEDGING_ENABLED': False,
+    'HEDGE_MIN_DELAY_MS': 1000,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def get_provider_health_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['PROVIDER_HEALTH'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('PROVIDER_HEALTH', {})
+    return {**DEFAULT_PROVIDER_HEALTH_SETTINGS, **configured}
+
+
+def is_error_response(response: Any) -> bool:
+    """call_llm reports failures as responses carrying raw_response['error']"""
+    return response is None or bool((getattr(response, 'raw_response', None) or {}).get('error'))
+
+
+def error_rate(window) -> float:
+    """Failed share of the calls with a known outcome (censored samples excluded)"""
+    concluded = [ok for _, _, ok in window if ok is not None]
+    return sum(1 for ok in concluded if not ok) / len(concluded) if concluded else 0.0
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100 * len(sorted_values))))
+    return float(sorted_values[rank - 1])
+
+
+class _ModelHealth:
+    """Window and breaker state for one (provider, model)"""
+
+    def __init__(self, window_size: int):
+        # (at, latency_ms, ok); ok is None for a censored (cancelled) call
+        self.samples: Deque[Tuple[float, float, Optional[bool]]] = deque(maxlen=window_size)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started_at = 0.0
+        self.probe_id = 0
+        self.opened_count = 0
+
+
+class ProviderHealthTracker:
+    """
+    Rolling latency percentiles, error rates and circuit breakers per (provider, model).
+    """
+
+    def __init__(self, **overrides):
+        """
+        Args:
+            **overrides: Any DEFAULT_PROVIDER_HEALTH_SETTINGS key, lower-cased
+        """
+        config = get_provider_health_settings()
+        config.update({key.upper(): value for key, value in overrides.items()})
+        self.window_size = config['WINDOW_SIZE']
+        self.window_seconds = config['WINDOW_SECONDS']
+        self.min_samples = config['MIN_SAMPLES']
+        self.error_rate_threshold = config['ERROR_RATE_THRESHOLD']
+        self.p99_latency_threshold_ms = config['P99_LATENCY_THRESHOLD_MS']
+        self.open_seconds = config['OPEN_SECONDS']
+        self.hedging_enabled = config['HEDGING_ENABLED']
+        self.hedge_min_delay_ms = config['HEDGE_MIN_DELAY_MS']
+
+        self._models: Dict[Tuple[str, str], _ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        provider_slug: str,
+        model_name: str,
+        latency_ms: float,
+        success: Optional[bool],
+        probe_id: Optional[int] = None
+    ) -> None:
+        """
+        Add one call's outcome and update the breaker.
+
+        Args:
+            success: False for a failed call; None for a cancelled call, whose
+                latency is recorded as a lower bound and which only frees the
+                probe slot (without resolving it) if it was the probe
+            probe_id: The id admit() returned if this call was the half-open probe
+        """
+        now = time.monotonic()
+        with self._lock:
+            health = self._health(provider_slug, model_name)
+            is_probe = (
+                health.state == HALF_OPEN and health.probe_in_flight
+                and probe_id is not None and probe_id == health.probe_id
+            )
+            health.samples.append((now, float(latency_ms), None if success is None else bool(success)))
+
+            if is_probe:
+                health.probe_in_flight = False
+                # A cancelled probe decides nothing; the next admit() sends another
+                if success:
+                    logger.info(f"✅ Circuit closed for {provider_slug}:{model_name} after a successful probe")
+                    health.state = CLOSED
+                    # Judge the model on calls made after it recovered
+                    health.samples.clear()
+                    health.samples.append((now, float(latency_ms), True))
+                elif success is False:
+                    self._open(provider_slug, model_name, health, now, 'probe failed')
+                return
+
+            if health.state == CLOSED:
+                reason = self._trip_reason(health, now)
+                if reason:
+                    self._open(provider_slug, model_name, health, now, reason)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def admit(self, provider_slug: str, model_name: str) -> Tuple[bool, Optional[int]]:
+        """
+        (whether to send a request to the model now, probe id if it is the probe).
+
+        Allowed while the circuit is closed. Once OPEN_SECONDS have passed
+        since it opened, allowed for one probe request until that request's
+        outcome is recorded with its probe id (or, if it never is, another
+        OPEN_SECONDS have passed).
+        """
+        with self._lock:
+            health = self._models.get((provider_slug, model_name))
+            if health is None or health.state == CLOSED:
+                return True, None
+            now = time.monotonic()
+            if health.state == OPEN and now - health.opened_at >= self.open_seconds:
+                health.state = HALF_OPEN
+            if health.state == HALF_OPEN and (
+                not health.probe_in_flight or now - health.probe_started_at >= self.open_seconds
+            ):
+                health.probe_in_flight = True
+                health.probe_started_at = now
+                health.probe_id += 1
+                return True, health.probe_id
+            return False, None
+
+    def allow_request(self, provider_slug: str, model_name: str) -> bool:
+        """admit() without the probe id"""
+        return self.admit(provider_slug, model_name)[0]
+
+    def is_open(self, provider_slug: str, model_name: str) -> bool:
+        """True while requests to the model are being diverted (no probe due)"""
+        with self._lock:
+            health = self._models.get((provider_slug, model_name))
+            if health is None or health.state == CLOSED:
+                return False
+            now = time.monotonic()
+            if health.state == OPEN:
+                return now - health.opened_at < self.open_seconds
+            return health.probe_in_flight and now - health.probe_started_at < self.open_seconds
+
+    def hedge_delay(self, provider_slug: str, model_name: str) -> Optional[float]:
+        """
+        Seconds to wait for the model before hedging: its p95 latency, no
+        less than HEDGE_MIN_DELAY_MS. None when hedging is off or the window
+        has fewer than MIN_SAMPLES successful or cancelled calls.
+        """
+        if not self.hedging_enabled:
+            return None
+        with self._lock:
+            health = self._models.get((provider_slug, model_name))
+            if health is None:
+                return None
+            latencies = sorted(
+                latency for at, latency, ok in self._window(health, time.monotonic()) if ok is not False
+            )
+        if len(latencies) < self.min_samples:
+            return None
+        return max(percentile(latencies, 95), self.hedge_min_delay_ms) / 1000
+
+    def snapshot(self, provider_slug: str, model_name: str) -> Dict[str, Any]:
+        """Window statistics and breaker state for one model"""
+        with self._lock:
+            health = self._models.get((provider_slug, model_name))
+            if health is None:
+                return {'samples': 0, 'state': CLOSED}
+            window = self._window(health, time.monotonic())
+            state, opened_count = health.state, health.opened_count
+        latencies = sorted(latency for _, latency, _ in window)
+        return {
+            'samples': len(window),
+            'censored': sum(1 for _, _, ok in window if ok is None),
+            'error_rate': round(error_rate(window), 4),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'state': state,
+            'opened_count': opened_count,
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """snapshot() for every tracked model, keyed 'provider:model'"""
+        with self._lock:
+            keys = list(self._models)
+        return {f"{provider}:{model}": self.snapshot(provider, model) for provider, model in keys}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _health(self, provider_slug: str, model_name: str) -> _ModelHealth:
+        key = (provider_slug, model_name)
+        health = self._models.get(key)
+        if health is None:
+            health = self._models[key] = _ModelHealth(self.window_size)
+        return health
+
+    def _window(self, health: _ModelHealth, now: float):
+        """Samples younger than WINDOW_SECONDS (older ones are dropped)"""
+        cutoff = now - self.window_seconds
+        while health.samples and health.samples[0][0] < cutoff:
+            health.samples.popleft()
+        return list(health.samples)
+
+    def _trip_reason(self, health: _ModelHealth, now: float) -> Optional[str]:
+        window = self._window(health, now)
+        if len(window) < self.min_samples:
+            return None
+        errors = error_rate(window)
+        if errors >= self.error_rate_threshold:
+            return f"error rate {errors:.0%}"
+        p99 = percentile(sorted(latency for _, latency, _ in window), 99)
+        if p99 >= self.p99_latency_threshold_ms:
+            return f"p99 latency {p99:.0f}ms"
+        return None
+
+    def _open(self, provider_slug: str, model_name: str, health: _ModelHealth, now: float, reason: str) -> None:
+        logger.warning(f"⚡ Circuit opened for {provider_slug}:{model_name}: {reason}")
+        health.state = OPEN
+        health.opened_at = now
+        health.probe_in_flight = False
+        health.opened_count += 1
+
+
+async def run_hedged(
+    primary: Callable[[], Awaitable[Any]],
+    hedge: Callable[[], Awaitable[Any]],
+    delay: float
+) -> Tuple[Any, bool]:
+    """
+    (response, True if the hedge produced it).
+
+    Starts primary(); if it has not finished after delay seconds, starts
+    hedge() as well. The first good response wins and the other call is
+    cancelled. If the first to finish is an error (or raises), the other is
+    awaited; when both fail the primary's outcome is returned.
+    """
+    primary_task = asyncio.ensure_future(primary())
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            return primary_task.result(), False
+
+        hedge_task = asyncio.ensure_future(hedge())
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary_task, hedge_task):
+                    if task in done and not task.exception() and not is_error_response(task.result()):
+                        return task.result(), task is hedge_task
+            if primary_task.exception():
+                raise primary_task.exception()
+            return primary_task.result(), False
+        finally:
+            hedge_task.cancel()
+    finally:
+        primary_task.cancel()
+
+
+_tracker: Optional[ProviderHealthTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_provider_health() -> ProviderHealthTracker:
+    """Process-wide tracker shared by every router"""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = ProviderHealthTracker()
+    return _tracker
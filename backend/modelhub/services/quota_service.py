@@ -0,0 +1,372 @@
+# File: backend/modelhub/services/quota_service.py
+"""
+API Key Quota Service
+
+Monthly spend per API key without aggregating ModelMetrics on every request:
+
+- Usage for any number of keys is computed in one grouped aggregate
+- Running counters (cost, requests) live in Redis hashes per month and are
+  incremented as each metric row is logged (see signals)
+- Each key's counter is reconciled against the database once it is older
+  than RECONCILE_INTERVAL, which corrects increments lost to crashes or
+  Redis outages
+- Reads are served from process memory for LOCAL_TTL seconds
+- Without Redis the counters are per process; reconciliation keeps them
+  within RECONCILE_INTERVAL of the database
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .redis_client import get_modelhub_redis
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUOTA_SETTINGS = {
+    'KEY_PREFIX': 'modelhub:quota',
+    'RECONCILE_INTERVAL': 300,
+    'LOCAL_TTL': 5,
+    'REDIS_RETRY_AFTER': 30,
+}
+
+# Counters outlive their month long enough for end-of-month reporting
+COUNTER_EXPIRY = 40 * 24 * 3600
+
+
+def get_quota_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['QUOTAS'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('QUOTAS', {})
+    return {**DEFAULT_QUOTA_SETTINGS, **configured}
+
+
+def start_of_month(now: Optional[datetime] = None) -> datetime:
+    now = now or timezone.now()
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def month_label(now: Optional[datetime] = None) -> str:
+    return (now or timezone.now()).strftime('%Y-%m')
+
+
+def build_quota_status(monthly_used, monthly_quota) -> Dict[str, Any]:
+    """
+    Quota status for a key's monthly spend.
+
+    Status is 'healthy' below 75%, 'warning' below 90%, 'critical' below
+    100%, 'exceeded' at or over the quota and 'no_limit' without a quota.
+    """
+    monthly_used = monthly_used or 0
+    monthly_quota = monthly_quota or 0
+
+    if monthly_quota > 0:
+        usage_percent = (monthly_used / monthly_quota) * 100
+        if usage_percent < 75:
+            status = 'healthy'
+        elif usage_percent < 90:
+            status = 'warning'
+        elif usage_percent < 100:
+            status = 'critical'
+        else:
+            status = 'exceeded'
+    else:
+        usage_percent = 0
+        status = 'no_limit'
+
+    return {
+        'used': float(monthly_used),
+        'quota': float(monthly_quota),
+        'usage_percent': usage_percent,
+        'status': status
+    }
+
+
+@dataclass
+class _Counter:
+    month: str
+    total_cost: Decimal
+    total_requests: int
+    reconciled_at: float  # wall clock, shared with other processes through Redis
+    fetched_at: float  # monotonic, local to this process
+
+    def as_usage(self) -> Dict[str, Any]:
+        return {'total_cost': self.total_cost, 'total_requests': self.total_requests}
+
+
+class QuotaService:
+    """
+    Monthly API key usage from running counters.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        use_redis: bool = True,
+        reconcile_interval: Optional[float] = None,
+        local_ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            redis_client: Redis connection for shared counters (default: MODELHUB_SETTINGS)
+            use_redis: Share counters across processes
+            reconcile_interval: Seconds before a key's counter is recomputed from the database
+            local_ttl: Seconds counters are served from memory before re-reading Redis
+        """
+        config = get_quota_settings()
+        self.key_prefix = config['KEY_PREFIX']
+        self.reconcile_interval = (
+            reconcile_interval if reconcile_interval is not None else config['RECONCILE_INTERVAL']
+        )
+        self.local_ttl = local_ttl if local_ttl is not None else config['LOCAL_TTL']
+        self.redis_retry_after = config['REDIS_RETRY_AFTER']
+        self.redis = redis_client if redis_client is not None else (get_modelhub_redis() if use_redis else None)
+
+        self._counters: Dict[str, _Counter] = {}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.stats = {'hits': 0, 'redis_reads': 0, 'reconciles': 0, 'increments': 0}
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_usage(self, key_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        This month's usage for each key, shaped like APIKey.get_usage_this_month().
+
+        Runs at most one Redis round trip and one grouped aggregate, however
+        many keys are asked for.
+        """
+        ids = list(dict.fromkeys(str(key_id) for key_id in key_ids))
+        if not ids:
+            return {}
+
+        month = month_label()
+        now, clock = time.time(), time.monotonic()
+        redis = self._available_redis(clock)
+
+        with self._lock:
+            counters = {key_id: self._counters.get(key_id) for key_id in ids}
+        cached = {
+            key_id for key_id, counter in counters.items()
+            if counter is not None and counter.month == month and not self._needs_reconcile(counter, now)
+            and (redis is None or clock - counter.fetched_at < self.local_ttl)
+        }
+        self.stats['hits'] += len(cached)
+
+        missing = [key_id for key_id in ids if key_id not in cached]
+        if missing and redis is not None:
+            counters.update(self._read_redis(redis, month, missing, clock))
+
+        stale = [
+            key_id for key_id in missing
+            if counters[key_id] is None or counters[key_id].month != month
+            or self._needs_reconcile(counters[key_id], now)
+        ]
+        if stale:
+            counters.update(self.reconcile(stale))
+
+        return {key_id: counters[key_id].as_usage() for key_id in ids}
+
+    def get_quota_statuses(self, api_keys: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """quota_status for several APIKey rows; keys without a monthly quota need no usage"""
+        api_keys = list(api_keys)
+        usage = self.get_usage(key.pk for key in api_keys if key.monthly_quota)
+        return {
+            str(key.pk): build_quota_status(
+                usage.get(str(key.pk), {}).get('total_cost'), key.monthly_quota
+            )
+            for key in api_keys
+        }
+
+    def _needs_reconcile(self, counter: _Counter, now: float) -> bool:
+        return now - counter.reconciled_at >= self.reconcile_interval
+
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+
+    def record(self, key_id: Any, cost, timestamp: Optional[datetime] = None) -> None:
+        """Add one logged call to the key's running counter"""
+        if key_id is None:
+            return
+        month = month_label()
+        if timestamp is not None and month_label(timestamp) != month:
+            return
+
+        key_id = str(key_id)
+        cost = Decimal(str(cost or 0))
+        self.stats['increments'] += 1
+
+        with self._lock:
+            counter = self._counters.get(key_id)
+            if counter is not None and counter.month == month:
+                counter.total_cost += cost
+                counter.total_requests += 1
+
+        redis = self._available_redis(time.monotonic())
+        if redis is None:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hincrbyfloat(self._cost_key(month), key_id, float(cost))
+            pipe.hincrby(self._requests_key(month), key_id, 1)
+            pipe.expire(self._cost_key(month), COUNTER_EXPIRY)
+            pipe.expire(self._requests_key(month), COUNTER_EXPIRY)
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def reconcile(self, key_ids: Optional[Iterable[Any]] = None) -> Dict[str, _Counter]:
+        """
+        Recompute counters from ModelMetrics in one grouped aggregate.
+
+        Args:
+            key_ids: Keys to reconcile (default: every active key)
+        """
+        from ..models import APIKey, ModelMetrics
+
+        if key_ids is None:
+            key_ids = APIKey.objects.filter(is_active=True).values_list('pk', flat=True)
+        ids = [str(key_id) for key_id in key_ids]
+        if not ids:
+            return {}
+
+        now = timezone.now()
+        month = month_label(now)
+        totals = {
+            str(row['api_key_id']): row
+            for row in ModelMetrics.objects.filter(
+                api_key_id__in=ids,
+                timestamp__gte=start_of_month(now)
+            ).values('api_key_id').annotate(
+                total_cost=models.Sum('cost'),
+                total_requests=models.Count('id')
+            )
+        }
+
+        reconciled_at, clock = time.time(), time.monotonic()
+        counters = {}
+        for key_id in ids:
+            row = totals.get(key_id, {})
+            counters[key_id] = _Counter(
+                month=month,
+                total_cost=row.get('total_cost') or Decimal('0'),
+                total_requests=row.get('total_requests') or 0,
+                reconciled_at=reconciled_at,
+                fetched_at=clock,
+            )
+
+        with self._lock:
+            self._counters.update(counters)
+        self.stats['reconciles'] += 1
+        self._write_redis(month, counters)
+        return counters
+
+    def clear(self) -> None:
+        """Forget local counters; the next lookup reads Redis or the database"""
+        with self._lock:
+            self._counters.clear()
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+
+    def _cost_key(self, month: str) -> str:
+        return f"{self.key_prefix}:{month}:cost"
+
+    def _requests_key(self, month: str) -> str:
+        return f"{self.key_prefix}:{month}:requests"
+
+    def _reconciled_key(self, month: str) -> str:
+        return f"{self.key_prefix}:{month}:reconciled"
+
+    def _available_redis(self, clock: float):
+        if self.redis is None or clock < self._redis_down_until:
+            return None
+        return self.redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        """Back off from Redis for a while; counters stay per process meanwhile"""
+        if not self._redis_down_until:
+            logger.warning(f"Quota counters unavailable in Redis, using per-process counters: {error}")
+        else:
+            logger.debug(f"Quota counters unavailable in Redis: {error}")
+        self._redis_down_until = time.monotonic() + self.redis_retry_after
+
+    def _read_redis(self, redis, month: str, key_ids: List[str], clock: float) -> Dict[str, Optional[_Counter]]:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hmget(self._cost_key(month), key_ids)
+            pipe.hmget(self._requests_key(month), key_ids)
+            pipe.hmget(self._reconciled_key(month), key_ids)
+            costs, requests, reconciled = pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+            with self._lock:
+                return {key_id: self._counters.get(key_id) for key_id in key_ids}
+        self.stats['redis_reads'] += 1
+
+        counters: Dict[str, Optional[_Counter]] = {}
+        for key_id, cost, count, reconciled_at in zip(key_ids, costs, requests, reconciled):
+            if reconciled_at is None:
+                counters[key_id] = None
+                continue
+            counters[key_id] = _Counter(
+                month=month,
+                total_cost=Decimal(cost.decode() if isinstance(cost, bytes) else str(cost or 0)),
+                total_requests=int(count or 0),
+                reconciled_at=float(reconciled_at),
+                fetched_at=clock,
+            )
+
+        with self._lock:
+            self._counters.update({key_id: c for key_id, c in counters.items() if c is not None})
+        return counters
+
+    def _write_redis(self, month: str, counters: Dict[str, _Counter]) -> None:
+        """
+        Overwrite the shared counters with reconciled totals. An increment
+        racing the aggregate can be lost; the next reconcile restores it.
+        """
+        redis = self._available_redis(time.monotonic())
+        if redis is None or not counters:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hset(self._cost_key(month), mapping={k: str(c.total_cost) for k, c in counters.items()})
+            pipe.hset(self._requests_key(month), mapping={k: c.total_requests for k, c in counters.items()})
+            pipe.hset(self._reconciled_key(month), mapping={k: c.reconciled_at for k, c in counters.items()})
+            for key in (self._cost_key(month), self._requests_key(month), self._reconciled_key(month)):
+                pipe.expire(key, COUNTER_EXPIRY)
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+
+_service: Optional[QuotaService] = None
+_service_lock = threading.Lock()
+
+
+def get_quota_service() -> QuotaService:
+    """Process-wide quota counters"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = QuotaService()
+    return _service
+
+
+def record_api_key_usage(key_id: Any, cost, timestamp: Optional[datetime] = None) -> None:
+    """Count a logged call against its API key's monthly quota"""
+    get_quota_service().record(key_id, cost, timestamp)
@@ -0,0 +1,38 @@
+# File: backend/modelhub/services/redis_client.py
+"""
+Shared Redis connection for modelhub coordination (catalog versions and
+invalidation messages). Returns None when MODELHUB_SETTINGS['REDIS_URL'] is
+empty or the redis package is missing, so callers fall back to per-process
+behaviour.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_modelhub_redis_url() -> str:
+    return getattr(settings, 'MODELHUB_SETTINGS', {}).get('REDIS_URL') or ''
+
+
+def get_modelhub_redis(url: Optional[str] = None):
+    """Shared Redis client, or None when Redis is not configured"""
+    url = url if url is not None else get_modelhub_redis_url()
+    if not url:
+        return None
+    with _clients_lock:
+        if url not in _clients:
+            try:
+                import redis
+            except ImportError:
+                logger.warning("redis is not installed; modelhub coordination is per process")
+                return None
+            _clients[url] = redis.Redis.from_url(url, socket_connect_timeout=1, socket_timeout=2)
+        return _clients[url]
@@ -0,0 +1,300 @@
+# File: backend/modelhub/services/request_coalescer.py
+"""
+LLM Request Coalescer
+
+Deduplicates identical LLM calls made through UnifiedLLMClient.call_llm:
+
+- A request is identified by a SHA-256 of its canonical JSON (provider, model,
+  messages or prompt, parameters) scoped to the API key, so one tenant never
+  receives another tenant's response
+- Concurrent identical calls share one upstream call (single-flight), in any
+  thread or event loop of the process
+- Temperature-0 responses can also be cached for a TTL, in process memory
+  and in Redis for other processes
+- Only successful responses are cached; a failed call is shared with the
+  callers waiting on it but never stored
+- Responses served without an upstream call cost nothing and carry
+  raw_response['served_from'] ('inflight', 'local' or 'redis')
+
+Opt-in per call site: call_llm(..., dedupe=True) and/or cache_ttl=<seconds>.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ..adapters.base import LLMResponse
+from .client_pool import hash_api_key
+from .complexity.cache import LeaderFailed, LocalResultCache
+from .redis_client import get_modelhub_redis
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LLM_COALESCING_SETTINGS = {
+    'LOCAL_MAX_ENTRIES': 1024,
+    'KEY_PREFIX': 'modelhub:llm_response',
+    'MAX_CACHE_TTL': 24 * 3600,
+    'REDIS_RETRY_AFTER': 30,
+}
+
+
+def get_llm_coalescing_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['LLM_COALESCING'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('LLM_COALESCING', {})
+    return {**DEFAULT_LLM_COALESCING_SETTINGS, **configured}
+
+
+def request_key(
+    provider_slug: str,
+    model_name: str,
+    api_key: str,
+    messages: Optional[List[Dict[str, Any]]] = None,
+    prompt: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> str:
+    """Hash of the canonicalized request; equal for byte-identical requests only"""
+    canonical = json.dumps(
+        {
+            'provider': provider_slug,
+            'model': model_name,
+            'scope': hash_api_key(api_key),
+            'messages': messages,
+            'prompt': prompt,
+            'params': params or {},
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def serialize_response(response: LLMResponse) -> Dict[str, Any]:
+    return {
+        'content': response.content,
+        'tokens_input': response.tokens_input,
+        'tokens_output': response.tokens_output,
+        'latency_ms': response.latency_ms,
+        'cost': str(response.cost),
+        'raw_response': response.raw_response,
+    }
+
+
+def is_cacheable(response: LLMResponse) -> bool:
+    return bool(response.content) and not response.raw_response.get('error')
+
+
+class LLMRequestCoalescer:
+    """
+    Single-flight and response cache for identical non-streaming LLM calls.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        use_redis: bool = True,
+        local_cache: Optional[LocalResultCache] = None
+    ):
+        """
+        Args:
+            redis_client: Redis connection for the shared tier (default: MODELHUB_SETTINGS)
+            use_redis: Share cached responses across processes
+            local_cache: In-process tier and in-flight registry
+        """
+        config = get_llm_coalescing_settings()
+        self.key_prefix = config['KEY_PREFIX']
+        self.max_cache_ttl = config['MAX_CACHE_TTL']
+        self.redis_retry_after = config['REDIS_RETRY_AFTER']
+        self.redis = redis_client if redis_client is not None else (get_modelhub_redis() if use_redis else None)
+        self.local_cache = (
+            local_cache if local_cache is not None
+            else LocalResultCache(max_entries=config['LOCAL_MAX_ENTRIES'], negative_ttl=0)
+        )
+
+        self._stats_lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.stats = {
+            'calls': 0,
+            'upstream_calls': 0,
+            'coalesced': 0,
+            'local_hits': 0,
+            'redis_hits': 0,
+            'cached': 0,
+            'saved_calls': 0,
+            'saved_tokens_input': 0,
+            'saved_tokens_output': 0,
+            'saved_cost': Decimal('0'),
+            'errors': 0,
+        }
+
+    async def call(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[LLMResponse]],
+        cache_ttl: Optional[float] = None
+    ) -> LLMResponse:
+        """
+        Response for the request identified by key.
+
+        Served from the cache when cache_ttl is set and a stored response
+        exists; otherwise shares the in-flight call for the key, or makes it
+        and (with cache_ttl) stores a successful result. If the call a request
+        was waiting on raises, the request makes its own.
+        """
+        started = time.monotonic()
+        self._count('calls')
+
+        if cache_ttl:
+            cached = await self._get_cached(key)
+            if cached is not None:
+                source, data = cached
+                return self._served(data, source, started)
+
+        future, leader = self.local_cache.join(key)
+        if not leader:
+            try:
+                data = await asyncio.wrap_future(future)
+                logger.debug(f"🔗 Shared in-flight LLM call: {key[:12]}")
+                self._count('coalesced')
+                return self._served(data, 'inflight', started)
+            except LeaderFailed:
+                logger.debug(f"In-flight LLM call failed, calling again: {key[:12]}")
+            self._count('upstream_calls')
+            return await call()
+
+        try:
+            self._count('upstream_calls')
+            response = await call()
+        except BaseException as e:
+            future.set_exception(LeaderFailed(str(e)))
+            raise
+        else:
+            data = serialize_response(response)
+            if cache_ttl and is_cacheable(response):
+                await self._store(key, data, min(cache_ttl, self.max_cache_ttl))
+            future.set_result(data)
+            return response
+        finally:
+            self.local_cache.leave(key, future)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['saved_cost'] = str(stats['saved_cost'])
+        stats['saved_percent'] = round(stats['saved_calls'] / stats['calls'] * 100, 2) if stats['calls'] else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Drop the in-process tier (Redis entries expire on their own)"""
+        self.local_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _count(self, name: str, amount: Any = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _served(self, data: Dict[str, Any], source: str, started: float) -> LLMResponse:
+        """A fresh response built from shared data, recorded as a saved call"""
+        with self._stats_lock:
+            self.stats['saved_calls'] += 1
+            self.stats['saved_tokens_input'] += data['tokens_input'] or 0
+            self.stats['saved_tokens_output'] += data['tokens_output'] or 0
+            self.stats['saved_cost'] += Decimal(data['cost'])
+        return LLMResponse(
+            content=data['content'],
+            tokens_input=data['tokens_input'],
+            tokens_output=data['tokens_output'],
+            latency_ms=int((time.monotonic() - started) * 1000),
+            cost=Decimal('0.00'),
+            raw_response={**(data['raw_response'] or {}), 'served_from': source},
+        )
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def _available_redis(self):
+        if self.redis is None or time.monotonic() < self._redis_down_until:
+            return None
+        return self.redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        """Back off from Redis for a while; responses stay cached per process meanwhile"""
+        if not self._redis_down_until:
+            logger.warning(f"LLM response cache unavailable in Redis, caching per process: {error}")
+        else:
+            logger.debug(f"LLM response cache unavailable in Redis: {error}")
+        self._count('errors')
+        self._redis_down_until = time.monotonic() + self.redis_retry_after
+
+    async def _get_cached(self, key: str) -> Optional[tuple]:
+        data = self.local_cache.get(key)
+        if data is not None:
+            self._count('local_hits')
+            return 'local', data
+
+        redis = self._available_redis()
+        if redis is None:
+            return None
+        try:
+            raw, ttl = await sync_to_async(self._read_redis, thread_sensitive=False)(redis, key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        self.local_cache.set(key, data, ttl if ttl and ttl > 0 else 0)
+        self._count('redis_hits')
+        return 'redis', data
+
+    def _read_redis(self, redis, key: str):
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(self._redis_key(key))
+        pipe.ttl(self._redis_key(key))
+        raw, ttl = pipe.execute()
+        return raw, ttl
+
+    async def _store(self, key: str, data: Dict[str, Any], ttl: float) -> None:
+        self.local_cache.set(key, data, ttl)
+        self._count('cached')
+
+        redis = self._available_redis()
+        if redis is None:
+            return
+        try:
+            payload = json.dumps(data, default=str)
+            await sync_to_async(redis.set, thread_sensitive=False)(
+                self._redis_key(key), payload, ex=max(1, int(ttl))
+            )
+        except Exception as e:
+            self._redis_failed(e)
+
+
+_coalescer: Optional[LLMRequestCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_request_coalescer() -> LLMRequestCoalescer:
+    """Process-wide coalescer used by UnifiedLLMClient.call_llm"""
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = LLMRequestCoalescer()
+    return _coalescer
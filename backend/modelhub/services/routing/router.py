@@ -14,6 +14,9 @@ from .types import (
     ModelCandidate, EntityType, RoutingMetrics
 )
 from modelhub.models import Model, Provider, RoutingRule, RoutingRuleModel
+from modelhub.services.model_catalog import get_model_catalog
+from modelhub.services.quota_service import get_quota_service
+from .rule_engine import RoutingRuleEngine, RuleSnapshot, get_routing_rule_engine
 
 logger = logging.getLogger(__name__)
 
@@ -155,8 +158,7 @@ class EnhancedModelRouter:
                 organization_strategy=strategy.value
             )
     
-    @database_sync_to_async
-    def _get_routing_decision_from_rules(
+    async def _get_routing_decision_from_rules(
         self,
         organization,
         model_type: str,
@@ -168,11 +170,10 @@ class EnhancedModelRouter:
         """
         Use database routing rules with entity-aware logic.
         
-        Entity types may influence rule selection and model preferences.
+        Rules come from the compiled rule engine; only a rule reload touches
+        the database.
         """
         try:
-            from ...models import RoutingRule
-            
             logger.info(
                 f"🔍 Looking for routing rules: "
                 f"complexity={complexity_score:.2f}, "
@@ -188,148 +189,49 @@ class EnhancedModelRouter:
                     logger.info(f"Using org default strategy: {org_strategy} (overriding {strategy.value})")
                     strategy = OptimizationStrategy(org_strategy)
             
-            # Find applicable routing rules
-            applicable_rules = []
-            
-            # Get rules for this organization first, then system-wide rules
-            rule_query = RoutingRule.objects.filter(
-                model_type=model_type,
-                is_active=True
-            ).order_by('priority')
-            
-            # Prefer organization-specific rules
-            org_rules = rule_query.filter(organization=organization)
-            system_rules = rule_query.filter(organization__isnull=True)
-            
-            for rule in list(org_rules) + list(system_rules):
-                if self._rule_matches_request(rule, complexity_score, content_type, strategy, context):
-                    applicable_rules.append(rule)
-                    logger.info(f"✅ Rule matches: {rule.name} (entity={context.entity_type})")
-                    break  # Use first matching rule
-            
-            if not applicable_rules:
-                logger.warning(f"⚠️ No routing rules matched for entity={context.entity_type}")
-                return None
-            
-            # Use the selected rule
-            selected_rule = applicable_rules[0]
-            
-            # Get models from the rule with their weights
-            rule_models = selected_rule.routingrulemodel_set.all().select_related('model', 'model__provider')
-            
-            if not rule_models:
-                logger.warning(f"⚠️ No models configured for rule: {selected_rule.name}")
-                return None
-            
-            # Filter models based on entity-specific requirements
-            suitable_models = []
-            for rule_model in rule_models:
-                if self._model_suitable_for_entity(rule_model.model, context):
-                    suitable_models.append(rule_model)
-            
-            if not suitable_models:
-                logger.warning(f"⚠️ No suitable models for entity type: {context.entity_type}")
-                return None
-            
-            # Select model (for now, use first suitable model)
-            # TODO: Implement proper weighted selection
-            selected_rule_model = suitable_models[0]
-            selected_model = selected_rule_model.model
-            
-            confidence = 0.9  # High confidence for rule-based decisions
-            
-            return (
-                selected_model.provider.slug,
-                selected_model.name,
-                confidence
+            engine = get_routing_rule_engine()
+            snapshot = await engine.aget()
+            return self._select_from_rules(
+                engine, snapshot, organization, model_type, complexity_score, content_type, strategy, context
             )
             
         except Exception as e:
             logger.error(f"Error in rule-based routing: {e}")
             return None
     
-    def _rule_matches_request(
+    def _select_from_rules(
         self,
-        rule: RoutingRule,
+        engine: RoutingRuleEngine,
+        snapshot: RuleSnapshot,
+        organization,
+        model_type: str,
         complexity_score: float,
         content_type: str,
-        strategy: OptimizationStrategy,
+        strategy: Optional[OptimizationStrategy],
         context: RequestContext
-    ) -> bool:
-        """Check if a routing rule matches the current request"""
-        if not rule.conditions:
-            return True
-        
-        for condition in rule.conditions:
-            field = condition.get('field')
-            operator = condition.get('operator')
-            value = condition.get('value')
-            
-            if not field or not operator:
-                continue
-            
-            # Skip entity_type conditions - we're making routing entity-agnostic
-            if field == 'entity_type':
-                continue
-            
-            elif field == 'complexity_score' and complexity_score is not None:
-                if not self._evaluate_condition(complexity_score, operator, value):
-                    return False
-            
-            elif field == 'content_type' and content_type:
-                if not self._evaluate_condition(content_type, operator, value):
-                    return False
-            
-            elif field == 'optimization_strategy' and strategy:
-                if not self._evaluate_condition(strategy.value, operator, value):
-                    return False
+    ) -> Optional[Tuple[str, str, float]]:
+        """First matching rule (organization, then system-wide), model picked by weight"""
+        rule, choice = engine.select(
+            snapshot,
+            organization_id=getattr(organization, 'pk', None),
+            model_type=model_type,
+            complexity_score=complexity_score,
+            content_type=content_type,
+            strategy=strategy.value if strategy else None
+        )
         
-        return True
-    
-    def _evaluate_condition(self, actual_value, operator: str, expected_value) -> bool:
-        """
-        Evaluate a routing rule condition.
+        if rule is None:
+            logger.warning(f"⚠️ No routing rules matched for entity={context.entity_type}")
+            return None
         
-        Args:
-            actual_value: The actual value to compare
-            operator: Comparison operator ('eq', 'gt', 'lt', 'gte', 'lte', 'in', 'contains')
-            expected_value: The expected value to compare against
-            
-        Returns:
-            bool: True if condition is met, False otherwise
-        """
-        try:
-            if operator == 'eq':
-                return actual_value == expected_value
-            elif operator == 'gt':
-                return float(actual_value) > float(expected_value)
-            elif operator == 'lt':
-                return float(actual_value) < float(expected_value)
-            elif operator == 'gte':
-                return float(actual_value) >= float(expected_value)
-            elif operator == 'lte':
-                return float(actual_value) <= float(expected_value)
-            elif operator == 'in':
-                # expected_value should be a list or comma-separated string
-                if isinstance(expected_value, str):
-                    expected_list = [item.strip() for item in expected_value.split(',')]
-                else:
-                    expected_list = expected_value
-                return actual_value in expected_list
-            elif operator == 'contains':
-                return str(expected_value).lower() in str(actual_value).lower()
-            else:
-                logger.warning(f"Unknown operator in routing condition: {operator}")
-                return False
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error evaluating condition: {actual_value} {operator} {expected_value} - {e}")
-            return False
-    
-    def _model_suitable_for_entity(self, model: Model, context: RequestContext) -> bool:
-        """Check if a model is suitable for the given entity type"""
-        # In entity-agnostic routing, all models are considered suitable for all entity types
-        # We're ignoring entity-specific requirements
-        return True
+        logger.info(f"✅ Rule matches: {rule.name} (entity={context.entity_type})")
+        if choice is None:
+            logger.warning(f"⚠️ No models configured for rule: {rule.name}")
+            return None
+        
+        provider_slug, model_name = choice
+        confidence = 0.9  # High confidence for rule-based decisions
+        return provider_slug, model_name, confidence
     
     def route_request_sync(
         self,
@@ -355,7 +257,7 @@ class EnhancedModelRouter:
         
         if routing_result:
             provider_slug, model_name, confidence = routing_result
-            model_info = self._get_model_info(provider_slug, model_name)
+            model_info = get_model_catalog().get().model_info(provider_slug, model_name)
             estimated_cost = self._calculate_estimated_cost(model_info, context.max_tokens)
             
             decision_time = int((time.time() - start_time) * 1000)
@@ -392,9 +294,6 @@ class EnhancedModelRouter:
         context: RequestContext
     ) -> Optional[Tuple[str, str, float]]:
         """Synchronous version of _get_routing_decision_from_rules"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
         try:
             logger.info(
                 f"🔍 Looking for routing rules: "
@@ -407,67 +306,10 @@ class EnhancedModelRouter:
             if organization and hasattr(organization, 'default_optimization_strategy') and not strategy:
                 strategy = OptimizationStrategy(organization.default_optimization_strategy)
             
-            applicable_rules = []
-            rule_query = RoutingRule.objects.filter(model_type=model_type, is_active=True).order_by('priority')
-            
-            if organization:
-                org_rules = rule_query.filter(organization=organization)
-                system_rules = rule_query.filter(organization__isnull=True)
-                all_rules = list(org_rules) + list(system_rules)
-            else:
-                all_rules = list(rule_query.filter(organization__isnull=True))
-            
-            for rule in all_rules:
-                if self._rule_matches_request(rule, complexity_score, content_type, strategy, context):
-                    applicable_rules.append(rule)
-                    logger.info(f"✅ Rule matched: {rule.name}")
-                    break  # Use first matching rule based on priority
-            
-            if not applicable_rules:
-                logger.info("❌ No matching rules found")
-                return None
-            
-            selected_rule = applicable_rules[0]  # Use highest priority rule
-            
-            # Get models associated with the rule
-            rule_models = selected_rule.routingrulemodel_set.all().select_related('model', 'model__provider')
-            
-            if not rule_models.exists():
-                logger.warning(f"⚠️ No models configured for rule: {selected_rule.name}")
-                return None
-            
-            # Filter models suitable for entity
-            suitable_models = [rm for rm in rule_models if self._model_suitable_for_entity(rm.model, context)]
-            
-            if not suitable_models:
-                logger.warning(f"⚠️ No suitable models for entity: {context.entity_type}")
-                return None
-            
-            # Select model based on weights
-            import random
-            total_weight = sum(rm.weight for rm in suitable_models)
-            rand_val = random.uniform(0, total_weight)
-            
-            current_weight = 0
-            for rm in suitable_models:
-                current_weight += rm.weight
-                if rand_val <= current_weight:
-                    selected_model = rm.model
-                    provider_slug = selected_model.provider.slug
-                    model_name = selected_model.name
-                    confidence = 0.9  # High confidence for rule-based selection
-                    
-                    logger.info(f"✅ Selected {provider_slug}/{model_name} from rule {selected_rule.name}")
-                    return provider_slug, model_name, confidence
-            
-            # Fallback to first model if weights don't add up correctly
-            selected_model = suitable_models[0].model
-            provider_slug = selected_model.provider.slug
-            model_name = selected_model.name
-            confidence = 0.8  # Slightly lower confidence for fallback selection
-            
-            logger.info(f"✅ Fallback selected {provider_slug}/{model_name} from rule {selected_rule.name}")
-            return provider_slug, model_name, confidence
+            engine = get_routing_rule_engine()
+            return self._select_from_rules(
+                engine, engine.get(), organization, model_type, complexity_score, content_type, strategy, context
+            )
             
         except Exception as e:
             logger.error(f"❌ Error in rule-based routing: {e}")
@@ -639,19 +481,23 @@ class EnhancedModelRouter:
     @database_sync_to_async
     def _get_available_models(self, organization, model_type: str = 'TEXT') -> List[Dict]:
         """Get available models for organization"""
-        from ...models import Model, APIKey, Provider
+        from ...models import Model
         
-        models = Model.objects.filter(
+        models = list(Model.objects.filter(
             status='ACTIVE',
             model_type=model_type,
             provider__status='ACTIVE'
-        ).select_related('provider').order_by('cost_input')
+        ).select_related('provider').order_by('cost_input'))
+        
+        # API keys and quota state for every candidate provider at once
+        api_keys_by_provider = self._check_api_key_availability(
+            organization, {model.provider_id for model in models}
+        )
         
         available_models = []
         
         for model in models:
-            # Check API key availability
-            api_key_info = self._check_api_key_availability(organization, model.provider)
+            api_key_info = api_keys_by_provider.get(model.provider_id, {'available': False})
             
             if api_key_info['available']:
                 available_models.append({
@@ -668,62 +514,57 @@ class EnhancedModelRouter:
         
         return available_models
     
-    def _check_api_key_availability(self, organization, provider) -> Dict:
-        """Check API key availability with cost protection"""
+    def _check_api_key_availability(self, organization, provider_ids) -> Dict:
+        """
+        Check API key availability with cost protection for several providers.
+        
+        Loads the organization and Dataelan keys in one query and their
+        monthly spend from the quota service's counters.
+        
+        Returns:
+            Dict of provider id -> {'available', 'api_key', 'source'}
+        """
+        from django.db.models import Q
         from ...models import APIKey
         
-        # Try organization key first
+        provider_ids = list(provider_ids)
+        if not provider_ids:
+            return {}
+        
+        scope = Q(organization__isnull=True)
         if organization:
-            api_key = APIKey.objects.filter(
-                organization=organization,
-                provider=provider,
-                is_active=True
-            ).first()
-            
-            if api_key and api_key.quota_status.get('status') != 'exceeded':
-                return {
-                    'available': True,
-                    'api_key': api_key.key,
-                    'source': 'org'
-                }
-        
-        # Try Dataelan fallback key
-        dataelan_key = APIKey.objects.filter(
-            organization__isnull=True,
-            provider=provider,
-            is_active=True
-        ).first()
-        
-        if dataelan_key and dataelan_key.quota_status.get('status') != 'exceeded':
-            return {
-                'available': True,
-                'api_key': dataelan_key.key,
-                'source': 'dataelan'
-            }
-        
-        return {'available': False}
+            scope |= Q(organization=organization)
+        
+        # First key per (provider, owner), in the order .first() used to pick them
+        candidates = {}
+        for api_key in APIKey.objects.filter(
+            scope, provider_id__in=provider_ids, is_active=True
+        ).order_by('pk'):
+            source = 'dataelan' if api_key.organization_id is None else 'org'
+            candidates.setdefault((api_key.provider_id, source), api_key)
+        
+        statuses = get_quota_service().get_quota_statuses(candidates.values())
+        
+        availability = {}
+        for provider_id in provider_ids:
+            availability[provider_id] = {'available': False}
+            # Try organization key first, then the Dataelan fallback key
+            for source in ('org', 'dataelan'):
+                api_key = candidates.get((provider_id, source))
+                if api_key and statuses[str(api_key.pk)]['status'] != 'exceeded':
+                    availability[provider_id] = {
+                        'available': True,
+                        'api_key': api_key.key,
+                        'source': source
+                    }
+                    break
+        
+        return availability
     
-    @database_sync_to_async
-    def _get_model_info(self, provider_slug: str, model_name: str) -> Optional[Dict]:
-        """Get model information from database"""
-        from ...models import Model
-        
-        try:
-            model = Model.objects.select_related('provider').get(
-                provider__slug=provider_slug,
-                name=model_name,
-                status='ACTIVE'
-            )
-            return {
-                'provider': model.provider.slug,
-                'model': model.name,
-                'cost_input': float(model.cost_input),
-                'cost_output': float(model.cost_output),
-                'context_window': model.context_window,
-                'capabilities': model.capabilities
-            }
-        except Model.DoesNotExist:
-            return None
+    async def _get_model_info(self, provider_slug: str, model_name: str) -> Optional[Dict]:
+        """Get model information from the model catalog cache"""
+        catalog = await get_model_catalog().aget()
+        return catalog.model_info(provider_slug, model_name)
     
     def _calculate_estimated_cost(self, model_info: Dict, estimated_tokens: int) -> Decimal:
         """Calculate estimated cost for model usage"""
@@ -0,0 +1,334 @@
+# backend/modelhub/services/routing/rule_engine.py
+"""
+Compiled routing rule engine.
+
+Active RoutingRule / RoutingRuleModel rows are compiled once into an in-memory
+decision structure instead of being queried and interpreted per request:
+
+- Conditions are pre-parsed into predicates (numeric thresholds converted,
+  'in' lists split into sets, 'contains' needles lower-cased)
+- Rules are indexed by (organization, model_type) and kept in priority order;
+  organization rules are tried before system-wide rules
+- Each rule's models carry a cumulative weight table, so weighted random
+  selection is a binary search
+- The compiled rules are a versioned snapshot (see versioned_cache): saving a
+  rule, rule model or model reloads them in every worker
+"""
+
+import bisect
+import logging
+import operator
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from ..versioned_cache import VersionedSnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RULE_ENGINE_SETTINGS = {
+    'TTL': 300,
+    'VERSION_KEY': 'modelhub:routing_rules:version',
+    'CHANNEL': 'modelhub:routing_rules',
+}
+
+# Request attributes rules can test; other fields (e.g. entity_type) are ignored
+ROUTABLE_FIELDS = ('complexity_score', 'content_type', 'optimization_strategy')
+
+NUMERIC_OPERATORS = {
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'gte': operator.ge,
+    'lte': operator.le,
+}
+
+
+def get_rule_engine_settings() -> Dict[str, Any]:
+    """MODELHUB_SETTINGS['ROUTING_RULES'] merged over the defaults"""
+    configured = getattr(settings, 'MODELHUB_SETTINGS', {}).get('ROUTING_RULES', {})
+    return {**DEFAULT_RULE_ENGINE_SETTINGS, **configured}
+
+
+def _never(actual_value) -> bool:
+    return False
+
+
+def compile_predicate(operator_name: str, expected_value) -> Callable[[Any], bool]:
+    """
+    Pre-parse one condition into a predicate on the request value.
+
+    Operators: 'eq', 'gt', 'lt', 'gte', 'lte', 'in', 'contains'. A condition
+    that can never be evaluated (unknown operator, non-numeric threshold)
+    compiles to a predicate that is always False.
+    """
+    if operator_name == 'eq':
+        return lambda actual: actual == expected_value
+
+    if operator_name in NUMERIC_OPERATORS:
+        compare = NUMERIC_OPERATORS[operator_name]
+        try:
+            threshold = float(expected_value)
+        except (TypeError, ValueError):
+            logger.warning(f"Non-numeric threshold in routing condition: {operator_name} {expected_value!r}")
+            return _never
+
+        def numeric(actual):
+            try:
+                return compare(float(actual), threshold)
+            except (TypeError, ValueError):
+                return False
+        return numeric
+
+    if operator_name == 'in':
+        if isinstance(expected_value, str):
+            options = [item.strip() for item in expected_value.split(',')]
+        elif isinstance(expected_value, Iterable):
+            options = list(expected_value)
+        else:
+            logger.warning(f"Routing condition 'in' needs a list, got {expected_value!r}")
+            return _never
+        try:
+            members = frozenset(options)
+        except TypeError:
+            members = tuple(options)
+        return lambda actual: actual in members
+
+    if operator_name == 'contains':
+        needle = str(expected_value).lower()
+        return lambda actual: needle in str(actual).lower()
+
+    logger.warning(f"Unknown operator in routing condition: {operator_name}")
+    return _never
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    field: str
+    test: Callable[[Any], bool]
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """A rule with parsed conditions and a cumulative weight table"""
+    id: str
+    name: str
+    priority: int
+    organization_id: Optional[str]
+    model_type: str
+    conditions: Tuple[CompiledCondition, ...]
+    choices: Tuple[Tuple[str, str], ...]  # (provider_slug, model_name)
+    cumulative_weights: Tuple[int, ...]
+
+    def matches(self, values: Dict[str, Any]) -> bool:
+        """
+        All conditions hold. A condition on a value the request does not
+        carry (None) is skipped.
+        """
+        for condition in self.conditions:
+            actual = values.get(condition.field)
+            if actual is not None and not condition.test(actual):
+                return False
+        return True
+
+    def choose(self, rand: float) -> Optional[Tuple[str, str]]:
+        """Weighted pick for a uniform rand in [0, 1)"""
+        if not self.choices:
+            return None
+        index = bisect.bisect_right(self.cumulative_weights, rand * self.cumulative_weights[-1])
+        return self.choices[min(index, len(self.choices) - 1)]
+
+
+def compile_rule(
+    rule_id: Any,
+    name: str,
+    priority: int,
+    organization_id: Any,
+    model_type: str,
+    conditions: Any,
+    models: Sequence[Tuple[str, str, int]]
+) -> Optional[CompiledRule]:
+    """
+    Compile one rule.
+
+    Args:
+        models: (provider_slug, model_name, weight) in selection order
+
+    Returns:
+        CompiledRule, or None when the conditions are malformed
+    """
+    compiled: List[CompiledCondition] = []
+    for condition in conditions or []:
+        if not isinstance(condition, dict):
+            logger.warning(f"Skipping routing rule {name}: malformed condition {condition!r}")
+            return None
+        field_name = condition.get('field')
+        operator_name = condition.get('operator')
+        if not field_name or not operator_name or field_name not in ROUTABLE_FIELDS:
+            continue
+        compiled.append(CompiledCondition(field_name, compile_predicate(operator_name, condition.get('value'))))
+
+    weights = [max(int(weight or 0), 0) for _, _, weight in models]
+    if models and not any(weights):
+        weights = [1] * len(models)
+    cumulative, total = [], 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    return CompiledRule(
+        id=str(rule_id),
+        name=name,
+        priority=priority,
+        organization_id=str(organization_id) if organization_id is not None else None,
+        model_type=model_type,
+        conditions=tuple(compiled),
+        choices=tuple((provider_slug, model_name) for provider_slug, model_name, _ in models),
+        cumulative_weights=tuple(cumulative),
+    )
+
+
+@dataclass
+class RuleSnapshot:
+    """Compiled rules indexed by (organization_id, model_type), in priority order"""
+    index: Dict[Tuple[Optional[str], str], Tuple[CompiledRule, ...]] = field(default_factory=dict)
+    version: int = 0
+    loaded_at: float = 0.0
+    rule_count: int = 0
+
+    @classmethod
+    def build(cls, rules: Iterable[CompiledRule], version: int = 0) -> 'RuleSnapshot':
+        grouped: Dict[Tuple[Optional[str], str], List[CompiledRule]] = {}
+        count = 0
+        for rule in rules:
+            grouped.setdefault((rule.organization_id, rule.model_type), []).append(rule)
+            count += 1
+        # sorted() is stable, so equal priorities keep load order
+        index = {key: tuple(sorted(group, key=lambda r: r.priority)) for key, group in grouped.items()}
+        return cls(index=index, version=version, loaded_at=time.monotonic(), rule_count=count)
+
+    def match(
+        self,
+        organization_id: Any,
+        model_type: str,
+        complexity_score: Optional[float] = None,
+        content_type: Optional[str] = None,
+        strategy: Optional[str] = None
+    ) -> Optional[CompiledRule]:
+        """First matching rule: organization rules, then system-wide rules"""
+        values = {
+            'complexity_score': complexity_score,
+            'content_type': content_type or None,
+            'optimization_strategy': strategy or None,
+        }
+        scopes = [None] if organization_id is None else [str(organization_id), None]
+        for scope in scopes:
+            for rule in self.index.get((scope, model_type), ()):
+                if rule.matches(values):
+                    return rule
+        return None
+
+
+class RoutingRuleEngine(VersionedSnapshotCache[RuleSnapshot]):
+    """
+    Compiled routing rules with hot reload.
+    """
+
+    label = 'routing rules'
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        redis_client: Any = None,
+        use_redis: bool = True,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Args:
+            ttl: Seconds compiled rules are served before recompiling
+            redis_client: Redis connection for the shared version (default: MODELHUB_SETTINGS)
+            use_redis: Coordinate invalidation across processes
+            rng: Random source for weighted selection
+        """
+        config = get_rule_engine_settings()
+        super().__init__(
+            ttl=ttl if ttl is not None else config['TTL'],
+            version_key=config['VERSION_KEY'],
+            channel=config['CHANNEL'],
+            redis_client=redis_client,
+            use_redis=use_redis
+        )
+        self.rng = rng or random.Random()
+
+    def _load(self, version: int) -> RuleSnapshot:
+        from ...models import RoutingRule, RoutingRuleModel
+
+        models_by_rule: Dict[Any, List[Tuple[str, str, int]]] = {}
+        for rule_model in RoutingRuleModel.objects.filter(
+            rule__is_active=True
+        ).select_related('model__provider').order_by('created_at'):
+            models_by_rule.setdefault(rule_model.rule_id, []).append(
+                (rule_model.model.provider.slug, rule_model.model.name, rule_model.weight)
+            )
+
+        compiled = []
+        for rule in RoutingRule.objects.filter(is_active=True).order_by('priority', 'created_at'):
+            compiled_rule = compile_rule(
+                rule_id=rule.id,
+                name=rule.name,
+                priority=rule.priority,
+                organization_id=rule.organization_id,
+                model_type=rule.model_type,
+                conditions=rule.conditions,
+                models=models_by_rule.get(rule.id, []),
+            )
+            if compiled_rule is not None:
+                compiled.append(compiled_rule)
+
+        snapshot = RuleSnapshot.build(compiled, version=version)
+        logger.info(f"Compiled {snapshot.rule_count} routing rules (version {version})")
+        return snapshot
+
+    def select(
+        self,
+        snapshot: RuleSnapshot,
+        organization_id: Any,
+        model_type: str,
+        complexity_score: Optional[float] = None,
+        content_type: Optional[str] = None,
+        strategy: Optional[str] = None
+    ) -> Tuple[Optional[CompiledRule], Optional[Tuple[str, str]]]:
+        """
+        Match a rule and pick one of its models by weight.
+
+        Returns:
+            (rule, (provider_slug, model_name)); the pick is None when the
+            matched rule has no models, and both are None when nothing matched
+        """
+        rule = snapshot.match(organization_id, model_type, complexity_score, content_type, strategy)
+        if rule is None:
+            return None, None
+        return rule, rule.choose(self.rng.random())
+
+
+_engine: Optional[RoutingRuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_routing_rule_engine() -> RoutingRuleEngine:
+    """Process-wide compiled routing rules"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RoutingRuleEngine()
+    return _engine
+
+
+def invalidate_routing_rules() -> None:
+    """Recompile routing rules here and in every other worker"""
+    get_routing_rule_engine().invalidate()
@@ -158,7 +158,22 @@ class EnhancedSessionManager:
             return False, None, None
         
         session_state = await self.get_session_state(context.session_id, context.entity_type)
-        if not session_state:
+        return await self.decide_stickiness(context, session_state, current_complexity)
+    
+    async def decide_stickiness(
+        self,
+        context: RequestContext,
+        session_state: Optional[SessionState],
+        current_complexity: float
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Stickiness decision for an already loaded session state, so the
+        lookup can run before the complexity score is known.
+        
+        Returns:
+            tuple: (should_stick, provider, model)
+        """
+        if not context.session_id or not session_state:
             return False, None, None
         
         # Get entity-specific configuration
@@ -8,8 +8,9 @@ from decimal import Decimal
 from typing import Optional, List, Dict, Any, Union, AsyncGenerator
 from abc import ABC, abstractmethod
 
-from channels.db import database_sync_to_async
 from ..adapters.base import LLMResponse
+from .client_pool import get_client_pool, hash_api_key
+from .model_catalog import get_model_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -68,8 +69,7 @@ class OpenAIProvider(BaseLLMProvider):
     ) -> Union[LLMResponse, AsyncGenerator[LLMResponse, None]]:
         try:
             # Dynamic import
-            openai = importlib.import_module('openai')
-            AsyncOpenAI = getattr(openai, 'AsyncOpenAI')
+            importlib.import_module('openai')
         except ImportError as e:
             raise ImportError(f"OpenAI library not installed: {e}")
         
@@ -94,16 +94,14 @@ class OpenAIProvider(BaseLLMProvider):
                 base_url = provider_config['config'].get('base_url')
                 logger.info(f"Extracted base_url: {base_url}")
         
-        # Create client with optional custom base URL
-        client_kwargs = {'api_key': api_key}
         if base_url:
-            client_kwargs['base_url'] = base_url
             logger.info(f"Using custom base URL for {provider_slug}: {base_url}")
         else:
             logger.warning(f"No base_url set for {provider_slug}, will use default OpenAI endpoint")
         
         try:
-            client = AsyncOpenAI(**client_kwargs)
+            # Long-lived client keyed by (provider, key, base URL) over a shared connection pool
+            client = get_client_pool().get_openai_client(api_key, base_url=base_url, provider=provider_slug)
             
             # Set default max_tokens if not provided
             if 'max_tokens' not in kwargs:
@@ -341,15 +339,14 @@ class AnthropicProvider(BaseLLMProvider):
     ) -> Union[LLMResponse, AsyncGenerator[LLMResponse, None]]:
         try:
             # Dynamic import
-            anthropic = importlib.import_module('anthropic')
-            AsyncAnthropic = getattr(anthropic, 'AsyncAnthropic')
+            importlib.import_module('anthropic')
         except ImportError as e:
             raise ImportError(f"Anthropic library not installed: {e}")
         
         start_time = time.time()
         
         try:
-            client = AsyncAnthropic(api_key=api_key)
+            client = get_client_pool().get_anthropic_client(api_key)
             
             # Convert prompt to messages if needed
             if prompt and not messages:
@@ -539,6 +536,8 @@ class AnthropicProvider(BaseLLMProvider):
 class GoogleProvider(BaseLLMProvider):
     """Provider for Google Gemini models"""
     
+    _configured_key_hash: Optional[str] = None
+    
     def get_required_modules(self) -> List[str]:
         return ['google.generativeai']
     
@@ -558,8 +557,12 @@ class GoogleProvider(BaseLLMProvider):
         try:
             import google.generativeai as genai
             
-            # Configure API key
-            genai.configure(api_key=api_key)
+            # configure() rebuilds the SDK's process-wide client, so only
+            # reconfigure when the key actually changes
+            key_hash = hash_api_key(api_key)
+            if GoogleProvider._configured_key_hash != key_hash:
+                genai.configure(api_key=api_key)
+                GoogleProvider._configured_key_hash = key_hash
             
             # Get the model
             model = genai.GenerativeModel(model_name)
@@ -667,7 +670,15 @@ class UnifiedLLMClient:
         stream: bool = False,
         **kwargs
     ) -> Union[LLMResponse, AsyncGenerator[LLMResponse, None]]:
-        """Call the appropriate LLM based on provider slug"""
+        """Call the appropriate LLM based on provider slug
+        
+        Opt-in deduplication of identical non-streaming requests
+        (see request_coalescer):
+            dedupe: Share one upstream call among concurrent identical calls
+            cache_ttl: Also serve temperature-0 responses from cache for this many seconds
+        """
+        dedupe = kwargs.pop('dedupe', False)
+        cache_ttl = kwargs.pop('cache_ttl', None)
         
         # Validate inputs
         if not api_key or api_key.strip() == "" or api_key == "your-openai-key-here":
@@ -692,6 +703,19 @@ class UnifiedLLMClient:
                 raw_response={"error": "No prompt or messages provided"}
             )
         
+        if (dedupe or cache_ttl) and not stream:
+            from .request_coalescer import get_request_coalescer, request_key
+            
+            kwargs.setdefault('max_tokens', 1000)
+            key = request_key(provider_slug, model_name, api_key, messages, prompt, kwargs)
+            return await get_request_coalescer().call(
+                key,
+                lambda: UnifiedLLMClient.call_llm(
+                    provider_slug, model_name, api_key, messages=messages, prompt=prompt, **kwargs
+                ),
+                cache_ttl=cache_ttl if kwargs.get('temperature') == 0 else None
+            )
+        
         start_time = time.time()
         try:
             logger.debug(f"Calling {provider_slug} model {model_name} with {'messages' if messages else 'prompt'}")
@@ -710,9 +734,6 @@ class UnifiedLLMClient:
                 # Use the registered provider
                 provider_class = UnifiedLLMClient._provider_registry.get(provider_slug)
             if not provider_class:
-                # Try to get provider configuration from database
-                provider_config = await UnifiedLLMClient._get_provider_config(provider_slug)
-                
                 if not provider_config:
                     logger.error(f"Unsupported provider: {provider_slug}")
                     return LLMResponse(
@@ -774,40 +795,27 @@ class UnifiedLLMClient:
             )
     
     @staticmethod
-    @database_sync_to_async
-    def _get_provider_config(provider_slug: str) -> Optional[Dict]:
-        """Get provider configuration from database"""
+    async def _get_provider_config(provider_slug: str) -> Optional[Dict]:
+        """Get provider configuration from the model catalog cache"""
         try:
-            from ..models import Provider
-            provider = Provider.objects.get(slug=provider_slug, status='ACTIVE')
-            return {
-                'name': provider.name,
-                'slug': provider.slug,
-                'config': provider.config
-            }
-        except:
+            catalog = await get_model_catalog().aget()
+            return catalog.provider_config(provider_slug)
+        except Exception as e:
+            logger.error(f"Error loading provider config for {provider_slug}: {e}")
             return None
     
     @staticmethod
-    @database_sync_to_async
-    def _get_api_type_for_model(provider_slug: str, model_name: str) -> str:
+    async def _get_api_type_for_model(provider_slug: str, model_name: str) -> str:
         """Get API type for a specific model"""
-        from ..models import Model
-        return Model.get_api_type_for_model(provider_slug, model_name)
+        catalog = await get_model_catalog().aget()
+        return catalog.api_type(provider_slug, model_name)
     
     @staticmethod
-    @database_sync_to_async
-    def _calculate_cost(provider_slug: str, model_name: str, tokens_input: int, tokens_output: int) -> Decimal:
+    async def _calculate_cost(provider_slug: str, model_name: str, tokens_input: int, tokens_output: int) -> Decimal:
         """Calculate cost based on token usage and model rates"""
         try:
-            from ..models import Model
-            model_obj = Model.objects.get(name=model_name, provider__slug=provider_slug)
-            cost = (Decimal(str(tokens_input)) / 1000 * model_obj.cost_input + 
-                   Decimal(str(tokens_output)) / 1000 * model_obj.cost_output)
-            return cost
-        except Model.DoesNotExist:
-            logger.debug(f"Model {model_name} not found in database, using zero cost")
-            return Decimal('0.00')
+            catalog = await get_model_catalog().aget()
+            return catalog.cost(provider_slug, model_name, tokens_input, tokens_output)
         except Exception as e:
             logger.error(f"Error calculating cost: {e}")
             return Decimal('0.00')
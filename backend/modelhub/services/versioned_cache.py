@@ -0,0 +1,200 @@
+# File: backend/modelhub/services/versioned_cache.py
+"""
+Versioned Snapshot Cache
+
+Base for in-process caches of rarely changing configuration (model catalog,
+routing rules) that must refresh in every worker when the data changes:
+
+- A subclass loads an immutable snapshot from the database in _load()
+- Snapshots expire after TTL seconds as a backstop
+- invalidate() marks the local snapshot stale and bumps a shared version in
+  Redis, publishing it on a pub/sub channel; a listener thread in every
+  process marks its own snapshot stale when it sees a newer version
+- Concurrent callers wait for a single reload
+- Without Redis, invalidation is local to the process and the TTL covers the rest
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Generic, Optional, TypeVar
+
+from channels.db import database_sync_to_async
+
+from .redis_client import get_modelhub_redis
+
+logger = logging.getLogger(__name__)
+
+SnapshotT = TypeVar('SnapshotT')
+
+
+class VersionedSnapshotCache(Generic[SnapshotT]):
+    """
+    TTL-bounded snapshot with cross-process invalidation.
+
+    Snapshots must expose ``version`` and ``loaded_at`` attributes.
+    """
+
+    label = 'snapshot'
+
+    def __init__(
+        self,
+        ttl: float,
+        version_key: str,
+        channel: str,
+        redis_client: Any = None,
+        use_redis: bool = True
+    ):
+        """
+        Args:
+            ttl: Seconds a snapshot is served before reloading (0 = until invalidated)
+            version_key: Redis key holding the shared version
+            channel: Redis pub/sub channel for version bumps
+            redis_client: Redis connection (default: MODELHUB_SETTINGS['REDIS_URL'])
+            use_redis: Coordinate invalidation across processes
+        """
+        self.ttl = ttl
+        self.version_key = version_key
+        self.channel = channel
+        self.redis = redis_client if redis_client is not None else (get_modelhub_redis() if use_redis else None)
+
+        self._snapshot: Optional[SnapshotT] = None
+        self._stale = True
+        self._refresh_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._broadcast_warned = False
+        self.stats = {'hits': 0, 'refreshes': 0, 'invalidations': 0}
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def is_fresh(self) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is not None
+            and not self._stale
+            and (not self.ttl or time.monotonic() - snapshot.loaded_at < self.ttl)
+        )
+
+    def get(self) -> SnapshotT:
+        """Current snapshot, reloading from the database when stale (sync callers)"""
+        if self.is_fresh():
+            self.stats['hits'] += 1
+            return self._snapshot
+        return self.refresh()
+
+    async def aget(self) -> SnapshotT:
+        """Current snapshot; only a reload leaves the event loop"""
+        if self.is_fresh():
+            self.stats['hits'] += 1
+            return self._snapshot
+        return await database_sync_to_async(self.refresh)()
+
+    def refresh(self, force: bool = False) -> SnapshotT:
+        """
+        Reload the snapshot. Concurrent callers wait for one reload instead
+        of each querying the database.
+        """
+        with self._refresh_lock:
+            if not force and self.is_fresh():
+                return self._snapshot
+
+            # Clear the flag before loading: an invalidation that arrives
+            # mid-load marks this snapshot stale again
+            self._stale = False
+            try:
+                snapshot = self._load(self._shared_version())
+            except Exception:
+                self._stale = True
+                raise
+            self._snapshot = snapshot
+            self.stats['refreshes'] += 1
+            self._ensure_listener()
+            logger.debug(f"Loaded {self.label} (version {snapshot.version})")
+            return snapshot
+
+    def _load(self, version: int) -> SnapshotT:
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        """
+        Mark the snapshot stale; with broadcast, bump the shared version so
+        every other worker does the same.
+        """
+        self._stale = True
+        self.stats['invalidations'] += 1
+        if not broadcast or self.redis is None:
+            return
+        try:
+            version = self.redis.incr(self.version_key)
+            self.redis.publish(self.channel, version)
+            self._broadcast_warned = False
+        except Exception as e:
+            log = logger.debug if self._broadcast_warned else logger.warning
+            log(f"Could not broadcast {self.label} invalidation: {e}")
+            self._broadcast_warned = True
+
+    def handle_message(self, message: Optional[Dict[str, Any]]) -> None:
+        """Pub/sub message from another process: a newer version means reload"""
+        if not message or message.get('type') != 'message':
+            return
+        try:
+            version = int(message['data'])
+        except (TypeError, ValueError):
+            version = None
+        snapshot = self._snapshot
+        if snapshot is None or version is None or version != snapshot.version:
+            self._stale = True
+
+    def _shared_version(self) -> int:
+        if self.redis is None:
+            return 0
+        try:
+            return int(self.redis.get(self.version_key) or 0)
+        except Exception as e:
+            logger.debug(f"Could not read {self.label} version: {e}")
+            return 0
+
+    def _ensure_listener(self) -> None:
+        if self.redis is None or self._listener is not None:
+            return
+        self._listener = threading.Thread(
+            target=self._listen, name=f"{self.label.replace(' ', '-')}-listener", daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self) -> None:
+        """Follow invalidations; reconnects with backoff while Redis is unavailable"""
+        backoff = 1.0
+        warned = False
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything published while we were disconnected is lost, so reload
+                self._stale = True
+                backoff, warned = 1.0, False
+                while not self._stop.is_set():
+                    self.handle_message(pubsub.get_message(timeout=1.0))
+            except Exception as e:
+                log = logger.debug if warned else logger.warning
+                log(f"{self.label.capitalize()} listener disconnected, relying on TTL: {e}")
+                warned = True
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def close(self) -> None:
+        self._stop.set()
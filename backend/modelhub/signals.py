@@ -0,0 +1,71 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import APIKey, Model, ModelMetrics, Provider, RoutingRule, RoutingRuleModel
+from .services.client_pool import get_client_pool
+from .services.model_catalog import invalidate_model_catalog
+from .services.quota_service import record_api_key_usage
+from .services.routing.rule_engine import invalidate_routing_rules
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=APIKey)
+def evict_clients_for_rotated_key(sender, instance, update_fields=None, **kwargs):
+    """Drop pooled LLM clients built with a key that is being replaced or deactivated"""
+    if instance._state.adding:
+        return
+    # last_used_at is saved on every request; skip the lookup for those saves
+    if update_fields is not None and not {'key', 'is_active'} & set(update_fields):
+        return
+
+    try:
+        previous_key = APIKey.objects.filter(pk=instance.pk).values_list('key', flat=True).first()
+    except Exception as e:
+        logger.warning(f"Could not load previous API key for client pool eviction: {e}")
+        return
+
+    if previous_key and (previous_key != instance.key or not instance.is_active):
+        get_client_pool().evict_key(previous_key)
+
+
+@receiver(post_delete, sender=APIKey)
+def evict_clients_for_deleted_key(sender, instance, **kwargs):
+    """Drop pooled LLM clients built with a deleted key"""
+    if instance.key:
+        get_client_pool().evict_key(instance.key)
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+@receiver(post_save, sender=Model)
+@receiver(post_delete, sender=Model)
+def invalidate_catalog_on_change(sender, **kwargs):
+    """Providers and models feed the model catalog cache; reload it in every worker"""
+    # After commit, so other workers reload the committed rows under the new version
+    transaction.on_commit(invalidate_model_catalog)
+    # Compiled rules carry provider slugs and model names
+    transaction.on_commit(invalidate_routing_rules)
+
+
+@receiver(post_save, sender=RoutingRule)
+@receiver(post_delete, sender=RoutingRule)
+@receiver(post_save, sender=RoutingRuleModel)
+@receiver(post_delete, sender=RoutingRuleModel)
+@receiver(m2m_changed, sender=RoutingRuleModel)
+def invalidate_rules_on_change(sender, **kwargs):
+    """Recompile routing rules in every worker, once the change is committed"""
+    transaction.on_commit(invalidate_routing_rules)
+
+
+@receiver(post_save, sender=ModelMetrics)
+def count_api_key_usage(sender, instance, created, **kwargs):
+    """Add each logged call to its API key's running quota counter"""
+    if created and instance.api_key_id:
+        try:
+            record_api_key_usage(instance.api_key_id, instance.cost, instance.timestamp)
+        except Exception as e:
+            logger.warning(f"Could not count usage for API key {instance.api_key_id}: {e}")
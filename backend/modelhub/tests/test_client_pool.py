@@ -0,0 +1,156 @@
+"""
+Tests for pooled, long-lived provider clients
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from django.test import SimpleTestCase, TestCase
+
+from modelhub.management.commands.benchmark_llm_clients import MockLLMServer
+from modelhub.models import APIKey, Provider
+from modelhub.services import client_pool
+from modelhub.services.client_pool import ProviderClientPool
+from modelhub.services.unified_llm_client import OpenAIProvider, UnifiedLLMClient
+
+
+class TestProviderClientPool(SimpleTestCase):
+    """Test client reuse, keying, eviction and shutdown"""
+
+    def setUp(self):
+        self.server = MockLLMServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    @pytest.mark.asyncio
+    async def test_calls_reuse_one_client_and_connection(self):
+        """Test repeated calls through the provider share a client and a keep-alive connection"""
+        pool = ProviderClientPool()
+        provider_config = AsyncMock(return_value={'config': {'base_url': self.server.base_url}})
+
+        with patch.object(client_pool, '_client_pool', pool), \
+                patch.object(UnifiedLLMClient, '_get_provider_config', provider_config), \
+                patch.object(UnifiedLLMClient, '_calculate_cost', AsyncMock(return_value=0)):
+            for _ in range(5):
+                response = await OpenAIProvider().call_api(
+                    model_name='mock-model',
+                    api_key='key-1',
+                    messages=[{'role': 'user', 'content': 'ping'}],
+                    prompt=None,
+                    api_type='CHAT',
+                    provider_slug='mock'
+                )
+                assert response.content == 'ok'
+
+        assert self.server.requests == 5
+        assert self.server.connections == 1
+        stats = pool.get_stats()
+        assert stats['clients'] == 1 and stats['misses'] == 1 and stats['hits'] == 4
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_clients_are_keyed_by_provider_key_and_base_url(self):
+        """Test each (provider, key, base URL) gets its own client over one HTTP pool"""
+        pool = ProviderClientPool()
+        base_url = self.server.base_url
+
+        first = pool.get_openai_client('key-1', base_url=base_url, provider='mock')
+        assert pool.get_openai_client('key-1', base_url=base_url, provider='mock') is first
+        others = [
+            pool.get_openai_client('key-2', base_url=base_url, provider='mock'),
+            pool.get_openai_client('key-1', base_url=base_url + '/', provider='mock'),
+            pool.get_openai_client('key-1', base_url=base_url, provider='qwen'),
+        ]
+
+        assert all(client is not first for client in others)
+        assert len({id(client._client) for client in [first, *others]}) == 1
+        assert pool.get_stats()['http_pools'] == 1
+        assert 'key-1' not in repr(list(pool._loop_pool().clients))
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_rotated_key_is_evicted(self):
+        """Test evicting a key drops only its clients"""
+        pool = ProviderClientPool()
+        old = pool.get_openai_client('old-key', base_url=self.server.base_url)
+        kept = pool.get_openai_client('other-key', base_url=self.server.base_url)
+
+        assert pool.evict_key('old-key') == 1
+        assert pool.get_openai_client('old-key', base_url=self.server.base_url) is not old
+        assert pool.get_openai_client('other-key', base_url=self.server.base_url) is kept
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_clients_are_dropped(self):
+        """Test the pool never holds more than max_clients"""
+        pool = ProviderClientPool(max_clients=2)
+        first = pool.get_openai_client('key-1')
+        pool.get_openai_client('key-2')
+        pool.get_openai_client('key-1')
+        pool.get_openai_client('key-3')
+
+        assert pool.get_stats()['clients'] == 2
+        assert pool.get_openai_client('key-1') is first
+        assert pool.stats['evictions'] == 1
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_shared_connections(self):
+        """Test shutdown closes the shared HTTP pool and empties the pool"""
+        pool = ProviderClientPool()
+        client = pool.get_openai_client('key-1', base_url=self.server.base_url)
+        await client.chat.completions.create(model='mock-model', messages=[{'role': 'user', 'content': 'ping'}])
+        http_client = client._client
+
+        await pool.aclose()
+
+        assert http_client.is_closed
+        assert pool.get_stats()['clients'] == 0
+        assert pool.get_openai_client('key-1', base_url=self.server.base_url) is not client
+        await pool.aclose()
+
+    def test_loop_shutdown_closes_its_pool(self):
+        """Test asyncio.run() loops close their clients and are not kept by the pool"""
+        pool = ProviderClientPool()
+
+        async def call():
+            client = pool.get_openai_client('key-1', base_url=self.server.base_url)
+            await client.chat.completions.create(model='mock-model', messages=[{'role': 'user', 'content': 'ping'}])
+            return client._client
+
+        http_clients = [asyncio.run(call()) for _ in range(3)]
+
+        assert all(http_client.is_closed for http_client in http_clients)
+        assert pool.get_stats()['event_loops'] == 0
+
+        # A loop closed without finalizing its async generators is forgotten on the next use
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(call())
+        loop.close()
+        assert pool.get_stats()['event_loops'] == 0
+
+
+class TestKeyRotationSignals(TestCase):
+    """Test APIKey changes evict pooled clients"""
+
+    def setUp(self):
+        self.provider = Provider.objects.create(name='Mock Provider', slug='mock-provider')
+        self.api_key = APIKey.objects.create(provider=self.provider, label='system', key='old-key')
+
+    def test_key_changes_evict_clients(self):
+        """Test rotating, deactivating and deleting a key evict it; usage updates do not"""
+        with patch.object(client_pool, '_client_pool', ProviderClientPool()) as pool, \
+                patch.object(pool, 'evict_key') as evict_key:
+            self.api_key.save(update_fields=['last_used_at'])
+            evict_key.assert_not_called()
+
+            self.api_key.key = 'new-key'
+            self.api_key.save()
+            evict_key.assert_called_once_with('old-key')
+
+            self.api_key.is_active = False
+            self.api_key.save(update_fields=['is_active'])
+            evict_key.assert_called_with('new-key')
+
+            self.api_key.delete()
+            assert evict_key.call_count == 3
@@ -0,0 +1,175 @@
+"""
+Tests for the two-tier complexity cache
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from modelhub.services.complexity import cache as complexity_cache
+from modelhub.services.complexity.cache import ComplexityCacheService, LocalResultCache
+from modelhub.services.complexity.types import (
+    AnalysisPath, ComplexityLevel, ComplexityResult, ContentType, RequestContext,
+)
+
+
+def make_result(score=0.6, confidence=0.95):
+    return ComplexityResult(
+        score=score, level=ComplexityLevel.MEDIUM, confidence=confidence, reasoning='rules',
+        analysis_path=AnalysisPath.RULE_BASED, analysis_time_ms=12, content_type=ContentType.CODE,
+    )
+
+
+class TestComplexityCache(SimpleTestCase):
+    """Test the local tier, negative caching, single-flight and tier stats"""
+
+    def setUp(self):
+        cache.clear()
+        self.local = LocalResultCache(max_entries=100, negative_ttl=10)
+        self.service = ComplexityCacheService(local_cache=self.local)
+        self.context = RequestContext(organization_id='org-1')
+
+        cache_get = cache.get
+        self.redis_reads = []
+        patcher = patch.object(
+            complexity_cache.cache, 'get',
+            side_effect=lambda key, *args: self.redis_reads.append(key) or cache_get(key, *args)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hot_prompt_served_locally(self):
+        """Test cached results are read from process memory, and other processes fill it from Redis"""
+        self.service.cache_result('write a parser', self.context, make_result())
+
+        result = self.service.get_cached_result('write a parser', self.context)
+        assert result.cache_hit is True and result.score == 0.6
+        assert self.redis_reads == []
+
+        # Another process: empty local tier, result in Redis
+        other = ComplexityCacheService(local_cache=LocalResultCache())
+        assert other.get_cached_result('write a parser', self.context).score == 0.6
+        assert other.get_cached_result('write a parser', self.context).score == 0.6
+        assert len(self.redis_reads) == 1
+
+    def test_local_ttl_follows_confidence_ttl(self):
+        """Test a result expires locally when its confidence-based TTL runs out"""
+        self.service.cache_result('summarise', self.context, make_result(confidence=0.5))
+        now = complexity_cache.time.monotonic()
+
+        with patch.object(complexity_cache.time, 'monotonic', return_value=now + 1700):
+            assert self.service.get_cached_result('summarise', self.context) is not None
+        with patch.object(complexity_cache.time, 'monotonic', return_value=now + 1900):
+            self.service.get_cached_result('summarise', self.context)
+        assert len(self.redis_reads) == 1
+
+    def test_misses_are_remembered(self):
+        """Test a miss skips Redis until the negative TTL passes or a result is cached"""
+        assert self.service.get_cached_result('new prompt', self.context) is None
+        assert self.service.get_cached_result('new prompt', self.context) is None
+        assert len(self.redis_reads) == 1
+
+        self.service.cache_result('new prompt', self.context, make_result())
+        assert self.service.get_cached_result('new prompt', self.context).score == 0.6
+        assert len(self.redis_reads) == 1
+
+    def test_lru_bound(self):
+        """Test the least recently used entry is evicted"""
+        local = LocalResultCache(max_entries=2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+        assert (local.get('a'), local.get('b'), local.get('c')) == (1, None, 3)
+        assert local.stats['evictions'] == 1
+
+    def test_concurrent_identical_prompts_analyze_once(self):
+        """Test single-flight: one analysis, every caller gets its result"""
+        calls = []
+
+        async def analyze():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return make_result(score=0.8)
+
+        async def run():
+            return await asyncio.gather(*[
+                self.service.get_or_analyze('design a schema', self.context, analyze) for _ in range(5)
+            ])
+
+        results = async_to_sync(run)()
+
+        assert len(calls) == 1
+        assert [result.score for result in results] == [0.8] * 5
+        assert self.local.stats['coalesced'] == 4
+        assert self.service.get_cached_result('design a schema', self.context).score == 0.8
+
+    def test_failed_analysis_is_retried_by_waiters(self):
+        """Test callers waiting on a failed analysis run their own"""
+        calls = []
+
+        async def analyze():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            if len(calls) == 1:
+                raise RuntimeError('escalation failed')
+            return make_result(score=0.7)
+
+        async def run():
+            return await asyncio.gather(
+                self.service.get_or_analyze('plan a migration', self.context, analyze),
+                self.service.get_or_analyze('plan a migration', self.context, analyze),
+                return_exceptions=True,
+            )
+
+        first, second = async_to_sync(run)()
+
+        assert isinstance(first, RuntimeError)
+        assert second.score == 0.7
+        assert len(calls) == 2
+
+    def test_waiters_released_when_sharing_the_result_fails(self):
+        """Test callers waiting on the leader are not left hanging if its result cannot be shared"""
+        calls = []
+        serialize = self.service._serialize_result
+
+        async def analyze():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return make_result(score=0.7)
+
+        def failing_serialize(result):
+            if len(calls) == 1:
+                raise ValueError('not serializable')
+            return serialize(result)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(
+                self.service.get_or_analyze('plan a rollout', self.context, analyze),
+                self.service.get_or_analyze('plan a rollout', self.context, analyze),
+                return_exceptions=True,
+            ), timeout=2)
+
+        with patch.object(self.service, '_serialize_result', failing_serialize):
+            first, second = async_to_sync(run)()
+
+        assert isinstance(first, ValueError)
+        assert second.score == 0.7
+        assert len(calls) == 2
+
+    def test_tier_hit_rates(self):
+        """Test hit ratios are reported for each tier"""
+        self.service.cache_result('a', self.context, make_result())
+        self.service.get_cached_result('a', self.context)  # local hit
+        ComplexityCacheService(local_cache=self.local).get_cached_result('b', self.context)  # redis miss
+        self.local.clear()
+        self.service.get_cached_result('a', self.context)  # redis hit
+
+        stats = self.service.get_cache_stats()
+        assert stats['total_requests'] == 3
+        assert stats['hit_rate_percent'] == 66.67
+        assert stats['local']['hit_rate_percent'] == 33.33
+        assert stats['redis'] == {'lookups': 2, 'hits': 1, 'hit_rate_percent': 50.0}
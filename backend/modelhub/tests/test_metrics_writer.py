@@ -0,0 +1,225 @@
+"""
+Tests for the buffered ModelMetrics writer
+"""
+
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import Organization
+from modelhub.models import APIKey, Model, ModelMetrics, Provider
+from modelhub.services import metrics_writer, quota_service
+from modelhub.services.metrics_writer import MetricsWriter
+from modelhub.services.quota_service import QuotaService
+
+
+class TestMetricsWriter(TestCase):
+    """Test buffering, batched writes, quota counting and the spill file"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Metrics Org', slug=f'metrics-org-{uuid.uuid4().hex[:8]}')
+        provider = Provider.objects.create(name='Voyage', slug=f'voyage-{uuid.uuid4().hex[:8]}')
+        self.model = Model.objects.create(
+            provider=provider, name='voyage-3.5-lite', model_type='EMBEDDING', capabilities=['embedding'],
+            cost_input=Decimal('0.00002'), cost_output=Decimal('0'), context_window=32000,
+        )
+        self.api_key = APIKey.objects.create(
+            organization=self.organization, provider=provider, label='org', key='voyage-key',
+        )
+
+        spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_dir.cleanup)
+        self.writer = MetricsWriter(batch_size=2, flush_interval=60, spill_dir=spill_dir.name)
+        # Flushed by the tests, not by the background thread
+        self.writer._ensure_thread = lambda: None
+
+        self.quotas = QuotaService(use_redis=False)
+        patcher = patch.object(quota_service, '_service', self.quotas)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, cost='0.001', **fields):
+        return self.writer.record(
+            model=self.model, organization=self.organization, api_key=self.api_key,
+            latency_ms=120, tokens_input=500, tokens_output=0, cost=Decimal(cost), **fields
+        )
+
+    def test_record_is_buffered_and_flushed_in_batches(self):
+        """Test logging does no I/O and a flush writes one insert per batch"""
+        with self.assertNumQueries(0):
+            events = [self.record() for _ in range(3)]
+        assert self.writer.pending() == 3
+
+        with self.assertNumQueries(2):
+            assert self.writer.flush() == 3
+
+        assert self.writer.pending() == 0
+        assert set(ModelMetrics.objects.values_list('id', flat=True)) == {uuid.UUID(e['id']) for e in events}
+        row = ModelMetrics.objects.get(id=events[0]['id'])
+        assert (row.model_id, row.api_key_id, row.cost) == (self.model.pk, self.api_key.pk, Decimal('0.001'))
+
+    def test_flushed_rows_count_against_api_key_quota(self):
+        """Test bulk-created rows still reach the quota counters"""
+        self.quotas.get_usage([self.api_key.pk])
+        self.record('0.25')
+        self.record('0.50')
+        self.writer.flush()
+
+        usage = self.quotas.get_usage([self.api_key.pk])[str(self.api_key.pk)]
+        assert usage == {'total_cost': Decimal('0.75'), 'total_requests': 2}
+
+    def test_database_outage_spills_and_replays(self):
+        """Test rows go to the spill file while the database fails and are written later"""
+        event = self.record(optimization_metadata={'operation_type': 'embedding'})
+        with patch.object(ModelMetrics.objects, 'bulk_create', side_effect=OperationalError('down')):
+            assert self.writer.flush() == 0
+        assert self.writer.stats['spilled'] == 1
+        assert len(os.listdir(self.writer.spill_dir)) == 1
+
+        # Still inside the retry interval: new rows are spilled without trying the database
+        self.record()
+        with self.assertNumQueries(0):
+            self.writer.flush()
+        assert self.writer.stats['spilled'] == 2
+
+        self.writer._db_down_until = 0
+        later = timezone.now() + timedelta(minutes=5)
+        with patch.object(metrics_writer.timezone, 'now', return_value=later):
+            assert self.writer.flush() == 2
+
+        assert os.listdir(self.writer.spill_dir) == []
+        row = ModelMetrics.objects.get(id=event['id'])
+        assert row.optimization_metadata == {'operation_type': 'embedding'}
+        # Recorded time, not the time of the replay
+        assert row.timestamp.isoformat() == event['timestamp']
+
+    def test_replayed_batch_is_written_once(self):
+        """Test a batch written again after an uncertain failure does not duplicate rows or usage"""
+        self.quotas.get_usage([self.api_key.pk])
+        self.record('0.25')
+        batch = list(self.writer._buffer)
+        self.writer.flush()
+        self.writer._spill(batch)
+        self.record('0.50')
+        self.writer._spill(list(self.writer._buffer))
+        self.writer._buffer.clear()
+
+        assert self.writer.flush() == 1
+        assert ModelMetrics.objects.count() == 2
+        usage = self.quotas.get_usage([self.api_key.pk])[str(self.api_key.pk)]
+        assert usage == {'total_cost': Decimal('0.75'), 'total_requests': 2}
+
+    def test_failed_backdating_stores_nothing(self):
+        """Test a batch whose write fails after the insert is stored and counted once on replay"""
+        self.quotas.get_usage([self.api_key.pk])
+        self.record('0.25')
+        later = timezone.now() + timedelta(minutes=5)
+        with patch.object(metrics_writer.timezone, 'now', return_value=later), \
+                patch.object(ModelMetrics.objects, 'filter', side_effect=OperationalError('down')):
+            assert self.writer.flush() == 0
+        assert ModelMetrics.objects.count() == 0
+
+        self.writer._db_down_until = 0
+        assert self.writer.flush() == 1
+        usage = self.quotas.get_usage([self.api_key.pk])[str(self.api_key.pk)]
+        assert usage == {'total_cost': Decimal('0.25'), 'total_requests': 1}
+
+
+class TestMetricsWriterThread(SimpleTestCase):
+    """Test the background thread, bounded buffer and shutdown flush"""
+
+    def setUp(self):
+        spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_dir.cleanup)
+        self.written = []
+        self.batch_written = threading.Event()
+
+        def write(events, replay=False):
+            self.written.append([event['tokens_input'] for event in events])
+            self.batch_written.set()
+            return len(events)
+
+        self.writer = MetricsWriter(batch_size=3, flush_interval=60, max_buffer=5, spill_dir=spill_dir.name)
+        self.writer._write = write
+        self.addCleanup(self.writer.close)
+
+    def record(self, tokens):
+        return self.writer.record(model_id=uuid.uuid4(), latency_ms=1, tokens_input=tokens, tokens_output=0, cost=0)
+
+    def test_full_batch_wakes_writer(self):
+        """Test the thread writes as soon as a batch is full"""
+        self.record(1)
+        self.record(2)
+        assert not self.batch_written.wait(0.1)
+        self.record(3)
+        assert self.batch_written.wait(2)
+        assert self.written == [[1, 2, 3]]
+
+    def test_close_flushes_buffer(self):
+        """Test shutdown writes what is still buffered"""
+        self.record(1)
+        self.writer.close()
+        assert self.written == [[1]]
+
+    def test_buffer_is_bounded(self):
+        """Test the oldest events are spilled when the writer falls behind"""
+        self.writer._ensure_thread = lambda: None
+        for tokens in range(7):
+            self.record(tokens)
+        assert self.writer.pending() == 5
+        assert self.writer.stats['spilled'] == 2
+
+        self.writer.flush()
+        assert sorted(sum(self.written, [])) == list(range(7))
+
+    def test_rows_spilled_during_replay_are_kept(self):
+        """Test rows appended to the spill file while it is claimed for replay are not removed with it"""
+        self.writer._ensure_thread = lambda: None
+        self.record(1)
+        self.writer._spill([self.writer._buffer.popleft()])
+        self.record(2)
+        late = self.writer._buffer.popleft()
+
+        dumps = metrics_writer.json.dumps
+        appending, release = threading.Event(), threading.Event()
+
+        def slow_dumps(event, **kwargs):
+            if event is late:
+                appending.set()
+                release.wait(2)
+            return dumps(event, **kwargs)
+
+        with patch.object(metrics_writer.json, 'dumps', slow_dumps):
+            spiller = threading.Thread(target=self.writer._spill, args=([late],))
+            spiller.start()
+            assert appending.wait(2)
+            replayer = threading.Thread(target=self.writer.flush)
+            replayer.start()
+            time.sleep(0.1)
+            release.set()
+            spiller.join(2)
+            replayer.join(2)
+
+        self.writer.flush()
+        assert sorted(sum(self.written, [])) == [1, 2]
+
+    def test_worker_shutdown_flushes_buffer(self):
+        """Test a Celery worker process flushes the process-wide writer when it shuts down"""
+        from celery.signals import worker_process_shutdown
+
+        with patch.object(metrics_writer, '_writer', None), \
+                patch.object(metrics_writer, 'MetricsWriter', return_value=self.writer), \
+                patch.object(metrics_writer.atexit, 'register'):
+            metrics_writer.record_metrics(model_id=uuid.uuid4(), latency_ms=1, tokens_input=1, tokens_output=0, cost=0)
+            worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+
+        assert self.written == [[1]]
@@ -0,0 +1,146 @@
+"""
+Tests for the in-process model catalog cache
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+
+from modelhub.models import Model, Provider
+from modelhub.services import model_catalog
+from modelhub.services.model_catalog import ModelCatalog
+from modelhub.services.routing.router import EnhancedModelRouter
+from modelhub.services.unified_llm_client import UnifiedLLMClient
+
+
+class FakeRedis:
+    """Version counter and published messages shared by several catalogs"""
+
+    def __init__(self):
+        self.values = {}
+        self.published = []
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+class TestModelCatalog(TestCase):
+    """Test catalog lookups, query counts and invalidation"""
+
+    def setUp(self):
+        self.provider = Provider.objects.create(
+            name='Mock Compatible', slug='mock-compatible', config={'api_type': 'openai', 'base_url': 'http://mock/v1'}
+        )
+        self.model = Model.objects.create(
+            provider=self.provider,
+            name='mock-chat',
+            model_type='TEXT',
+            capabilities=['chat'],
+            cost_input=Decimal('0.001'),
+            cost_output=Decimal('0.002'),
+            context_window=8192,
+        )
+        Provider.objects.create(name='Retired', slug='retired', status='INACTIVE')
+
+        self.catalog = ModelCatalog(use_redis=False)
+        patcher = patch.object(model_catalog, '_catalog', self.catalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookups_are_served_from_one_load(self):
+        """Test the per-call lookups hit the database only on the first load"""
+        with self.assertNumQueries(2):
+            self.catalog.get()
+        config = async_to_sync(UnifiedLLMClient._get_provider_config)('mock-compatible')
+        assert config == {
+            'name': 'Mock Compatible',
+            'slug': 'mock-compatible',
+            'config': {'api_type': 'openai', 'base_url': 'http://mock/v1'},
+        }
+
+        async def per_call_lookups():
+            assert await UnifiedLLMClient._get_provider_config('retired') is None
+            assert await UnifiedLLMClient._get_api_type_for_model('mock-compatible', 'mock-chat') == 'CHAT'
+            cost = await UnifiedLLMClient._calculate_cost('mock-compatible', 'mock-chat', 1000, 500)
+            info = await EnhancedModelRouter()._get_model_info('mock-compatible', 'mock-chat')
+            return cost, info
+
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                cost, info = async_to_sync(per_call_lookups)()
+
+        assert cost == Decimal('0.002')
+        assert info['cost_output'] == 0.002 and info['context_window'] == 8192
+        assert self.catalog.stats['refreshes'] == 1
+
+    def test_unknown_models_match_model_lookups(self):
+        """Test fallbacks for models missing from the catalog"""
+        snapshot = self.catalog.get()
+
+        for provider_slug, model_name in (
+            ('mock-compatible', 'text-davinci-003'),
+            ('openai', 'text-davinci-003'),
+            ('mock-compatible', 'mock-chat'),
+        ):
+            assert snapshot.api_type(provider_slug, model_name) == Model.get_api_type_for_model(provider_slug, model_name)
+        assert snapshot.cost('mock-compatible', 'missing', 1000, 1000) == Decimal('0.00')
+        assert snapshot.model_info('mock-compatible', 'missing') is None
+
+    def test_saves_invalidate_the_catalog(self):
+        """Test a pricing change or new model is visible on the next lookup"""
+        assert self.catalog.get().cost('mock-compatible', 'mock-chat', 1000, 0) == Decimal('0.001')
+
+        self.model.cost_input = Decimal('0.005')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.model.save()
+            # Nothing is invalidated until the transaction commits
+            assert self.catalog.is_fresh()
+        assert len(callbacks) == 2
+        assert self.catalog.get().cost('mock-compatible', 'mock-chat', 1000, 0) == Decimal('0.005')
+
+        self.model.status = 'INACTIVE'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model.save()
+        assert self.catalog.get().model_info('mock-compatible', 'mock-chat') is None
+        assert self.catalog.stats['refreshes'] == 3
+
+    def test_version_bump_reaches_other_workers(self):
+        """Test an invalidation in one process marks the other process's snapshot stale"""
+        redis = FakeRedis()
+        here = ModelCatalog(redis_client=redis)
+        there = ModelCatalog(redis_client=redis)
+        with patch.object(ModelCatalog, '_ensure_listener'):
+            here.get()
+            there.get()
+
+            here.invalidate()
+            assert redis.published == [('modelhub:catalog', 1)]
+            assert not here.is_fresh()
+
+            there.handle_message({'type': 'message', 'data': b'1'})
+            assert not there.is_fresh()
+            assert there.get().version == 1
+
+            # A repeat of the version it already loaded changes nothing
+            there.handle_message({'type': 'message', 'data': b'1'})
+            assert there.is_fresh()
+
+    def test_ttl_expires_snapshot(self):
+        """Test a snapshot older than the TTL is reloaded"""
+        catalog = ModelCatalog(ttl=60, use_redis=False)
+        with patch.object(model_catalog.time, 'monotonic', return_value=1000.0):
+            catalog.get()
+        with patch.object(model_catalog.time, 'monotonic', return_value=1030.0):
+            assert catalog.is_fresh()
+        with patch.object(model_catalog.time, 'monotonic', return_value=1061.0):
+            assert not catalog.is_fresh()
@@ -0,0 +1,90 @@
+"""
+Tests for the compiled complexity pattern matcher
+"""
+
+import random
+import re
+import time
+
+from django.test import SimpleTestCase
+
+from modelhub.services.complexity.pattern_matcher import CompiledPatternMatcher
+from modelhub.services.complexity.rule_analyzer import RuleBasedComplexityAnalyzer
+from modelhub.services.complexity.types import ContentType, RequestContext
+
+
+def search_each(matcher, text):
+    """Reference result: every pattern searched on its own"""
+    return frozenset(pattern_id for pattern_id, pattern in matcher.patterns if pattern.search(text))
+
+
+class TestCompiledPatternMatcher(SimpleTestCase):
+    """Test the matcher finds exactly the patterns re.search finds"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.analyzer = RuleBasedComplexityAnalyzer()
+        cls.matcher = cls.analyzer._matcher
+
+    def test_same_hits_as_search_on_random_texts(self):
+        """Test random texts built from the pattern vocabulary"""
+        vocabulary = set()
+        for _, pattern in self.matcher.patterns:
+            vocabulary.update(re.findall(r'[a-z0-9+\-]+', pattern.pattern.lower()))
+        vocabulary = sorted(vocabulary) + ['the', 'API', 'What', '```', '?', 'café', 'ſtep']
+        separators = [' ', ' ', ' ', '\n', '-', ', ', '']
+        rng = random.Random(3)
+
+        for _ in range(1000):
+            words = rng.choices(vocabulary, k=rng.choice([1, 3, 8, 40]))
+            text = ''.join(word + rng.choice(separators) for word in words).strip()
+            assert self.matcher.scan(text).hits == search_each(self.matcher, text), text
+
+    def test_overlapping_keywords_and_boundaries(self):
+        """Test phrases sharing a start, word prefixes and conjunctions split over lines"""
+        matcher = CompiledPatternMatcher({'group': {'category': [
+            re.compile(r'\b(step|step by step)\b', re.I),
+            re.compile(r'\b(by step)\b', re.I),
+            re.compile(r'\b(write|create).*\b(code|script)\b', re.I),
+            re.compile(r'\b(if.*then)\b', re.I),
+        ]}})
+        cases = [
+            'Step by step please',
+            'steps by steps',
+            'rewrite the code',
+            'writes some scripts',
+            'write a\nscript',
+            'write a script',
+            'if x then y',
+            'iffy thenceforth',
+        ]
+        for text in cases:
+            assert matcher.scan(text).hits == search_each(matcher, text), text
+
+    def test_long_single_line_prompt(self):
+        """Test a conjunction that never completes stays linear on one long line"""
+        text = ' '.join(['these'] * 2000 + ['data'] * 2000)
+        started = time.perf_counter()
+        hits = self.matcher.scan(text)
+        assert time.perf_counter() - started < 0.5
+        assert hits.hits == search_each(self.matcher, text)
+
+
+class TestRuleAnalyzerScan(SimpleTestCase):
+    """Test the analyzer counts and content type come from one scan"""
+
+    def test_counts_and_content_type(self):
+        analyzer = RuleBasedComplexityAnalyzer()
+        text = 'Analyze the sales data and then compare it with the code in the function'
+
+        hits = analyzer._matcher.scan(text.lower())
+        assert hits.count('complex') == analyzer._check_pattern_matches(text.lower(), analyzer.COMPLEX_PATTERNS)
+        assert analyzer._detect_content_type(text.lower()) == ContentType.CODE
+
+        calls = []
+        scan = analyzer._matcher.scan
+        analyzer._matcher.scan = lambda value: calls.append(value) or scan(value)
+        result = analyzer.analyze_complexity(text, RequestContext(rag_documents=[{}, {}]))
+        assert len(calls) == 1
+        assert result.content_type == ContentType.CODE
@@ -0,0 +1,148 @@
+"""
+Tests for concurrent router phases
+"""
+
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from modelhub.services.llm_router import EnhancedLLMRouter
+from modelhub.services.phase_graph import PhaseGraph
+from modelhub.services.routing.types import RequestContext, RoutingDecision
+
+
+def sleeper(seconds, result=None, log=None, name=None):
+    """Coroutine function standing in for a phase or a router step"""
+    async def phase(*args, **kwargs):
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f'cancelled:{name}')
+            raise
+        return result(*args) if callable(result) else result
+    return phase
+
+
+class TestPhaseGraph(SimpleTestCase):
+    """Test dependency ordering, concurrency, cancellation and timings"""
+
+    def test_independent_phases_overlap(self):
+        """Test phases start when their dependencies finish and receive their results"""
+        graph = PhaseGraph()
+        graph.add('a', sleeper(0.05, 1))
+        graph.add('b', sleeper(0.05, 2))
+        graph.add('sum', sleeper(0, lambda r: r['a'] + r['b']), depends_on=('a', 'b'))
+
+        results = async_to_sync(graph.run)()
+
+        assert results == {'a': 1, 'b': 2, 'sum': 3}
+        timings = graph.timings_ms()
+        assert timings['b']['started_ms'] < 20
+        assert timings['sum']['started_ms'] >= 45
+        assert timings['sum']['started_ms'] < 95
+
+    def test_failure_cancels_remaining_phases(self):
+        """Test the first failure is raised and running or waiting phases are cancelled"""
+        log = []
+
+        async def fail(_):
+            await asyncio.sleep(0.01)
+            raise RuntimeError('no key')
+
+        graph = PhaseGraph()
+        graph.add('slow', sleeper(1, log=log, name='slow'))
+        graph.add('fail', fail)
+        graph.add('after', sleeper(0, log=log, name='after'), depends_on=('fail',))
+
+        with self.assertRaisesMessage(RuntimeError, 'no key'):
+            async_to_sync(graph.run)()
+        assert log == ['cancelled:slow']
+        assert set(graph.timings) == set()
+
+    def test_unknown_dependency(self):
+        """Test dependencies must be registered first"""
+        with self.assertRaises(ValueError):
+            PhaseGraph().add('routing', sleeper(0), depends_on=('complexity',))
+
+
+class TestRouterPhases(SimpleTestCase):
+    """Test execute_with_cost_optimization runs independent phases concurrently"""
+
+    def setUp(self):
+        self.router = EnhancedLLMRouter()
+        self.decision = RoutingDecision(
+            selected_model='gpt-4o-mini', selected_provider='openai', api_type='CHAT',
+            confidence_score=0.9, reasoning='database_rule', estimated_cost=Decimal('0.001'),
+            estimated_tokens=1000, complexity_score=0.4, content_type='general',
+            fallback_chain=[], decision_time_ms=1,
+        )
+        complexity = SimpleNamespace(
+            score=0.4, level=SimpleNamespace(value='simple'), confidence=0.9, reasoning='rules',
+            analysis_path=SimpleNamespace(value='rule_based'), analysis_time_ms=50,
+            content_type=SimpleNamespace(value='general'), cache_hit=False, escalation_reason=None,
+        )
+        self.response = SimpleNamespace(content='ok', cost=Decimal('0.001'), tokens_input=10, tokens_output=5)
+
+        async def analyze(text, context):
+            await asyncio.sleep(0.05)
+            return complexity
+
+        async def route(**kwargs):
+            return self.decision
+
+        self.router.complexity_analyzer = SimpleNamespace(analyze_complexity=analyze)
+        self.router.session_manager.get_session_state = sleeper(0.05)
+        self.router.session_manager.record_model_usage = AsyncMock()
+        self.router.model_router.route_request = route
+        self.router._prepare_context_integration = sleeper(0.05, {'strategy_used': 'full_context'})
+
+        for target in ('get_routing_rule_engine', 'get_model_catalog'):
+            patcher = patch(f'modelhub.services.llm_router.{target}')
+            patcher.start().return_value.aget = AsyncMock()
+            self.addCleanup(patcher.stop)
+        patcher = patch('modelhub.services.llm_router.UnifiedLLMClient.call_llm', AsyncMock(return_value=self.response))
+        self.call_llm = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def execute(self):
+        return async_to_sync(self.router.execute_with_cost_optimization)(
+            organization=None, model_type='TEXT',
+            request_context=RequestContext(session_id='session-1'),
+            messages=[{'role': 'user', 'content': 'Summarise the takeoff'}],
+        )
+
+    def test_phases_overlap_with_same_decision(self):
+        """Test complexity/session and api key/context overlap and timings are reported"""
+        self.router._get_api_key_for_model = sleeper(0.05, 'sk-test')
+
+        response, metadata = self.execute()
+
+        assert response is self.response
+        assert self.call_llm.call_args.kwargs['api_key'] == 'sk-test'
+        assert metadata['routing']['selected_model'] == 'gpt-4o-mini'
+        assert metadata['context'] == {'strategy_used': 'full_context'}
+
+        phases = metadata['performance']['phases']
+        assert set(phases) == {'complexity', 'session', 'routing_data', 'routing', 'api_key', 'context'}
+        assert phases['session']['started_ms'] < phases['complexity']['duration_ms']
+        assert phases['context']['started_ms'] < phases['api_key']['started_ms'] + phases['api_key']['duration_ms']
+        # Two pairs of 50ms phases in sequence, not four
+        assert metadata['performance']['total_time_ms'] < 175
+
+    def test_missing_api_key_cancels_context_and_falls_back(self):
+        """Test a failed phase cancels context preparation and takes the fallback path"""
+        self.router._get_api_key_for_model = AsyncMock(side_effect=[None, 'sk-fallback'])
+        log = []
+        self.router._prepare_context_integration = sleeper(1, {}, log=log, name='context')
+
+        response, metadata = self.execute()
+
+        assert log == ['cancelled:context']
+        assert metadata['routing']['is_fallback'] is True
+        assert metadata['fallback_reason'] == 'No API key found for provider openai'
+        assert self.call_llm.call_args.kwargs['api_key'] == 'sk-fallback'
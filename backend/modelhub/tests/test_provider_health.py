@@ -0,0 +1,284 @@
+"""
+Tests for provider health tracking, circuit breakers and hedged requests
+"""
+
+import asyncio
+import time
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from modelhub.adapters.base import LLMResponse
+from modelhub.services import provider_health
+from modelhub.services.llm_router import EnhancedLLMRouter
+from modelhub.services.provider_health import ProviderHealthTracker
+from modelhub.services.routing.types import RoutingDecision
+from modelhub.services.unified_llm_client import BaseLLMProvider, UnifiedLLMClient
+
+
+class FakeLatencyProvider(BaseLLMProvider):
+    """Local provider answering after a configurable delay per model"""
+
+    latency = {}
+    errors = set()
+    calls = []
+    cancelled = []
+
+    async def call_api(self, model_name, api_key, messages, prompt, api_type, stream=False, **kwargs):
+        self.calls.append(model_name)
+        try:
+            await asyncio.sleep(self.latency.get(model_name, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(model_name)
+            raise
+        if model_name in self.errors:
+            return LLMResponse(
+                content='overloaded', tokens_input=0, tokens_output=0, latency_ms=0,
+                cost=Decimal('0'), raw_response={'error': 'overloaded', 'type': 'rate_limit'}
+            )
+        return LLMResponse(
+            content=f'answer from {model_name}', tokens_input=20, tokens_output=10,
+            latency_ms=int(self.latency.get(model_name, 0) * 1000), cost=Decimal('0')
+        )
+
+
+class TestProviderHealthTracker(SimpleTestCase):
+    """Test the rolling window, breaker transitions and hedge deadline"""
+
+    def setUp(self):
+        self.tracker = ProviderHealthTracker(
+            min_samples=10, error_rate_threshold=0.5, p99_latency_threshold_ms=5000,
+            open_seconds=30, hedging_enabled=True, hedge_min_delay_ms=100,
+        )
+
+    def record(self, latencies, success=True):
+        for latency in latencies:
+            self.tracker.record('openai', 'gpt-4o', latency, success)
+
+    def test_percentiles_and_hedge_delay(self):
+        """Test window percentiles and that hedging waits for enough samples"""
+        self.record(range(100, 1001, 100))
+        assert self.tracker.hedge_delay('openai', 'gpt-4o') == 1.0
+
+        self.record([200] * 90)
+        snapshot = self.tracker.snapshot('openai', 'gpt-4o')
+        assert snapshot['samples'] == 100
+        assert (snapshot['p50_ms'], snapshot['p95_ms'], snapshot['p99_ms']) == (200, 500, 900)
+        assert snapshot['state'] == 'closed'
+        assert self.tracker.hedge_delay('openai', 'gpt-4o') == 0.5
+
+        assert self.tracker.hedge_delay('openai', 'gpt-4o-mini') is None
+        self.tracker.record('openai', 'gpt-4o-mini', 50, True)
+        assert self.tracker.hedge_delay('openai', 'gpt-4o-mini') is None
+
+    def test_error_rate_opens_circuit_until_probe_succeeds(self):
+        """Test open -> half-open probe -> closed"""
+        self.record([300] * 5)
+        self.record([300] * 4, success=False)
+        assert self.tracker.allow_request('openai', 'gpt-4o')
+
+        self.record([300], success=False)
+        assert self.tracker.snapshot('openai', 'gpt-4o')['state'] == 'open'
+        assert not self.tracker.allow_request('openai', 'gpt-4o')
+        assert self.tracker.is_open('openai', 'gpt-4o')
+
+        later = time.monotonic() + 31
+        with patch.object(provider_health.time, 'monotonic', return_value=later):
+            allowed, probe_id = self.tracker.admit('openai', 'gpt-4o')
+            assert allowed and probe_id
+            # Only one probe at a time
+            assert self.tracker.admit('openai', 'gpt-4o') == (False, None)
+            # A late result from a call started before the circuit opened is not the probe
+            self.tracker.record('openai', 'gpt-4o', 250, True)
+            assert self.tracker.snapshot('openai', 'gpt-4o')['state'] == 'half_open'
+            self.tracker.record('openai', 'gpt-4o', 250, True, probe_id)
+            assert self.tracker.allow_request('openai', 'gpt-4o')
+        assert self.tracker.snapshot('openai', 'gpt-4o') == {
+            'samples': 1, 'censored': 0, 'error_rate': 0.0, 'p50_ms': 250, 'p95_ms': 250, 'p99_ms': 250,
+            'state': 'closed', 'opened_count': 1,
+        }
+
+    def test_slow_p99_opens_circuit_and_failed_probe_reopens(self):
+        """Test a latency-degraded model is diverted even without errors"""
+        self.record([400] * 9 + [8000])
+        assert self.tracker.snapshot('openai', 'gpt-4o')['state'] == 'open'
+
+        later = time.monotonic() + 31
+        with patch.object(provider_health.time, 'monotonic', return_value=later):
+            _, probe_id = self.tracker.admit('openai', 'gpt-4o')
+            self.tracker.record('openai', 'gpt-4o', 9000, False, probe_id)
+            assert not self.tracker.allow_request('openai', 'gpt-4o')
+        assert self.tracker.snapshot('openai', 'gpt-4o')['opened_count'] == 2
+
+    def test_cancelled_probe_is_inconclusive(self):
+        """Test a cancelled probe leaves the circuit half-open and lets the next probe through"""
+        self.record([300] * 10, success=False)
+
+        later = time.monotonic() + 31
+        with patch.object(provider_health.time, 'monotonic', return_value=later):
+            _, probe_id = self.tracker.admit('openai', 'gpt-4o')
+            self.tracker.record('openai', 'gpt-4o', 100, None, probe_id)
+            snapshot = self.tracker.snapshot('openai', 'gpt-4o')
+            assert (snapshot['state'], snapshot['censored']) == ('half_open', 1)
+
+            allowed, next_probe = self.tracker.admit('openai', 'gpt-4o')
+            assert allowed and next_probe != probe_id
+            # The stale id cannot resolve the new probe
+            self.tracker.record('openai', 'gpt-4o', 100, True, probe_id)
+            assert self.tracker.snapshot('openai', 'gpt-4o')['state'] == 'half_open'
+
+    def test_cancelled_calls_count_toward_latency_only(self):
+        """Test hedged-away slow calls raise p95/p99 and can open the circuit, but are not errors"""
+        tracker = ProviderHealthTracker(
+            min_samples=20, p99_latency_threshold_ms=1500, hedging_enabled=True, hedge_min_delay_ms=100,
+        )
+        for _ in range(14):
+            tracker.record('openai', 'gpt-4o', 400, True)
+        for _ in range(6):
+            tracker.record('openai', 'gpt-4o', 1600, None)
+        snapshot = tracker.snapshot('openai', 'gpt-4o')
+        assert (snapshot['samples'], snapshot['censored'], snapshot['error_rate']) == (20, 6, 0.0)
+        assert snapshot['state'] == 'open'
+        # Cancelled at the deadline: the hedge delay does not drift below it
+        assert tracker.hedge_delay('openai', 'gpt-4o') == 1.6
+
+
+class TestRouterProviderHealth(SimpleTestCase):
+    """Test the router diverts open circuits and hedges slow calls, against a fake provider"""
+
+    def setUp(self):
+        FakeLatencyProvider.latency = {'primary': 0.01, 'backup': 0.01}
+        FakeLatencyProvider.errors = set()
+        FakeLatencyProvider.calls = []
+        FakeLatencyProvider.cancelled = []
+        UnifiedLLMClient.register_provider('fake', FakeLatencyProvider)
+        self.addCleanup(UnifiedLLMClient._provider_registry.pop, 'fake')
+
+        async def provider_config(provider_slug):
+            return None
+
+        async def api_type(provider_slug, model_name):
+            return 'CHAT'
+
+        async def cost(provider_slug, model_name, tokens_input, tokens_output):
+            return Decimal('0.001')
+
+        for name, value in (('_get_provider_config', provider_config), ('_get_api_type_for_model', api_type),
+                            ('_calculate_cost', cost)):
+            patcher = patch.object(UnifiedLLMClient, name, staticmethod(value))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.router = EnhancedLLMRouter()
+        self.router.provider_health = ProviderHealthTracker(
+            min_samples=10, open_seconds=30, hedging_enabled=True, hedge_min_delay_ms=10,
+        )
+        self.router._get_api_key_for_model = AsyncMock(return_value=None)
+        self.decision = RoutingDecision(
+            selected_model='primary', selected_provider='fake', api_type='CHAT',
+            confidence_score=0.9, reasoning='database_rule', estimated_cost=Decimal('0.001'),
+            estimated_tokens=1000, complexity_score=0.4, content_type='general',
+            fallback_chain=[('fake', 'backup')], decision_time_ms=1,
+        )
+
+    def execute(self):
+        return async_to_sync(self.router._execute_with_provider_health)(
+            organization=None, routing_decision=self.decision, api_key='sk-fake',
+            messages=[{'role': 'user', 'content': 'Count the footings'}], prompt=None,
+            stream=False, stream_callback=None, context_metadata=None,
+        )
+
+    def learn_latency(self, model, latency_ms, count=20):
+        for _ in range(count):
+            self.router.provider_health.record('fake', model, latency_ms, True)
+
+    def test_calls_are_recorded(self):
+        """Test a healthy model is called directly and its latency recorded"""
+        response, decision = self.execute()
+
+        assert response.content == 'answer from primary'
+        assert decision is self.decision
+        assert self.router.provider_health.snapshot('fake', 'primary')['samples'] == 1
+
+    def test_open_circuit_uses_fallback(self):
+        """Test traffic for an open circuit goes to the fallback chain"""
+        for _ in range(20):
+            self.router.provider_health.record('fake', 'primary', 500, False)
+
+        response, decision = self.execute()
+
+        assert response.content == 'answer from backup'
+        assert FakeLatencyProvider.calls == ['backup']
+        assert decision.selected_model == 'backup'
+        assert decision.reasoning == 'database_rule,circuit_open=fake:primary'
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        """Test a call past the primary's p95 is raced against the fallback, and the loser cancelled"""
+        self.learn_latency('primary', 50)
+        FakeLatencyProvider.latency['primary'] = 5
+
+        started = time.monotonic()
+        response, decision = self.execute()
+
+        assert time.monotonic() - started < 1
+        assert response.content == 'answer from backup'
+        assert decision.selected_model == 'backup'
+        assert decision.reasoning == 'database_rule,hedged=fake:primary'
+        assert FakeLatencyProvider.calls == ['primary', 'backup']
+        assert FakeLatencyProvider.cancelled == ['primary']
+        # The cancelled call counts as a latency of at least the hedge deadline, not as an error
+        snapshot = self.router.provider_health.snapshot('fake', 'primary')
+        assert (snapshot['samples'], snapshot['censored'], snapshot['error_rate']) == (21, 1, 0.0)
+        assert snapshot['p99_ms'] >= 50
+
+    def test_half_open_probe_is_not_hedged(self):
+        """Test the probe runs to completion and its outcome closes the circuit"""
+        self.learn_latency('primary', 50)
+        for _ in range(20):
+            self.router.provider_health.record('fake', 'primary', 500, False)
+        assert self.router.provider_health.snapshot('fake', 'primary')['state'] == 'open'
+        # Probe due straight away; the event loop needs the real clock
+        self.router.provider_health.open_seconds = 0
+        FakeLatencyProvider.latency['primary'] = 0.2
+
+        response, decision = self.execute()
+
+        assert self.router.provider_health.snapshot('fake', 'primary')['state'] == 'closed'
+        assert response.content == 'answer from primary'
+        assert decision is self.decision
+        assert FakeLatencyProvider.calls == ['primary']
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test no hedge is sent when the primary answers within its p95"""
+        self.learn_latency('primary', 200)
+
+        response, decision = self.execute()
+
+        assert response.content == 'answer from primary'
+        assert FakeLatencyProvider.calls == ['primary']
+
+    def test_failed_hedge_waits_for_primary(self):
+        """Test an error from the hedge does not win the race"""
+        self.learn_latency('primary', 50)
+        FakeLatencyProvider.latency['primary'] = 0.3
+        FakeLatencyProvider.errors = {'backup'}
+
+        response, decision = self.execute()
+
+        assert response.content == 'answer from primary'
+        assert decision is self.decision
+        assert FakeLatencyProvider.cancelled == []
+
+    def test_hedging_disabled_by_default(self):
+        """Test hedging is opt-in through settings"""
+        assert provider_health.DEFAULT_PROVIDER_HEALTH_SETTINGS['HEDGING_ENABLED'] is False
+        self.router.provider_health = ProviderHealthTracker(min_samples=10, hedging_enabled=False)
+        self.learn_latency('primary', 50)
+        FakeLatencyProvider.latency['primary'] = 0.2
+
+        response, _ = self.execute()
+
+        assert response.content == 'answer from primary'
+        assert FakeLatencyProvider.calls == ['primary']
@@ -0,0 +1,168 @@
+"""
+Tests for API key quota counters and single-query key availability
+"""
+
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Organization
+from modelhub.models import APIKey, Model, ModelMetrics, Provider
+from modelhub.services import quota_service
+from modelhub.services.quota_service import QuotaService, build_quota_status
+from modelhub.services.routing.router import EnhancedModelRouter
+
+
+class FakeRedis:
+    """Hashes with the pipeline subset the quota counters use"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hmget(self, name, keys):
+        values = self.hashes.get(name, {})
+        return [values.get(key) for key in keys]
+
+    def hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update({k: str(v).encode() for k, v in mapping.items()})
+
+    def hincrbyfloat(self, name, key, amount):
+        values = self.hashes.setdefault(name, {})
+        values[key] = str(float(values.get(key, 0)) + amount).encode()
+
+    def hincrby(self, name, key, amount):
+        values = self.hashes.setdefault(name, {})
+        values[key] = str(int(values.get(key, 0)) + amount).encode()
+
+    def expire(self, name, seconds):
+        return True
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class TestQuotaStatus(SimpleTestCase):
+
+    def test_thresholds(self):
+        """Test status bands, including spend at or over the quota"""
+        assert build_quota_status(Decimal('10'), Decimal('100'))['status'] == 'healthy'
+        assert build_quota_status(Decimal('80'), Decimal('100'))['status'] == 'warning'
+        assert build_quota_status(Decimal('95'), Decimal('100'))['status'] == 'critical'
+        assert build_quota_status(Decimal('100'), Decimal('100'))['status'] == 'exceeded'
+        assert build_quota_status(Decimal('500'), None) == {
+            'used': 500.0, 'quota': 0.0, 'usage_percent': 0, 'status': 'no_limit'
+        }
+
+
+class TestQuotaService(TestCase):
+    """Test counters, reconciliation and the router's key availability"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Quota Org', slug=f'quota-org-{uuid.uuid4().hex[:8]}')
+        self.providers = [
+            Provider.objects.create(name=f'Provider {i}', slug=f'quota-provider-{i}') for i in range(3)
+        ]
+        self.models = [
+            Model.objects.create(
+                provider=provider, name=f'model-{i}', model_type='TEXT', capabilities=['chat'],
+                cost_input=Decimal('0.001'), cost_output=Decimal('0.002'), context_window=8192,
+            )
+            for i, provider in enumerate(self.providers)
+        ]
+        self.org_key = APIKey.objects.create(
+            organization=self.organization, provider=self.providers[0], label='org',
+            key='org-key', monthly_quota=Decimal('1.00'),
+        )
+        self.system_keys = [
+            APIKey.objects.create(provider=provider, label='system', key=f'system-key-{i}')
+            for i, provider in enumerate(self.providers[:2])
+        ]
+
+        self.service = QuotaService(use_redis=False)
+        patcher = patch.object(quota_service, '_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log_call(self, api_key, cost):
+        return ModelMetrics.objects.create(
+            model=self.models[0], organization=self.organization, api_key=api_key,
+            latency_ms=100, tokens_input=100, tokens_output=50, cost=cost, status='SUCCESS',
+        )
+
+    def available(self):
+        # The synchronous body behind database_sync_to_async
+        get_available_models = EnhancedModelRouter.__dict__['_get_available_models'].func
+        return {
+            model['model']: (model['api_key'], model['api_key_source'])
+            for model in get_available_models(EnhancedModelRouter(), self.organization, 'TEXT')
+        }
+
+    def test_availability_for_all_candidates_in_fixed_queries(self):
+        """Test models, keys and one usage aggregate, then keys come from counters"""
+        self.log_call(self.org_key, Decimal('0.40'))
+
+        # models, keys, one grouped aggregate for every key with a quota
+        with self.assertNumQueries(3):
+            assert self.available() == {
+                'model-0': ('org-key', 'org'),
+                'model-1': ('system-key-1', 'dataelan'),
+            }
+        with self.assertNumQueries(2):
+            self.available()
+
+    def test_logged_calls_update_counters(self):
+        """Test a key over quota falls back to the Dataelan key without another aggregate"""
+        self.available()
+        self.log_call(self.org_key, Decimal('1.20'))
+
+        with self.assertNumQueries(2):
+            assert self.available()['model-0'] == ('system-key-0', 'dataelan')
+        assert self.service.get_usage([self.org_key.pk])[str(self.org_key.pk)] == {
+            'total_cost': Decimal('1.20'), 'total_requests': 1
+        }
+        assert self.org_key.quota_status['status'] == 'exceeded'
+
+    def test_reconcile_corrects_drift(self):
+        """Test counters are recomputed from ModelMetrics once older than the interval"""
+        self.service.get_usage([self.org_key.pk])
+        # Written without signals, so the counter does not see it
+        ModelMetrics.objects.bulk_create([ModelMetrics(
+            model=self.models[0], api_key=self.org_key, latency_ms=1,
+            tokens_input=1, tokens_output=1, cost=Decimal('2.00'), status='SUCCESS',
+        )])
+        assert self.service.get_usage([self.org_key.pk])[str(self.org_key.pk)]['total_cost'] == 0
+
+        with patch.object(quota_service.time, 'time', return_value=quota_service.time.time() + 301):
+            usage = self.service.get_usage([self.org_key.pk])
+        assert usage[str(self.org_key.pk)]['total_cost'] == Decimal('2.00')
+        assert self.service.stats['reconciles'] == 2
+
+    def test_counters_are_shared_through_redis(self):
+        """Test another worker reads reconciled counters and increments from Redis"""
+        redis = FakeRedis()
+        here = QuotaService(redis_client=redis)
+        there = QuotaService(redis_client=redis, local_ttl=0)
+        key_id = str(self.org_key.pk)
+
+        self.log_call(self.org_key, Decimal('0.25'))
+        here.get_usage([key_id])
+        here.record(key_id, Decimal('0.50'))
+
+        with self.assertNumQueries(0):
+            usage = there.get_usage([key_id])
+        assert usage[key_id] == {'total_cost': Decimal('0.75'), 'total_requests': 2}
+        assert here.get_usage([key_id]) == usage
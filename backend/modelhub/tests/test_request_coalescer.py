@@ -0,0 +1,223 @@
+"""
+Tests for LLM request coalescing and the response cache
+"""
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from modelhub.adapters.base import LLMResponse
+from modelhub.services import request_coalescer
+from modelhub.services.request_coalescer import LLMRequestCoalescer, request_key
+from modelhub.services.unified_llm_client import UnifiedLLMClient
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for the shared tier"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, ex)
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append(lambda: self.redis.values.get(key, (None, None))[0])
+
+    def ttl(self, key):
+        self.commands.append(lambda: self.redis.values.get(key, (None, -2))[1])
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+def make_response(content='4 columns, 12 m3', error=None):
+    return LLMResponse(
+        content=content, tokens_input=900, tokens_output=100, latency_ms=800,
+        cost=Decimal('0.0150'), raw_response={'error': error} if error else {'id': 'resp-1'},
+    )
+
+
+class TestRequestCoalescer(SimpleTestCase):
+    """Test single-flight, caching, failures and the saved-call counters"""
+
+    def setUp(self):
+        self.coalescer = LLMRequestCoalescer(use_redis=False)
+        self.calls = []
+
+    def upstream(self, response=None, delay=0.05):
+        async def call():
+            self.calls.append(1)
+            await asyncio.sleep(delay)
+            return response or make_response()
+        return call
+
+    def test_request_key_is_canonical_and_scoped(self):
+        """Test the key ignores dict ordering but not content, parameters or API key"""
+        messages = [{'role': 'user', 'content': 'count the footings'}]
+        key = request_key('openai', 'gpt-4o', 'sk-a', messages, None, {'temperature': 0, 'max_tokens': 100})
+
+        assert key == request_key(
+            'openai', 'gpt-4o', 'sk-a', [{'content': 'count the footings', 'role': 'user'}], None,
+            {'max_tokens': 100, 'temperature': 0}
+        )
+        assert key != request_key('openai', 'gpt-4o', 'sk-b', messages, None, {'temperature': 0, 'max_tokens': 100})
+        assert key != request_key('openai', 'gpt-4o', 'sk-a', messages, None, {'temperature': 0, 'max_tokens': 200})
+        assert key != request_key('openai', 'gpt-4o-mini', 'sk-a', messages, None, {'temperature': 0, 'max_tokens': 100})
+
+    def test_concurrent_identical_calls_share_one_upstream_call(self):
+        """Test single-flight: one call, every caller gets the response, savings are counted"""
+        async def run():
+            return await asyncio.gather(*[self.coalescer.call('k', self.upstream()) for _ in range(4)])
+
+        responses = async_to_sync(run)()
+
+        assert len(self.calls) == 1
+        assert [r.content for r in responses] == ['4 columns, 12 m3'] * 4
+        assert sorted(r.raw_response.get('served_from', '') for r in responses) == ['', 'inflight', 'inflight', 'inflight']
+        # Only the upstream call is billed
+        assert sum(r.cost for r in responses) == Decimal('0.0150')
+
+        stats = self.coalescer.get_stats()
+        assert (stats['calls'], stats['upstream_calls'], stats['coalesced']) == (4, 1, 3)
+        assert (stats['saved_calls'], stats['saved_tokens_input'], stats['saved_tokens_output']) == (3, 2700, 300)
+        assert stats['saved_cost'] == '0.0450'
+
+        # Nothing is cached without cache_ttl
+        async_to_sync(self.coalescer.call)('k', self.upstream())
+        assert len(self.calls) == 2
+
+    def test_cached_response_served_until_ttl(self):
+        """Test a cached response is returned as a copy and expires with its TTL"""
+        first = async_to_sync(self.coalescer.call)('k', self.upstream(), cache_ttl=60)
+        second = async_to_sync(self.coalescer.call)('k', self.upstream(), cache_ttl=60)
+        second.raw_response['mutated'] = True
+        third = async_to_sync(self.coalescer.call)('k', self.upstream(), cache_ttl=60)
+
+        assert len(self.calls) == 1
+        assert first.cost == Decimal('0.0150') and third.cost == Decimal('0')
+        assert third.raw_response == {'id': 'resp-1', 'served_from': 'local'}
+
+        now = request_coalescer.time.monotonic()
+        with patch.object(request_coalescer.time, 'monotonic', return_value=now + 61):
+            # No timers while the clock is frozen
+            async_to_sync(self.coalescer.call)('k', self.upstream(delay=0), cache_ttl=60)
+        assert len(self.calls) == 2
+
+    def test_errors_are_shared_but_not_cached(self):
+        """Test an error response reaches waiting callers but the next call goes upstream"""
+        failing = self.upstream(make_response('rate limited', error='429'))
+
+        async def run():
+            return await asyncio.gather(*[self.coalescer.call('k', failing, cache_ttl=60) for _ in range(2)])
+
+        responses = async_to_sync(run)()
+        assert [r.raw_response['error'] for r in responses] == ['429', '429']
+        assert len(self.calls) == 1
+
+        async_to_sync(self.coalescer.call)('k', self.upstream(), cache_ttl=60)
+        assert len(self.calls) == 2
+
+    def test_failed_leader_is_retried_by_waiters(self):
+        """Test callers waiting on a call that raised make their own"""
+        async def call():
+            self.calls.append(1)
+            await asyncio.sleep(0.02)
+            if len(self.calls) == 1:
+                raise asyncio.TimeoutError()
+            return make_response()
+
+        async def run():
+            return await asyncio.gather(
+                self.coalescer.call('k', call), self.coalescer.call('k', call), return_exceptions=True
+            )
+
+        first, second = async_to_sync(run)()
+        assert isinstance(first, asyncio.TimeoutError)
+        assert second.content == '4 columns, 12 m3'
+        assert len(self.calls) == 2
+
+    def test_other_processes_read_redis(self):
+        """Test a response cached by one process is served to another from Redis"""
+        redis = FakeRedis()
+        async_to_sync(LLMRequestCoalescer(redis_client=redis).call)('k', self.upstream(), cache_ttl=600)
+        assert list(redis.values.values())[0][1] == 600
+
+        other = LLMRequestCoalescer(redis_client=redis)
+        response = async_to_sync(other.call)('k', self.upstream(), cache_ttl=600)
+        assert response.raw_response['served_from'] == 'redis'
+        assert async_to_sync(other.call)('k', self.upstream(), cache_ttl=600).raw_response['served_from'] == 'local'
+        assert len(self.calls) == 1
+
+
+class TestCallLLMDedupe(SimpleTestCase):
+    """Test call_llm only coalesces and caches when the call site opts in"""
+
+    def setUp(self):
+        self.coalescer = LLMRequestCoalescer(use_redis=False)
+        patcher = patch.object(request_coalescer, '_coalescer', self.coalescer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.requests = []
+
+        async def call_api(provider, **kwargs):
+            self.requests.append(kwargs)
+            await asyncio.sleep(0.02)
+            return make_response()
+
+        async def provider_config(provider_slug):
+            return None
+
+        async def api_type(provider_slug, model_name):
+            return 'CHAT'
+
+        async def cost(provider_slug, model_name, tokens_input, tokens_output):
+            return Decimal('0.0150')
+
+        for name, value in (('_get_provider_config', provider_config), ('_get_api_type_for_model', api_type),
+                            ('_calculate_cost', cost)):
+            patcher = patch.object(UnifiedLLMClient, name, staticmethod(value))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('modelhub.services.unified_llm_client.OpenAIProvider.call_api', call_api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def call(self, **kwargs):
+        return await UnifiedLLMClient.call_llm(
+            'openai', 'gpt-4o', 'sk-test', messages=[{'role': 'user', 'content': 'list the beams'}], **kwargs
+        )
+
+    def test_opt_in(self):
+        """Test plain calls are untouched, dedupe coalesces, cache_ttl caches temperature 0 only"""
+        async def run(**kwargs):
+            return await asyncio.gather(self.call(**kwargs), self.call(**kwargs))
+
+        async_to_sync(run)()
+        assert len(self.requests) == 2
+
+        async_to_sync(run)(dedupe=True)
+        assert len(self.requests) == 3
+        assert 'dedupe' not in self.requests[-1] and self.requests[-1]['max_tokens'] == 1000
+
+        # cache_ttl only applies to temperature-0 requests
+        async_to_sync(self.call)(cache_ttl=60, temperature=0.7)
+        async_to_sync(self.call)(cache_ttl=60, temperature=0.7)
+        assert len(self.requests) == 5
+        async_to_sync(self.call)(cache_ttl=60, temperature=0)
+        response = async_to_sync(self.call)(cache_ttl=60, temperature=0)
+        assert len(self.requests) == 6
+        assert response.raw_response['served_from'] == 'local'
@@ -0,0 +1,146 @@
+"""
+Tests for the compiled routing rule engine
+"""
+
+import random
+import uuid
+from collections import Counter
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Organization
+from modelhub.models import Model, Provider, RoutingRule, RoutingRuleModel
+from modelhub.services.routing import rule_engine
+from modelhub.services.routing.router import EnhancedModelRouter
+from modelhub.services.routing.rule_engine import RoutingRuleEngine, RuleSnapshot, compile_predicate, compile_rule
+from modelhub.services.routing.types import OptimizationStrategy, RequestContext
+
+
+def make_rule(name, priority, conditions=None, organization_id=None, models=(('openai', 'gpt-4o', 1),)):
+    return compile_rule(
+        rule_id=name, name=name, priority=priority, organization_id=organization_id,
+        model_type='TEXT', conditions=conditions or [], models=list(models)
+    )
+
+
+class TestCompiledRules(SimpleTestCase):
+    """Test condition compilation, rule precedence and weighted selection"""
+
+    def test_predicates(self):
+        """Test each operator and unparseable conditions"""
+        assert compile_predicate('gte', '0.5')(0.5) and not compile_predicate('gt', 0.5)(0.5)
+        assert compile_predicate('lt', 0.5)(0.2) and compile_predicate('lte', 0.5)(0.5)
+        assert not compile_predicate('gt', 0.5)('balanced')
+        assert not compile_predicate('gt', 'high')(0.9)
+        assert compile_predicate('in', 'code, technical')('technical')
+        assert compile_predicate('in', ['code', 'business'])('code')
+        assert not compile_predicate('in', 5)('code')
+        assert compile_predicate('contains', 'CODE')('source code review')
+        assert compile_predicate('eq', 'balanced')('balanced')
+        assert not compile_predicate('between', 1)(1)
+
+    def test_rule_precedence(self):
+        """Test organization rules win, then priority order, and skipped conditions"""
+        org_id = str(uuid.uuid4())
+        snapshot = RuleSnapshot.build([
+            make_rule('system-first', 1),
+            make_rule('org-complex', 5, [{'field': 'complexity_score', 'operator': 'gte', 'value': 0.7}], org_id),
+            make_rule('org-code', 2, [{'field': 'content_type', 'operator': 'eq', 'value': 'code'}], org_id),
+            make_rule('ignored-fields', 3, [{'field': 'entity_type', 'operator': 'eq', 'value': 'agent'}], org_id),
+        ])
+
+        assert snapshot.match(org_id, 'TEXT', 0.9, 'code').name == 'org-code'
+        assert snapshot.match(org_id, 'TEXT', 0.9, 'business').name == 'ignored-fields'
+        assert snapshot.match(None, 'TEXT', 0.9, 'code').name == 'system-first'
+        assert snapshot.match(org_id, 'VISION', 0.9, 'code') is None
+        # content_type missing from the request: its condition is skipped
+        assert snapshot.match(org_id, 'TEXT', 0.1, '').name == 'org-code'
+
+    def test_malformed_rule_is_dropped(self):
+        """Test a rule whose conditions are not dicts never matches"""
+        assert make_rule('broken', 1, ['complexity_score > 0.5']) is None
+
+    def test_weighted_choice(self):
+        """Test cumulative weights map the unit interval onto models by weight"""
+        rule = make_rule('weighted', 1, models=[('a', 'one', 1), ('b', 'two', 3)])
+
+        assert rule.cumulative_weights == (1, 4)
+        assert rule.choose(0.0) == ('a', 'one')
+        assert rule.choose(0.24) == ('a', 'one')
+        assert rule.choose(0.25) == ('b', 'two')
+        assert rule.choose(0.999) == ('b', 'two')
+        assert make_rule('empty', 1, models=[]).choose(0.5) is None
+
+        engine = RoutingRuleEngine(use_redis=False, rng=random.Random(1))
+        snapshot = RuleSnapshot.build([rule])
+        picks = Counter(engine.select(snapshot, None, 'TEXT')[1] for _ in range(4000))
+        assert 0.70 < picks[('b', 'two')] / 4000 < 0.80
+
+
+class TestRuleRouting(TestCase):
+    """Test the router against compiled database rules"""
+
+    def setUp(self):
+        self.organization = Organization.objects.create(name='Rule Org', slug=f'rule-org-{uuid.uuid4().hex[:8]}')
+        provider = Provider.objects.create(name='OpenAI Test', slug='openai-test')
+        self.models = [
+            Model.objects.create(
+                provider=provider, name=name, model_type='TEXT', capabilities=['chat'],
+                cost_input=Decimal('0.001'), cost_output=Decimal('0.002'), context_window=8192,
+            )
+            for name in ('small', 'large')
+        ]
+        self.rule = RoutingRule.objects.create(
+            organization=self.organization, name='Complex work', priority=10, model_type='TEXT',
+            conditions=[{'field': 'complexity_score', 'operator': 'gte', 'value': 0.6}],
+        )
+        RoutingRuleModel.objects.create(rule=self.rule, model=self.models[1], weight=5)
+
+        self.engine = RoutingRuleEngine(use_redis=False)
+        patcher = patch.object(rule_engine, '_engine', self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, complexity_score):
+        return async_to_sync(EnhancedModelRouter()._get_routing_decision_from_rules)(
+            organization=self.organization,
+            model_type='TEXT',
+            complexity_score=complexity_score,
+            content_type='technical',
+            strategy=OptimizationStrategy.BALANCED,
+            context=RequestContext(),
+        )
+
+    def test_decisions_use_compiled_rules(self):
+        """Test routing after the first compile runs no queries"""
+        with self.assertNumQueries(2):
+            self.engine.get()
+
+        with self.assertNumQueries(0):
+            assert self.route(0.8) == ('openai-test', 'large', 0.9)
+            assert self.route(0.2) is None
+
+    def test_rule_changes_are_hot_reloaded(self):
+        """Test new rules and rule models take effect on the next decision"""
+        self.engine.get()
+        assert self.route(0.2) is None
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fallback = RoutingRule.objects.create(
+                organization=None, name='Everything else', priority=50, model_type='TEXT', conditions=[],
+            )
+            self.rule.models.add(self.models[0], through_defaults={'weight': 1})
+            RoutingRuleModel.objects.create(rule=fallback, model=self.models[0])
+            # Nothing is invalidated until the transaction commits
+            assert self.engine.is_fresh()
+
+        # Reload here; async callers reload through a worker thread
+        assert not self.engine.is_fresh()
+        self.engine.get()
+        assert self.route(0.2) == ('openai-test', 'small', 0.9)
+        assert set(self.engine.get().index[(str(self.organization.pk), 'TEXT')][0].choices) == {
+            ('openai-test', 'small'), ('openai-test', 'large')
+        }
@@ -0,0 +1,115 @@
+"""
+Management command to backfill pgvector embeddings from the legacy JSON column.
+
+Copies Chunk.embedding_vector (JSON list) into Chunk.embedding (pgvector) in
+keyset-paginated batches so the HNSW indexes can serve existing chunks.
+
+Usage:
+    python manage.py backfill_pgvector
+    python manage.py backfill_pgvector --kb_id=<knowledge_base_id> --batch-size=500
+    python manage.py backfill_pgvector --dry-run
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rag_service.models import Chunk, KnowledgeBase
+
+
+class Command(BaseCommand):
+    help = "Backfill pgvector embeddings on chunks from the legacy JSON embedding_vector column"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kb_id",
+            type=str,
+            default=None,
+            help="Only backfill chunks in this knowledge base",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, 'RAG_SETTINGS', {}).get('PGVECTOR', {}).get('BACKFILL_BATCH_SIZE', 1000),
+            help="Number of chunks to update per transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be backfilled without writing",
+        )
+
+    def handle(self, *args, **options):
+        kb_id = options["kb_id"]
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        queryset = Chunk.objects.filter(
+            embedding__isnull=True,
+            embedding_vector__isnull=False
+        )
+        if kb_id:
+            queryset = queryset.filter(document__knowledge_base_id=kb_id)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN MODE - No chunks will be updated"))
+
+        # Expected width per knowledge base, resolved lazily
+        expected_dimensions = {}
+
+        start_time = time.time()
+        last_pk = None
+        updated = 0
+        skipped = 0
+
+        while True:
+            batch_queryset = queryset.order_by('pk')
+            if last_pk is not None:
+                batch_queryset = batch_queryset.filter(pk__gt=last_pk)
+
+            rows = list(batch_queryset.values_list(
+                'id', 'embedding_vector', 'document__knowledge_base_id'
+            )[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            to_update = []
+            for chunk_id, values, knowledge_base_id in rows:
+                if not isinstance(values, list) or not values:
+                    skipped += 1
+                    continue
+
+                if knowledge_base_id not in expected_dimensions:
+                    knowledge_base = KnowledgeBase.objects.select_related('embedding_model').get(
+                        id=knowledge_base_id
+                    )
+                    expected_dimensions[knowledge_base_id] = knowledge_base.get_embedding_dimensions()
+
+                expected = expected_dimensions[knowledge_base_id]
+                if expected and len(values) != expected:
+                    skipped += 1
+                    continue
+
+                chunk = Chunk(id=chunk_id)
+                chunk.set_embedding(values)
+                to_update.append(chunk)
+
+            if to_update and not dry_run:
+                with transaction.atomic():
+                    Chunk.objects.bulk_update(to_update, ['embedding', 'embedding_dimensions'])
+
+            updated += len(to_update)
+            elapsed = time.time() - start_time
+            self.stdout.write(
+                f"Processed {updated + skipped} chunks "
+                f"({updated} {'to backfill' if dry_run else 'backfilled'}, {skipped} skipped) "
+                f"in {elapsed:.1f}s"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill complete: {updated} chunks {'would be ' if dry_run else ''}updated, "
+            f"{skipped} skipped (empty or dimension mismatch)"
+        ))
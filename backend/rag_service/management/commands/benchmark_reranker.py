@@ -0,0 +1,138 @@
+"""
+Management command to benchmark cross-encoder reranking latency.
+
+Reranks 20/50/100 candidates (configurable) and reports cold (uncached pairs)
+and warm (cached pair scores) latency. Candidates come from a knowledge base's
+chunks when --kb_id is given, otherwise synthetic drawing-note text is used.
+
+Usage:
+    python manage.py benchmark_reranker
+    python manage.py benchmark_reranker --candidates 20 50 100 --runs 10
+    python manage.py benchmark_reranker --kb_id=<knowledge_base_id> --max-length=512
+"""
+
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rag_service.models import Chunk
+from rag_service.services.storage_retrieval.reranker import Reranker, get_cross_encoder
+
+
+SYNTHETIC_TEXT = (
+    "Base plate {i} is 300x300x20 with four M20 anchor bolts on grid line {i}. "
+    "Column above continues to roof level; refer to general notes for concrete "
+    "cover, grout thickness and footing reinforcement schedule."
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark cross-encoder reranking latency for different candidate counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--candidates",
+            type=int,
+            nargs="+",
+            default=[20, 50, 100],
+            help="Candidate counts to benchmark",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Timed runs per candidate count",
+        )
+        parser.add_argument(
+            "--query",
+            type=str,
+            default="What size are the base plates and anchor bolts?",
+            help="Query to rerank against",
+        )
+        parser.add_argument(
+            "--kb_id",
+            type=str,
+            default=None,
+            help="Use chunks from this knowledge base as candidates",
+        )
+        parser.add_argument(
+            "--model",
+            type=str,
+            default=None,
+            help="Cross-encoder model (defaults to RAG_SETTINGS)",
+        )
+        parser.add_argument(
+            "--max-length",
+            type=int,
+            default=None,
+            help="Max sequence length per pair (defaults to RAG_SETTINGS)",
+        )
+
+    def handle(self, *args, **options):
+        reranker = Reranker(
+            strategy='cross_encoder',
+            model_name=options["model"],
+            max_length=options["max_length"],
+            use_thread_pool=False,
+        )
+
+        try:
+            load_start = time.time()
+            get_cross_encoder(reranker.model_name, reranker.max_length)
+        except ImportError:
+            raise CommandError("sentence-transformers is not installed")
+        self.stdout.write(
+            f"Loaded {reranker.model_name} (max_length={reranker.max_length}) "
+            f"in {(time.time() - load_start) * 1000:.0f}ms"
+        )
+
+        candidates = self._load_candidates(options["kb_id"], max(options["candidates"]))
+        query = options["query"]
+
+        self.stdout.write(f"{'candidates':>10} {'cold p50':>10} {'cold p95':>10} {'warm p50':>10}")
+        for count in options["candidates"]:
+            results = candidates[:count]
+            cold, warm = [], []
+
+            for _ in range(options["runs"]):
+                reranker.score_cache.clear()
+                cold.append(self._time_rerank(reranker, query, results))
+                warm.append(self._time_rerank(reranker, query, results))
+
+            self.stdout.write(
+                f"{len(results):>10} {self._percentile(cold, 50):>8.1f}ms "
+                f"{self._percentile(cold, 95):>8.1f}ms {self._percentile(warm, 50):>8.1f}ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def _load_candidates(self, kb_id, count):
+        """Build candidate results from chunks or synthetic text"""
+        if kb_id:
+            chunks = list(Chunk.objects.filter(
+                document__knowledge_base_id=kb_id
+            ).values('id', 'content')[:count])
+            if not chunks:
+                raise CommandError(f"No chunks found in knowledge base {kb_id}")
+            return [
+                {'chunk_id': str(chunk['id']), 'content': chunk['content'], 'score': 0.0}
+                for chunk in chunks
+            ]
+
+        return [
+            {'chunk_id': f'synthetic-{i}', 'content': SYNTHETIC_TEXT.format(i=i), 'score': 0.0}
+            for i in range(count)
+        ]
+
+    def _time_rerank(self, reranker, query, results):
+        start = time.perf_counter()
+        asyncio.run(reranker.rerank(query=query, results=results, top_k=len(results)))
+        return (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _percentile(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
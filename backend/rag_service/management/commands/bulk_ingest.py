@@ -0,0 +1,169 @@
+"""
+Management command to ingest a directory or manifest of documents.
+
+Files are processed through DocumentPipeline by a pool of workers. Per-file
+state is checkpointed in SQLite, so re-running the same command resumes an
+interrupted run: ingested files are skipped by content hash, changed files are
+re-ingested incrementally and failed files are retried.
+
+Usage:
+    python manage.py bulk_ingest --kb_id=<knowledge_base_id> --dir=/data/drawings
+    python manage.py bulk_ingest --kb_id=<knowledge_base_id> --manifest=files.txt --workers=8
+    python manage.py bulk_ingest --kb_id=<knowledge_base_id> --dir=/data --checkpoint=/tmp/run.sqlite3
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from rag_service.models import KnowledgeBase
+from rag_service.services.bulk_ingest import (
+    BulkIngestRunner,
+    DEFAULT_EXTENSIONS,
+    IngestCheckpoint,
+    discover_files,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Ingest many documents into a knowledge base with resumable, concurrent processing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kb_id",
+            type=str,
+            required=True,
+            help="Knowledge base ID (UUID) to ingest into",
+        )
+        parser.add_argument(
+            "--dir",
+            type=str,
+            default=None,
+            help="Directory of files to ingest",
+        )
+        parser.add_argument(
+            "--manifest",
+            type=str,
+            default=None,
+            help="File listing paths to ingest (one per line, or JSON lines with path/title)",
+        )
+        parser.add_argument(
+            "--extensions",
+            type=str,
+            default=",".join(DEFAULT_EXTENSIONS),
+            help="Comma-separated extensions to pick up from --dir",
+        )
+        parser.add_argument(
+            "--no-recursive",
+            action="store_true",
+            help="Do not descend into subdirectories of --dir",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, 'RAG_SETTINGS', {}).get('BULK_INGEST', {}).get('WORKERS', 4),
+            help="Number of documents processed concurrently",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=str,
+            default=None,
+            help="SQLite checkpoint file (defaults to MEDIA_ROOT/bulk_ingest/<kb_id>.sqlite3)",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=3,
+            help="Attempts per file before it is left as failed",
+        )
+        parser.add_argument(
+            "--progress-interval",
+            type=float,
+            default=10.0,
+            help="Seconds between progress reports",
+        )
+        parser.add_argument(
+            "--user_id",
+            type=int,
+            default=None,
+            help="User ID to associate as the creator",
+        )
+
+    def handle(self, *args, **options):
+        kb_id = options["kb_id"]
+        directory = options["dir"]
+        manifest = options["manifest"]
+        user_id = options["user_id"]
+
+        if not directory and not manifest:
+            self.stderr.write(self.style.ERROR("Provide --dir and/or --manifest"))
+            return
+        if directory and not os.path.isdir(directory):
+            self.stderr.write(self.style.ERROR(f"Directory not found: {directory}"))
+            return
+        if manifest and not os.path.isfile(manifest):
+            self.stderr.write(self.style.ERROR(f"Manifest not found: {manifest}"))
+            return
+
+        if not KnowledgeBase.objects.filter(id=kb_id).exists():
+            self.stderr.write(self.style.ERROR(f"Knowledge base with ID {kb_id} not found"))
+            return
+        if user_id and not User.objects.filter(id=user_id).exists():
+            self.stderr.write(self.style.ERROR(f"User with ID {user_id} not found"))
+            return
+
+        extensions = [
+            ext if ext.startswith('.') else f'.{ext}'
+            for ext in (e.strip() for e in options["extensions"].split(','))
+            if ext
+        ]
+        files = discover_files(
+            directory=directory,
+            manifest=manifest,
+            extensions=extensions,
+            recursive=not options["no_recursive"]
+        )
+        missing = [path for path, _ in files if not os.path.isfile(path)]
+        for path in missing:
+            self.stderr.write(self.style.WARNING(f"Skipping missing file: {path}"))
+        files = [(path, title) for path, title in files if path not in missing]
+
+        checkpoint_path = options["checkpoint"] or os.path.join(
+            settings.MEDIA_ROOT, 'bulk_ingest', f'{kb_id}.sqlite3'
+        )
+        checkpoint = IngestCheckpoint(checkpoint_path)
+        self.stdout.write(
+            f"Ingesting {len(files)} files with {options['workers']} workers "
+            f"(checkpoint: {checkpoint_path})"
+        )
+
+        runner = BulkIngestRunner(
+            knowledge_base_id=kb_id,
+            checkpoint=checkpoint,
+            workers=options["workers"],
+            max_attempts=options["max_attempts"],
+            created_by_id=user_id,
+            on_progress=lambda progress: self.stdout.write(progress.summary_line()),
+            progress_interval=options["progress_interval"]
+        )
+
+        try:
+            progress = runner.run(files)
+        except KeyboardInterrupt:
+            self.stderr.write(self.style.WARNING("Interrupted - re-run the same command to resume"))
+            return
+        finally:
+            checkpoint.close()
+
+        for path, error in progress.failures:
+            self.stderr.write(self.style.ERROR(f"Failed: {path}: {error}"))
+
+        style = self.style.SUCCESS if not progress.failed else self.style.WARNING
+        self.stdout.write(style(
+            f"Bulk ingest finished: {progress.ingested} ingested, {progress.skipped} skipped, "
+            f"{progress.failed} failed, {progress.pages} pages"
+        ))
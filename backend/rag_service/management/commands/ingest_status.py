@@ -0,0 +1,46 @@
+"""
+Management command to show the staged ingestion pipeline's queue depth and latency.
+
+Usage:
+    python manage.py ingest_status
+    python manage.py ingest_status --json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from rag_service.services.ingest_stages import get_stage_stats
+
+
+class Command(BaseCommand):
+    help = "Show per-stage queue depth, throughput and latency of the ingestion pipeline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print the raw stats as JSON",
+        )
+
+    def handle(self, *args, **options):
+        stats = get_stage_stats()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        def fmt(value):
+            return '-' if value is None else f"{value:.0f}"
+
+        self.stdout.write(
+            f"{'stage':<8} {'in flight':>10} {'processed':>10} {'failed':>7} {'deferred':>9} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'wait p50':>9} {'wait p95':>9}"
+        )
+        for stage, row in stats.items():
+            in_flight = f"{row['in_flight']}/{row['limit'] or '-'}"
+            self.stdout.write(
+                f"{stage:<8} {in_flight:>10} {row['processed']:>10} {row['failed']:>7} {row['deferred']:>9} "
+                f"{fmt(row['latency_ms_p50']):>8} {fmt(row['latency_ms_p95']):>8} "
+                f"{fmt(row['queue_wait_ms_p50']):>9} {fmt(row['queue_wait_ms_p95']):>9}"
+            )
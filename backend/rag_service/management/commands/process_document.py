@@ -275,6 +275,10 @@ class Command(BaseCommand):
                     # Log first 3 chunks
                     if i < 3:
                         self.stdout.write(f"   Chunk {i+1}: {chunk.chunk_type} ({len(chunk.content)} chars)")
+                
+                # Link related chunks in one bulk insert now that they exist
+                linked = await sync_to_async(chunking_service.save_relations)()
+                self.stdout.write(f"   Linked {linked} chunk relations")
             else:
                 self.stdout.write(self.style.WARNING("   No chunks were created"))
             
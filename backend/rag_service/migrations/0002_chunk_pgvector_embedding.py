@@ -0,0 +1,65 @@
+# Generated by Django 4.2.26 on 2025-12-02 10:14
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import pgvector.django.extensions
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0001_initial'),
+    ]
+
+    operations = [
+        pgvector.django.extensions.VectorExtension(),
+        migrations.AddField(
+            model_name='chunk',
+            name='embedding',
+            field=pgvector.django.vector.VectorField(blank=True, help_text='pgvector embedding used for ANN search', null=True),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='embedding_dimensions',
+            field=models.IntegerField(blank=True, help_text='Width of the pgvector embedding; selects the matching HNSW index', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=512)), name='vector_cosine_ops'), condition=models.Q(('embedding_dimensions', 512)), ef_construction=64, m=16, name='rag_chunk_512_cosine_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=512)), name='vector_l2_ops'), condition=models.Q(('embedding_dimensions', 512)), ef_construction=64, m=16, name='rag_chunk_512_euclidean_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=512)), name='vector_ip_ops'), condition=models.Q(('embedding_dimensions', 512)), ef_construction=64, m=16, name='rag_chunk_512_dot_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1024)), name='vector_cosine_ops'), condition=models.Q(('embedding_dimensions', 1024)), ef_construction=64, m=16, name='rag_chunk_1024_cosine_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1024)), name='vector_l2_ops'), condition=models.Q(('embedding_dimensions', 1024)), ef_construction=64, m=16, name='rag_chunk_1024_euclidean_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1024)), name='vector_ip_ops'), condition=models.Q(('embedding_dimensions', 1024)), ef_construction=64, m=16, name='rag_chunk_1024_dot_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1536)), name='vector_cosine_ops'), condition=models.Q(('embedding_dimensions', 1536)), ef_construction=64, m=16, name='rag_chunk_1536_cosine_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1536)), name='vector_l2_ops'), condition=models.Q(('embedding_dimensions', 1536)), ef_construction=64, m=16, name='rag_chunk_1536_euclidean_hnsw'),
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=pgvector.django.indexes.HnswIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.comparison.Cast('embedding', output_field=pgvector.django.vector.VectorField(dimensions=1536)), name='vector_ip_ops'), condition=models.Q(('embedding_dimensions', 1536)), ef_construction=64, m=16, name='rag_chunk_1536_dot_hnsw'),
+        ),
+    ]
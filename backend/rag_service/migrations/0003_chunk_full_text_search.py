@@ -0,0 +1,46 @@
+# Generated by Django 4.2.26 on 2025-12-04 09:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0002_chunk_pgvector_embedding'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        # Stored generated tsvector columns are maintained by Postgres, so they
+        # are intentionally not declared on the models (the ORM would otherwise
+        # try to write them on INSERT/UPDATE).
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE rag_chunk ADD COLUMN content_tsv tsvector "
+                "GENERATED ALWAYS AS (to_tsvector('english'::regconfig, coalesce(content, ''))) STORED",
+                "CREATE INDEX rag_chunk_content_tsv_gin ON rag_chunk USING gin (content_tsv)",
+                "ALTER TABLE rag_document ADD COLUMN search_tsv tsvector "
+                "GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'B')"
+                ") STORED",
+                "CREATE INDEX rag_document_search_tsv_gin ON rag_document USING gin (search_tsv)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS rag_document_search_tsv_gin",
+                "ALTER TABLE rag_document DROP COLUMN IF EXISTS search_tsv",
+                "DROP INDEX IF EXISTS rag_chunk_content_tsv_gin",
+                "ALTER TABLE rag_chunk DROP COLUMN IF EXISTS content_tsv",
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='chunk',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['content'], name='rag_chunk_content_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='rag_document_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0003_chunk_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentpage',
+            name='text_hash',
+            field=models.CharField(blank=True, default='', help_text="SHA-256 of the page's normalized text", max_length=64),
+        ),
+        migrations.AddField(
+            model_name='documentpage',
+            name='graphics_hash',
+            field=models.CharField(blank=True, default='', help_text="SHA-256 of the page's drawing operators and embedded images", max_length=64),
+        ),
+    ]
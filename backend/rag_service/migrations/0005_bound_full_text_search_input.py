@@ -0,0 +1,51 @@
+# Generated by Django 4.2.26 on 2026-10-18 23:40
+
+from django.db import migrations
+
+
+# Characters of content fed to to_tsvector. A tsvector is limited to 1MB;
+# 200k characters stay well below it whatever the text, and search over the
+# rest of a long document is covered by its chunks.
+MAX_CHARS = 200000
+
+CHUNK_TSV = (
+    f"to_tsvector('english'::regconfig, left(coalesce(content, ''), {MAX_CHARS}))"
+)
+DOCUMENT_TSV = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('english'::regconfig, left(coalesce(content, ''), {MAX_CHARS})), 'B')"
+)
+
+OLD_CHUNK_TSV = "to_tsvector('english'::regconfig, coalesce(content, ''))"
+OLD_DOCUMENT_TSV = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'B')"
+)
+
+
+def rebuild_columns(chunk_tsv, document_tsv):
+    """Generated columns cannot change their expression in place: drop and re-add"""
+    return [
+        "DROP INDEX IF EXISTS rag_chunk_content_tsv_gin",
+        "ALTER TABLE rag_chunk DROP COLUMN IF EXISTS content_tsv",
+        f"ALTER TABLE rag_chunk ADD COLUMN content_tsv tsvector GENERATED ALWAYS AS ({chunk_tsv}) STORED",
+        "CREATE INDEX rag_chunk_content_tsv_gin ON rag_chunk USING gin (content_tsv)",
+        "DROP INDEX IF EXISTS rag_document_search_tsv_gin",
+        "ALTER TABLE rag_document DROP COLUMN IF EXISTS search_tsv",
+        f"ALTER TABLE rag_document ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ({document_tsv}) STORED",
+        "CREATE INDEX rag_document_search_tsv_gin ON rag_document USING gin (search_tsv)",
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0004_documentpage_fingerprints'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=rebuild_columns(CHUNK_TSV, DOCUMENT_TSV),
+            reverse_sql=rebuild_columns(OLD_CHUNK_TSV, OLD_DOCUMENT_TSV),
+        ),
+    ]
@@ -8,10 +8,57 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Cast
+from pgvector.django import HnswIndex, VectorField
 
 from core.models import BaseModel, SoftDeletableMixin, SoftDeletableManager
 
 
+# Embedding widths that get their own HNSW index. pgvector cannot build HNSW
+# indexes on `vector` columns wider than 2000 dimensions, so larger embeddings
+# are still stored but searched without an ANN index.
+PGVECTOR_INDEXED_DIMENSIONS = (512, 1024, 1536)
+
+# VectorIndex.metric -> pgvector operator class
+PGVECTOR_METRIC_OPCLASSES = {
+    'cosine': 'vector_cosine_ops',
+    'euclidean': 'vector_l2_ops',
+    'dot': 'vector_ip_ops',
+}
+
+
+# Text search configuration used by the generated tsvector columns on
+# rag_chunk and rag_document (see migrations 0003 and 0005; only the first
+# 200k characters of content are indexed). Queries must use the same
+# configuration or the GIN indexes cannot be used.
+FULL_TEXT_SEARCH_CONFIG = 'english'
+
+
+def pgvector_hnsw_indexes():
+    """
+    Build one partial HNSW index per (dimension, metric) pair.
+
+    Chunk.embedding has no fixed width because knowledge bases can use
+    different embedding models, so each index covers a cast of the column
+    restricted to rows with the matching embedding_dimensions.
+    """
+    return [
+        HnswIndex(
+            OpClass(
+                Cast('embedding', output_field=VectorField(dimensions=dimensions)),
+                name=opclass,
+            ),
+            name=f'rag_chunk_{dimensions}_{metric}_hnsw',
+            condition=models.Q(embedding_dimensions=dimensions),
+            m=16,
+            ef_construction=64,
+        )
+        for dimensions in PGVECTOR_INDEXED_DIMENSIONS
+        for metric, opclass in PGVECTOR_METRIC_OPCLASSES.items()
+    ]
+
+
 class KnowledgeBase(SoftDeletableMixin):
     """
     A knowledge base is a collection of documents that can be used for RAG.
@@ -152,6 +199,24 @@ class KnowledgeBase(SoftDeletableMixin):
         self.last_queried = timezone.now()
         self.save(update_fields=['last_queried'])
     
+    def get_active_vector_index(self):
+        """Get the most recent active vector index, if any"""
+        return self.vector_indexes.filter(status='active').order_by('-created_at').first()
+    
+    def get_embedding_dimensions(self):
+        """
+        Get the embedding width for this knowledge base.
+        
+        The active VectorIndex is authoritative; otherwise fall back to the
+        configured embedding model.
+        """
+        vector_index = self.get_active_vector_index()
+        if vector_index:
+            return vector_index.dimensions
+        if self.embedding_model and self.embedding_model.embedding_dimensions:
+            return self.embedding_model.embedding_dimensions
+        return None
+    
     def can_access(self, user):
         """Check if user can access this knowledge base"""
         if not user or not user.is_active:
@@ -397,6 +462,7 @@ class Document(SoftDeletableMixin):
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['document_type']),
             models.Index(fields=['storage_approach']),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='rag_document_title_trgm'),
         ]
     
     def update_statistics(self):
@@ -471,13 +537,27 @@ class DocumentPage(SoftDeletableMixin):
     height = models.FloatField(null=True, blank=True)
     rotation = models.IntegerField(default=0)
     metadata = models.JSONField(default=dict, blank=True)
-    
+
+    # Content fingerprints used to detect changed pages on re-ingest
+    text_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="SHA-256 of the page's normalized text"
+    )
+    graphics_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="SHA-256 of the page's drawing operators and embedded images"
+    )
+
     # Statistics
     token_count = models.IntegerField(default=0)
     word_count = models.IntegerField(default=0)
     table_count = models.IntegerField(default=0)
     image_count = models.IntegerField(default=0)
-    
+
     objects = SoftDeletableManager()
     
     class Meta:
@@ -628,6 +708,16 @@ class Chunk(BaseModel):
         blank=True,
         help_text="Vector embedding for semantic search"
     )
+    embedding = VectorField(
+        null=True,
+        blank=True,
+        help_text="pgvector embedding used for ANN search"
+    )
+    embedding_dimensions = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Width of the pgvector embedding; selects the matching HNSW index"
+    )
     token_count = models.IntegerField(default=0)
     
     # Metadata
@@ -669,7 +759,10 @@ class Chunk(BaseModel):
             models.Index(fields=['document', 'chunk_index']),
             models.Index(fields=['embedding_vector_id']),
             models.Index(fields=['retrieval_count']),
-        ]
+            # Substring/regex lookups for element IDs ("BP3", "C12") that the
+            # english tsvector parser does not tokenize reliably
+            GinIndex(fields=['content'], opclasses=['gin_trgm_ops'], name='rag_chunk_content_trgm'),
+        ] + pgvector_hnsw_indexes()
         constraints = [
             models.UniqueConstraint(
                 fields=['document', 'chunk_index'],
@@ -680,6 +773,17 @@ class Chunk(BaseModel):
     def __str__(self):
         return f"Chunk {self.chunk_index} of {self.document.title}"
     
+    def set_embedding(self, values):
+        """Set the pgvector embedding and its width (does not save)"""
+        if values is None:
+            self.embedding = None
+            self.embedding_dimensions = None
+            return
+        if hasattr(values, 'tolist'):
+            values = values.tolist()
+        self.embedding = list(values)
+        self.embedding_dimensions = len(self.embedding)
+    
     def record_retrieval(self, relevance_score=None):
         """Record that this chunk was retrieved in a query"""
         self.retrieval_count += 1
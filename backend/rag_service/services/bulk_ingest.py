@@ -0,0 +1,421 @@
+"""
+Bulk Document Ingest
+
+Runs DocumentPipeline over a directory or manifest of files with a pool of
+worker threads. The pipeline's PyMuPDF work goes through the process-wide
+render thread, so workers overlap database and file I/O with one another but
+never drive PyMuPDF concurrently. Per-file state is kept in a local SQLite
+checkpoint so an interrupted or partially failed run resumes where it stopped:
+
+- Files already ingested with the same content hash are skipped, as are
+  duplicates of another file (same hash) in the checkpoint or knowledge base
+- Files whose content changed are re-ingested into the same document, so the
+  pipeline only reprocesses changed pages
+- Failed files are retried on the next run up to max_attempts times
+
+Progress (docs/min, pages/min, failures) is reported while the run is going.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+
+from .document_pipeline import DocumentPipeline
+from .extraction.page_image_cache import file_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md', '.csv')
+
+
+@dataclass
+class CheckpointEntry:
+    """Stored state of one file"""
+    path: str
+    content_hash: str
+    status: str  # 'processing', 'done', 'failed', 'skipped'
+    document_id: Optional[str] = None
+    pages: int = 0
+    attempts: int = 0
+    error: str = ''
+
+
+class IngestCheckpoint:
+    """
+    SQLite record of per-file ingest state.
+
+    One connection is shared by the worker threads behind a lock; WAL mode
+    keeps each state change a small durable append.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file (created with its directory if missing)
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                document_id TEXT,
+                pages INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL
+            )
+            '''
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash, status)')
+
+    def get(self, path: str) -> Optional[CheckpointEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path, content_hash, status, document_id, pages, attempts, error FROM files WHERE path = ?',
+                (path,)
+            ).fetchone()
+        return CheckpointEntry(*row) if row else None
+
+    def find_done(self, content_hash: str) -> Optional[CheckpointEntry]:
+        """An ingested file with the given content hash"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT path, content_hash, status, document_id, pages, attempts, error FROM files '
+                'WHERE content_hash = ? AND status = ? LIMIT 1',
+                (content_hash, 'done')
+            ).fetchone()
+        return CheckpointEntry(*row) if row else None
+
+    def mark_started(self, path: str, content_hash: str, document_id: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                '''
+                INSERT INTO files (path, content_hash, status, document_id, attempts, updated_at)
+                VALUES (?, ?, 'processing', ?, 1, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    status = 'processing',
+                    document_id = excluded.document_id,
+                    attempts = CASE WHEN files.content_hash = excluded.content_hash
+                        THEN files.attempts + 1 ELSE 1 END,
+                    content_hash = excluded.content_hash,
+                    error = '',
+                    updated_at = excluded.updated_at
+                ''',
+                (path, content_hash, document_id, time.time())
+            )
+
+    def mark_finished(
+        self,
+        path: str,
+        content_hash: str,
+        status: str,
+        document_id: Optional[str] = None,
+        pages: int = 0,
+        error: str = ''
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                '''
+                INSERT INTO files (path, content_hash, status, document_id, pages, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    status = excluded.status,
+                    document_id = COALESCE(excluded.document_id, files.document_id),
+                    pages = excluded.pages,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                ''',
+                (path, content_hash, status, document_id, pages, error[:2000], time.time())
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM files GROUP BY status').fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class IngestProgress:
+    """Thread-safe run counters"""
+    total: int = 0
+    ingested: int = 0
+    skipped: int = 0
+    failed: int = 0
+    pages: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, outcome: str, pages: int = 0, path: str = '', error: str = '') -> None:
+        with self._lock:
+            if outcome == 'done':
+                self.ingested += 1
+                self.pages += pages
+            elif outcome == 'skipped':
+                self.skipped += 1
+            else:
+                self.failed += 1
+                self.failures.append((path, error))
+
+    @property
+    def finished(self) -> int:
+        return self.ingested + self.skipped + self.failed
+
+    def rates(self) -> Tuple[float, float]:
+        """(docs/min, pages/min) over ingested files"""
+        minutes = max(time.monotonic() - self.started_at, 1e-6) / 60
+        return self.ingested / minutes, self.pages / minutes
+
+    def summary_line(self) -> str:
+        docs_per_min, pages_per_min = self.rates()
+        return (
+            f"{self.finished}/{self.total} files: {self.ingested} ingested, {self.skipped} skipped, "
+            f"{self.failed} failed | {docs_per_min:.1f} docs/min, {pages_per_min:.1f} pages/min"
+        )
+
+
+def discover_files(
+    directory: Optional[str] = None,
+    manifest: Optional[str] = None,
+    extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+    recursive: bool = True
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    List files to ingest.
+
+    Manifest lines are either a path or a JSON object with "path" and an
+    optional "title"; relative paths resolve against the manifest's directory.
+    Blank lines and lines starting with '#' are ignored.
+
+    Args:
+        directory: Directory to scan
+        manifest: Manifest file
+        extensions: File extensions to include from the directory
+        recursive: Scan subdirectories
+
+    Returns:
+        Sorted, de-duplicated (absolute path, title) pairs
+    """
+    files: Dict[str, Optional[str]] = {}
+    extensions = tuple(ext.lower() for ext in extensions)
+
+    if directory:
+        for root, dirs, names in os.walk(directory):
+            if not recursive:
+                dirs.clear()
+            for name in names:
+                if name.lower().endswith(extensions) and not name.startswith('.'):
+                    files.setdefault(os.path.abspath(os.path.join(root, name)), None)
+
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                title = None
+                if line.startswith('{'):
+                    entry = json.loads(line)
+                    line, title = entry['path'], entry.get('title')
+                files[os.path.abspath(os.path.join(base, line))] = title
+
+    return sorted(files.items())
+
+
+class BulkIngestRunner:
+    """
+    Ingests many files through DocumentPipeline with a worker pool.
+    """
+
+    def __init__(
+        self,
+        knowledge_base_id: str,
+        checkpoint: IngestCheckpoint,
+        workers: int = 4,
+        max_attempts: int = 3,
+        created_by_id: Optional[str] = None,
+        pipeline_factory: Callable[[], Any] = DocumentPipeline,
+        on_progress: Optional[Callable[[IngestProgress], None]] = None,
+        progress_interval: float = 10.0
+    ):
+        """
+        Args:
+            knowledge_base_id: Knowledge base receiving the documents
+            checkpoint: Per-file state store
+            workers: Files processed concurrently
+            max_attempts: Attempts per file content before it is left as failed
+            created_by_id: User recorded as the documents' creator
+            pipeline_factory: Builds one pipeline per worker thread
+            on_progress: Called with the progress counters every
+                progress_interval seconds and at the end of the run
+            progress_interval: Seconds between progress callbacks
+        """
+        self.knowledge_base_id = knowledge_base_id
+        self.checkpoint = checkpoint
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.created_by_id = created_by_id
+        self.pipeline_factory = pipeline_factory
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._local = threading.local()
+        self._claims_lock = threading.Lock()
+        self._claimed_hashes: Dict[str, str] = {}
+
+    def run(self, files: List[Tuple[str, Optional[str]]]) -> IngestProgress:
+        """
+        Ingest files, resuming from the checkpoint.
+
+        Args:
+            files: (path, title) pairs from discover_files()
+
+        Returns:
+            Final progress counters
+        """
+        progress = IngestProgress(total=len(files))
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-ingest')
+        pending = set()
+        queue = iter(files)
+        last_report = time.monotonic()
+
+        def submit_next() -> bool:
+            for path, title in queue:
+                pending.add(executor.submit(self._ingest_file, path, title, progress))
+                return True
+            return False
+
+        try:
+            # Keep a small backlog per worker rather than queueing every file
+            while len(pending) < self.workers * 2 and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, timeout=self.progress_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    future.result()
+                    submit_next()
+                if self.on_progress and time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    self.on_progress(progress)
+        finally:
+            # On interrupt, queued files are dropped; running ones stay
+            # 'processing' in the checkpoint and are redone on the next run
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if self.on_progress:
+            self.on_progress(progress)
+        return progress
+
+    def _pipeline(self):
+        pipeline = getattr(self._local, 'pipeline', None)
+        if pipeline is None:
+            pipeline = self._local.pipeline = self.pipeline_factory()
+        return pipeline
+
+    def _ingest_file(self, path: str, title: Optional[str], progress: IngestProgress) -> None:
+        """Process one file; never raises so one bad file cannot stop the run"""
+        content_hash = ''
+        try:
+            content_hash = file_content_hash(path)
+            entry = self.checkpoint.get(path)
+
+            if entry and entry.content_hash == content_hash:
+                if entry.status in ('done', 'skipped'):
+                    progress.record('skipped')
+                    return
+                if entry.status == 'failed' and entry.attempts >= self.max_attempts:
+                    logger.info(f"Skipping {path}: failed {entry.attempts} times")
+                    progress.record('skipped')
+                    return
+
+            # Identical files in flight at the same time: let the first one
+            # through; the others are re-checked against it on the next run
+            with self._claims_lock:
+                claimed_by = self._claimed_hashes.setdefault(content_hash, path)
+            if claimed_by != path:
+                logger.info(f"Skipping {path}: same content as {claimed_by}")
+                progress.record('skipped')
+                return
+
+            duplicate_of = self._find_duplicate(path, content_hash)
+            if duplicate_of:
+                logger.info(f"Skipping {path}: same content as document {duplicate_of}")
+                self.checkpoint.mark_finished(path, content_hash, 'skipped', document_id=duplicate_of)
+                progress.record('skipped')
+                return
+
+            # A changed file is re-ingested into its document (incremental)
+            document_id = entry.document_id if entry else None
+            self.checkpoint.mark_started(path, content_hash, document_id)
+
+            # async_to_sync runs the pipeline's thread-sensitive queries on
+            # this thread, so its connection is the one closed below
+            result = async_to_sync(self._pipeline().process_document)(
+                file_path=path,
+                knowledge_base_id=self.knowledge_base_id,
+                title=title,
+                document_id=document_id,
+                created_by_id=self.created_by_id,
+                metadata={'content_hash': content_hash, 'source_path': path}
+            )
+
+            if result.get('status') == 'completed':
+                pages = result.get('page_count', 0)
+                self.checkpoint.mark_finished(
+                    path, content_hash, 'done', document_id=result.get('document_id'), pages=pages
+                )
+                progress.record('done', pages=pages)
+            else:
+                error = result.get('error') or 'Unknown error'
+                self.checkpoint.mark_finished(
+                    path, content_hash, 'failed', document_id=result.get('document_id'), error=error
+                )
+                progress.record('failed', path=path, error=error)
+
+        except Exception as e:
+            logger.error(f"Bulk ingest failed for {path}: {e}", exc_info=True)
+            if content_hash:
+                self.checkpoint.mark_finished(path, content_hash, 'failed', error=str(e))
+            progress.record('failed', path=path, error=str(e))
+        finally:
+            connection.close()
+
+    def _find_duplicate(self, path: str, content_hash: str) -> Optional[str]:
+        """Document ID of an already ingested file with the same content"""
+        entry = self.checkpoint.find_done(content_hash)
+        if entry and entry.path != path:
+            return entry.document_id
+
+        from rag_service.models import Document
+
+        document_id = Document.objects.filter(
+            knowledge_base_id=self.knowledge_base_id,
+            metadata__content_hash=content_hash,
+            status='completed'
+        ).exclude(metadata__source_path=path).values_list('id', flat=True).first()
+        return str(document_id) if document_id else None
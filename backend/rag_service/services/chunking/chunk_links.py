@@ -0,0 +1,193 @@
+# rag_service/services/chunking/chunk_links.py
+"""
+Chunk relation linking.
+
+Relations between chunks (schedule <-> visual group, reading-order neighbours,
+same page, same section and optional embedding similarity) are computed in
+memory as a deduplicated set of (from_chunk_id, to_chunk_id) pairs and written
+to the Chunk.related_chunks through-table with a single bulk_create, instead
+of one related_chunks.add() round trip per pair.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+Relation = Tuple[str, str]
+
+# Page/section groups up to this size are fully connected; larger groups are
+# linked as a chain so relation counts stay linear in the number of chunks
+MAX_GROUP_CLIQUE_SIZE = 12
+
+
+def _page_of(chunk) -> Optional[int]:
+    page = chunk.page_number
+    if page is None:
+        page = (chunk.metadata or {}).get('page_number')
+    return page
+
+
+def _link_group(relations: Set[Relation], ids: List[str]) -> None:
+    """Connect a group of chunks in both directions"""
+    if len(ids) <= MAX_GROUP_CLIQUE_SIZE:
+        for a in ids:
+            for b in ids:
+                if a != b:
+                    relations.add((a, b))
+    else:
+        for a, b in zip(ids, ids[1:]):
+            relations.add((a, b))
+            relations.add((b, a))
+
+
+def top_k_similar_pairs(
+    chunk_ids: Sequence[str],
+    embeddings,
+    top_k: int = 3,
+    threshold: float = 0.8,
+    block_size: int = 1024
+) -> Set[Relation]:
+    """
+    Find each chunk's top-k most similar chunks by cosine similarity.
+
+    Similarities are computed as blocked matrix products over L2-normalized
+    embeddings, so memory stays at block_size x n floats.
+
+    Args:
+        chunk_ids: Chunk IDs aligned with embeddings
+        embeddings: (n, d) array-like of embeddings
+        top_k: Neighbours to keep per chunk
+        threshold: Minimum cosine similarity for a link
+        block_size: Rows scored per matrix product
+
+    Returns:
+        Set of (chunk_id, similar_chunk_id) pairs
+    """
+    n = len(chunk_ids)
+    if n < 2 or top_k <= 0:
+        return set()
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    k = min(top_k, n - 1)
+    relations = set()
+    for start in range(0, n, block_size):
+        block = matrix[start:start + block_size] @ matrix.T
+        rows = np.arange(block.shape[0])
+        block[rows, rows + start] = -np.inf
+
+        # Unordered top-k per row, then threshold
+        neighbours = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(block, neighbours, axis=1)
+        for row, col in zip(*np.nonzero(scores >= threshold)):
+            relations.add((chunk_ids[start + row], chunk_ids[neighbours[row, col]]))
+
+    return relations
+
+
+def build_chunk_relations(
+    chunks: Sequence,
+    embeddings=None,
+    similarity_top_k: int = 0,
+    similarity_threshold: float = 0.8
+) -> Set[Relation]:
+    """
+    Compute deduplicated relations between a document's chunks.
+
+    Args:
+        chunks: Chunk instances (IDs are assigned on construction)
+        embeddings: Optional (n, d) embeddings aligned with chunks; defaults to
+            each chunk's stored embedding when similarity links are enabled
+        similarity_top_k: Similar chunks linked per chunk (0 disables)
+        similarity_threshold: Minimum cosine similarity for similarity links
+
+    Returns:
+        Set of (from_chunk_id, to_chunk_id) pairs
+    """
+    relations: Set[Relation] = set()
+    by_id = {str(chunk.id): chunk for chunk in chunks}
+
+    # Schedule tables <-> visual element groups (set by ChunkingService._link_chunks)
+    for chunk in chunks:
+        schedule_id = (chunk.metadata or {}).get('schedule_chunk_id')
+        if schedule_id and schedule_id in by_id:
+            relations.add((str(chunk.id), schedule_id))
+            relations.add((schedule_id, str(chunk.id)))
+
+    # Reading-order neighbours within each chunk type
+    by_type = defaultdict(list)
+    for chunk in sorted(chunks, key=lambda c: c.chunk_index):
+        by_type[chunk.chunk_type].append(str(chunk.id))
+    for ids in by_type.values():
+        for a, b in zip(ids, ids[1:]):
+            relations.add((a, b))
+            relations.add((b, a))
+
+    # Same page and same section
+    by_page: Dict[int, List[str]] = defaultdict(list)
+    by_section: Dict[str, List[str]] = defaultdict(list)
+    for chunk in sorted(chunks, key=lambda c: c.chunk_index):
+        page = _page_of(chunk)
+        if page is not None:
+            by_page[page].append(str(chunk.id))
+        section = (chunk.metadata or {}).get('section')
+        if section:
+            by_section[section].append(str(chunk.id))
+    for ids in list(by_page.values()) + list(by_section.values()):
+        _link_group(relations, ids)
+
+    if similarity_top_k > 0:
+        relations |= _similarity_relations(chunks, embeddings, similarity_top_k, similarity_threshold)
+
+    return relations
+
+
+def _similarity_relations(chunks, embeddings, top_k, threshold) -> Set[Relation]:
+    if embeddings is not None:
+        return top_k_similar_pairs([str(c.id) for c in chunks], embeddings, top_k, threshold)
+
+    ids, vectors = [], []
+    for chunk in chunks:
+        vector = chunk.embedding if chunk.embedding is not None else chunk.embedding_vector
+        if vector is not None and len(vector):
+            ids.append(str(chunk.id))
+            vectors.append(vector)
+
+    if len(ids) < 2 or len({len(v) for v in vectors}) != 1:
+        return set()
+    return top_k_similar_pairs(ids, vectors, top_k, threshold)
+
+
+def save_chunk_relations(relations: Iterable[Relation], batch_size: int = 1000) -> int:
+    """
+    Write relations to the Chunk.related_chunks through-table.
+
+    Args:
+        relations: (from_chunk_id, to_chunk_id) pairs; both chunks must exist
+        batch_size: Rows per INSERT
+
+    Returns:
+        Number of relations submitted (existing ones are skipped by the database)
+    """
+    from rag_service.models import Chunk
+
+    Through = Chunk.related_chunks.through
+    rows = [
+        Through(from_chunk_id=from_id, to_chunk_id=to_id)
+        for from_id, to_id in sorted(set(relations))
+        if from_id != to_id
+    ]
+    if not rows:
+        return 0
+
+    Through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    logger.debug(f"Linked {len(rows)} chunk relations")
+    return len(rows)
@@ -1,6 +1,12 @@
 # rag_service/services/chunking/chunking_service.py
 
-from typing import Dict, List, Any, Optional
+import itertools
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+from .chunk_links import build_chunk_relations, save_chunk_relations
+from .text_chunker import PageInput, StreamingTextChunker, TokenCounter
 
 
 class ChunkingService:
@@ -9,20 +15,64 @@ class ChunkingService:
     Works with the unified_extractor ExtractionResponse format.
     """
     
-    def chunk_document(self, extraction_response: Dict[str, Any], document) -> List:
+    def __init__(
+        self,
+        target_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        encoding_name: Optional[str] = None
+    ):
+        """
+        Args:
+            target_tokens: Token budget per text chunk
+                (defaults to RAG_SETTINGS['DOCUMENTS']['CHUNK_TARGET_TOKENS'])
+            overlap_tokens: Tokens of context repeated between text chunks
+                (defaults to RAG_SETTINGS['DOCUMENTS']['CHUNK_OVERLAP_TOKENS'])
+            encoding_name: tiktoken encoding used for token counts
+                (defaults to RAG_SETTINGS['DOCUMENTS']['TOKENIZER_ENCODING'])
+        """
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('DOCUMENTS', {})
+        
+        self.token_counter = TokenCounter(
+            encoding_name or config.get('TOKENIZER_ENCODING', 'cl100k_base')
+        )
+        self.text_chunker = StreamingTextChunker(
+            target_tokens=target_tokens or config.get('CHUNK_TARGET_TOKENS', 512),
+            overlap_tokens=(
+                overlap_tokens if overlap_tokens is not None
+                else config.get('CHUNK_OVERLAP_TOKENS', 64)
+            ),
+            token_counter=self.token_counter
+        )
+        self.similarity_top_k = config.get('SIMILARITY_LINK_TOP_K', 0)
+        self.similarity_threshold = config.get('SIMILARITY_LINK_THRESHOLD', 0.8)
+        self.pending_relations = set()
+    
+    def chunk_document(
+        self,
+        extraction_response: Dict[str, Any],
+        document,
+        start_index: int = 0,
+        page_bounded: bool = False
+    ) -> List:
         """
         Main entry point: route to appropriate chunking strategy.
         
         Args:
             extraction_response: The response from document_processor.process_file()
                                 Contains: text, tables, layout_blocks, entities, metadata
+                                and pages (page dicts or (page_number, text) tuples,
+                                possibly a generator)
             document: The Document model instance to associate chunks with
+            start_index: Index of the first chunk (incremental re-ingest appends
+                after the chunks kept from the previous revision)
+            page_bounded: Never let a text chunk span two pages, so a page's
+                chunks can later be replaced without touching its neighbours
             
         Returns:
             List[Chunk]: List of created document chunks
         """
         chunks = []
-        chunk_index = 0
+        chunk_index = start_index
         
         # Extract data from the unified extractor response format
         tables = extraction_response.get('tables', [])
@@ -58,8 +108,18 @@ class ChunkingService:
             chunks.extend(visual_chunks)
             chunk_index += len(visual_chunks)
         
-        # 4. Chunk text content if available
-        if text_content:
+        # 4. Chunk text content if available (per page when the extractor
+        # provides page text, so chunks keep their page numbers). Pages may
+        # be a generator; they are read one at a time
+        pages = self._iter_page_texts(extraction_response.get('pages') or [])
+        first_page = next(pages, None)
+        if first_page is not None:
+            text_chunks = list(self.iter_text_chunks(
+                itertools.chain([first_page], pages), chunk_index, document, page_bounded
+            ))
+            chunks.extend(text_chunks)
+            chunk_index += len(text_chunks)
+        elif text_content:
             text_chunks = self._chunk_text_content(
                 text_content,
                 chunk_index,
@@ -74,6 +134,15 @@ class ChunkingService:
         return chunks
     
     
+    def _iter_page_texts(self, pages: Iterable) -> Iterator[Tuple[int, str]]:
+        """(page_number, text) for each page with text; pages are dicts or tuples"""
+        for i, page in enumerate(pages):
+            if isinstance(page, dict):
+                page = (page.get('page_number', i + 1), page.get('text'))
+            if page[1]:
+                yield page
+    
+    
     def _has_drawing_metadata(self, metadata: Dict) -> bool:
         """Check if metadata contains drawing-specific information."""
         drawing_fields = ['drawing_number', 'drawing_title', 'drawing_type', 'revision']
@@ -101,6 +170,7 @@ class ChunkingService:
                     'count': block.get('count', 1),
                     'zone': block.get('zone', ''),
                     'cluster_center': block.get('center', {}),
+                    'page_number': block.get('page_number', block.get('page')),
                     'elements': block.get('elements', [block]),  # Wrap single element in list
                     'spatial_description': block.get('description', block.get('text', ''))
                 })
@@ -132,7 +202,7 @@ class ChunkingService:
             "contains_specs": True,
             "column_headers": table_data.get("headers", []),
             "row_count": len(table_data.get("rows", [])),
-            "page_number": table_data.get("page_number"),
+            "page_number": table_data.get("page_number", table_data.get("page")),
             "bounding_box": table_data.get("bounding_box"),
             "element_types": table_data.get("element_types_to_count", []),
             "searchable_terms": self._extract_searchable_terms(table_data),
@@ -146,6 +216,7 @@ class ChunkingService:
             chunk_index=chunk_index,
             chunk_type='table',
             content=content,
+            page_number=metadata["page_number"],
             metadata=metadata,
             token_count=self._estimate_tokens(content)
         )
@@ -235,6 +306,7 @@ class ChunkingService:
                 "element_type": group.get("element_type"),
                 "element_count": group.get("count"),
                 "zone": group.get("zone"),
+                "page_number": group.get("page_number"),
                 "quadrant": self._determine_quadrant(group.get("cluster_center")),
                 
                 # Spatial information
@@ -261,6 +333,7 @@ class ChunkingService:
                 chunk_index=start_index + i,
                 chunk_type='visual_element_group',
                 content=content,
+                page_number=group.get("page_number"),
                 metadata=metadata,
                 token_count=self._estimate_tokens(content)
             )
@@ -270,67 +343,78 @@ class ChunkingService:
         return chunks
     
     
-    def _chunk_text_content(self, text_content: str, start_index: int, document) -> List:
+    def iter_text_chunks(
+        self,
+        pages: Iterable[PageInput],
+        start_index: int,
+        document,
+        page_bounded: bool = False
+    ) -> Iterator:
         """
-        Chunk text content using a sliding window approach.
+        Stream text chunks from a page generator.
+        
+        Chunks split on headings, paragraphs, table rows and sentences and are
+        sized with the tokenizer against the configured token target. Each
+        chunk is yielded as soon as it is complete, so callers can embed and
+        save in batches while later pages are still being read.
         
         Args:
-            text_content: Raw text content to chunk
+            pages: Page texts, or (page_number, text) tuples (e.g. a generator)
             start_index: Starting index for chunks
             document: Document model instance
+            page_bounded: Chunk each page on its own instead of packing
+                across page breaks
             
-        Returns:
-            List[Chunk]: List of text chunks
+        Yields:
+            Chunk: Unsaved text chunks in document order
         """
         from rag_service.models import Chunk
         
-        # Simple chunking parameters
-        chunk_size = 1000  # characters
-        chunk_overlap = 200  # characters
-        
-        chunks = []
-        text_length = len(text_content)
-        
-        # Skip if text is too short
-        if text_length < 100:
-            return []
+        if page_bounded:
+            text_chunks = (
+                text_chunk
+                for page in pages
+                for text_chunk in self.text_chunker.iter_chunks([page])
+            )
+        else:
+            text_chunks = self.text_chunker.iter_chunks(pages)
         
-        # Create chunks with overlap
-        i = 0
-        chunk_count = 0
-        while i < text_length:
-            # Calculate chunk boundaries
-            end = min(i + chunk_size, text_length)
-            
-            # Extract chunk text
-            chunk_text = text_content[i:end]
-            
-            # Create chunk
-            chunk = Chunk(
+        for position, text_chunk in enumerate(text_chunks):
+            yield Chunk(
                 document=document,
-                chunk_index=start_index + chunk_count,
+                chunk_index=start_index + position,
                 chunk_type='text',
-                content=chunk_text,
+                content=text_chunk.content,
+                page_number=text_chunk.page_start,
                 metadata={
                     "chunk_type": "text",
-                    "position": chunk_count,
-                    "start_char": i,
-                    "end_char": end,
+                    "position": position,
+                    "page_start": text_chunk.page_start,
+                    "page_end": text_chunk.page_end,
+                    "section": text_chunk.section,
+                    "contains_table_rows": 'table_row' in text_chunk.unit_types,
                 },
-                token_count=self._estimate_tokens(chunk_text)
+                token_count=text_chunk.token_count
             )
+    
+    
+    def _chunk_text_content(self, text_content: str, start_index: int, document) -> List:
+        """
+        Chunk text content on structural boundaries with token-accurate sizing.
+        
+        Args:
+            text_content: Raw text content to chunk
+            start_index: Starting index for chunks
+            document: Document model instance
             
-            chunks.append(chunk)
-            chunk_count += 1
-            
-            # Move to next chunk with overlap
-            i += (chunk_size - chunk_overlap)
-            
-            # Ensure we don't create tiny chunks at the end
-            if i < text_length and (text_length - i) < chunk_overlap:
-                break
+        Returns:
+            List[Chunk]: List of text chunks
+        """
+        # Skip if text is too short
+        if len(text_content.strip()) < 100:
+            return []
         
-        return chunks
+        return list(self.iter_text_chunks([text_content], start_index, document))
     
     
     def _link_chunks(self, chunks: List, extraction_response: Dict[str, Any]):
@@ -339,7 +423,11 @@ class ChunkingService:
         
         Critical linkages:
         - Schedule tables → Visual element groups (validate counts)
-        - Metadata → All chunks (document context)
+        - Neighbouring, same-page and same-section chunks
+        - Optionally, the most similar chunks by embedding
+        
+        Relations are collected in self.pending_relations and written by
+        save_relations() (immediately if the chunks are already saved).
         
         Args:
             chunks: List of created chunks
@@ -381,11 +469,44 @@ class ChunkingService:
                     visual_chunk.metadata["validation_status"] = (
                         "match" if actual_count == required_qty else "mismatch"
                     )
-                    
-                    # Create bidirectional relationship after saving
-                    if hasattr(visual_chunk, 'id') and visual_chunk.id and hasattr(schedule_chunk, 'id') and schedule_chunk.id:
-                        visual_chunk.related_chunks.add(schedule_chunk)
-                        schedule_chunk.related_chunks.add(visual_chunk)
+        
+        # Adjacency, page, section, schedule (and optional similarity) links,
+        # written in bulk once the chunks exist in the database
+        self.pending_relations = build_chunk_relations(
+            chunks,
+            similarity_top_k=self.similarity_top_k,
+            similarity_threshold=self.similarity_threshold
+        )
+        if chunks and all(not chunk._state.adding for chunk in chunks):
+            self.save_relations()
+    
+    
+    def save_relations(self, chunks: Optional[List] = None, embeddings=None) -> int:
+        """
+        Write chunk relations with a single bulk insert into the through-table.
+        
+        Call after the chunks returned by chunk_document() have been saved.
+        Passing chunks recomputes the relations, e.g. to add similarity links
+        once embeddings are available.
+        
+        Args:
+            chunks: Saved chunks to recompute relations for (optional)
+            embeddings: (n, d) embeddings aligned with chunks (optional)
+            
+        Returns:
+            int: Number of relations written
+        """
+        if chunks is not None:
+            self.pending_relations = build_chunk_relations(
+                chunks,
+                embeddings=embeddings,
+                similarity_top_k=self.similarity_top_k,
+                similarity_threshold=self.similarity_threshold
+            )
+        
+        written = save_chunk_relations(self.pending_relations)
+        self.pending_relations = set()
+        return written
     
     
     # Helper methods
@@ -506,8 +627,8 @@ class ChunkingService:
     
     
     def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation)."""
-        return int(len(text.split()) * 1.3)  # Rough estimate
+        """Count tokens with the configured tokenizer (estimated if unavailable)."""
+        return self.token_counter.count(text)
     
     
     def _table_has_quantities(self, table_data: Dict) -> bool:
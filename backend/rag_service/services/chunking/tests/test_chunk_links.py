@@ -0,0 +1,90 @@
+# chunking/tests/test_chunk_links.py
+"""
+Tests for bulk chunk relation linking
+"""
+
+import uuid
+
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase, Document, Chunk
+from rag_service.services.chunking.chunk_links import top_k_similar_pairs
+from rag_service.services.chunking.chunking_service import ChunkingService
+
+
+class TestTopKSimilarPairs(SimpleTestCase):
+    """Test vectorized similarity linking"""
+
+    def test_top_k_and_threshold(self):
+        """Test each chunk links to its nearest neighbours above the threshold"""
+        ids = ['a', 'b', 'c', 'd']
+        embeddings = np.array([
+            [1.0, 0.0],
+            [0.9, 0.1],
+            [0.0, 1.0],
+            [0.1, 0.9],
+        ])
+
+        pairs = top_k_similar_pairs(ids, embeddings, top_k=1, threshold=0.8, block_size=3)
+
+        assert pairs == {('a', 'b'), ('b', 'a'), ('c', 'd'), ('d', 'c')}
+
+    def test_never_links_to_self(self):
+        """Test identical embeddings do not produce self links"""
+        pairs = top_k_similar_pairs(['a', 'b'], np.ones((2, 4)), top_k=5, threshold=0.0)
+
+        assert pairs == {('a', 'b'), ('b', 'a')}
+
+
+class TestChunkLinking(TransactionTestCase):
+    """Test ChunkingService relations are written in one bulk insert"""
+
+    def setUp(self):
+        """Set up a saved document with text chunks over two pages"""
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        knowledge_base = KnowledgeBase.objects.create(organization=organization, name='Test KB')
+        self.document = Document.objects.create(knowledge_base=knowledge_base, title='Test Document')
+        self.chunks = [
+            Chunk.objects.create(
+                document=self.document,
+                chunk_index=i,
+                content=f'Chunk {i}',
+                embedding_model='test',
+                embedding_vector_id=f'{self.document.id}_{i}',
+                page_number=1 if i < 3 else 2,
+                metadata={'section': 'GENERAL NOTES' if i < 4 else 'FOOTINGS'}
+            )
+            for i in range(6)
+        ]
+
+    def test_relations_written_in_single_insert(self):
+        """Test adjacency, page and section links are deduplicated and bulk inserted"""
+        service = ChunkingService()
+
+        with CaptureQueriesContext(connection) as queries:
+            written = service.save_relations(self.chunks)
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        assert len(inserts) == 1
+        assert written == Chunk.related_chunks.through.objects.count()
+
+        first, second, third, fourth = self.chunks[:4]
+        assert set(first.related_chunks.all()) == {second, third, fourth}
+        assert set(fourth.related_chunks.all()) == {first, second, third, self.chunks[4], self.chunks[5]}
+
+    def test_saving_twice_ignores_existing_relations(self):
+        """Test re-linking saved chunks does not fail or duplicate rows"""
+        service = ChunkingService()
+        service._link_chunks(self.chunks, {})
+        count = Chunk.related_chunks.through.objects.count()
+
+        service.save_relations(self.chunks)
+
+        assert Chunk.related_chunks.through.objects.count() == count
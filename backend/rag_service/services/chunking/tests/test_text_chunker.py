@@ -0,0 +1,165 @@
+# chunking/tests/test_text_chunker.py
+"""
+Tests for the streaming token-accurate text chunker
+"""
+
+from django.test import SimpleTestCase
+
+from rag_service.services.chunking.chunking_service import ChunkingService
+from rag_service.services.chunking.text_chunker import StreamingTextChunker, TokenCounter
+
+
+class WhitespaceTokenizer:
+    """One token per whitespace-separated word, with tiktoken's encode/decode shape"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+def make_chunker(target_tokens=20, overlap_tokens=0):
+    return StreamingTextChunker(
+        target_tokens=target_tokens,
+        overlap_tokens=overlap_tokens,
+        tokenizer=WhitespaceTokenizer()
+    )
+
+
+def sentences(count, words=5, prefix='Word'):
+    return ' '.join(
+        f"{prefix}{i} " + ' '.join(['alpha'] * (words - 2)) + ' end.'
+        for i in range(count)
+    )
+
+
+class TestStreamingTextChunker(SimpleTestCase):
+    """Test StreamingTextChunker packing rules"""
+
+    def test_chunks_respect_token_target(self):
+        """Test no chunk exceeds the target and long paragraphs split on sentences"""
+        chunker = make_chunker(target_tokens=20)
+
+        chunks = list(chunker.iter_chunks([sentences(12)]))
+
+        assert len(chunks) > 1
+        assert all(chunk.token_count <= 20 for chunk in chunks)
+        assert all(chunk.content.endswith('end.') for chunk in chunks)
+
+    def test_oversized_sentence_is_hard_split(self):
+        """Test a single sentence longer than the target is cut by tokens"""
+        chunker = make_chunker(target_tokens=10)
+
+        chunks = list(chunker.iter_chunks([' '.join(['x'] * 35)]))
+
+        assert all(chunk.token_count <= 10 for chunk in chunks)
+        assert sum(chunk.token_count for chunk in chunks) == 35
+
+    def test_headings_start_chunks_and_set_section(self):
+        """Test headings flush the current chunk and label the following ones"""
+        chunker = make_chunker(target_tokens=50)
+        page = (
+            "GENERAL NOTES\n\nAll dimensions in millimetres.\n\n"
+            "3.2 Footings\n\nFootings bear on rock with 200kPa capacity."
+        )
+
+        chunks = list(chunker.iter_chunks([page]))
+
+        assert [chunk.section for chunk in chunks] == ['GENERAL NOTES', '3.2 Footings']
+        assert chunks[0].content.startswith('GENERAL NOTES')
+        assert chunks[1].content.startswith('3.2 Footings')
+
+    def test_table_header_repeats_when_table_continues(self):
+        """Test table rows stay whole and a continued table repeats its header"""
+        chunker = make_chunker(target_tokens=16)
+        rows = ['| Mark | Size | Qty |'] + [f'| F{i} | 1200x1200 | {i} |' for i in range(6)]
+
+        chunks = list(chunker.iter_chunks(['\n'.join(rows)]))
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.content.startswith('| Mark | Size | Qty |')
+            assert 'table_row' in chunk.unit_types
+        body = [line for chunk in chunks for line in chunk.content.split('\n')[1:]]
+        assert body == rows[1:]
+
+    def test_overlap_carries_trailing_units(self):
+        """Test consecutive chunks share whole trailing units up to the overlap"""
+        chunker = make_chunker(target_tokens=20, overlap_tokens=5)
+
+        chunks = list(chunker.iter_chunks([sentences(8)]))
+
+        for previous, following in zip(chunks, chunks[1:]):
+            last_sentence = previous.content.split('. ')[-1]
+            assert following.content.startswith(last_sentence.rstrip('.'))
+
+    def test_page_numbers_and_lazy_consumption(self):
+        """Test chunks track page ranges and pages are pulled on demand"""
+        chunker = make_chunker(target_tokens=12)
+        consumed = []
+
+        def pages():
+            for number in range(1, 6):
+                consumed.append(number)
+                yield number, sentences(2, prefix=f'P{number}w')
+
+        stream = chunker.iter_chunks(pages())
+        first = next(stream)
+
+        assert first.page_start == 1
+        assert consumed == [1, 2]
+        rest = list(stream)
+        assert consumed == [1, 2, 3, 4, 5]
+        assert rest[-1].page_end == 5
+        assert all(c.page_start <= c.page_end for c in [first] + rest)
+
+    def test_estimates_without_tokenizer(self):
+        """Test the counter falls back to word-based estimates"""
+        counter = TokenCounter(tokenizer=None)
+        counter.tokenizer = None
+
+        assert counter.count('one two three four five six seven eight nine ten') == 13
+        assert not counter.is_exact
+
+
+class TestChunkingServiceText(SimpleTestCase):
+    """Test ChunkingService text chunking on top of StreamingTextChunker"""
+
+    def test_iter_text_chunks_builds_chunk_models(self):
+        """Test text chunks carry page numbers, section and exact token counts"""
+        service = ChunkingService(target_tokens=30, overlap_tokens=0)
+        service.token_counter = TokenCounter(tokenizer=WhitespaceTokenizer())
+        service.text_chunker = StreamingTextChunker(
+            target_tokens=30, overlap_tokens=0, token_counter=service.token_counter
+        )
+
+        chunks = list(service.iter_text_chunks(
+            [(3, "SCOPE OF WORK\n\n" + sentences(3)), (4, sentences(6))],
+            start_index=5,
+            document=None
+        ))
+
+        assert [chunk.chunk_index for chunk in chunks] == list(range(5, 5 + len(chunks)))
+        assert chunks[0].page_number == 3
+        assert chunks[0].metadata['section'] == 'SCOPE OF WORK'
+        assert chunks[-1].metadata['page_end'] == 4
+        assert all(chunk.token_count == len(chunk.content.split()) for chunk in chunks)
+
+    def test_chunk_document_reads_page_generator(self):
+        """Test chunk_document chunks pages streamed as (page_number, text) rows"""
+        service = ChunkingService(target_tokens=30, overlap_tokens=0)
+        service.token_counter = TokenCounter(tokenizer=WhitespaceTokenizer())
+        service.text_chunker = StreamingTextChunker(
+            target_tokens=30, overlap_tokens=0, token_counter=service.token_counter
+        )
+
+        def rows():
+            yield 1, sentences(3)
+            yield 2, ''
+            yield 3, sentences(3)
+
+        chunks = service.chunk_document({'text': '', 'pages': rows()}, document=None)
+
+        assert {chunk.page_number for chunk in chunks} == {1, 3}
+        assert not service.chunk_document({'text': '', 'pages': iter([(1, '')])}, document=None)
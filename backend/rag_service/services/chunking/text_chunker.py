@@ -0,0 +1,301 @@
+# rag_service/services/chunking/text_chunker.py
+"""
+Streaming, token-accurate text chunker.
+
+Consumes page text one page at a time, splits it on structural boundaries
+(headings, paragraphs, table rows, sentences) and packs the pieces into chunks
+sized against a token target measured with a real tokenizer. Chunks are
+yielded as soon as they are full, so callers can start embedding before the
+whole document is chunked and memory stays proportional to one page.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+PageInput = Union[str, Tuple[int, str]]
+
+# Markdown headings, dotted section numbers ("3.2 Footings") and short
+# multi-word all-caps title lines ("GENERAL NOTES", "1 SCOPE OF WORK")
+_HEADING_PATTERN = re.compile(
+    r'^(#{1,6}\s+\S.*'
+    r'|\d+(\.\d+)+\.?\s+[A-Z][^.!?]{0,60}'
+    r'|(\d+\s+)?[A-Z][A-Z0-9&/,()\-]*(\s+[A-Z0-9&/,()\-]+){1,7}:?)$'
+)
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;:])\s+(?=[A-Z0-9(\[])')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(encoding_name: str = 'cl100k_base'):
+    """
+    Load a tiktoken encoding once per process.
+
+    cl100k_base tracks Voyage's tokenizer closely enough for chunk sizing.
+
+    Args:
+        encoding_name: tiktoken encoding name
+
+    Returns:
+        tiktoken Encoding, or None if tiktoken or the encoding is unavailable
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {encoding_name} unavailable, estimating token counts: {e}")
+        return None
+
+
+class TokenCounter:
+    """Counts tokens with a tiktoken-compatible encoder, or estimates without one"""
+
+    def __init__(self, encoding_name: str = 'cl100k_base', tokenizer=None):
+        """
+        Args:
+            encoding_name: tiktoken encoding to load when no tokenizer is given
+            tokenizer: Object with encode()/decode() (overrides encoding_name)
+        """
+        self.tokenizer = tokenizer if tokenizer is not None else get_tokenizer(encoding_name)
+
+    @property
+    def is_exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, disallowed_special=()))
+        return int(len(text.split()) * 1.3)
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """Hard-split text into pieces of at most max_tokens tokens"""
+        if self.tokenizer is not None:
+            tokens = self.tokenizer.encode(text, disallowed_special=())
+            return [
+                self.tokenizer.decode(tokens[start:start + max_tokens])
+                for start in range(0, len(tokens), max_tokens)
+            ]
+
+        words = text.split()
+        words_per_piece = max(1, int(max_tokens / 1.3))
+        return [
+            ' '.join(words[start:start + words_per_piece])
+            for start in range(0, len(words), words_per_piece)
+        ]
+
+
+@dataclass
+class TextChunk:
+    """A chunk of text produced by StreamingTextChunker"""
+    content: str
+    token_count: int
+    page_start: Optional[int]
+    page_end: Optional[int]
+    section: Optional[str] = None
+    unit_types: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Unit:
+    """Smallest piece the chunker moves around (heading, sentence, table row...)"""
+    text: str
+    tokens: int
+    kind: str  # 'heading', 'text', 'table_row'
+    page: Optional[int]
+    joiner: str = '\n\n'  # separator before this unit inside a chunk
+    table_header: Optional['_Unit'] = None
+
+
+class StreamingTextChunker:
+    """
+    Token-accurate chunker over a stream of pages.
+
+    Packing rules:
+    - Units are never cut unless a single sentence or row exceeds the target
+    - A heading starts a new chunk and is carried as the chunk's section
+    - Table rows stay whole; a table continuing into a new chunk repeats its
+      header row
+    - Consecutive chunks overlap by whole trailing units up to overlap_tokens
+    """
+
+    def __init__(
+        self,
+        target_tokens: int = 512,
+        overlap_tokens: int = 64,
+        encoding_name: str = 'cl100k_base',
+        tokenizer=None,
+        token_counter: Optional[TokenCounter] = None
+    ):
+        """
+        Args:
+            target_tokens: Maximum tokens per chunk
+            overlap_tokens: Tokens of trailing context repeated in the next chunk
+            encoding_name: tiktoken encoding used to count tokens
+            tokenizer: Optional encoder overriding encoding_name
+            token_counter: Optional pre-built TokenCounter
+        """
+        if target_tokens <= 0:
+            raise ValueError("target_tokens must be positive")
+        self.target_tokens = target_tokens
+        self.overlap_tokens = max(0, min(overlap_tokens, target_tokens // 2))
+        self.counter = token_counter or TokenCounter(encoding_name, tokenizer)
+
+    def iter_chunks(self, pages: Iterable[PageInput]) -> Iterator[TextChunk]:
+        """
+        Chunk a stream of pages.
+
+        Args:
+            pages: Page texts, or (page_number, text) tuples
+
+        Yields:
+            TextChunk objects in document order
+        """
+        current: List[_Unit] = []
+        current_tokens = 0
+        section: Optional[str] = None
+        chunk_section: Optional[str] = None
+
+        for page_number, text in self._numbered(pages):
+            for unit in self._iter_units(text, page_number):
+                if unit.kind == 'heading':
+                    if self._has_body(current):
+                        yield self._build(current, chunk_section)
+                        current, current_tokens = [], 0
+                    section = unit.text.lstrip('#').strip()
+
+                # +1 per unit budgets for the separator joining it
+                if current_tokens + unit.tokens + 1 > self.target_tokens and self._has_body(current):
+                    yield self._build(current, chunk_section)
+                    current = self._overlap(current)
+                    if unit.table_header is not None and unit.table_header not in current:
+                        current = self._with_table_header(current, unit.table_header)
+                    current_tokens = sum(u.tokens + 1 for u in current)
+                    # Carried context must never push the next unit over the target
+                    while current and current_tokens + unit.tokens + 1 > self.target_tokens:
+                        current_tokens -= current.pop(0).tokens + 1
+
+                if not current:
+                    chunk_section = section
+                current.append(unit)
+                current_tokens += unit.tokens + 1
+
+        if self._has_body(current):
+            yield self._build(current, chunk_section)
+
+    # Segmentation
+
+    def _numbered(self, pages: Iterable[PageInput]) -> Iterator[Tuple[Optional[int], str]]:
+        for index, page in enumerate(pages, start=1):
+            if isinstance(page, tuple):
+                yield page[0], page[1] or ''
+            else:
+                yield index, page or ''
+
+    def _iter_units(self, text: str, page: Optional[int]) -> Iterator[_Unit]:
+        """Split one page into headings, table rows and sentence-sized units"""
+        for block in _BLANK_LINES.split(text):
+            lines = [line.rstrip() for line in block.strip('\n').split('\n') if line.strip()]
+            if not lines:
+                continue
+
+            # Leading heading line(s), e.g. "SECTION 03 30 00" above a paragraph
+            while lines and self._is_heading(lines[0]):
+                heading = lines.pop(0).strip()
+                yield _Unit(heading, self.counter.count(heading), 'heading', page)
+            if not lines:
+                continue
+
+            if self._is_table(lines):
+                header = None
+                for i, line in enumerate(lines):
+                    row = _Unit(line.strip(), self.counter.count(line), 'table_row', page,
+                                joiner='\n\n' if i == 0 else '\n')
+                    if i == 0:
+                        header = row
+                    else:
+                        row.table_header = header
+                    if row.tokens > self.target_tokens:
+                        yield from self._hard_split(row)
+                    else:
+                        yield row
+                continue
+
+            paragraph = ' '.join(line.strip() for line in lines)
+            tokens = self.counter.count(paragraph)
+            if tokens <= self.target_tokens:
+                yield _Unit(paragraph, tokens, 'text', page)
+                continue
+
+            for i, sentence in enumerate(_SENTENCE_BOUNDARY.split(paragraph)):
+                unit = _Unit(sentence, self.counter.count(sentence), 'text', page,
+                             joiner='\n\n' if i == 0 else ' ')
+                if unit.tokens > self.target_tokens:
+                    yield from self._hard_split(unit)
+                else:
+                    yield unit
+
+    def _hard_split(self, unit: _Unit) -> Iterator[_Unit]:
+        for i, piece in enumerate(self.counter.split(unit.text, self.target_tokens - 1)):
+            if piece.strip():
+                yield _Unit(piece, self.counter.count(piece), unit.kind, unit.page,
+                            joiner=unit.joiner if i == 0 else ' ')
+
+    @staticmethod
+    def _is_heading(line: str) -> bool:
+        stripped = line.strip()
+        return bool(stripped) and bool(_HEADING_PATTERN.match(stripped)) and any(c.isalpha() for c in stripped)
+
+    @staticmethod
+    def _is_table(lines: List[str]) -> bool:
+        """Most lines have 2+ pipe/tab/wide-space separated cells"""
+        if len(lines) < 2:
+            return False
+        cell_rows = sum(
+            1 for line in lines
+            if line.count('|') >= 2 or line.count('\t') >= 1 or len(re.findall(r'\S {3,}\S', line)) >= 1
+        )
+        return cell_rows >= max(2, int(len(lines) * 0.6))
+
+    # Packing
+
+    @staticmethod
+    def _has_body(units: List[_Unit]) -> bool:
+        return any(u.kind != 'heading' for u in units)
+
+    def _overlap(self, units: List[_Unit]) -> List[_Unit]:
+        """Trailing whole units (excluding headings) that fit in overlap_tokens"""
+        carried, tokens = [], 0
+        for unit in reversed(units):
+            if unit.kind == 'heading' or tokens + unit.tokens > self.overlap_tokens:
+                break
+            carried.insert(0, unit)
+            tokens += unit.tokens
+        return carried
+
+    @staticmethod
+    def _with_table_header(units: List[_Unit], header: _Unit) -> List[_Unit]:
+        """Insert a continued table's header row before its first carried row"""
+        for i, unit in enumerate(units):
+            if unit.kind == 'table_row':
+                return units[:i] + [header] + units[i:]
+        return units + [header]
+
+    def _build(self, units: List[_Unit], section: Optional[str]) -> TextChunk:
+        content = units[0].text + ''.join(unit.joiner + unit.text for unit in units[1:])
+
+        pages = [u.page for u in units if u.page is not None]
+        return TextChunk(
+            content=content,
+            token_count=self.counter.count(content),
+            page_start=min(pages) if pages else None,
+            page_end=max(pages) if pages else None,
+            section=section,
+            unit_types=sorted({u.kind for u in units}),
+        )
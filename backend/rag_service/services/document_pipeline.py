@@ -15,17 +15,23 @@ import os
 import uuid
 import logging
 import asyncio
-from typing import Dict, Any, Optional, BinaryIO, List, Union
+from typing import Dict, Any, Optional, BinaryIO, List, Tuple, Union
 from pathlib import Path
 from datetime import datetime
 
 from django.utils import timezone
 from django.db import transaction
-from asgiref.sync import sync_to_async
 
 from .extraction.text import TextExtractor, TextExtractorConfig, detect_file_type
+from .extraction.image_processor import run_in_render_thread
 from .extraction.layout_analyzer import LayoutAnalyzer
 from .extraction.table_extractor import TableExtractor, TableExtractionMethod
+from .extraction.page_fingerprint import (
+    PageDiff,
+    PageFingerprint,
+    diff_page_fingerprints,
+    fingerprint_pdf_pages,
+)
 from .storage_retrieval.document_store import DocumentStore
 
 logger = logging.getLogger(__name__)
@@ -64,11 +70,17 @@ class DocumentPipeline:
         description: Optional[str] = None,
         document_id: Optional[str] = None,
         created_by_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        incremental: bool = True
     ) -> Dict[str, Any]:
         """
         Process a document end-to-end using rule-based extraction.
         
+        PDF pages are fingerprinted (text hash plus drawing-operator hash).
+        When an existing document_id is re-ingested, the new revision is
+        fingerprinted first and text, layout and tables are extracted and
+        pages rewritten only for pages whose fingerprints changed.
+        
         Args:
             file_path: Path to the document file
             knowledge_base_id: ID of the knowledge base to store the document in
@@ -77,9 +89,12 @@ class DocumentPipeline:
             document_id: Document ID (optional, will generate if not provided)
             created_by_id: ID of the user who created the document (optional)
             metadata: Additional metadata (optional)
+            incremental: Compare with the stored revision of document_id and
+                skip unchanged pages
             
         Returns:
-            Dictionary with processing results
+            Dictionary with processing results; a re-ingest adds an
+            'incremental' summary of the page diff (PageDiff.summary())
         """
         start_time = datetime.now()
         document_id = document_id or str(uuid.uuid4())
@@ -106,22 +121,43 @@ class DocumentPipeline:
             file_metadata.update(metadata)
         
         try:
+            # Compare a re-ingested PDF with its previous revision before
+            # extracting anything, so only changed pages are extracted
+            page_diff, fingerprints = None, None
+            if file_type == 'pdf' and incremental:
+                page_diff, fingerprints = await self._diff_revision(file_path, document_id)
+            pages_to_extract = page_diff.reprocess if page_diff is not None else None
+            
             # 1. Extract text using rule-based extraction
             logger.info(f"Extracting text from {file_path}")
-            extraction_result = await self._extract_text(file_path)
+            extraction_result = await self._extract_text(file_path, pages=pages_to_extract)
+            if file_type == 'pdf' and extraction_result.get('pages'):
+                await self._fingerprint_pages(file_path, extraction_result['pages'], fingerprints)
             
             # 2. Analyze document layout
             logger.info(f"Analyzing document layout")
-            layout_blocks = await self._analyze_layout(file_path)
+            if pages_to_extract == []:
+                layout_blocks = {'layout_blocks': [], 'layout_by_page': {}}
+            else:
+                layout_blocks = await self._analyze_layout(file_path, pages=pages_to_extract)
             
-            # 3. Extract tables
+            # 3. Extract tables (changed pages only on re-ingest)
             logger.info(f"Extracting tables")
-            tables = await self._extract_tables(file_path)
+            if pages_to_extract == []:
+                tables = {'tables': [], 'tables_by_page': {}}
+            else:
+                tables = await self._extract_tables(file_path, pages=pages_to_extract)
             
-            # 4. Prepare extraction response
+            # 4. Prepare extraction response (on re-ingest, 'pages' holds the
+            # changed pages only and store_extraction keeps the others)
             extraction_response = {
                 'text': extraction_result.get('text', ''),
                 'pages': extraction_result.get('pages', []),  # Include page-by-page text
+                'page_count': extraction_result.get('metadata', {}).get(
+                    'page_count', len(extraction_result.get('pages', []))
+                ),
+                'layout_blocks': layout_blocks.get('layout_blocks', []),
+                'tables': [_table_to_json(table) for table in tables.get('tables', [])],
                 'extraction_method': 'rule_based',
                 'model_used': 'rule_based',
                 'provider_used': 'local',
@@ -134,6 +170,7 @@ class DocumentPipeline:
             
             # 5. Store in PostgreSQL
             logger.info(f"Storing document {document_id} in database")
+            stored = False
             try:
                 # Enhance file metadata with document information
                 enhanced_metadata = {
@@ -145,26 +182,33 @@ class DocumentPipeline:
                 }
                 
                 # Store directly using document_store for error cases
-                await self.document_store.store_extraction(
+                stored = await self.document_store.store_extraction(
                     document_id=document_id,
                     extraction_response=extraction_response,
                     file_metadata=enhanced_metadata,
-                    knowledge_base_id=knowledge_base_id
+                    knowledge_base_id=knowledge_base_id,
+                    pages_to_update=page_diff.reprocess if page_diff is not None else None
                 )
             except Exception as store_error:
                 logger.error(f"Failed to store error information: {store_error}", exc_info=True)
+            if not stored:
+                raise RuntimeError(f"Failed to store extraction for document {document_id}")
             
             logger.info(f"Document processing completed for {file_path}")
-            return {
+            result = {
                 'document_id': document_id,
                 'knowledge_base_id': knowledge_base_id,
                 'title': title,
                 'status': 'completed',
                 'processing_time_ms': extraction_response['processing_time_ms'],
                 'text_length': len(extraction_response['text']),
-                'tables_count': len(tables),
-                'layout_blocks_count': len(layout_blocks)
+                'page_count': extraction_response['page_count'],
+                'tables_count': len(extraction_response['tables']),
+                'layout_blocks_count': len(extraction_response['layout_blocks'])
             }
+            if page_diff is not None:
+                result['incremental'] = page_diff.summary()
+            return result
             
         except Exception as e:
             logger.error(f"Error processing document {file_path}: {e}", exc_info=True)
@@ -212,11 +256,11 @@ class DocumentPipeline:
                 'processing_time_ms': error_response['processing_time_ms']
             }
     
-    async def _extract_text(self, file_path: str) -> Dict[str, Any]:
-        """Extract text using the TextExtractor service"""
+    async def _extract_text(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Extract text using the TextExtractor service (PDFs: only pages, if given)"""
         try:
-            # Use the existing TextExtractor service
-            extraction_result = self.text_extractor.extract(file_path)
+            # Use the existing TextExtractor service (PyMuPDF only runs on the render thread)
+            extraction_result = await run_in_render_thread(self.text_extractor.extract, file_path, pages)
             
             # Log the extraction result
             logger.info(f"Text extraction result keys: {extraction_result.keys()}")
@@ -240,13 +284,14 @@ class DocumentPipeline:
                 'warnings': [f"Text extraction failed: {str(e)}"]
             }
     
-    async def _analyze_layout(self, file_path: str) -> Dict[str, Any]:
+    async def _analyze_layout(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
         """Analyze document layout using the LayoutAnalyzer service"""
         try:
             # Use the existing LayoutAnalyzer service which now returns organized data
             layout_result = await self.layout_analyzer.analyze_layout(
                 file_path=file_path,
-                method='rule_based'
+                method='rule_based',
+                pages=pages
             )
             
             # Return the result directly since it's already organized
@@ -258,12 +303,64 @@ class DocumentPipeline:
                 'layout_by_page': {}
             }
     
-    async def _extract_tables(self, file_path: str) -> Dict[str, Any]:
+    async def _diff_revision(
+        self,
+        file_path: str,
+        document_id: str
+    ) -> Tuple[Optional[PageDiff], Optional[Dict[int, PageFingerprint]]]:
+        """
+        Fingerprint a PDF straight from the file and diff it against the
+        stored revision of document_id.
+        
+        Returns:
+            (PageDiff, fingerprints of the new revision), or (None, None) for a
+            new document or when fingerprinting fails (everything is extracted)
+        """
+        previous = await self.document_store.get_page_fingerprints(document_id)
+        if not previous:
+            return None, None
+        try:
+            # page.get_text() is the text TextExtractor stores, so text hashes compare
+            fingerprints = await run_in_render_thread(fingerprint_pdf_pages, file_path)
+        except Exception as e:
+            logger.warning(f"Page fingerprinting failed for {file_path}, re-extracting every page: {e}")
+            return None, None
+        
+        page_diff = diff_page_fingerprints(previous, fingerprints)
+        logger.info(f"Re-ingest of document {document_id}: {page_diff.summary()}")
+        return page_diff, fingerprints
+    
+    async def _fingerprint_pages(
+        self,
+        file_path: str,
+        pages: List[Dict[str, Any]],
+        fingerprints: Optional[Dict[int, PageFingerprint]] = None
+    ) -> None:
+        """Attach text_hash/graphics_hash to extracted page dicts"""
+        if fingerprints is None:
+            page_texts = {
+                page.get('page_number', i + 1): page.get('text', '')
+                for i, page in enumerate(pages)
+            }
+            try:
+                fingerprints = await run_in_render_thread(fingerprint_pdf_pages, file_path, page_texts)
+            except Exception as e:
+                logger.warning(f"Page fingerprinting failed for {file_path}: {e}")
+                return
+        
+        for i, page in enumerate(pages):
+            fingerprint = fingerprints.get(page.get('page_number', i + 1))
+            if fingerprint:
+                page['text_hash'] = fingerprint.text_hash
+                page['graphics_hash'] = fingerprint.graphics_hash
+    
+    async def _extract_tables(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
         """Extract tables using the TableExtractor service"""
         try:
             # Use the existing TableExtractor service which now returns organized data
             tables_result = await self.table_extractor.extract_tables(
-                file_path=file_path
+                file_path=file_path,
+                pages=pages
             )
             
             # Return the result directly since it's already organized
@@ -369,6 +466,20 @@ class DocumentPipeline:
     # Storage is now handled directly by calling document_store.store_extraction
 
 
+def _table_to_json(table: Dict[str, Any]) -> Dict[str, Any]:
+    """Table extractor output (DataFrame) as the JSON shape the chunker reads"""
+    data = table.get('data')
+    headers = [str(h) for h in data.columns.tolist()] if hasattr(data, 'columns') else table.get('headers', [])
+    rows = data.astype(str).values.tolist() if hasattr(data, 'values') else table.get('rows', [])
+    return {
+        'headers': headers,
+        'rows': rows,
+        'page_number': table.get('page_number', table.get('page')),
+        'caption': table.get('caption', ''),
+        'bounding_box': table.get('bbox'),
+    }
+
+
 # Command-line interface for testing
 if __name__ == "__main__":
     import django
@@ -28,6 +28,7 @@ class VoyageEmbeddingService:
         self.organization = organization
         self.model_name = model_name
         self._api_key = None
+        self._api_key_id = None
         self._api_key_source = None
         self._model_obj = None
         self._provider = None
@@ -38,11 +39,12 @@ class VoyageEmbeddingService:
             return
         
         # Get API key from ModelHub
-        api_key, source = await self._get_api_key()
-        if not api_key:
+        api_key_obj, source = await self._get_api_key()
+        if not api_key_obj:
             raise ValueError("No Voyage AI API key available. Please configure an API key in ModelHub.")
         
-        self._api_key = api_key
+        self._api_key = api_key_obj.key
+        self._api_key_id = api_key_obj.pk
         self._api_key_source = source
         
         # Get model configuration from ModelHub
@@ -56,8 +58,8 @@ class VoyageEmbeddingService:
         logger.info(f"Initialized Voyage embedding service: model={self.model_name}, source={source}")
     
     @database_sync_to_async
-    def _get_api_key(self) -> Tuple[Optional[str], str]:
-        """Get API key from ModelHub's APIKey model"""
+    def _get_api_key(self) -> Tuple[Optional[object], str]:
+        """Get the APIKey from ModelHub, with its source ('organization' or 'system')"""
         from modelhub.models import APIKey
         
         try:
@@ -73,7 +75,7 @@ class VoyageEmbeddingService:
                 ).first()
                 
                 if api_key_obj:
-                    return api_key_obj.key, 'organization'
+                    return api_key_obj, 'organization'
             
             # Fallback to system key
             api_key_obj = APIKey.objects.filter(
@@ -83,7 +85,7 @@ class VoyageEmbeddingService:
             ).first()
             
             if api_key_obj:
-                return api_key_obj.key, 'system'
+                return api_key_obj, 'system'
             
             return None, None
             
@@ -198,32 +200,15 @@ class VoyageEmbeddingService:
             logger.error(f"Error embedding query with Voyage AI: {e}")
             raise
     
-    @database_sync_to_async
-    def _log_usage(self, tokens_processed: int, cost: Decimal, latency_ms: int):
-        """Log embedding usage to ModelMetrics"""
-        from modelhub.models import ModelMetrics, APIKey
+    async def _log_usage(self, tokens_processed: int, cost: Decimal, latency_ms: int):
+        """Queue embedding usage for ModelMetrics (written in batches off the request path)"""
+        from modelhub.services.metrics_writer import arecord_metrics
         
         try:
-            # Get the API key object for tracking
-            api_key_obj = None
-            if self._api_key_source == 'organization' and self.organization:
-                api_key_obj = APIKey.objects.filter(
-                    organization=self.organization,
-                    provider__slug='voyage',
-                    is_active=True
-                ).first()
-            elif self._api_key_source == 'system':
-                api_key_obj = APIKey.objects.filter(
-                    organization__isnull=True,
-                    provider__slug='voyage',
-                    is_active=True
-                ).first()
-            
-            # Create metrics record
-            ModelMetrics.objects.create(
+            await arecord_metrics(
                 model=self._model_obj,
                 organization=self.organization,
-                api_key=api_key_obj,
+                api_key_id=self._api_key_id,
                 latency_ms=latency_ms,
                 tokens_input=tokens_processed,
                 tokens_output=0,  # Embeddings don't have output tokens
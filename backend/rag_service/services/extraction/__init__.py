@@ -18,6 +18,7 @@ from .document_processor import DocumentProcessor, create_document_processor
 from .base import BaseExtractor, ExtractionResult
 from .image_processor import ImageProcessor
 from .vision import VisionExtractor, VisionConfig
+from .page_scheduler import VisionPageScheduler
 from .layout_analyzer import LayoutAnalyzer, LayoutBlock, BlockType
 from .table_extractor import TableExtractor, TableExtractionMethod
 from .multi_task_prompts import ExtractionTask, MultiTaskPrompts, SpecializedPrompts
@@ -40,6 +41,7 @@ __all__ = [
     'ImageProcessor',
     'VisionExtractor',
     'VisionConfig',
+    'VisionPageScheduler',
     
     # Layout analysis
     'LayoutAnalyzer',
@@ -12,15 +12,51 @@ This module is used by the UnifiedExtractor to prepare images for LLM processing
 """
 
 import os
+import math
 import base64
+import asyncio
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Union, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .page_image_cache import file_content_hash, get_page_image_cache
 
 logger = logging.getLogger(__name__)
 
 
+# Largest image each provider accepts without rejecting or downscaling it
+# server-side; rendering beyond this only wastes memory and upload bandwidth
+PROVIDER_MAX_IMAGE_DIMENSIONS = {
+    'anthropic': (8000, 8000),
+    'openai': (2048, 2048),
+    'google': (3072, 3072),
+}
+
+
+# PyMuPDF is not thread-safe, even across separate documents: every PDF this
+# module opens is opened, rendered and closed on this one thread, and other
+# services that move PyMuPDF work off the event loop share it. Rendering
+# still overlaps with the event loop; parallelism comes from worker processes.
+render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-render')
+
+
+async def run_in_render_thread(func, *args):
+    """Run a PyMuPDF call on the render thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(render_executor, functools.partial(func, *args))
+
+
+def _pdf_page_count(file_path: str) -> int:
+    import fitz  # PyMuPDF
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+
 class ImageProcessor:
     """
     Handles image processing for vision-based extraction.
@@ -37,11 +73,14 @@ class ImageProcessor:
         
         Args:
             config: Configuration options
-                - dpi: DPI for rendering (default: 300)
+                - dpi: Maximum DPI for rendering (default: 300)
                 - max_width: Maximum image width (default: 2048)
                 - max_height: Maximum image height (default: 2048)
-                - format: Output format (default: 'jpeg')
-                - quality: JPEG quality (default: 90)
+                - format: Output format: 'jpeg', 'png' or 'webp' (default: 'jpeg')
+                - quality: JPEG/WebP quality (default: 90)
+                - color_mode: 'rgb' or 'gray' (default: 'rgb')
+                - use_cache: Reuse rendered pages from the page image cache
+                  (default: True)
         """
         self.config = config or {}
         self.dpi = self.config.get('dpi', 300)
@@ -49,98 +88,309 @@ class ImageProcessor:
         self.max_height = self.config.get('max_height', 2048)
         self.format = self.config.get('format', 'jpeg')
         self.quality = self.config.get('quality', 90)
+        self.color_mode = self.config.get('color_mode', 'rgb')
+        self.page_cache = get_page_image_cache() if self.config.get('use_cache', True) else None
     
-    async def convert_file_to_images(self, file_path: str) -> List[Dict[str, Any]]:
+    async def convert_file_to_images(
+        self,
+        file_path: str,
+        page_numbers: Optional[Sequence[int]] = None,
+        max_pages: Optional[int] = None,
+        max_dimensions: Optional[Tuple[int, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Convert a file to a list of images.
         
+        Only the requested pages are rendered. Prefer iter_page_images() when
+        the images can be consumed one at a time.
+        
         Args:
             file_path: Path to the file
+            page_numbers: 1-indexed pages to render (default: all)
+            max_pages: Maximum number of pages to render
+            max_dimensions: (width, height) limit of the target model
             
         Returns:
             List of image dictionaries with data and metadata
         """
+        return [
+            image async for image in self.iter_page_images(
+                file_path, page_numbers, max_pages, max_dimensions
+            )
+        ]
+    
+    async def iter_page_images(
+        self,
+        file_path: str,
+        page_numbers: Optional[Sequence[int]] = None,
+        max_pages: Optional[int] = None,
+        max_dimensions: Optional[Tuple[int, int]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lazily render a file's pages to images, one page at a time.
+        
+        Each page is rendered only when the consumer asks for it, at a DPI
+        chosen so the image fits the target dimensions, and its pixmap is
+        released as soon as it is encoded. Peak memory is one page.
+        
+        Args:
+            file_path: Path to the file
+            page_numbers: 1-indexed pages to render (default: all)
+            max_pages: Maximum number of pages to render
+            max_dimensions: (width, height) limit of the target model
+            
+        Yields:
+            Image dictionaries with data and metadata
+        """
         try:
             file_ext = Path(file_path).suffix.lower()
             
             if file_ext == '.pdf':
-                return await self._convert_pdf_to_images(file_path)
+                async for image in self._iter_pdf_images(file_path, page_numbers, max_pages, max_dimensions):
+                    yield image
             elif file_ext in ['.jpg', '.jpeg', '.png', '.webp', '.tiff', '.tif', '.bmp']:
-                return await self._process_image_file(file_path)
+                if page_numbers and 1 not in page_numbers:
+                    return
+                for image in await self._process_image_file(file_path, max_dimensions):
+                    yield image
             elif file_ext in ['.docx', '.doc']:
-                return await self._convert_docx_to_images(file_path)
+                for image in await self._convert_docx_to_images(file_path):
+                    yield image
             else:
                 logger.warning(f"Unsupported file format for image conversion: {file_ext}")
-                return []
                 
         except Exception as e:
             logger.error(f"Error converting file to images: {e}")
+    
+    async def select_pages(
+        self,
+        file_path: str,
+        page_numbers: Optional[Sequence[int]] = None,
+        max_pages: Optional[int] = None
+    ) -> List[int]:
+        """
+        Resolve which pages iter_page_images() would render, without rendering.
+        
+        Args:
+            file_path: Path to the file
+            page_numbers: 1-indexed pages requested (default: all)
+            max_pages: Maximum number of pages
+            
+        Returns:
+            Sorted list of existing 1-indexed page numbers
+        """
+        file_ext = Path(file_path).suffix.lower()
+        if file_ext == '.pdf':
+            try:
+                page_count = await run_in_render_thread(_pdf_page_count, file_path)
+            except Exception as e:
+                logger.error(f"Error reading PDF page count: {e}")
+                return []
+        elif file_ext in ['.jpg', '.jpeg', '.png', '.webp', '.tiff', '.tif', '.bmp']:
+            page_count = 1
+        else:
             return []
+        
+        return self._resolve_pages(page_count, page_numbers, max_pages)
     
-    async def _convert_pdf_to_images(self, file_path: str) -> List[Dict[str, Any]]:
+    def target_dimensions(self, provider_slug: Optional[str] = None) -> Tuple[int, int]:
         """
-        Convert PDF to images.
+        Maximum image (width, height) for a provider, capped by this processor's config.
         
         Args:
-            file_path: Path to PDF file
+            provider_slug: Provider the images are for (optional)
             
         Returns:
-            List of image dictionaries
+            (max_width, max_height) in pixels
+        """
+        provider_width, provider_height = PROVIDER_MAX_IMAGE_DIMENSIONS.get(
+            provider_slug, (self.max_width, self.max_height)
+        )
+        return min(self.max_width, provider_width), min(self.max_height, provider_height)
+    
+    def adaptive_dpi(
+        self,
+        page_width_pt: float,
+        page_height_pt: float,
+        max_dimensions: Optional[Tuple[int, int]] = None
+    ) -> float:
+        """
+        Highest DPI (up to the configured dpi) at which a page fits the target size.
+        
+        The target size wins over DPI: very large sheets may render below 72 DPI
+        rather than exceed what the model accepts.
+        
+        A 36x24in drawing sheet at 300 DPI would be 10800x7200 pixels; rendering
+        it directly at the DPI that fits avoids allocating the full-size
+        pixmap only to shrink it afterwards.
+        
+        Args:
+            page_width_pt: Page width in PDF points (1/72 inch)
+            page_height_pt: Page height in PDF points
+            max_dimensions: (width, height) limit (default: configured max)
+            
+        Returns:
+            DPI to render at
+        """
+        max_width, max_height = max_dimensions or (self.max_width, self.max_height)
+        if page_width_pt <= 0 or page_height_pt <= 0:
+            return float(self.dpi)
+        
+        fit_dpi = min(max_width * 72 / page_width_pt, max_height * 72 / page_height_pt)
+        # Round down so the rendered pixmap never overshoots by a pixel
+        return min(float(self.dpi), math.floor(fit_dpi * 100) / 100)
+    
+    @staticmethod
+    def _resolve_pages(
+        page_count: int,
+        page_numbers: Optional[Sequence[int]],
+        max_pages: Optional[int]
+    ) -> List[int]:
+        if page_numbers:
+            pages = sorted({p for p in page_numbers if 1 <= p <= page_count})
+        else:
+            pages = list(range(1, page_count + 1))
+        return pages[:max_pages] if max_pages is not None else pages
+    
+    async def _iter_pdf_images(
+        self,
+        file_path: str,
+        page_numbers: Optional[Sequence[int]],
+        max_pages: Optional[int],
+        max_dimensions: Optional[Tuple[int, int]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Render the selected PDF pages one at a time.
+        
+        Args:
+            file_path: Path to PDF file
+            page_numbers: 1-indexed pages to render (default: all)
+            max_pages: Maximum number of pages to render
+            max_dimensions: (width, height) limit of the target model
+            
+        Yields:
+            Image dictionaries
         """
         try:
             # Import here to avoid dependency if not used
             import fitz  # PyMuPDF
+        except ImportError:
+            logger.error("PyMuPDF (fitz) not installed. Cannot convert PDF to images.")
+            return
+        
+        # The document never leaves the render thread's hands
+        doc = await run_in_render_thread(fitz.open, file_path)
+        try:
+            page_count = await run_in_render_thread(len, doc)
+            pages = self._resolve_pages(page_count, page_numbers, max_pages)
+            file_hash = None
+            if self.page_cache is not None:
+                file_hash = await sync_to_async(file_content_hash, thread_sensitive=False)(file_path)
             
-            images = []
-            doc = fitz.open(file_path)
+            for page_number in pages:
+                try:
+                    image = await run_in_render_thread(
+                        self._render_pdf_page, doc, page_number, max_dimensions, file_hash
+                    )
+                except Exception as e:
+                    logger.error(f"Error rendering page {page_number} of {file_path}: {e}")
+                    continue
+                yield image
+        finally:
+            await run_in_render_thread(doc.close)
+    
+    def _render_pdf_page(
+        self,
+        doc,
+        page_number: int,
+        max_dimensions: Optional[Tuple[int, int]] = None,
+        file_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Render and encode a single PDF page, or load it from the page image cache.
+        
+        Args:
+            doc: Open PyMuPDF document
+            page_number: 1-indexed page number
+            max_dimensions: (width, height) limit of the target model
+            file_hash: Content hash of the PDF; enables the page image cache
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Get page dimensions
-                width, height = page.rect.width, page.rect.height
-                
-                # Calculate zoom factor to achieve target DPI
-                # 72 is the base DPI for PDF
-                zoom = self.dpi / 72
-                
-                # Create matrix for rendering
-                matrix = fitz.Matrix(zoom, zoom)
-                
-                # Render page to pixmap
-                pix = page.get_pixmap(matrix=matrix)
-                
-                # Convert to desired format
-                img_data = pix.tobytes(self.format)
-                
-                # Add to images list
-                images.append({
-                    'data': img_data,
-                    'format': self.format,
-                    'page_number': page_num + 1,
-                    'width': pix.width,
-                    'height': pix.height,
-                    'dpi': self.dpi,
-                    'original_width': width,
-                    'original_height': height
-                })
+        Returns:
+            Image dictionary
+        """
+        import fitz  # PyMuPDF
+        
+        page = doc.load_page(page_number - 1)
+        
+        # Get page dimensions
+        width, height = page.rect.width, page.rect.height
+        
+        # 72 is the base DPI for PDF
+        dpi = self.adaptive_dpi(width, height, max_dimensions)
+        matrix = fitz.Matrix(dpi / 72, dpi / 72)
+        
+        # Pixel size is known without rendering, so cache hits skip it entirely
+        pixel_rect = (page.rect * matrix).irect
+        pixel_width, pixel_height = pixel_rect.width, pixel_rect.height
+        
+        cache_key = None
+        img_data = None
+        if file_hash and self.page_cache is not None:
+            cache_key = self.page_cache.make_key(
+                file_hash,
+                page_number - 1,
+                dpi,
+                color_mode=self.color_mode,
+                crop_box=tuple(page.cropbox),
+                image_format=self.format,
+                quality=self.quality
+            )
+            img_data = self.page_cache.get(cache_key)
+        
+        if img_data is None:
+            colorspace = fitz.csGRAY if self.color_mode == 'gray' else fitz.csRGB
+            pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False)
+            img_data = self._encode_pixmap(pix)
+            pixel_width, pixel_height = pix.width, pix.height
             
-            doc.close()
-            return images
+            # Release the raw pixmap before the next page is rendered
+            pix = None
             
-        except ImportError:
-            logger.error("PyMuPDF (fitz) not installed. Cannot convert PDF to images.")
-            return []
-        except Exception as e:
-            logger.error(f"Error converting PDF to images: {e}")
-            return []
+            if cache_key:
+                self.page_cache.set(cache_key, img_data)
+        page = None
+        
+        return {
+            'data': img_data,
+            'format': self.format,
+            'page_number': page_number,
+            'width': pixel_width,
+            'height': pixel_height,
+            'dpi': round(dpi, 1),
+            'original_width': width,
+            'original_height': height
+        }
+    
+    def _encode_pixmap(self, pix) -> bytes:
+        """Encode a pixmap in the configured format"""
+        if self.format in ('jpeg', 'jpg'):
+            return pix.tobytes(self.format, jpg_quality=self.quality)
+        if self.format == 'webp':
+            # MuPDF has no WebP writer; go through Pillow
+            return pix.pil_tobytes(format='WEBP', quality=self.quality)
+        return pix.tobytes(self.format)
     
-    async def _process_image_file(self, file_path: str) -> List[Dict[str, Any]]:
+    async def _process_image_file(
+        self,
+        file_path: str,
+        max_dimensions: Optional[Tuple[int, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Process an image file.
         
         Args:
             file_path: Path to image file
+            max_dimensions: (width, height) limit of the target model
             
         Returns:
             List containing single image dictionary
@@ -158,7 +408,7 @@ class ImageProcessor:
                     img = img.convert('RGB')
                 
                 # Resize if needed
-                img = self._resize_image(img)
+                img = self._resize_image(img, max_dimensions)
                 
                 # Save to bytes
                 img_byte_arr = BytesIO()
@@ -208,12 +458,13 @@ class ImageProcessor:
             logger.error(f"Error converting DOCX to images: {e}")
             return []
     
-    def _resize_image(self, img):
+    def _resize_image(self, img, max_dimensions: Optional[Tuple[int, int]] = None):
         """
         Resize image if needed.
         
         Args:
             img: PIL Image object
+            max_dimensions: (width, height) limit (default: configured max)
             
         Returns:
             Resized PIL Image object
@@ -221,18 +472,14 @@ class ImageProcessor:
         from PIL import Image
         
         width, height = img.width, img.height
+        max_width, max_height = max_dimensions or (self.max_width, self.max_height)
         
         # Check if resizing is needed
-        if width > self.max_width or height > self.max_height:
-            # Calculate aspect ratio
-            aspect_ratio = width / height
-            
-            if width > height:
-                new_width = self.max_width
-                new_height = int(new_width / aspect_ratio)
-            else:
-                new_height = self.max_height
-                new_width = int(new_height * aspect_ratio)
+        if width > max_width or height > max_height:
+            # Scale to fit both limits, preserving aspect ratio
+            scale = min(max_width / width, max_height / height)
+            new_width = max(1, int(width * scale))
+            new_height = max(1, int(height * scale))
             
             # Resize image
             img = img.resize((new_width, new_height), Image.LANCZOS)
@@ -10,6 +10,8 @@ from typing import List, Dict, Tuple, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from .image_processor import run_in_render_thread
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,7 +60,8 @@ class LayoutAnalyzer:
         self, 
         file_path: str,
         organization=None,
-        method: str = 'auto'
+        method: str = 'auto',
+        pages: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Analyze document layout and return structured blocks.
@@ -67,6 +70,7 @@ class LayoutAnalyzer:
             file_path: Path to PDF/image file
             organization: Organization for ModelHub routing
             method: 'rule_based', 'vision', or 'auto'
+            pages: 1-indexed pages to analyze (None for every page)
         
         Returns:
             Dictionary containing:
@@ -75,12 +79,13 @@ class LayoutAnalyzer:
             - raw_blocks: Original LayoutBlock objects
         """
         
+        # PyMuPDF is driven from the shared render thread, never the event loop
         if method == 'auto':
             # Only rule-based (faster, free)
-            blocks = self._analyze_rule_based(file_path)
+            blocks = await run_in_render_thread(self._analyze_rule_based, file_path, pages)
         
         elif method == 'rule_based':
-            blocks = self._analyze_rule_based(file_path)
+            blocks = await run_in_render_thread(self._analyze_rule_based, file_path, pages)
         
         elif method == 'vision':
             raise ValueError("Vision method removed, use 'rule_based' or 'auto'")
@@ -123,7 +128,7 @@ class LayoutAnalyzer:
             'raw_blocks': blocks  # Include the original blocks for any other processing
         }
     
-    def _analyze_rule_based(self, file_path: str) -> List[LayoutBlock]:
+    def _analyze_rule_based(self, file_path: str, pages: Optional[List[int]] = None) -> List[LayoutBlock]:
         """
         Rule-based layout analysis using PyMuPDF.
         (Keeping your existing implementation - it's good)
@@ -137,7 +142,12 @@ class LayoutAnalyzer:
         blocks = []
         doc = fitz.open(file_path)
         
-        for page_num, page in enumerate(doc):
+        page_indexes = (
+            range(len(doc)) if pages is None
+            else sorted({page - 1 for page in pages if 0 < page <= len(doc)})
+        )
+        for page_num in page_indexes:
+            page = doc[page_num]
             page_blocks = page.get_text("dict")["blocks"]
             
             reading_order = 0
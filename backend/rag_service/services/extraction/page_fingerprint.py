@@ -0,0 +1,215 @@
+# File: backend/rag_service/services/extraction/page_fingerprint.py
+
+"""
+Page-level content fingerprints for incremental re-ingest.
+
+Each page gets two hashes: one over its whitespace-normalized text and one over
+its drawing operators (the content stream with text objects removed, plus the
+raw streams of the images and form XObjects it places). A revised drawing set
+usually changes a handful of sheets; comparing fingerprints against the
+previous revision tells the pipeline which pages need to be re-extracted,
+re-chunked and re-embedded and which can be reused as they are.
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Text objects (BT ... ET) are covered by the text hash; stripping them keeps
+# the graphics hash stable when only annotation text moves or changes
+_TEXT_OBJECT = re.compile(rb'\bBT\b.*?\bET\b', re.DOTALL)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass(frozen=True)
+class PageFingerprint:
+    """Content hashes of one page"""
+    text_hash: str
+    graphics_hash: str = ''
+
+    def matches(self, other: Optional['PageFingerprint']) -> bool:
+        """
+        True if both pages have the same content.
+
+        A missing graphics hash on either side (e.g. pages stored before
+        fingerprinting, or non-PDF input) falls back to comparing text only.
+        """
+        if other is None or not self.text_hash or self.text_hash != other.text_hash:
+            return False
+        if self.graphics_hash and other.graphics_hash:
+            return self.graphics_hash == other.graphics_hash
+        return True
+
+
+def text_fingerprint(text: Optional[str]) -> str:
+    """
+    SHA-256 of page text with whitespace runs collapsed.
+
+    Args:
+        text: Page text
+
+    Returns:
+        Hex digest
+    """
+    normalized = _WHITESPACE.sub(' ', text or '').strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def graphics_fingerprint(page) -> str:
+    """
+    SHA-256 of a PDF page's drawing operators and placed images/XObjects.
+
+    Args:
+        page: PyMuPDF page
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(_TEXT_OBJECT.sub(b'', page.read_contents() or b''))
+
+    doc = page.parent
+    xrefs = {image[0]: image[7] for image in page.get_images(full=True)}
+    xrefs.update({xobject[0]: xobject[1] for xobject in page.get_xobjects()})
+    for xref, name in sorted(xrefs.items(), key=lambda item: (item[1], item[0])):
+        try:
+            stream = doc.xref_stream_raw(xref) or b''
+        except Exception:
+            stream = b''
+        digest.update(name.encode('utf-8', 'replace'))
+        digest.update(hashlib.sha256(stream).digest())
+
+    return digest.hexdigest()
+
+
+def fingerprint_pdf_pages(
+    file_path: str,
+    page_texts: Optional[Mapping[int, str]] = None
+) -> Dict[int, PageFingerprint]:
+    """
+    Fingerprint every page of a PDF.
+
+    Args:
+        file_path: Path to the PDF
+        page_texts: Already extracted page text keyed by 1-indexed page number;
+            hashing the same text that is stored on DocumentPage keeps text
+            hashes comparable across revisions (read from the PDF if missing)
+
+    Returns:
+        Dict of 1-indexed page number -> PageFingerprint
+    """
+    import fitz
+
+    fingerprints = {}
+    with fitz.open(file_path) as doc:
+        for index, page in enumerate(doc):
+            page_number = index + 1
+            text = page_texts.get(page_number) if page_texts is not None else None
+            if text is None:
+                text = page.get_text()
+            try:
+                graphics_hash = graphics_fingerprint(page)
+            except Exception as e:
+                logger.warning(f"Could not hash drawing operators of page {page_number} in {file_path}: {e}")
+                graphics_hash = ''
+            fingerprints[page_number] = PageFingerprint(text_fingerprint(text), graphics_hash)
+
+    return fingerprints
+
+
+def fingerprints_from_pages(pages: List[Dict[str, Any]]) -> Dict[int, PageFingerprint]:
+    """
+    Fingerprints for extraction response pages.
+
+    Uses 'text_hash'/'graphics_hash' when the pipeline attached them and
+    falls back to hashing the page text.
+
+    Args:
+        pages: extraction_response['pages'] entries
+
+    Returns:
+        Dict of 1-indexed page number -> PageFingerprint
+    """
+    fingerprints = {}
+    for i, page in enumerate(pages):
+        if not isinstance(page, dict):
+            continue
+        fingerprints[page.get('page_number', i + 1)] = PageFingerprint(
+            text_hash=page.get('text_hash') or text_fingerprint(page.get('text', '')),
+            graphics_hash=page.get('graphics_hash') or ''
+        )
+    return fingerprints
+
+
+@dataclass
+class PageDiff:
+    """Pages of a new revision compared to the stored one"""
+    unchanged: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+
+    @property
+    def reprocess(self) -> List[int]:
+        """Pages that need extraction, chunking and embedding"""
+        return sorted(self.changed + self.added)
+
+    @property
+    def stale(self) -> List[int]:
+        """Pages whose stored chunks and vectors are out of date"""
+        return sorted(self.changed + self.removed)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed or self.added or self.removed)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'pages_total': len(self.unchanged) + len(self.reprocess),
+            'pages_skipped': len(self.unchanged),
+            'pages_reprocessed': len(self.reprocess),
+            'pages_removed': len(self.removed),
+            'changed_pages': self.changed,
+            'added_pages': self.added,
+            'removed_pages': self.removed,
+        }
+
+    @classmethod
+    def from_summary(cls, summary: Dict[str, Any]) -> 'PageDiff':
+        """Rebuild a diff from summary() (unchanged pages are only counted there)"""
+        return cls(
+            changed=list(summary.get('changed_pages', [])),
+            added=list(summary.get('added_pages', [])),
+            removed=list(summary.get('removed_pages', [])),
+        )
+
+
+def diff_page_fingerprints(
+    previous: Mapping[int, PageFingerprint],
+    current: Mapping[int, PageFingerprint]
+) -> PageDiff:
+    """
+    Compare two revisions page by page.
+
+    Args:
+        previous: Stored fingerprints keyed by page number
+        current: New fingerprints keyed by page number
+
+    Returns:
+        PageDiff
+    """
+    diff = PageDiff()
+    for page_number in sorted(current):
+        if page_number not in previous:
+            diff.added.append(page_number)
+        elif current[page_number].matches(previous[page_number]):
+            diff.unchanged.append(page_number)
+        else:
+            diff.changed.append(page_number)
+    diff.removed = sorted(set(previous) - set(current))
+    return diff
@@ -0,0 +1,307 @@
+# File: backend/rag_service/services/extraction/page_image_cache.py
+
+"""
+Disk-backed cache of rendered page images.
+
+Rendering and encoding a large drawing sheet is the most expensive local step
+of vision extraction. Encoded page images are cached on disk keyed by
+(file content hash, page index, DPI, color mode, crop box, encoding), so
+re-running an extraction on an unchanged file - including Celery retries on
+another worker sharing the directory - skips rendering entirely.
+
+Writes go to a temporary file in the target directory followed by os.replace,
+so readers never observe partial images. Total size is capped by evicting the
+least recently used files (by mtime, refreshed on every hit).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Eviction trims to this fraction of max_bytes, so writes at the cap do not
+# each trigger a full directory scan
+EVICT_LOW_WATER = 0.9
+
+_hash_memo: Dict[Tuple, str] = {}
+_hash_memo_lock = threading.Lock()
+
+
+def file_content_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of a file's contents, memoized per (path, size, mtime).
+
+    Args:
+        file_path: Path to the file
+        block_size: Bytes read per iteration
+
+    Returns:
+        Hex digest
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    with _hash_memo_lock:
+        cached = _hash_memo.get(memo_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    with _hash_memo_lock:
+        if len(_hash_memo) >= 1024:
+            _hash_memo.clear()
+        _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+class PageImageCache:
+    """
+    LRU, size-capped cache of encoded page images in a shared directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3, evict_every: int = 50):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cached images (created if missing)
+            max_bytes: Total size cap; oldest entries are evicted beyond it
+            evict_every: Writes between size checks (every write checks when
+                the in-process estimate already exceeds the cap)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+        self._estimated_bytes = None
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'errors': 0,
+        }
+
+    @staticmethod
+    def make_key(
+        file_hash: str,
+        page_index: int,
+        dpi: float,
+        color_mode: str = 'rgb',
+        crop_box: Optional[Sequence[float]] = None,
+        image_format: str = 'png',
+        quality: Optional[int] = None
+    ) -> str:
+        """
+        Build the cache key for one rendered page.
+
+        Args:
+            file_hash: Content hash of the source file
+            page_index: 0-indexed page
+            dpi: Render DPI
+            color_mode: 'rgb' or 'gray'
+            crop_box: Page crop box (x0, y0, x1, y1) in points
+            image_format: Encoded format ('png', 'webp', 'jpeg')
+            quality: Encoder quality for lossy formats
+
+        Returns:
+            Hex cache key
+        """
+        crop = ','.join(f'{v:.2f}' for v in crop_box) if crop_box else ''
+        raw = f'{file_hash}|{page_index}|{dpi:.2f}|{color_mode}|{crop}|{image_format}|{quality or ""}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a cached image.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            Encoded image bytes, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except OSError as e:
+            logger.warning(f"Page image cache read failed for {key}: {e}")
+            self.stats['misses'] += 1
+            return None
+
+        try:
+            # Refresh recency for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats['hits'] += 1
+        return data
+
+    def set(self, key: str, data: bytes) -> bool:
+        """
+        Atomically store an image.
+
+        Args:
+            key: Key from make_key()
+            data: Encoded image bytes
+
+        Returns:
+            bool: True if written
+        """
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning(f"Page image cache write failed for {key}: {e}")
+            self.stats['errors'] += 1
+            return False
+
+        self.stats['writes'] += 1
+        self._after_write(len(data))
+        return True
+
+    def clear(self) -> None:
+        """Remove every cached image."""
+        for path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._estimated_bytes = 0
+
+    def size_bytes(self) -> int:
+        """Total size of cached images on disk."""
+        return sum(size for _, size, _ in self._scan())
+
+    def _after_write(self, size: int) -> None:
+        with self._lock:
+            self._writes_since_check += 1
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += size
+            due = (
+                self._estimated_bytes is None
+                or self._estimated_bytes > self.max_bytes
+                or self._writes_since_check >= self.evict_every
+            )
+            if due:
+                self._writes_since_check = 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Once the cache exceeds max_bytes, delete least recently used images
+        until it is back under EVICT_LOW_WATER of max_bytes.
+
+        Safe to run concurrently from several workers: files already removed
+        by another process are skipped.
+
+        Returns:
+            Number of files evicted
+        """
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        if total > self.max_bytes:
+            target = int(self.max_bytes * EVICT_LOW_WATER)
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                    evicted += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Page image cache eviction failed for {path}: {e}")
+                    continue
+                total -= size
+
+        with self._lock:
+            self._estimated_bytes = total
+        if evicted:
+            self.stats['evictions'] += evicted
+            logger.info(f"Evicted {evicted} page images from cache ({total} bytes remain)")
+        return evicted
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        return [
+            path for path in self.cache_dir.glob('*/*')
+            if path.is_file() and not path.name.startswith('.tmp-')
+        ]
+
+    def _scan(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+_page_image_cache = None
+_page_image_cache_lock = threading.Lock()
+
+
+def get_page_image_cache() -> Optional[PageImageCache]:
+    """
+    Get the process-wide page image cache configured from RAG_SETTINGS.
+
+    Returns:
+        PageImageCache, or None if caching is disabled
+    """
+    global _page_image_cache
+
+    config = getattr(settings, 'RAG_SETTINGS', {}).get('PAGE_IMAGE_CACHE', {})
+    if not config.get('ENABLED', True):
+        return None
+
+    if _page_image_cache is None:
+        with _page_image_cache_lock:
+            if _page_image_cache is None:
+                _page_image_cache = PageImageCache(
+                    cache_dir=config.get(
+                        'DIR',
+                        os.path.join(settings.MEDIA_ROOT, 'page_image_cache')
+                    ),
+                    max_bytes=int(config.get('MAX_SIZE_MB', 2048)) * 1024 * 1024
+                )
+    return _page_image_cache
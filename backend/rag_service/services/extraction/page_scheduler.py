@@ -0,0 +1,293 @@
+# File: backend/rag_service/services/extraction/page_scheduler.py
+
+"""
+Page-level scheduler for vision LLM calls.
+
+Issues one vision request per page concurrently instead of one page at a time,
+so a drawing set takes roughly as long as its slowest pages rather than the
+sum of all pages. Per provider, requests are bounded by a concurrency limit
+and a token-bucket rate limit shared by every extraction running in the
+process. Rate-limit and server errors are retried with exponential backoff
+and full jitter; results are returned in page order, with failed pages
+reported alongside the successful ones.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+import weakref
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Provider error types/messages worth retrying: rate limits, overload,
+# timeouts and 5xx responses
+RETRYABLE_ERROR_TYPES = {
+    'RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError',
+    'ServiceUnavailableError', 'OverloadedError', 'TimeoutError', 'ResourceExhausted',
+}
+_RETRYABLE_MESSAGE = re.compile(
+    r'\b(429|500|502|503|504|529)\b|rate.?limit|overloaded|timed? ?out|temporarily unavailable',
+    re.IGNORECASE
+)
+
+
+def is_retryable_error(error: Any, error_type: Optional[str] = None) -> bool:
+    """
+    Decide whether a failed vision call should be retried.
+
+    Args:
+        error: Exception or error message
+        error_type: Exception class name reported by the provider (optional)
+
+    Returns:
+        bool: True for rate-limit, timeout and 5xx errors
+    """
+    if isinstance(error, BaseException):
+        error_type = error_type or type(error).__name__
+        status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+        if isinstance(status, int) and (status == 429 or status >= 500):
+            return True
+    if error_type in RETRYABLE_ERROR_TYPES:
+        return True
+
+    message = str(error or '')
+    if 'authentication' in message.lower():
+        return False
+    return bool(_RETRYABLE_MESSAGE.search(message))
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursting up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            capacity: Maximum burst size (default: max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Wait until `tokens` are available and take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class ProviderLimiter:
+    """Concurrency semaphore and rate limiter for one provider"""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.bucket = TokenBucket(
+            rate=requests_per_minute / 60.0 if requests_per_minute else 0,
+            capacity=max(1, max_concurrency)
+        )
+
+
+# Limiters are per event loop (asyncio primitives cannot cross loops) and
+# per provider, shared by all schedulers running on that loop
+_limiters: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ProviderLimiter]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _provider_setting(config: Dict, key: str, provider_slug: str, default):
+    value = config.get(key, default)
+    if isinstance(value, dict):
+        return value.get(provider_slug, value.get('default', default))
+    return value
+
+
+def get_provider_limiter(provider_slug: str) -> ProviderLimiter:
+    """
+    Get the shared limiter for a provider on the running event loop.
+
+    Limits come from RAG_SETTINGS['VISION'] MAX_CONCURRENCY and
+    REQUESTS_PER_MINUTE, each either a number or a {provider: value}
+    dict with an optional 'default'.
+    """
+    loop = asyncio.get_running_loop()
+    loop_limiters = _limiters.setdefault(loop, {})
+
+    limiter = loop_limiters.get(provider_slug)
+    if limiter is None:
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('VISION', {})
+        limiter = loop_limiters[provider_slug] = ProviderLimiter(
+            max_concurrency=_provider_setting(config, 'MAX_CONCURRENCY', provider_slug, 4),
+            requests_per_minute=_provider_setting(config, 'REQUESTS_PER_MINUTE', provider_slug, 0)
+        )
+    return limiter
+
+
+PageCall = Callable[[Any, int], Awaitable[Dict[str, Any]]]
+
+
+class VisionPageScheduler:
+    """
+    Runs a per-page vision call concurrently under provider limits.
+
+    The page call receives (page, index) and returns a result dict with a
+    'success' flag. Failed results may carry 'error' and 'error_type' (or
+    'retryable') so the scheduler can decide whether to retry; exceptions
+    raised by the call are treated the same way.
+    """
+
+    def __init__(
+        self,
+        provider_slug: str,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        limiter: Optional[ProviderLimiter] = None
+    ):
+        """
+        Args:
+            provider_slug: Provider the calls go to (selects the shared limiter)
+            max_retries: Attempts per page (default: RAG_SETTINGS VISION MAX_RETRIES)
+            base_delay: First backoff ceiling in seconds
+            max_delay: Largest backoff ceiling in seconds
+            limiter: Explicit limiter (overrides the shared per-provider one)
+        """
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('VISION', {})
+        self.provider_slug = provider_slug
+        self.max_retries = max_retries if max_retries is not None else config.get('MAX_RETRIES', 3)
+        self.base_delay = base_delay if base_delay is not None else config.get('RETRY_BASE_DELAY', 1.0)
+        self.max_delay = max_delay if max_delay is not None else config.get('RETRY_MAX_DELAY', 30.0)
+        self._limiter = limiter
+
+    async def run(
+        self,
+        pages: Union[Iterable[Any], AsyncIterable[Any]],
+        call: PageCall
+    ) -> Dict[str, Any]:
+        """
+        Process all pages concurrently.
+
+        Pages are pulled from `pages` only while fewer than max_concurrency of
+        this run's pages are pending, so a lazy page iterator never has more
+        than that many pages in memory. The provider slot itself is taken by
+        each page's task.
+
+        Args:
+            pages: Page payloads (e.g. image dicts), sync or async iterable
+            call: Coroutine function called as call(page, index)
+
+        Returns:
+            Dict with 'results' (one per page, in page order), 'failed'
+            (indexes of failed pages), 'partial' and 'duration_ms'
+        """
+        limiter = self._limiter or get_provider_limiter(self.provider_slug)
+        start_time = time.time()
+        tasks = []
+        # Pages of this run not finished yet; released by a done callback, so
+        # it is returned even for a task cancelled before it started
+        pending = asyncio.Semaphore(limiter.max_concurrency)
+
+        try:
+            index = 0
+            async for page in _as_async_iter(pages):
+                await pending.acquire()
+                try:
+                    task = asyncio.create_task(self._run_page(page, index, call, limiter))
+                except BaseException:
+                    pending.release()
+                    raise
+                task.add_done_callback(lambda _: pending.release())
+                tasks.append(task)
+                index += 1
+            results = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        failed = [i for i, result in enumerate(results) if not result.get('success')]
+        if failed:
+            logger.warning(
+                f"Vision extraction via {self.provider_slug}: "
+                f"{len(failed)}/{len(results)} pages failed"
+            )
+        return {
+            'results': results,
+            'failed': failed,
+            'partial': bool(failed) and len(failed) < len(results),
+            'duration_ms': int((time.time() - start_time) * 1000),
+        }
+
+    async def _run_page(self, page: Any, index: int, call: PageCall, limiter: ProviderLimiter) -> Dict[str, Any]:
+        """Run one page with rate limiting and retries, holding a provider slot"""
+        async with limiter.semaphore:
+            result: Dict[str, Any] = {}
+            for attempt in range(max(1, self.max_retries)):
+                await limiter.bucket.acquire()
+                try:
+                    result = await call(page, index)
+                    if result.get('success'):
+                        result['attempts'] = attempt + 1
+                        return result
+                    retryable = result.get('retryable')
+                    if retryable is None:
+                        retryable = is_retryable_error(result.get('error'), result.get('error_type'))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Page {index + 1} attempt {attempt + 1} failed: {e}")
+                    result = {'success': False, 'error': str(e)}
+                    if isinstance(page, dict) and 'page_number' in page:
+                        result['page_number'] = page['page_number']
+                    retryable = is_retryable_error(e)
+
+                if not retryable or attempt == self.max_retries - 1:
+                    break
+
+                delay = self._backoff(attempt)
+                logger.info(f"Retrying page {index + 1} in {delay:.2f}s: {result.get('error')}")
+                await asyncio.sleep(delay)
+
+            result.setdefault('success', False)
+            result['attempts'] = attempt + 1
+            return result
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+async def _as_async_iter(items):
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -2,15 +2,50 @@
 Advanced table extraction integrated with existing extraction pipeline.
 
 This module now uses the UnifiedExtractor for vision-based table extraction to avoid duplicate LLM calls.
+
+Camelot and pdfplumber only run on pages (and page areas) the cheap
+table-page classifier flags, one page per task in a process pool shared by
+every document in the process, with a per-page timeout. Per-page results are
+cached on disk by page content hash, so an unchanged sheet in a revised set
+is never re-extracted.
 """
 
+import asyncio
+import functools
+import hashlib
+import json
 import logging
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple, Any
 from enum import Enum
 import pandas as pd
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .image_processor import run_in_render_thread
+from .page_fingerprint import graphics_fingerprint, text_fingerprint
+from .page_image_cache import PageImageCache
+from .table_page_classifier import BBox, classify_pages
+
 logger = logging.getLogger(__name__)
 
+# Bump when extraction logic changes so cached page results are not reused
+TABLE_CACHE_VERSION = 1
+
+# Padding around classifier regions so outer rulings and labels are included
+REGION_PADDING = 6.0
+
+# Pages of one document extracted at once in threads when MAX_WORKERS is 0
+INLINE_PAGE_WORKERS = 4
+
+# Seconds between checks for a free worker
+SLOT_POLL_INTERVAL = 0.02
+
 
 class TableExtractionMethod(Enum):
     CAMELOT = 'camelot'
@@ -18,6 +53,36 @@ class TableExtractionMethod(Enum):
     VISION = 'vision'
 
 
+@dataclass
+class TablePageJob:
+    """One candidate page handed to a table extraction worker"""
+    page_number: int  # 1-indexed
+    page_height: float
+    regions: List[BBox] = field(default_factory=list)
+    content_hash: str = ''
+
+
+def extract_page_tables(
+    file_path: str,
+    page_number: int,
+    regions: List[BBox],
+    page_height: float
+) -> List[Dict]:
+    """
+    Extract the tables of one page (process pool entry point).
+
+    Args:
+        file_path: Path to PDF file
+        page_number: 1-indexed page
+        regions: Candidate areas (top-left origin, points); empty = whole page
+        page_height: Page height in points (for Camelot's bottom-left origin)
+
+    Returns:
+        Table dictionaries for the page
+    """
+    return TableExtractor()._extract_page(file_path, page_number, regions, page_height)
+
+
 class TableExtractor:
     """
     Multi-method table extraction that integrates with ModelHub.
@@ -34,9 +99,31 @@ class TableExtractor:
     - ModelMetrics for cost tracking
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        page_timeout: Optional[float] = None,
+        use_classifier: Optional[bool] = None,
+        use_cache: Optional[bool] = None
+    ):
+        """
+        Args:
+            max_workers: Worker processes for candidate pages, shared by
+                every document in the process (0 = run in up to
+                INLINE_PAGE_WORKERS threads, default:
+                RAG_SETTINGS['TABLES']['MAX_WORKERS'])
+            page_timeout: Seconds before a page's extraction is abandoned
+            use_classifier: Skip pages the table-page classifier rejects
+            use_cache: Reuse per-page results cached by content hash
+        """
         # No dependencies - will use ModelHub when needed
-        pass
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('TABLES', {})
+        self.max_workers = max_workers if max_workers is not None else config.get(
+            'MAX_WORKERS', min(4, os.cpu_count() or 1)
+        )
+        self.page_timeout = page_timeout if page_timeout is not None else config.get('PAGE_TIMEOUT', 60)
+        self.use_classifier = use_classifier if use_classifier is not None else config.get('CLASSIFY_PAGES', True)
+        self.use_cache = use_cache if use_cache is not None else config.get('CACHE_ENABLED', True)
     
     async def extract_tables(
         self, 
@@ -47,15 +134,19 @@ class TableExtractor:
         """
         Extract all tables from document with fallback strategy.
         
+        Pages are classified first; Camelot (then pdfplumber) runs only on
+        candidate pages, restricted to the detected table areas.
+        
         Args:
             file_path: Path to PDF file
             organization: Organization for ModelHub routing (needed for vision)
-            pages: Specific pages to process (None = all pages)
+            pages: Specific 1-indexed pages to process (None = all pages)
         
         Returns:
             Dictionary containing:
             - tables: List of table dictionaries with page info
             - tables_by_page: Dict organizing tables by page number
+            - stats: Pages scanned, candidates, cache hits, failed pages
             Each table dictionary contains:
             - data: DataFrame
             - page: Page number
@@ -65,6 +156,224 @@ class TableExtractor:
             - markdown: Markdown representation
             - text: Plain text representation
         """
+        # Classification opens the PDF with PyMuPDF: only on the render thread
+        try:
+            jobs, pages_scanned = await run_in_render_thread(self._plan_pages, file_path, pages)
+        except Exception as e:
+            logger.warning(f"Table page classification failed, scanning whole file: {e}")
+            return await run_in_render_thread(self._extract_document, file_path, pages)
+        
+        stats = {
+            'pages_scanned': pages_scanned,
+            'candidate_pages': [job.page_number for job in jobs],
+            'cached_pages': [],
+            'failed_pages': [],
+        }
+        
+        cache = get_table_cache() if self.use_cache else None
+        tables = []
+        pending = []
+        for job in jobs:
+            cached = self._cache_get(cache, job)
+            if cached is None:
+                pending.append(job)
+            else:
+                stats['cached_pages'].append(job.page_number)
+                tables.extend(cached)
+        
+        for job, page_tables in await self._run_pages(file_path, pending):
+            if page_tables is None:
+                stats['failed_pages'].append(job.page_number)
+                continue
+            self._cache_set(cache, job, page_tables)
+            tables.extend(page_tables)
+        
+        tables.sort(key=lambda table: table.get('page', 0))
+        logger.info(
+            f"Tables: {len(jobs)}/{pages_scanned} candidate pages, "
+            f"{len(stats['cached_pages'])} cached, {len(stats['failed_pages'])} failed, "
+            f"{len(tables)} tables"
+        )
+        result = self._organize_tables_by_page(tables)
+        result['stats'] = stats
+        return result
+    
+    def _plan_pages(self, file_path: str, pages: Optional[List[int]]) -> Tuple[List[TablePageJob], int]:
+        """Classify pages and build jobs for the candidates"""
+        import fitz
+        
+        jobs = []
+        with fitz.open(file_path) as doc:
+            if self.use_classifier:
+                signals = classify_pages(doc, pages)
+                scanned = len(signals)
+                candidates = [(s.page_number, s.page_height, s.regions) for s in signals if s.is_candidate]
+            else:
+                page_numbers = [p for p in (sorted(set(pages)) if pages else range(1, len(doc) + 1)) if 1 <= p <= len(doc)]
+                scanned = len(page_numbers)
+                candidates = [(p, doc[p - 1].rect.height, []) for p in page_numbers]
+            
+            for page_number, page_height, regions in candidates:
+                page = doc[page_number - 1]
+                content_hash = hashlib.sha256(
+                    f"{text_fingerprint(page.get_text())}|{graphics_fingerprint(page)}".encode()
+                ).hexdigest()
+                jobs.append(TablePageJob(page_number, page_height, regions, content_hash))
+        
+        return jobs, scanned
+    
+    async def _run_pages(
+        self,
+        file_path: str,
+        jobs: List[TablePageJob]
+    ) -> List[Tuple[TablePageJob, Optional[List[Dict]]]]:
+        """
+        Extract candidate pages concurrently with a per-page timeout.
+        
+        A page is handed to the pool only when one of its workers is free
+        (pages of other documents included), so its timeout covers its own
+        extraction, not time spent queued behind other pages. A worker still
+        busy with a timed-out page keeps its slot until that page finishes,
+        and the pool is replaced for later documents; pages still waiting for
+        a slot when the document deadline (page_timeout per round of
+        workers) passes are failed.
+        
+        Returns:
+            (job, tables) per job; tables is None if the page failed or timed out
+        """
+        if not jobs:
+            return []
+        
+        pool = executor = None
+        if self.max_workers > 0 and len(jobs) > 1:
+            workers = min(self.max_workers, len(jobs))
+            pool = _acquire_page_pool(self.max_workers)
+            executor, slots = pool.executor, pool.slots
+        else:
+            workers = min(INLINE_PAGE_WORKERS, len(jobs))
+            slots = threading.Semaphore(workers)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.page_timeout * math.ceil(len(jobs) / workers)
+        hung = []
+        
+        def release_when_done(future):
+            # Retrieve the outcome so a late failure is not reported as unhandled
+            if not future.cancelled():
+                future.exception()
+            slots.release()
+        
+        async def acquire_slot():
+            # Slots of the shared pool are taken from any thread and event loop
+            while not slots.acquire(blocking=False):
+                if loop.time() >= deadline:
+                    return False
+                await asyncio.sleep(SLOT_POLL_INTERVAL)
+            return True
+        
+        async def run(job):
+            if not await acquire_slot():
+                logger.warning(f"Table extraction of page {job.page_number} never started before the document deadline")
+                return job, None
+            
+            call = functools.partial(
+                extract_page_tables, file_path, job.page_number, job.regions, job.page_height
+            )
+            if executor is not None:
+                future = loop.run_in_executor(executor, call)
+            else:
+                future = asyncio.ensure_future(sync_to_async(call, thread_sensitive=False)())
+            
+            try:
+                done, _ = await asyncio.wait({future}, timeout=self.page_timeout)
+            except BaseException:
+                future.add_done_callback(release_when_done)
+                raise
+            if not done:
+                logger.warning(f"Table extraction timed out on page {job.page_number} after {self.page_timeout}s")
+                hung.append(job.page_number)
+                future.add_done_callback(release_when_done)
+                return job, None
+            
+            slots.release()
+            try:
+                return job, future.result()
+            except Exception as e:
+                logger.warning(f"Table extraction failed on page {job.page_number}: {e}")
+            return job, None
+        
+        try:
+            return list(await asyncio.gather(*(run(job) for job in jobs)))
+        finally:
+            if pool is not None:
+                _release_page_pool(pool, hung=bool(hung))
+    
+    def _extract_page(
+        self,
+        file_path: str,
+        page_number: int,
+        regions: List[BBox],
+        page_height: float
+    ) -> List[Dict]:
+        """Camelot, then pdfplumber, on one page's candidate areas"""
+        try:
+            camelot_tables = self._extract_with_camelot(
+                file_path, [page_number], table_areas=self._camelot_areas(regions, page_height)
+            )
+            if camelot_tables and self._assess_quality(camelot_tables) > 0.7:
+                return camelot_tables
+        except Exception as e:
+            logger.warning(f"Camelot extraction failed on page {page_number}: {e}")
+        
+        try:
+            plumber_tables = self._extract_with_pdfplumber(file_path, [page_number], regions=regions)
+            if plumber_tables and self._assess_quality(plumber_tables) > 0.6:
+                return plumber_tables
+        except Exception as e:
+            logger.warning(f"pdfplumber extraction failed on page {page_number}: {e}")
+        
+        return []
+    
+    @staticmethod
+    def _camelot_areas(regions: List[BBox], page_height: float) -> Optional[List[str]]:
+        """Regions as Camelot table_areas ("x1,y1,x2,y2", bottom-left origin, top-left corner first)"""
+        if not regions:
+            return None
+        return [
+            f"{max(0.0, x0 - REGION_PADDING):.1f},{page_height - max(0.0, y0 - REGION_PADDING):.1f},"
+            f"{x1 + REGION_PADDING:.1f},{max(0.0, page_height - y1 - REGION_PADDING):.1f}"
+            for x0, y0, x1, y1 in regions
+        ]
+    
+    def _cache_get(self, cache: Optional[PageImageCache], job: TablePageJob) -> Optional[List[Dict]]:
+        if cache is None or not job.content_hash:
+            return None
+        data = cache.get(self._cache_key(job))
+        if data is None:
+            return None
+        try:
+            return [_table_from_json(table, job.page_number) for table in json.loads(data)]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cached tables for page {job.page_number}: {e}")
+            return None
+    
+    def _cache_set(self, cache: Optional[PageImageCache], job: TablePageJob, tables: List[Dict]) -> None:
+        if cache is None or not job.content_hash:
+            return
+        try:
+            data = json.dumps([_table_to_json(table) for table in tables], default=str)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Tables of page {job.page_number} not cacheable: {e}")
+            return
+        cache.set(self._cache_key(job), data.encode('utf-8'))
+    
+    @staticmethod
+    def _cache_key(job: TablePageJob) -> str:
+        regions = ';'.join(','.join(f'{v:.1f}' for v in region) for region in job.regions)
+        raw = f'tables|v{TABLE_CACHE_VERSION}|{job.content_hash}|{regions}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _extract_document(self, file_path: str, pages: Optional[List[int]]) -> Dict[str, Any]:
+        """Whole-file extraction, used when pages cannot be classified"""
         tables = []
         
         # Method 1: Camelot (fast, free, best for bordered tables)
@@ -119,7 +428,8 @@ class TableExtractor:
     def _extract_with_camelot(
         self, 
         file_path: str, 
-        pages: Optional[List[int]]
+        pages: Optional[List[int]],
+        table_areas: Optional[List[str]] = None
     ) -> List[Dict]:
         """Extract tables using Camelot (best for structured PDFs)"""
         try:
@@ -129,6 +439,7 @@ class TableExtractor:
             return []
         
         page_range = ','.join(map(str, pages)) if pages else 'all'
+        area_kwargs = {'table_areas': table_areas} if table_areas else {}
         tables = []
         
         # Try lattice mode (bordered tables)
@@ -137,7 +448,8 @@ class TableExtractor:
                 file_path,
                 pages=page_range,
                 flavor='lattice',
-                line_scale=40
+                line_scale=40,
+                **area_kwargs
             )
             
             for table in camelot_tables:
@@ -153,7 +465,8 @@ class TableExtractor:
                     file_path,
                     pages=page_range,
                     flavor='stream',
-                    edge_tol=50
+                    edge_tol=50,
+                    **area_kwargs
                 )
                 
                 for table in camelot_tables:
@@ -167,7 +480,8 @@ class TableExtractor:
     def _extract_with_pdfplumber(
         self, 
         file_path: str, 
-        pages: Optional[List[int]]
+        pages: Optional[List[int]],
+        regions: Optional[List[BBox]] = None
     ) -> List[Dict]:
         """Extract tables using pdfplumber (good for simple tables)"""
         try:
@@ -179,26 +493,38 @@ class TableExtractor:
         tables = []
         
         with pdfplumber.open(file_path) as pdf:
-            pages_to_process = pages if pages else range(len(pdf.pages))
+            # Pages are 1-indexed, like Camelot's
+            pages_to_process = pages if pages else range(1, len(pdf.pages) + 1)
             
             for page_num in pages_to_process:
-                if page_num >= len(pdf.pages):
+                if not 1 <= page_num <= len(pdf.pages):
                     continue
                     
-                page = pdf.pages[page_num]
-                page_tables = page.extract_tables()
+                page = pdf.pages[page_num - 1]
+                areas = [None]
+                if regions:
+                    areas = [
+                        (
+                            max(page.bbox[0], x0 - REGION_PADDING), max(page.bbox[1], y0 - REGION_PADDING),
+                            min(page.bbox[2], x1 + REGION_PADDING), min(page.bbox[3], y1 + REGION_PADDING)
+                        )
+                        for x0, y0, x1, y1 in regions
+                    ]
                 
-                for table_data in page_tables:
-                    if table_data and len(table_data) > 1:
-                        tables.append({
-                            'data': pd.DataFrame(table_data[1:], columns=table_data[0]),
-                            'page': page_num + 1,
-                            'bbox': None,
-                            'confidence': 0.75,
-                            'method': TableExtractionMethod.PDFPLUMBER.value,
-                            'markdown': self._to_markdown(table_data),
-                            'text': self._to_text(table_data)
-                        })
+                for area in areas:
+                    page_tables = (page.crop(area) if area else page).extract_tables()
+                    
+                    for table_data in page_tables:
+                        if table_data and len(table_data) > 1:
+                            tables.append({
+                                'data': pd.DataFrame(table_data[1:], columns=table_data[0]),
+                                'page': page_num,
+                                'bbox': list(area) if area else None,
+                                'confidence': 0.75,
+                                'method': TableExtractionMethod.PDFPLUMBER.value,
+                                'markdown': self._to_markdown(table_data),
+                                'text': self._to_text(table_data)
+                            })
         
         return tables
     
@@ -254,3 +580,104 @@ class TableExtractor:
         
         df = pd.DataFrame(table_data[1:], columns=table_data[0])
         return df.to_string(index=False)
+
+
+def _table_to_json(table: Dict) -> Dict:
+    """Serializable copy of a table dict (page is restored on load)"""
+    data = {key: value for key, value in table.items() if key not in ('data', 'page')}
+    df = table.get('data')
+    if isinstance(df, pd.DataFrame):
+        data['data'] = {'columns': list(df.columns), 'rows': df.values.tolist()}
+    if data.get('bbox') is not None:
+        data['bbox'] = [float(v) for v in data['bbox']]
+    return data
+
+
+def _table_from_json(data: Dict, page_number: int) -> Dict:
+    table = dict(data)
+    frame = table.get('data')
+    if isinstance(frame, dict):
+        table['data'] = pd.DataFrame(frame['rows'], columns=frame['columns'])
+    table['page'] = page_number
+    return table
+
+
+def _shutdown_executor(executor: ProcessPoolExecutor, terminate: bool = False) -> None:
+    """Shut a worker pool down; terminate workers still busy with timed-out pages"""
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    if terminate:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+
+class _PagePool:
+    """Table extraction worker processes shared by the documents of this process"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        # One per worker; a page holds one while it runs
+        self.slots = threading.Semaphore(workers)
+        self.users = 0
+
+
+_page_pools: Dict[int, _PagePool] = {}
+_page_pools_lock = threading.Lock()
+
+
+def _acquire_page_pool(workers: int) -> _PagePool:
+    """The shared pool with this many workers (created on first use)"""
+    with _page_pools_lock:
+        pool = _page_pools.get(workers)
+        if pool is None:
+            pool = _page_pools[workers] = _PagePool(workers)
+        pool.users += 1
+        return pool
+
+
+def _release_page_pool(pool: _PagePool, hung: bool = False) -> None:
+    """
+    Stop using a shared pool.
+
+    A pool with a worker stuck on a timed-out page is replaced for later
+    documents and terminated once no document is using it any more.
+    """
+    with _page_pools_lock:
+        if hung and _page_pools.get(pool.workers) is pool:
+            del _page_pools[pool.workers]
+        pool.users -= 1
+        if pool.users or pool in _page_pools.values():
+            return
+    _shutdown_executor(pool.executor, terminate=True)
+
+
+_table_cache = None
+_table_cache_lock = threading.Lock()
+
+
+def get_table_cache() -> Optional[PageImageCache]:
+    """
+    Get the process-wide per-page table cache.
+
+    Uses the same size-capped on-disk LRU store as rendered page images, in
+    its own directory (RAG_SETTINGS['TABLES']['CACHE_DIR']).
+
+    Returns:
+        Cache, or None if disabled
+    """
+    global _table_cache
+
+    config = getattr(settings, 'RAG_SETTINGS', {}).get('TABLES', {})
+    if not config.get('CACHE_ENABLED', True):
+        return None
+
+    if _table_cache is None:
+        with _table_cache_lock:
+            if _table_cache is None:
+                _table_cache = PageImageCache(
+                    cache_dir=config.get('CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'table_cache')),
+                    max_bytes=int(config.get('CACHE_MAX_SIZE_MB', 256)) * 1024 * 1024
+                )
+    return _table_cache
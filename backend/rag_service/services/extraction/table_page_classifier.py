@@ -0,0 +1,288 @@
+# File: backend/rag_service/services/extraction/table_page_classifier.py
+
+"""
+Cheap table-page classifier.
+
+Camelot and pdfplumber are expensive per page, and most drawing sheets carry
+no tables at all. This classifier scores each page from data PyMuPDF already
+has - vector drawings and positioned words - so table extraction can skip
+pages (and page areas) that cannot contain a table:
+
+- Ruling grids: groups of connected horizontal/vertical lines where several
+  rules run edge to edge across the group, as in a bordered schedule (floor
+  plan walls rarely start and end on the group's outline)
+- Text grid alignment: many rows whose words start on shared column positions
+- Keywords: "SCHEDULE", "LEGEND", "QTY" ...
+"""
+
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+BBox = Tuple[float, float, float, float]
+
+TABLE_KEYWORDS = re.compile(
+    r'\b(SCHEDULES?|SCHED\.?|LEGEND|TABLE|QTY|QUANTITY|SUMMARY|TAKEOFF|BILL OF MATERIALS)\b',
+    re.IGNORECASE
+)
+
+# Score contributions; a page is a candidate at CANDIDATE_THRESHOLD or above.
+# A ruling grid or a text grid (borderless table) qualifies on its own;
+# keywords alone do not
+RULING_GRID_SCORE = 0.6
+TEXT_GRID_SCORE = 0.5
+KEYWORD_SCORE = 0.2
+CANDIDATE_THRESHOLD = 0.5
+
+
+@dataclass
+class TablePageSignals:
+    """Classifier evidence for one page"""
+    page_number: int  # 1-indexed
+    page_height: float = 0.0
+    ruled_regions: List[BBox] = field(default_factory=list)
+    text_grid_regions: List[BBox] = field(default_factory=list)
+    aligned_rows: int = 0
+    keywords: List[str] = field(default_factory=list)
+    score: float = 0.0
+
+    @property
+    def is_candidate(self) -> bool:
+        return self.score >= CANDIDATE_THRESHOLD
+
+    @property
+    def regions(self) -> List[BBox]:
+        """Areas worth handing to the table extractors (top-left origin, points)"""
+        return self.ruled_regions + self.text_grid_regions
+
+
+def _ruling_segments(page, min_length: float) -> Tuple[List[BBox], List[BBox]]:
+    """Horizontal and vertical ruling segments as thin bboxes"""
+    horizontal, vertical = [], []
+
+    def add(x0, y0, x1, y1):
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        if y1 - y0 <= 2 and x1 - x0 >= min_length:
+            horizontal.append((x0, y0, x1, y1))
+        elif x1 - x0 <= 2 and y1 - y0 >= min_length:
+            vertical.append((x0, y0, x1, y1))
+
+    for path in page.get_drawings():
+        for item in path.get('items', []):
+            if item[0] == 'l':
+                add(item[1].x, item[1].y, item[2].x, item[2].y)
+            elif item[0] == 're':
+                rect = item[1]
+                if rect.height <= 2 or rect.width <= 2:
+                    add(rect.x0, rect.y0, rect.x1, rect.y1)
+                else:
+                    add(rect.x0, rect.y0, rect.x1, rect.y0)
+                    add(rect.x0, rect.y1, rect.x1, rect.y1)
+                    add(rect.x0, rect.y0, rect.x0, rect.y1)
+                    add(rect.x1, rect.y0, rect.x1, rect.y1)
+
+    return horizontal, vertical
+
+
+def _group_segments(segments: List[BBox], tolerance: float) -> List[List[int]]:
+    """Connected components of segments whose (padded) bboxes touch"""
+    parent = list(range(len(segments)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sweep over x so only horizontally overlapping segments are compared
+    order = sorted(range(len(segments)), key=lambda i: segments[i][0])
+    active: List[int] = []
+    for i in order:
+        x0, y0, x1, y1 = segments[i]
+        active = [j for j in active if segments[j][2] + tolerance >= x0]
+        for j in active:
+            _, b0, _, b1 = segments[j]
+            if b0 - tolerance <= y1 and y0 - tolerance <= b1:
+                parent[find(i)] = find(j)
+        active.append(i)
+
+    groups = defaultdict(list)
+    for i in range(len(segments)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def find_ruled_regions(
+    page,
+    min_rule_length: float = 20.0,
+    tolerance: float = 3.0
+) -> List[BBox]:
+    """
+    Bordered table areas on a page.
+
+    A group of connected rulings is a table when at least three horizontal
+    rules run from its left to its right edge and at least two vertical rules
+    run from its top to its bottom edge.
+
+    Args:
+        page: PyMuPDF page
+        min_rule_length: Shortest segment counted as a ruling (points)
+        tolerance: Gap still treated as touching, and slack allowed where a
+            rule meets the group's outline (points)
+
+    Returns:
+        Region bboxes (x0, y0, x1, y1), top-left origin
+    """
+    horizontal, vertical = _ruling_segments(page, min_rule_length)
+    segments = horizontal + vertical
+    if len(horizontal) < 3 or len(vertical) < 2:
+        return []
+
+    regions = []
+    for group in _group_segments(segments, tolerance):
+        boxes = [segments[i] for i in group]
+        x0 = min(b[0] for b in boxes)
+        y0 = min(b[1] for b in boxes)
+        x1 = max(b[2] for b in boxes)
+        y1 = max(b[3] for b in boxes)
+        if x1 - x0 < min_rule_length or y1 - y0 < min_rule_length:
+            continue
+
+        slack = 2 * tolerance
+        spanning_rows = sum(
+            1 for i in group
+            if i < len(horizontal) and segments[i][0] - x0 <= slack and x1 - segments[i][2] <= slack
+        )
+        spanning_cols = sum(
+            1 for i in group
+            if i >= len(horizontal) and segments[i][1] - y0 <= slack and y1 - segments[i][3] <= slack
+        )
+        if spanning_rows >= 3 and spanning_cols >= 2:
+            regions.append((x0, y0, x1, y1))
+
+    return regions
+
+
+def find_text_grid(
+    page,
+    column_tolerance: float = 3.0,
+    row_tolerance: float = 2.0,
+    min_rows: int = 4,
+    min_columns: int = 3
+) -> Tuple[int, List[BBox]]:
+    """
+    Detect borderless tables from word alignment.
+
+    Rows are keyed by baseline rather than PyMuPDF line, since CAD exports
+    often write every cell as its own text block.
+
+    Args:
+        page: PyMuPDF page
+        column_tolerance: Word start positions closer than this share a column
+        row_tolerance: Words whose baselines are closer than this share a row
+        min_rows: Rows needed for a grid
+        min_columns: Shared columns a row needs to count as aligned
+
+    Returns:
+        (aligned row count, [bbox of the aligned rows])
+    """
+    rows: Dict[int, List[Tuple[float, BBox]]] = defaultdict(list)
+    for x0, y0, x1, y1, *_ in page.get_text('words'):
+        rows[round(y1 / row_tolerance)].append((x0, (x0, y0, x1, y1)))
+    if len(rows) < min_rows:
+        return 0, []
+
+    # Column positions shared by at least min_rows rows
+    rows_per_column = defaultdict(set)
+    for key, words in rows.items():
+        for x0, _ in words:
+            rows_per_column[round(x0 / column_tolerance)].add(key)
+    columns = {col for col, keys in rows_per_column.items() if len(keys) >= min_rows}
+    if len(columns) < min_columns:
+        return 0, []
+
+    aligned = [
+        words for words in rows.values()
+        if len({round(x0 / column_tolerance) for x0, _ in words} & columns) >= min_columns
+    ]
+    if len(aligned) < min_rows:
+        return 0, []
+
+    boxes = [bbox for words in aligned for _, bbox in words]
+    region = (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes)
+    )
+    return len(aligned), [region]
+
+
+def classify_page(page, page_number: Optional[int] = None) -> TablePageSignals:
+    """
+    Score how likely a page is to contain a table.
+
+    Args:
+        page: PyMuPDF page
+        page_number: 1-indexed page number (default: page.number + 1)
+
+    Returns:
+        TablePageSignals
+    """
+    signals = TablePageSignals(
+        page_number=page_number if page_number is not None else page.number + 1,
+        page_height=page.rect.height
+    )
+
+    try:
+        signals.ruled_regions = find_ruled_regions(page)
+    except Exception as e:
+        logger.debug(f"Ruling detection failed on page {signals.page_number}: {e}")
+    signals.aligned_rows, grid_regions = find_text_grid(page)
+    signals.keywords = sorted({m.upper() for m in TABLE_KEYWORDS.findall(page.get_text())})
+
+    # Borderless grids that already sit inside a ruled table add nothing
+    signals.text_grid_regions = [
+        region for region in grid_regions
+        if not any(_contains(ruled, region) for ruled in signals.ruled_regions)
+    ]
+
+    score = 0.0
+    if signals.ruled_regions:
+        score += RULING_GRID_SCORE
+    if signals.aligned_rows:
+        score += TEXT_GRID_SCORE
+    if signals.keywords:
+        score += KEYWORD_SCORE
+    signals.score = round(min(score, 1.0), 2)
+    return signals
+
+
+def classify_pages(doc, pages: Optional[Iterable[int]] = None) -> List[TablePageSignals]:
+    """
+    Classify pages of an open PyMuPDF document.
+
+    Args:
+        doc: PyMuPDF document
+        pages: 1-indexed pages to classify (None = all)
+
+    Returns:
+        TablePageSignals per page, in page order
+    """
+    page_numbers = sorted(set(pages)) if pages else range(1, len(doc) + 1)
+    return [
+        classify_page(doc[page_number - 1], page_number)
+        for page_number in page_numbers
+        if 1 <= page_number <= len(doc)
+    ]
+
+
+def _contains(outer: BBox, inner: BBox, tolerance: float = 2.0) -> bool:
+    return (
+        outer[0] - tolerance <= inner[0] and outer[1] - tolerance <= inner[1]
+        and inner[2] <= outer[2] + tolerance and inner[3] <= outer[3] + tolerance
+    )
@@ -0,0 +1,130 @@
+"""
+Tests for lazy, page-range-first rasterization in ImageProcessor.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+import fitz  # PyMuPDF
+import pytest
+from django.test import SimpleTestCase
+
+from rag_service.services.extraction import image_processor
+from rag_service.services.extraction.image_processor import ImageProcessor
+
+
+class TestImageProcessorRasterization(SimpleTestCase):
+    """Test ImageProcessor renders only requested pages at an adaptive DPI"""
+
+    def setUp(self):
+        # Five ARCH D sheets (36x24in), far larger than any vision limit at 300 DPI
+        handle, self.pdf_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        doc = fitz.open()
+        for i in range(5):
+            page = doc.new_page(width=36 * 72, height=24 * 72)
+            page.insert_text((72, 72), f'Sheet S-{i + 1:02d}', fontsize=48)
+        doc.save(self.pdf_path)
+        doc.close()
+        self.addCleanup(os.remove, self.pdf_path)
+
+        self.processor = ImageProcessor({'max_width': 2000, 'max_height': 2000, 'use_cache': False})
+        self.rendered = []
+        render = self.processor._render_pdf_page
+
+        self.render_threads = set()
+
+        def tracking_render(doc, page_number, *args):
+            self.rendered.append(page_number)
+            self.render_threads.add(threading.current_thread().name)
+            return render(doc, page_number, *args)
+
+        self.processor._render_pdf_page = tracking_render
+
+    @pytest.mark.asyncio
+    async def test_renders_only_requested_pages(self):
+        """Test page_numbers and max_pages are applied before rendering"""
+        images = await self.processor.convert_file_to_images(self.pdf_path, page_numbers=[3])
+        assert [image['page_number'] for image in images] == [3]
+
+        images = await self.processor.convert_file_to_images(self.pdf_path, max_pages=2)
+        assert [image['page_number'] for image in images] == [1, 2]
+        assert self.rendered == [3, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_adaptive_dpi_fits_target_dimensions(self):
+        """Test large sheets render at the DPI that fits the provider limit"""
+        images = await self.processor.convert_file_to_images(
+            self.pdf_path,
+            page_numbers=[1],
+            max_dimensions=self.processor.target_dimensions('openai')
+        )
+
+        image = images[0]
+        assert image['width'] <= 2000 and image['height'] <= 2000
+        assert image['width'] >= 1990
+        assert image['dpi'] < 300
+        assert self.processor.adaptive_dpi(8.5 * 72, 11 * 72) == 181.81
+
+    @pytest.mark.asyncio
+    async def test_pages_render_on_demand(self):
+        """Test the iterator renders the next page only when asked"""
+        images = self.processor.iter_page_images(self.pdf_path)
+
+        first = await images.__anext__()
+        assert first['page_number'] == 1
+        assert self.rendered == [1]
+
+        await images.aclose()
+        assert self.rendered == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_documents_render_on_one_thread(self):
+        """Test PyMuPDF is only ever driven from the render thread"""
+        async def render(page_numbers):
+            return await self.processor.convert_file_to_images(self.pdf_path, page_numbers=page_numbers)
+
+        first, second = await asyncio.gather(render([1, 2]), render([3, 4]))
+
+        assert [image['page_number'] for image in first + second] == [1, 2, 3, 4]
+        assert len(self.render_threads) == 1
+        assert self.render_threads.pop().startswith('pdf-render')
+
+    @pytest.mark.asyncio
+    async def test_select_pages_skips_missing_pages(self):
+        """Test page selection ignores pages outside the document and reads the PDF on the render thread"""
+        page_count = image_processor._pdf_page_count
+        threads = []
+
+        def counting_page_count(file_path):
+            threads.append(threading.current_thread().name)
+            return page_count(file_path)
+
+        with patch.object(image_processor, '_pdf_page_count', counting_page_count):
+            assert await self.processor.select_pages(self.pdf_path, page_numbers=[5, 9, 2]) == [2, 5]
+            assert await self.processor.select_pages(self.pdf_path, max_pages=3) == [1, 2, 3]
+        assert self.rendered == []
+        assert len(threads) == 2 and all(name.startswith('pdf-render') for name in threads)
+
+    @pytest.mark.asyncio
+    async def test_vision_processor_renders_on_render_thread(self):
+        """Test the vision extractor's page rendering stays off the event loop"""
+        from rag_service.services.extraction import vision
+
+        processor = vision.ImageProcessor(dpi=20)
+        render = processor._render_pdf
+        threads = []
+
+        def tracking_render(*args):
+            threads.append(threading.current_thread().name)
+            return render(*args)
+
+        processor._render_pdf = tracking_render
+        with patch.object(vision, 'get_page_image_cache', return_value=None):
+            images = await processor.convert_file_to_images(self.pdf_path, max_pages=2)
+
+        assert [image['page_number'] for image in images] == [1, 2]
+        assert len(threads) == 1 and threads[0].startswith('pdf-render')
@@ -0,0 +1,88 @@
+"""
+Tests for page fingerprints and revision diffs.
+"""
+
+import os
+import tempfile
+
+import fitz  # PyMuPDF
+from django.test import SimpleTestCase
+
+from rag_service.services.extraction.page_fingerprint import (
+    PageFingerprint,
+    diff_page_fingerprints,
+    fingerprint_pdf_pages,
+    fingerprints_from_pages,
+    text_fingerprint,
+)
+
+
+class TestPageFingerprint(SimpleTestCase):
+    """Test text/graphics hashes of PDF pages"""
+
+    def _make_pdf(self, sheets):
+        """Write a PDF with one page per (title, wall_x) sheet"""
+        handle, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        doc = fitz.open()
+        for title, wall_x in sheets:
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), title, fontsize=18)
+            page.draw_line((wall_x, 200), (wall_x, 600))
+            page.draw_rect(fitz.Rect(100, 300, 250, 400))
+        doc.save(path)
+        doc.close()
+        return path
+
+    def test_text_hash_ignores_whitespace(self):
+        """Test reflowed whitespace does not change the text hash"""
+        assert text_fingerprint('GENERAL  NOTES\n1. Concrete') == text_fingerprint('GENERAL NOTES 1. Concrete ')
+        assert text_fingerprint('GENERAL NOTES') != text_fingerprint('GENERAL NOTE')
+
+    def test_text_and_graphics_changes_are_separate(self):
+        """Test moving a line changes only the graphics hash, editing text only the text hash"""
+        original = fingerprint_pdf_pages(self._make_pdf([('A-101', 300), ('A-102', 300)]))
+        moved_wall = fingerprint_pdf_pages(self._make_pdf([('A-101', 300), ('A-102', 320)]))
+        new_title = fingerprint_pdf_pages(self._make_pdf([('A-101 REV B', 300), ('A-102', 300)]))
+
+        assert set(original) == {1, 2}
+        assert original[1] == moved_wall[1]
+        assert original[2].text_hash == moved_wall[2].text_hash
+        assert original[2].graphics_hash != moved_wall[2].graphics_hash
+
+        assert original[1].text_hash != new_title[1].text_hash
+        assert original[1].graphics_hash == new_title[1].graphics_hash
+        assert original[2] == new_title[2]
+
+    def test_diff_classifies_pages(self):
+        """Test unchanged, changed, added and removed pages are reported"""
+        previous = {
+            1: PageFingerprint('t1', 'g1'),
+            2: PageFingerprint('t2', 'g2'),
+            3: PageFingerprint('t3', 'g3'),
+        }
+        current = {
+            1: PageFingerprint('t1', 'g1'),
+            2: PageFingerprint('t2', 'g2-moved'),
+        }
+        diff = diff_page_fingerprints(previous, current)
+
+        assert diff.unchanged == [1]
+        assert diff.changed == [2]
+        assert diff.removed == [3]
+        assert diff.stale == [2, 3]
+
+        grown = diff_page_fingerprints(current, {**current, 3: PageFingerprint('t3', 'g3')})
+        assert grown.added == [3]
+        assert grown.reprocess == [3]
+        assert grown.summary()['pages_skipped'] == 2
+
+    def test_missing_graphics_hash_compares_text_only(self):
+        """Test pages without a graphics hash still match on text"""
+        pages = [{'page_number': 1, 'text': 'Sheet A-101'}]
+        current = fingerprints_from_pages(pages)
+        previous = {1: PageFingerprint(text_fingerprint('Sheet A-101'), 'g1')}
+
+        assert diff_page_fingerprints(previous, current).unchanged == [1]
@@ -0,0 +1,128 @@
+"""
+Tests for the disk-backed rendered page image cache.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+import fitz  # PyMuPDF
+import pytest
+from django.test import SimpleTestCase
+
+from rag_service.services.extraction.image_processor import ImageProcessor
+from rag_service.services.extraction.page_image_cache import PageImageCache, file_content_hash
+
+
+class TestPageImageCache(SimpleTestCase):
+    """Test PageImageCache storage, eviction and ImageProcessor integration"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+
+        handle, self.pdf_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        doc = fitz.open()
+        for i in range(2):
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), f'Sheet A-{i + 1}', fontsize=24)
+        doc.save(self.pdf_path)
+        doc.close()
+        self.addCleanup(os.remove, self.pdf_path)
+
+    def test_keys_cover_render_parameters(self):
+        """Test any change in page, DPI, color mode or crop box changes the key"""
+        base = PageImageCache.make_key('abc', 0, 150, 'rgb', (0, 0, 612, 792), 'png')
+
+        assert base == PageImageCache.make_key('abc', 0, 150, 'rgb', (0, 0, 612, 792), 'png')
+        assert base != PageImageCache.make_key('abc', 1, 150, 'rgb', (0, 0, 612, 792), 'png')
+        assert base != PageImageCache.make_key('abc', 0, 200, 'rgb', (0, 0, 612, 792), 'png')
+        assert base != PageImageCache.make_key('abc', 0, 150, 'gray', (0, 0, 612, 792), 'png')
+        assert base != PageImageCache.make_key('abc', 0, 150, 'rgb', (0, 0, 300, 792), 'png')
+
+    def test_lru_eviction_respects_size_cap(self):
+        """Test least recently used entries are evicted once over the cap"""
+        cache = PageImageCache(self.cache_dir, max_bytes=250, evict_every=1)
+        cache.set('aa1', b'x' * 100)
+        cache.set('bb2', b'x' * 100)
+        os.utime(cache._path('aa1'), (1, 1))
+        os.utime(cache._path('bb2'), (2, 2))
+
+        assert cache.get('aa1') == b'x' * 100  # refreshes aa1
+        cache.set('cc3', b'x' * 100)
+
+        assert cache.get('bb2') is None
+        assert cache.get('aa1') is not None and cache.get('cc3') is not None
+        assert cache.stats['evictions'] == 1
+        assert cache.size_bytes() <= 250
+
+    def test_eviction_trims_to_low_water_mark(self):
+        """Test eviction leaves headroom so the next writes do not rescan the directory"""
+        cache = PageImageCache(self.cache_dir, max_bytes=1000)
+        for i in range(10):
+            cache.set(f'k{i:02d}', b'x' * 100)
+            os.utime(cache._path(f'k{i:02d}'), (i + 1, i + 1))
+        cache.evict()
+        cache.set('k10', b'x' * 100)
+
+        assert cache.stats['evictions'] == 2
+        assert cache.get('k00') is None and cache.get('k01') is None
+        assert cache.size_bytes() == 900
+
+        with patch.object(cache, '_scan', wraps=cache._scan) as scan:
+            cache.set('k11', b'x' * 100)
+        scan.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_file_skips_rendering(self):
+        """Test a second extraction over the same file is served from the cache"""
+        processor = ImageProcessor({'format': 'png'})
+        processor.page_cache = PageImageCache(self.cache_dir)
+
+        first = await processor.convert_file_to_images(self.pdf_path)
+
+        def fail_get_pixmap(*args, **kwargs):
+            raise AssertionError("page was re-rendered")
+
+        original = fitz.Page.get_pixmap
+        fitz.Page.get_pixmap = fail_get_pixmap
+        try:
+            second = await processor.convert_file_to_images(self.pdf_path)
+        finally:
+            fitz.Page.get_pixmap = original
+
+        assert [image['data'] for image in second] == [image['data'] for image in first]
+        assert [(i['width'], i['height']) for i in second] == [(i['width'], i['height']) for i in first]
+        assert processor.page_cache.stats == {
+            'hits': 2, 'misses': 2, 'writes': 2, 'evictions': 0, 'errors': 0
+        }
+
+    def test_content_hash_tracks_file_changes(self):
+        """Test the file hash changes when the file content changes"""
+        before = file_content_hash(self.pdf_path)
+        with open(self.pdf_path, 'ab') as f:
+            f.write(b'\n% appended')
+
+        assert file_content_hash(self.pdf_path) != before
+
+    @pytest.mark.asyncio
+    async def test_vision_hashes_file_off_the_event_loop(self):
+        """Test the vision extractor hashes the file for the cache key in a worker thread"""
+        from rag_service.services.extraction import vision
+
+        threads = []
+
+        def tracking_hash(file_path):
+            threads.append(threading.current_thread())
+            return file_content_hash(file_path)
+
+        processor = vision.ImageProcessor(dpi=20)
+        with patch.object(vision, 'get_page_image_cache', return_value=PageImageCache(self.cache_dir)), \
+                patch.object(vision, 'file_content_hash', tracking_hash):
+            images = await processor.convert_file_to_images(self.pdf_path)
+
+        assert [image['page_number'] for image in images] == [1, 2]
+        assert len(threads) == 1 and threads[0] is not threading.current_thread()
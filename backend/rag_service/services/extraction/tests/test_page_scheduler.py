@@ -0,0 +1,245 @@
+"""
+Tests for concurrent per-page vision calls.
+
+Runs VisionPageScheduler and VisionExtractor against a local fake provider
+that simulates latency, rate limiting and server errors.
+"""
+
+import asyncio
+import json
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.test import SimpleTestCase
+
+from modelhub.adapters.base import LLMResponse
+from rag_service.services.extraction import page_scheduler
+from rag_service.services.extraction.page_scheduler import (
+    ProviderLimiter,
+    TokenBucket,
+    VisionPageScheduler,
+    is_retryable_error,
+)
+from rag_service.services.extraction.vision import VisionConfig, VisionExtractor
+
+
+class FakeVisionProvider:
+    """UnifiedLLMClient stand-in: fixed latency, scripted failures per page"""
+
+    def __init__(self, latency=0.05, failures=None):
+        self.latency = latency
+        # page number -> list of errors returned on successive attempts
+        self.failures = {page: list(errors) for page, errors in (failures or {}).items()}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def call_llm(self, provider_slug, model_name, api_key, messages, **kwargs):
+        page = int(messages[0]['content'][1]['text'])
+        self.calls.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        pending = self.failures.get(page)
+        if pending:
+            error = pending.pop(0)
+            return LLMResponse(
+                content=f"Error: {error}", tokens_input=0, tokens_output=0,
+                latency_ms=int(self.latency * 1000), cost=Decimal('0'),
+                raw_response={'error': error, 'type': 'APIStatusError'}
+            )
+        return LLMResponse(
+            content=json.dumps({'text_content': f'page {page}', 'confidence': 0.9}),
+            tokens_input=100, tokens_output=20,
+            latency_ms=int(self.latency * 1000), cost=Decimal('0.01'),
+            raw_response={}
+        )
+
+
+class TestVisionPageScheduler(SimpleTestCase):
+    """Test VisionPageScheduler concurrency, ordering and retries"""
+
+    @pytest.mark.asyncio
+    async def test_runs_pages_concurrently_within_limit(self):
+        """Test pages overlap up to the concurrency limit and keep page order"""
+        in_flight = {'now': 0, 'max': 0}
+
+        async def call(page, index):
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            await asyncio.sleep(0.05 if page % 2 else 0.01)
+            in_flight['now'] -= 1
+            return {'success': True, 'page': page}
+
+        scheduler = VisionPageScheduler('fake', limiter=ProviderLimiter(3, 0))
+        start = time.monotonic()
+        outcome = await scheduler.run(range(9), call)
+
+        assert [r['page'] for r in outcome['results']] == list(range(9))
+        assert in_flight['max'] == 3
+        assert time.monotonic() - start < 9 * 0.03
+        assert outcome['failed'] == [] and not outcome['partial']
+
+    @pytest.mark.asyncio
+    async def test_retries_retryable_errors_only(self):
+        """Test 429/5xx are retried with backoff and other errors are not"""
+        attempts = {}
+
+        async def call(page, index):
+            attempts[page] = attempts.get(page, 0) + 1
+            if page == 'rate-limited' and attempts[page] < 3:
+                return {'success': False, 'error': 'Error code: 429 - rate limit exceeded'}
+            if page == 'bad-request':
+                return {'success': False, 'error': 'Error code: 400 - invalid image'}
+            return {'success': True}
+
+        scheduler = VisionPageScheduler(
+            'fake', max_retries=3, base_delay=0.001, limiter=ProviderLimiter(4, 0)
+        )
+        outcome = await scheduler.run(['rate-limited', 'bad-request', 'ok'], call)
+
+        assert attempts == {'rate-limited': 3, 'bad-request': 1, 'ok': 1}
+        assert outcome['failed'] == [1]
+        assert outcome['partial']
+        assert outcome['results'][0]['attempts'] == 3
+
+    @pytest.mark.asyncio
+    async def test_retried_page_keeps_its_data(self):
+        """Test a retry sees the same page payload and a raised error names the page"""
+        seen = []
+
+        async def call(page, index):
+            seen.append(page['data'])
+            if page['page_number'] == 2:
+                raise RuntimeError('connection reset')
+            if len(seen) == 1:
+                return {'success': False, 'error': 'Error code: 503 - overloaded'}
+            return {'success': True}
+
+        scheduler = VisionPageScheduler('fake', max_retries=2, base_delay=0.001, limiter=ProviderLimiter(1, 0))
+        outcome = await scheduler.run([{'data': b'p1', 'page_number': 1}, {'data': b'p2', 'page_number': 2}], call)
+
+        assert seen == [b'p1', b'p1', b'p2']
+        assert outcome['results'][1] == {
+            'success': False, 'error': 'connection reset', 'page_number': 2, 'attempts': 1
+        }
+
+    @pytest.mark.asyncio
+    async def test_failed_run_releases_provider_slots(self):
+        """Test slots are returned when pages are cancelled before or after they start"""
+        limiter = ProviderLimiter(4, 0)
+
+        async def call(page, index):
+            await asyncio.sleep(1)
+            return {'success': True}
+
+        def pages():
+            yield 1
+            yield 2
+            raise OSError('render failed')
+
+        # Page tasks are cancelled in the step that created them
+        with pytest.raises(OSError):
+            await VisionPageScheduler('fake', limiter=limiter).run(pages(), call)
+        await asyncio.sleep(0)
+        assert limiter.semaphore._value == 4
+
+        run = asyncio.ensure_future(VisionPageScheduler('fake', limiter=limiter).run(range(6), call))
+        await asyncio.sleep(0.01)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        await asyncio.sleep(0)
+        assert limiter.semaphore._value == 4
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_limits_rate(self):
+        """Test the bucket allows the burst, then spaces requests by 1/rate"""
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        # 2 immediately, 3 more at 20ms intervals
+        assert time.monotonic() - start >= 0.055
+
+    def test_retryable_classification(self):
+        """Test error classification"""
+        assert is_retryable_error('Error code: 503 - overloaded')
+        assert is_retryable_error('anything', 'RateLimitError')
+        assert not is_retryable_error('Error code: 401 - authentication failed')
+        assert not is_retryable_error('Invalid image format')
+
+
+class TestVisionExtractorPages(SimpleTestCase):
+    """Test VisionExtractor page extraction against the fake provider"""
+
+    def setUp(self):
+        # 4 concurrent requests, no rate limit
+        limiter_patch = patch.object(
+            page_scheduler, 'get_provider_limiter', lambda slug: ProviderLimiter(4, 0)
+        )
+        limiter_patch.start()
+        self.addCleanup(limiter_patch.stop)
+
+    def _extractor(self, provider):
+        extractor = VisionExtractor(VisionConfig(max_retries=3, retry_delay_seconds=0.001))
+        extractor.llm_client = provider
+        # Put the page number where the fake provider can read it
+        extractor._build_vision_messages = lambda prompt, base64_image, provider_slug: [
+            {'role': 'user', 'content': [{'type': 'image'}, {'type': 'text', 'text': prompt}]}
+        ]
+        return extractor
+
+    async def _extract(self, extractor, page_count):
+        model = SimpleNamespace(name='fake-vision', provider=SimpleNamespace(slug='fake-vision'))
+        api_key = SimpleNamespace(key='test-key')
+        images = [{'data': b'img', 'page_number': i + 1} for i in range(page_count)]
+
+        original = extractor._extract_from_image
+
+        async def extract_from_image(image, model, api_key, prompt, page_number):
+            return await original(image, model, api_key, str(page_number), page_number)
+
+        extractor._extract_from_image = extract_from_image
+        return await extractor._extract_pages(images, model, api_key, prompt='')
+
+    @pytest.mark.asyncio
+    async def test_pages_extracted_concurrently_in_order(self):
+        """Test wall clock is well under the sum of page latencies"""
+        provider = FakeVisionProvider(latency=0.05)
+        extractor = self._extractor(provider)
+
+        start = time.monotonic()
+        results = await self._extract(extractor, 8)
+
+        assert time.monotonic() - start < 8 * 0.05 / 2
+        assert provider.max_in_flight == 4
+        assert [r['page_number'] for r in results] == list(range(1, 9))
+        assert all(r['success'] for r in results)
+
+    @pytest.mark.asyncio
+    async def test_partial_results_when_pages_fail(self):
+        """Test 429s are retried and a permanently failing page is reported"""
+        provider = FakeVisionProvider(latency=0.01, failures={
+            2: ['Error code: 429 - rate limited'],
+            3: ['Error code: 500 - internal error'] * 5,
+        })
+        extractor = self._extractor(provider)
+
+        results = await self._extract(extractor, 4)
+        combined = extractor._combine_results(results)
+
+        assert [r['success'] for r in results] == [True, True, False, True]
+        assert provider.calls.count(2) == 2
+        assert provider.calls.count(3) == 3
+        assert combined['metadata']['successful_pages'] == 3
+        assert combined['metadata']['failed_pages'] == 1
+        assert 'page 4' in combined['text']
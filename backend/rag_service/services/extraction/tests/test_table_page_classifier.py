@@ -0,0 +1,215 @@
+"""
+Tests for candidate-page table extraction.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import fitz  # PyMuPDF
+import pytest
+from django.test import SimpleTestCase
+
+from rag_service.services.extraction import table_extractor
+from rag_service.services.extraction.page_image_cache import PageImageCache
+from rag_service.services.extraction.table_extractor import TableExtractor
+from rag_service.services.extraction.table_page_classifier import classify_page
+
+
+def draw_schedule(page, title='DOOR SCHEDULE', top=80):
+    """Draw a bordered 3-column schedule"""
+    page.insert_text((72, top - 20), title, fontsize=14)
+    xs = [72, 150, 250, 350]
+    ys = [top + i * 20 for i in range(6)]
+    for y in ys:
+        page.draw_line((xs[0], y), (xs[-1], y))
+    for x in xs:
+        page.draw_line((x, ys[0]), (x, ys[-1]))
+    rows = [['MARK', 'TYPE', 'QTY'], ['D1', 'HM', '4'], ['D2', 'WD', '6'], ['D3', 'AL', '2'], ['D4', 'HM', '1']]
+    for r, row in enumerate(rows):
+        for c, text in enumerate(row):
+            page.insert_text((xs[c] + 4, ys[r] + 14), text, fontsize=9)
+
+
+def draw_borderless_schedule(page, top=80):
+    """Draw a 3-column schedule laid out by text alignment alone"""
+    rows = [['MARK', 'SIZE', 'QTY'], ['F1', '1200', '4'], ['F2', '1500', '6'], ['F3', '1800', '2'], ['F4', '2100', '1']]
+    for r, row in enumerate(rows):
+        for c, text in enumerate(row):
+            page.insert_text((72 + c * 100, top + r * 20), text, fontsize=9)
+
+
+def draw_floor_plan(page):
+    """Walls: many rulings, none running edge to edge"""
+    for i in range(10):
+        page.draw_line((100 + i * 30, 100), (100 + i * 30, 100 + (i % 3 + 1) * 60))
+    for i in range(5):
+        page.draw_line((100, 120 + i * 40), (100 + (i + 1) * 40, 120 + i * 40))
+    page.insert_text((100, 320), 'FIRST FLOOR PLAN', fontsize=12)
+
+
+class TestTablePageClassifier(SimpleTestCase):
+    """Test page classification and candidate-only extraction"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+
+        handle, self.pdf_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        doc = fitz.open()
+        notes = doc.new_page(width=612, height=792)
+        notes.insert_text((72, 72), 'GENERAL NOTES\n1. All work per code.\n2. Verify dimensions.', fontsize=11)
+        notes.draw_rect(fitz.Rect(20, 20, 592, 772))
+        draw_schedule(doc.new_page(width=612, height=792))
+        draw_floor_plan(doc.new_page(width=612, height=792))
+        draw_schedule(doc.new_page(width=612, height=792), title='WINDOW SCHEDULE', top=300)
+        doc.save(self.pdf_path)
+        doc.close()
+        self.addCleanup(os.remove, self.pdf_path)
+
+    def test_classifier_flags_only_schedule_pages(self):
+        """Test ruled schedules are candidates while notes and floor plans are not"""
+        with fitz.open(self.pdf_path) as doc:
+            signals = [classify_page(page) for page in doc]
+
+        assert [s.is_candidate for s in signals] == [False, True, False, True]
+        assert signals[1].ruled_regions == [(72.0, 80.0, 350.0, 180.0)]
+        assert 'SCHEDULE' in signals[1].keywords
+        assert signals[1].aligned_rows >= 4
+
+    def test_borderless_table_is_candidate(self):
+        """Test a text grid alone makes a page a candidate"""
+        doc = fitz.open()
+        page = doc.new_page(width=612, height=792)
+        draw_borderless_schedule(page)
+
+        signals = classify_page(page)
+        doc.close()
+
+        assert signals.ruled_regions == []
+        assert signals.aligned_rows >= 4
+        assert signals.is_candidate
+
+    @pytest.mark.asyncio
+    async def test_extracts_candidate_pages_only(self):
+        """Test table extraction runs once per candidate page"""
+        extracted = []
+        original = table_extractor.extract_page_tables
+
+        def tracking_extract(file_path, page_number, regions, page_height):
+            extracted.append(page_number)
+            return original(file_path, page_number, regions, page_height)
+
+        with patch.object(table_extractor, 'extract_page_tables', tracking_extract):
+            result = await TableExtractor(max_workers=0, use_cache=False).extract_tables(self.pdf_path)
+
+        assert sorted(extracted) == [2, 4]
+        assert result['stats']['pages_scanned'] == 4
+        assert sorted(result['tables_by_page']) == [2, 4]
+        assert list(result['tables'][0]['data'].columns) == ['MARK', 'TYPE', 'QTY']
+        assert result['tables'][0]['data'].shape == (4, 3)
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_inline(self):
+        """Test worker processes return the same tables as in-thread extraction"""
+        inline = await TableExtractor(max_workers=0, use_cache=False).extract_tables(self.pdf_path)
+        pooled = await TableExtractor(max_workers=2, use_cache=False).extract_tables(self.pdf_path)
+
+        assert [t['page'] for t in pooled['tables']] == [t['page'] for t in inline['tables']]
+        assert [t['text'] for t in pooled['tables']] == [t['text'] for t in inline['tables']]
+
+    @pytest.mark.asyncio
+    async def test_cached_pages_skip_extraction(self):
+        """Test a second run is served from the per-page cache"""
+        cache = PageImageCache(self.cache_dir)
+        extractor = TableExtractor(max_workers=0, use_cache=True)
+
+        with patch.object(table_extractor, 'get_table_cache', return_value=cache):
+            first = await extractor.extract_tables(self.pdf_path)
+            with patch.object(table_extractor, 'extract_page_tables', side_effect=AssertionError('not cached')):
+                second = await extractor.extract_tables(self.pdf_path)
+
+        assert second['stats']['cached_pages'] == [2, 4]
+        assert [t['page'] for t in second['tables']] == [t['page'] for t in first['tables']]
+        assert second['tables'][0]['data'].equals(first['tables'][0]['data'])
+
+    @pytest.mark.asyncio
+    async def test_slow_page_times_out(self):
+        """Test a page exceeding the timeout is reported as failed"""
+        original = table_extractor.extract_page_tables
+
+        def slow_extract(file_path, page_number, regions, page_height):
+            if page_number == 4:
+                time.sleep(1.0)
+            return original(file_path, page_number, regions, page_height)
+
+        extractor = TableExtractor(max_workers=0, page_timeout=0.2, use_cache=False)
+        with patch.object(table_extractor, 'extract_page_tables', slow_extract):
+            result = await extractor.extract_tables(self.pdf_path)
+
+        assert result['stats']['failed_pages'] == [4]
+        assert sorted(result['tables_by_page']) == [2]
+
+    @pytest.mark.asyncio
+    async def test_queued_pages_do_not_time_out(self):
+        """Test the timeout starts when a worker picks the page up, not when it is queued"""
+        doc = fitz.open()
+        for _ in range(6):
+            draw_schedule(doc.new_page(width=612, height=792))
+        doc.save(self.pdf_path)
+        doc.close()
+        original = table_extractor.extract_page_tables
+
+        def slow_extract(file_path, page_number, regions, page_height):
+            time.sleep(0.15)
+            return original(file_path, page_number, regions, page_height)
+
+        # Threads stand in for worker processes so the patched function is used
+        extractor = TableExtractor(max_workers=2, page_timeout=0.25, use_cache=False)
+        with patch.object(table_extractor, 'extract_page_tables', slow_extract), \
+                patch.object(table_extractor, 'ProcessPoolExecutor', ThreadPoolExecutor), \
+                patch.object(table_extractor, '_page_pools', {}):
+            result = await extractor.extract_tables(self.pdf_path)
+
+        assert result['stats']['failed_pages'] == []
+        assert sorted(result['tables_by_page']) == [1, 2, 3, 4, 5, 6]
+
+    @pytest.mark.asyncio
+    async def test_documents_share_the_worker_pool(self):
+        """Test one pool of workers serves every document, not one per extraction"""
+        created = []
+
+        def counting_pool(max_workers):
+            created.append(max_workers)
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        extractor = TableExtractor(max_workers=2, use_cache=False)
+        with patch.object(table_extractor, 'ProcessPoolExecutor', counting_pool), \
+                patch.object(table_extractor, '_page_pools', {}):
+            first = await extractor.extract_tables(self.pdf_path)
+            second = await extractor.extract_tables(self.pdf_path)
+            pool = table_extractor._page_pools[2]
+
+        assert created == [2]
+        assert pool.users == 0
+        assert sorted(first['tables_by_page']) == sorted(second['tables_by_page']) == [2, 4]
+
+    @pytest.mark.asyncio
+    async def test_classification_runs_on_render_thread(self):
+        """Test PyMuPDF page classification stays on the shared render thread"""
+        threads = []
+        original = table_extractor.classify_pages
+
+        def tracking_classify(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        with patch.object(table_extractor, 'classify_pages', tracking_classify):
+            await TableExtractor(max_workers=0, use_cache=False).extract_tables(self.pdf_path)
+
+        assert threads and all(name.startswith('pdf-render') for name in threads)
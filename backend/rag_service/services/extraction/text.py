@@ -48,12 +48,14 @@ class TextExtractor:
         """
         self.config = config or TextExtractorConfig()
         
-    def extract(self, file_path: str) -> Dict[str, Any]:
+    def extract(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
         """
         Extract text from a file based on its extension.
         
         Args:
             file_path: Path to the file
+            pages: 1-indexed PDF pages to extract (None extracts every page;
+                ignored for other formats)
             
         Returns:
             Dictionary containing extracted text and metadata
@@ -73,7 +75,7 @@ class TextExtractor:
         
         try:
             if file_ext == '.pdf':
-                return self._extract_pdf(file_path)
+                return self._extract_pdf(file_path, pages)
             elif file_ext == '.docx':
                 return self._extract_docx(file_path)
             elif file_ext == '.txt':
@@ -87,13 +89,16 @@ class TextExtractor:
         except Exception as e:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
-    
-    def _extract_pdf(self, file_path: str) -> Dict[str, Any]:
+
+    def _extract_pdf(self, file_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
         """
         Extract text from a PDF file.
         
         Args:
             file_path: Path to the PDF file
+            pages: 1-indexed pages to extract (None for every page); 'text'
+                then joins only those pages, metadata['page_count'] is still
+                the length of the document
             
         Returns:
             Dictionary containing extracted text and metadata
@@ -128,7 +133,12 @@ class TextExtractor:
             full_text = []
             low_text_density_pages = []
             
-            for page_num, page in enumerate(doc):
+            page_indexes = (
+                range(len(doc)) if pages is None
+                else sorted({page - 1 for page in pages if 0 < page <= len(doc)})
+            )
+            for page_num in page_indexes:
+                page = doc[page_num]
                 page_text = page.get_text()
                 page_dict = self._process_pdf_page(page, page_num, page_text)
                 result['pages'].append(page_dict)
@@ -142,7 +152,7 @@ class TextExtractor:
             result['text'] = '\n\n'.join(full_text)
             
             # Set scanned flag if many pages have low text density
-            if len(low_text_density_pages) > len(doc) * 0.5:
+            if len(low_text_density_pages) > len(page_indexes) * 0.5:
                 result['is_scanned'] = True
                 result['text_confidence'] = 0.3
                 result['problematic_pages'] = low_text_density_pages
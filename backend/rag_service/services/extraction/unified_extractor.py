@@ -16,6 +16,7 @@ from dataclasses import dataclass, field
 import pandas as pd
 
 from .multi_task_prompts import ExtractionTask, MultiTaskPrompts, SpecializedPrompts
+from .page_scheduler import VisionPageScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -98,22 +99,20 @@ class UnifiedExtractor:
             from modelhub.services.unified_llm_client import UnifiedLLMClient
             from modelhub.models import Model, APIKey, ModelMetrics
             
-            # Convert file to images
-            images = await self.image_processor.convert_file_to_images(request.file_path)
+            # Resolve the pages to process (page_range holds 0-based indices);
+            # pages are rendered lazily below, one at a time
+            page_numbers = await self.image_processor.select_pages(
+                request.file_path,
+                page_numbers=[i + 1 for i in request.page_range] if request.page_range else None,
+                max_pages=request.max_pages
+            )
             
-            if not images:
+            if not page_numbers:
                 return ExtractionResponse(
                     success=False,
                     error="Failed to convert file to images"
                 )
             
-            # Filter to specific pages if requested
-            if request.page_range:
-                images = [img for i, img in enumerate(images) if i in request.page_range]
-            
-            # Limit number of pages to process
-            images = images[:request.max_pages]
-            
             # Select vision model
             context = RequestContext(
                 entity_type='unified_extraction',
@@ -122,7 +121,7 @@ class UnifiedExtractor:
                 max_tokens=4000,
                 metadata={
                     'priority': request.quality_priority,
-                    'image_count': len(images),
+                    'image_count': len(page_numbers),
                     'tasks': [task.value for task in request.tasks],
                     'max_cost': request.max_cost_usd
                 }
@@ -167,20 +166,29 @@ class UnifiedExtractor:
                 metadata={
                     'file_path': request.file_path,
                     'file_name': os.path.basename(request.file_path),
-                    'page_count': len(images),
+                    'page_count': len(page_numbers),
                     'tasks': [task.value for task in request.tasks]
                 }
             )
             
             llm_client = UnifiedLLMClient()
-            total_cost = 0.0
-            total_time_ms = 0
             
-            for page_num, image in enumerate(images):
-                # Build the unified prompt based on requested tasks and specialized prompt
-                prompt = self._build_unified_prompt(request.tasks, request.specialized_prompt)
+            # Build the unified prompt based on requested tasks and specialized prompt
+            prompt = self._build_unified_prompt(request.tasks, request.specialized_prompt)
+            
+            images = self.image_processor.iter_page_images(
+                request.file_path,
+                page_numbers=page_numbers,
+                max_dimensions=self.image_processor.target_dimensions(model.provider.slug)
+            )
+            
+            # Spend per page across every attempt, including failed ones
+            page_costs: Dict[int, float] = {}
+            
+            async def extract_page(image: Dict[str, Any], index: int) -> Dict[str, Any]:
+                page_number = image['page_number']
                 
-                # Encode image
+                # The bytes stay on the page: a retry encodes them again
                 base64_image = base64.b64encode(image['data']).decode('utf-8')
                 
                 # Build vision messages
@@ -210,25 +218,60 @@ class UnifiedExtractor:
                     cost=float(llm_response.cost),
                     latency_ms=llm_response.latency_ms,
                     api_key=api_key,
-                    metadata={'task': 'unified_extraction', 'page': page_num + 1}
+                    metadata={'task': 'unified_extraction', 'page': page_number}
                 )
                 
-                # Update cost and time tracking
-                total_cost += float(llm_response.cost)
-                total_time_ms += llm_response.latency_ms
+                page_costs[index] = page_costs.get(index, 0.0) + float(llm_response.cost)
+                result = {
+                    'success': False,
+                    'page_number': page_number,
+                    'cost': float(llm_response.cost),
+                    'latency_ms': llm_response.latency_ms,
+                }
+                if not llm_response.content or llm_response.raw_response.get('error'):
+                    result['error'] = llm_response.raw_response.get('error') or 'Empty response'
+                    result['error_type'] = llm_response.raw_response.get('type')
+                    return result
                 
-                # Parse response
-                if llm_response.content and not llm_response.raw_response.get('error'):
-                    try:
-                        page_results = json.loads(llm_response.content)
-                        self._merge_page_results(response, page_results, page_num + 1)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse LLM response for page {page_num + 1}: {e}")
-                        response.warnings.append(f"Failed to parse response for page {page_num + 1}")
+                # Parse response (malformed JSON is not worth retrying)
+                try:
+                    result['page_results'] = json.loads(llm_response.content)
+                    result['success'] = True
+                except json.JSONDecodeError as e:
+                    logger.error(f"Failed to parse LLM response for page {page_number}: {e}")
+                    result['error'] = f"Failed to parse response for page {page_number}"
+                    result['retryable'] = False
+                return result
+            
+            # Pages run concurrently under the provider's limits; results come
+            # back in page order
+            scheduler = VisionPageScheduler(provider_slug=model.provider.slug)
+            outcome = await scheduler.run(images, extract_page)
+            
+            total_cost = sum(page_costs.values())
+            total_latency_ms = 0
+            failed_pages = []
+            for page_result in outcome['results']:
+                total_latency_ms += page_result.get('latency_ms', 0)
+                if page_result.get('success'):
+                    self._merge_page_results(response, page_result['page_results'], page_result['page_number'])
+                else:
+                    failed_pages.append(page_result.get('page_number'))
+                    response.warnings.append(
+                        f"Page {page_result.get('page_number')} failed: {page_result.get('error')}"
+                    )
+            
+            if failed_pages:
+                response.metadata['failed_pages'] = failed_pages
+                response.metadata['partial'] = outcome['partial']
+                if not outcome['partial']:
+                    response.success = False
+                    response.error = "Extraction failed for all pages"
             
-            # Update final cost and time
+            # Update final cost and time (wall clock; pages overlap)
             response.cost_usd = total_cost
-            response.processing_time_ms = total_time_ms
+            response.processing_time_ms = outcome['duration_ms']
+            response.metadata['llm_latency_ms_total'] = total_latency_ms
             
             return response
             
@@ -21,7 +21,12 @@ from decimal import Decimal
 from io import BytesIO
 from pathlib import Path
 
+from asgiref.sync import sync_to_async
+
 from .base import BaseExtractor, ExtractionResult
+from .image_processor import run_in_render_thread
+from .page_image_cache import file_content_hash, get_page_image_cache
+from .page_scheduler import VisionPageScheduler
 from modelhub.services.routing import EnhancedModelRouter
 from modelhub.services.routing.types import RequestContext
 from modelhub.services.unified_llm_client import UnifiedLLMClient
@@ -50,19 +55,19 @@ class ImageProcessor:
     def __init__(self, dpi: int = 300):
         self.dpi = dpi
         
-    async def convert_file_to_images(self, file_path: str) -> List[Dict[str, Any]]:
+    async def convert_file_to_images(self, file_path: str, max_pages: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Convert a file (PDF, image) to a list of images.
         
         Args:
             file_path: Path to the file
+            max_pages: Only render the first max_pages pages
             
         Returns:
             List of image dictionaries with data and metadata
         """
         try:
             # Import libraries here to avoid dependencies if not used
-            import fitz  # PyMuPDF
             from PIL import Image
             
             file_ext = Path(file_path).suffix.lower()
@@ -70,21 +75,15 @@ class ImageProcessor:
             
             # Handle PDF files
             if file_ext == '.pdf':
-                doc = fitz.open(file_path)
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    pix = page.get_pixmap(dpi=self.dpi)
-                    img_data = pix.tobytes("jpeg")
-                    
-                    images.append({
-                        'data': img_data,
-                        'format': 'jpeg',
-                        'page_number': page_num + 1,
-                        'width': pix.width,
-                        'height': pix.height,
-                        'dpi': self.dpi
-                    })
-                doc.close()
+                page_cache = get_page_image_cache()
+                # Hashing reads the whole file: keep it off the event loop
+                file_hash = (
+                    await sync_to_async(file_content_hash, thread_sensitive=False)(file_path)
+                    if page_cache else None
+                )
+                images = await run_in_render_thread(
+                    self._render_pdf, file_path, max_pages, page_cache, file_hash
+                )
                 
             # Handle image files
             elif file_ext in ['.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp', '.webp']:
@@ -115,6 +114,46 @@ class ImageProcessor:
             logger.error(f"Error converting file to images: {e}")
             return []
 
+    
+    def _render_pdf(self, file_path: str, max_pages: Optional[int], page_cache, file_hash: Optional[str]) -> List[Dict[str, Any]]:
+        """Render PDF pages as JPEG (runs on the PyMuPDF render thread)"""
+        import fitz  # PyMuPDF
+        
+        images = []
+        with fitz.open(file_path) as doc:
+            page_count = len(doc) if max_pages is None else min(len(doc), max_pages)
+            for page_num in range(page_count):
+                page = doc[page_num]
+                
+                # Reuse a previously rendered page (e.g. on retry)
+                img_data = cache_key = None
+                if page_cache:
+                    cache_key = page_cache.make_key(
+                        file_hash, page_num, self.dpi,
+                        crop_box=tuple(page.cropbox), image_format='jpeg'
+                    )
+                    img_data = page_cache.get(cache_key)
+                
+                if img_data is None:
+                    pix = page.get_pixmap(dpi=self.dpi)
+                    img_data = pix.tobytes("jpeg")
+                    width, height = pix.width, pix.height
+                    pix = None
+                    if cache_key:
+                        page_cache.set(cache_key, img_data)
+                else:
+                    pixel_rect = (page.rect * fitz.Matrix(self.dpi / 72, self.dpi / 72)).irect
+                    width, height = pixel_rect.width, pixel_rect.height
+                
+                images.append({
+                    'data': img_data,
+                    'format': 'jpeg',
+                    'page_number': page_num + 1,
+                    'width': width,
+                    'height': height,
+                    'dpi': self.dpi
+                })
+        return images
 
 class VisionExtractor(BaseExtractor):
     """
@@ -178,17 +217,13 @@ class VisionExtractor(BaseExtractor):
             # Step 4: Build prompt
             prompt = self._build_prompt(file_upload.document_type)
             
-            # Step 5: Process images (with retry)
-            results = []
-            for i, image in enumerate(images[:self.config.max_pages]):
-                result = await self._extract_from_image_with_retry(
-                    image=image,
-                    model=model,
-                    api_key=api_key,
-                    prompt=prompt,
-                    page_number=i + 1
-                )
-                results.append(result)
+            # Step 5: Process images concurrently (with retry)
+            results = await self._extract_pages(
+                images=images[:self.config.max_pages],
+                model=model,
+                api_key=api_key,
+                prompt=prompt
+            )
             
             # Step 6: Combine results
             combined = self._combine_results(results)
@@ -230,7 +265,10 @@ class VisionExtractor(BaseExtractor):
         file_path = file_upload.file.path
         
         # Use image processor to convert to images
-        return await self.image_processor.convert_file_to_images(file_path)
+        return await self.image_processor.convert_file_to_images(
+            file_path,
+            max_pages=self.config.max_pages
+        )
     
     async def _select_vision_model(
         self, 
@@ -274,62 +312,54 @@ class VisionExtractor(BaseExtractor):
         
         return model
     
-    async def _extract_from_image_with_retry(
+    async def _extract_pages(
         self,
-        image: Dict,
+        images: List[Dict],
         model: Model,
         api_key: APIKey,
-        prompt: str,
-        page_number: int
-    ) -> Dict:
+        prompt: str
+    ) -> List[Dict]:
         """
-        Extract from single image with retry logic.
-        Uses UnifiedLLMClient for actual execution.
+        Extract from all page images concurrently.
+        
+        Pages run under the provider's shared concurrency and rate limits and
+        are retried with jittered backoff on rate-limit/5xx errors. Results
+        are returned in page order; pages that still fail are included as
+        unsuccessful results so the rest of the document is kept.
         """
-        last_error = None
-        
-        for attempt in range(self.config.max_retries):
-            try:
-                result = await self._extract_from_image(
-                    image=image,
-                    model=model,
-                    api_key=api_key,
-                    prompt=prompt,
-                    page_number=page_number
-                )
-                
-                if result['success']:
-                    return result
-                
-                # If not successful but no exception, log and retry
-                logger.warning(f"Extraction failed on attempt {attempt + 1}")
-                last_error = result.get('error', 'Unknown error')
-                
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"Attempt {attempt + 1} failed: {e}")
-                
-                # Don't retry on auth errors
-                if 'authentication' in str(e).lower():
-                    break
-            
-            # Wait before retry
-            if attempt < self.config.max_retries - 1:
-                await asyncio.sleep(self.config.retry_delay_seconds * (attempt + 1))
+        scheduler = VisionPageScheduler(
+            provider_slug=model.provider.slug,
+            max_retries=self.config.max_retries,
+            base_delay=self.config.retry_delay_seconds
+        )
         
-        # All retries failed
-        return {
-            'success': False,
-            'error': last_error,
-            'page_number': page_number,
-            'text': '',
-            'structured': {},
-            'tokens_input': 0,
-            'tokens_output': 0,
-            'cost': 0,
-            'latency_ms': 0,
-            'confidence': 0
-        }
+        async def extract_page(image: Dict, index: int) -> Dict:
+            return await self._extract_from_image(
+                image=image,
+                model=model,
+                api_key=api_key,
+                prompt=prompt,
+                page_number=image.get('page_number', index + 1)
+            )
+        
+        outcome = await scheduler.run(images, extract_page)
+        
+        results = []
+        for index, result in enumerate(outcome['results']):
+            if not result.get('success'):
+                result = {
+                    'text': '',
+                    'structured': {},
+                    'tokens_input': 0,
+                    'tokens_output': 0,
+                    'cost': 0,
+                    'latency_ms': 0,
+                    'confidence': 0,
+                    **result,
+                    'page_number': result.get('page_number') or images[index].get('page_number', index + 1),
+                }
+            results.append(result)
+        return results
     
     async def _extract_from_image(
         self,
@@ -371,6 +401,7 @@ class VisionExtractor(BaseExtractor):
             return {
                 'success': False,
                 'error': response.content,
+                'error_type': response.raw_response.get('type'),
                 'page_number': page_number,
                 'text': '',
                 'structured': {},
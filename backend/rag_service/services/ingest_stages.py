@@ -0,0 +1,586 @@
+"""
+Staged Ingestion Pipeline
+
+Splits document ingest into four Celery stages, each on its own queue so
+CPU-bound and I/O-bound work scale independently:
+
+1. extract - text, layout, tables and page fingerprints -> Document/DocumentPage rows
+2. chunk   - Document rows -> Chunk rows, handed on in batches of chunk IDs
+3. embed   - chunk IDs -> embeddings written onto the Chunk rows
+4. store   - chunk IDs -> vector store upsert; the last batch completes the document
+
+Stages hand off IDs only; the payload lives in PostgreSQL. Every stage is
+idempotent (rows are upserted or replaced, embedded chunks are not embedded
+again, vector upserts overwrite by ID), so a retried or redelivered task is
+safe.
+
+Backpressure: a task checks the in-flight count of the stage it feeds before
+doing any work and defers itself while that stage is full, so embedding
+cannot outrun storage and chunking cannot outrun embedding. Chunking fans out
+only as many embed batches as that stage has room for and defers the rest. In-flight counts,
+throughput and latency per stage live in Redis (or an in-process stand-in for
+tests and single-process runs) and are reported by get_stage_stats().
+
+The functions here are plain stage bodies; the Celery tasks that call them and
+enqueue the next stage are in rag_service.tasks.
+"""
+
+import fnmatch
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+STAGES = ('extract', 'chunk', 'embed', 'store')
+
+# The stage each stage hands its output to
+NEXT_STAGE = {'extract': 'chunk', 'chunk': 'embed', 'embed': 'store'}
+
+# Recent latency samples kept per stage for percentiles
+LATENCY_SAMPLES = 500
+
+# Seconds per-ingest and per-task bookkeeping is kept
+JOB_TTL = 7 * 24 * 3600
+
+
+def get_pipeline_settings() -> Dict[str, Any]:
+    """INGEST_PIPELINE settings with defaults"""
+    config = {
+        'REDIS_URL': 'memory://',
+        'CHUNK_BATCH_SIZE': 64,
+        'MAX_IN_FLIGHT': {'extract': 8, 'chunk': 8, 'embed': 16, 'store': 16},
+        'DEFER_COUNTDOWN': 5,
+        'MAX_DEFERRALS': 720,
+        'MAX_RETRIES': 3,
+        'RETRY_BACKOFF': 10,
+        'VECTOR_STORE': 'pgvector',
+    }
+    config.update(getattr(settings, 'RAG_SETTINGS', {}).get('INGEST_PIPELINE', {}))
+    return config
+
+
+class InMemoryRedis:
+    """
+    Thread-safe stand-in for the few Redis commands the tracker uses.
+
+    Used when INGEST_PIPELINE['REDIS_URL'] is 'memory://' (tests, eager mode,
+    single-process development); state is per process.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+        return None if value is None else str(value).encode()
+
+    def incrby(self, key, amount=1):
+        with self._lock:
+            self._data[key] = int(self._data.get(key, 0)) + amount
+            return self._data[key]
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            if nx and key in self._data:
+                return None
+            self._data[key] = value
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def hincrby(self, key, field_name, amount=1):
+        with self._lock:
+            mapping = self._data.setdefault(key, {})
+            mapping[field_name] = int(mapping.get(field_name, 0)) + amount
+            return mapping[field_name]
+
+    def hset(self, key, field_name=None, value=None, mapping=None):
+        with self._lock:
+            target = self._data.setdefault(key, {})
+            if field_name is not None:
+                target[field_name] = value
+            target.update(mapping or {})
+            return 1
+
+    def hgetall(self, key):
+        with self._lock:
+            mapping = dict(self._data.get(key, {}))
+        return {str(k).encode(): str(v).encode() for k, v in mapping.items()}
+
+    def lpush(self, key, *values):
+        with self._lock:
+            items = self._data.setdefault(key, [])
+            for value in values:
+                items.insert(0, str(value).encode())
+            return len(items)
+
+    def ltrim(self, key, start, end):
+        with self._lock:
+            items = self._data.get(key, [])
+            self._data[key] = items[start:None if end == -1 else end + 1]
+            return True
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            items = list(self._data.get(key, []))
+        return items[start:None if end == -1 else end + 1]
+
+    def expire(self, key, seconds):
+        return key in self._data
+
+    def keys(self, pattern):
+        with self._lock:
+            return [key.encode() for key in self._data if fnmatch.fnmatch(key, pattern)]
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_ingest_redis(url: Optional[str] = None):
+    """Shared Redis client for pipeline bookkeeping ('memory://' = in-process)"""
+    url = url or get_pipeline_settings()['REDIS_URL']
+    with _clients_lock:
+        if url not in _clients:
+            if url.startswith('memory://'):
+                _clients[url] = InMemoryRedis()
+            else:
+                import redis
+                _clients[url] = redis.Redis.from_url(url)
+        return _clients[url]
+
+
+def _to_int(value) -> int:
+    return int(value) if value is not None else 0
+
+
+class StageTracker:
+    """
+    In-flight counts, throughput and latency per stage, plus per-ingest
+    batch bookkeeping.
+
+    A batch is "in flight" for a stage from the moment it is enqueued there
+    until that stage finishes it (successfully or for good), so the count is
+    the stage's queue depth plus its running tasks.
+    """
+
+    def __init__(self, client=None, prefix: str = 'rag:ingest'):
+        self.client = client if client is not None else get_ingest_redis()
+        self.prefix = prefix
+        self.config = get_pipeline_settings()
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + tuple(str(p) for p in parts))
+
+    # -- backpressure ------------------------------------------------------
+
+    def in_flight(self, stage: str) -> int:
+        return max(0, _to_int(self.client.get(self._key('inflight', stage))))
+
+    def limit(self, stage: str) -> int:
+        return int(self.config['MAX_IN_FLIGHT'].get(stage, 0))
+
+    def has_capacity(self, stage: str) -> bool:
+        """Whether the stage accepts more batches (limit 0 = unbounded)"""
+        free = self.free_slots(stage)
+        return free is None or free > 0
+
+    def free_slots(self, stage: str) -> Optional[int]:
+        """Batches the stage accepts now (None = unbounded)"""
+        limit = self.limit(stage)
+        return max(0, limit - self.in_flight(stage)) if limit else None
+
+    def enqueued(self, stage: str, count: int = 1) -> None:
+        self.client.incrby(self._key('inflight', stage), count)
+
+    def deferred(self, stage: str) -> None:
+        self.client.hincrby(self._key('stats', stage), 'deferred', 1)
+
+    def finished(
+        self,
+        stage: str,
+        duration_ms: float,
+        wait_ms: Optional[float] = None,
+        ok: bool = True,
+        task_id: Optional[str] = None
+    ) -> None:
+        """
+        Record a batch leaving the stage for good.
+
+        With task_id, a redelivered task that finishes again is not counted
+        twice.
+        """
+        if task_id and not self.client.set(self._key('finished', stage, task_id), 1, nx=True, ex=JOB_TTL):
+            return
+        self.client.incrby(self._key('inflight', stage), -1)
+        self.client.hincrby(self._key('stats', stage), 'processed' if ok else 'failed', 1)
+        sample = json.dumps([round(duration_ms, 1), None if wait_ms is None else round(wait_ms, 1)])
+        latency_key = self._key('latency', stage)
+        self.client.lpush(latency_key, sample)
+        self.client.ltrim(latency_key, 0, LATENCY_SAMPLES - 1)
+
+    # -- per-ingest bookkeeping ----------------------------------------------
+
+    def set_batches(self, ingest_id: str, total: int) -> str:
+        """
+        Start counting an ingest's batches; returns the prefix for its batch keys.
+
+        The bookkeeping of an earlier chunking of the same ingest (a
+        redelivered chunk task) is dropped, and batches still in flight from
+        it are no longer counted.
+        """
+        key = self._key('job', ingest_id)
+        generation = uuid.uuid4().hex[:12]
+        self.client.delete(key)
+        self.client.hset(key, mapping={'batches_total': total, 'batches_stored': 0, 'generation': generation})
+        self.client.expire(key, JOB_TTL)
+        return generation
+
+    def batch_stored(self, ingest_id: str, batch_key: str) -> bool:
+        """
+        Count a stored batch once; True when it was the ingest's last one.
+
+        A redelivered store task for the same batch is not counted twice, nor
+        is a batch from an earlier chunking of the ingest.
+        """
+        key = self._key('job', ingest_id)
+        generation = self.client.hgetall(key).get(b'generation')
+        if generation is None or not batch_key.startswith(f'{generation.decode()}:'):
+            return False
+        if self.client.hincrby(key, f'stored:{batch_key}', 1) != 1:
+            return False
+        stored = self.client.hincrby(key, 'batches_stored', 1)
+        job = self.client.hgetall(key)
+        return stored >= _to_int(job.get(b'batches_total'))
+
+    # -- reporting -----------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, counters and latency percentiles for every stage"""
+        report = {}
+        for stage in STAGES:
+            counters = {k.decode(): int(v) for k, v in self.client.hgetall(self._key('stats', stage)).items()}
+            samples = [json.loads(s) for s in self.client.lrange(self._key('latency', stage), 0, -1)]
+            durations = sorted(d for d, _ in samples)
+            waits = sorted(w for _, w in samples if w is not None)
+            report[stage] = {
+                'in_flight': self.in_flight(stage),
+                'limit': self.limit(stage),
+                'processed': counters.get('processed', 0),
+                'failed': counters.get('failed', 0),
+                'deferred': counters.get('deferred', 0),
+                'latency_ms_p50': _percentile(durations, 50),
+                'latency_ms_p95': _percentile(durations, 95),
+                'queue_wait_ms_p50': _percentile(waits, 50),
+                'queue_wait_ms_p95': _percentile(waits, 95),
+            }
+        return report
+
+    def reset(self) -> None:
+        keys = self.client.keys(f'{self.prefix}:*')
+        if keys:
+            self.client.delete(*keys)
+
+
+def _percentile(values: List[float], pct: int) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def get_stage_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-stage queue depth and latency of the ingestion pipeline"""
+    return StageTracker().stats()
+
+
+@dataclass
+class StageResult:
+    """Output of a stage body: batches to hand to the next stage"""
+    document_id: str
+    batches: List[List[str]] = field(default_factory=list)
+    complete: bool = False
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+# -- stage bodies ----------------------------------------------------------
+
+
+def extract_stage(
+    file_path: str,
+    knowledge_base_id: str,
+    document_id: str,
+    title: Optional[str] = None,
+    created_by_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> StageResult:
+    """
+    Extract a file and store the Document and DocumentPage rows.
+
+    Runs DocumentPipeline.process_document, so re-ingesting a PDF extracts
+    and rewrites only its changed pages; the page diff is handed on to the
+    chunk stage in detail['incremental']. Re-running overwrites the same rows
+    (update_or_create), so the stage is safe to retry.
+    """
+    from rag_service.models import Document
+    from .document_pipeline import DocumentPipeline
+
+    result = async_to_sync(DocumentPipeline().process_document)(
+        file_path=file_path,
+        knowledge_base_id=knowledge_base_id,
+        title=title,
+        document_id=document_id,
+        created_by_id=created_by_id,
+        metadata=metadata
+    )
+    if result['status'] != 'completed':
+        raise RuntimeError(f"Failed to extract document {document_id}: {result.get('error')}")
+
+    # Extraction alone does not make the document searchable yet
+    Document.objects.filter(id=document_id).update(status='processing')
+
+    detail = {'pages': result['page_count'], 'tables': result['tables_count']}
+    if 'incremental' in result:
+        detail['incremental'] = result['incremental']
+    return StageResult(document_id=document_id, batches=[[document_id]], detail=detail)
+
+
+def chunk_stage(
+    document_id: str,
+    batch_size: Optional[int] = None,
+    incremental: Optional[Dict[str, Any]] = None,
+    vector_store=None
+) -> StageResult:
+    """
+    Chunk a stored document and split the chunk IDs to embed into batches.
+
+    With the extract stage's page diff (incremental), only the chunks of
+    changed pages are replaced and only new chunks are handed on; otherwise
+    every chunk is replaced. Vectors of chunks that are gone are deleted
+    either way. A retry starts from a clean slate (batches from an earlier
+    attempt find their chunk IDs gone and no-op).
+    """
+    from rag_service.models import Chunk, Document, DocumentPage
+    from .extraction.page_fingerprint import PageDiff
+    from .storage_retrieval.storage_service import StorageService
+
+    batch_size = batch_size or get_pipeline_settings()['CHUNK_BATCH_SIZE']
+    document = Document.objects.defer('content').get(id=document_id)
+    extraction_metadata = document.extraction_metadata or {}
+    page_diff = PageDiff.from_summary(incremental) if incremental is not None else None
+    page_rows = DocumentPage.objects.filter(document_id=document_id).order_by('page_number')
+    has_pages = page_rows.exists()
+    if page_diff is not None:
+        # Changed pages are picked out of the page list
+        pages = [
+            {'page_number': page_number, 'text': page_text}
+            for page_number, page_text in page_rows.values_list('page_number', 'page_text')
+        ]
+    else:
+        # Page text is streamed from the rows as the chunker reads it; the
+        # full text is only loaded for documents stored without pages
+        pages = page_rows.values_list('page_number', 'page_text').iterator(chunk_size=50)
+    extraction_response = {
+        'text': '' if has_pages else document.content,
+        'pages': pages,
+        'tables': extraction_metadata.get('tables', []),
+        'layout_blocks': extraction_metadata.get('layout_blocks', []),
+        'metadata': extraction_metadata.get('drawing_metadata') or {},
+    }
+
+    service = StorageService(vector_store_type='none')
+    service.vector_store = vector_store if vector_store is not None else get_vector_store()
+    result = async_to_sync(service.rechunk_document)(
+        document_id,
+        extraction_response,
+        page_diff=page_diff,
+        knowledge_base_id=str(document.knowledge_base_id)
+    )
+    if not result['success']:
+        raise RuntimeError(f"Failed to chunk document {document_id}: {'; '.join(result['errors'])}")
+
+    # Kept chunks are embedded and stored already
+    chunk_ids = [
+        str(chunk_id) for chunk_id in
+        Chunk.objects.filter(document_id=document_id, embedding_vector__isnull=True)
+        .order_by('chunk_index').values_list('id', flat=True)
+    ]
+    batches = [chunk_ids[i:i + batch_size] for i in range(0, len(chunk_ids), batch_size)]
+    detail = {'chunks': len(chunk_ids), 'vectors_deleted': result['vectors_deleted']}
+    if 'incremental' in result:
+        detail['chunks_reused'] = result['incremental']['chunks_reused']
+    return StageResult(
+        document_id=document_id,
+        batches=batches,
+        complete=not batches,
+        detail=detail
+    )
+
+
+def embed_stage(document_id: str, chunk_ids: List[str], embedder=None) -> StageResult:
+    """
+    Embed a batch of chunks and write the vectors onto their rows.
+
+    Chunks that already have an embedding (a retried batch) and chunks that
+    no longer exist (re-chunked since) are skipped.
+    """
+    from rag_service.models import Chunk, Document
+
+    chunks = list(Chunk.objects.filter(id__in=chunk_ids, document_id=document_id).order_by('chunk_index'))
+    live_ids = [str(chunk.id) for chunk in chunks]
+    pending = [chunk for chunk in chunks if chunk.embedding_vector is None]
+
+    if pending:
+        if embedder is None:
+            embedder = get_embedder(Document.objects.select_related('knowledge_base').get(id=document_id))
+        embeddings = embedder([chunk.content for chunk in pending])
+        model_name = getattr(embedder, 'model_name', '') or ''
+        for chunk, values in zip(pending, embeddings):
+            values = values.tolist() if hasattr(values, 'tolist') else list(values)
+            chunk.embedding_vector = values
+            chunk.set_embedding(values)
+            if model_name:
+                chunk.embedding_model = model_name
+        Chunk.objects.bulk_update(
+            pending,
+            ['embedding_vector', 'embedding', 'embedding_dimensions', 'embedding_model'],
+            batch_size=500
+        )
+
+    return StageResult(
+        document_id=document_id,
+        batches=[live_ids] if live_ids else [],
+        detail={'embedded': len(pending), 'reused': len(chunks) - len(pending)}
+    )
+
+
+def store_stage(
+    ingest_id: str,
+    document_id: str,
+    chunk_ids: List[str],
+    batch_key: str,
+    vector_store=None
+) -> StageResult:
+    """
+    Upsert a batch of embedded chunks into the vector store.
+
+    Vector IDs are deterministic (Chunk.embedding_vector_id), so repeating
+    the upsert is harmless. The ingest's last batch marks the document
+    completed.
+    """
+    from rag_service.models import Chunk, Document
+
+    document = Document.objects.get(id=document_id)
+    chunks = list(
+        Chunk.objects.filter(id__in=chunk_ids, document_id=document_id, embedding_vector__isnull=False)
+        .order_by('chunk_index')
+    )
+
+    if chunks:
+        vector_store = vector_store if vector_store is not None else get_vector_store()
+        if vector_store is not None:
+            vectors = [
+                {
+                    'id': chunk.embedding_vector_id,
+                    'values': chunk.embedding_vector,
+                    'metadata': {
+                        'document_id': document_id,
+                        'chunk_index': chunk.chunk_index,
+                        'chunk_type': chunk.chunk_type,
+                        'content': chunk.content[:1000],
+                        **(chunk.metadata or {})
+                    }
+                }
+                for chunk in chunks
+            ]
+            result = async_to_sync(vector_store.upsert_vectors)(
+                vectors=vectors,
+                namespace=str(document.knowledge_base_id)
+            )
+            if not result.get('success', True):
+                raise RuntimeError(f"Vector upsert failed: {result.get('error')}")
+
+    complete = StageTracker().batch_stored(ingest_id, batch_key)
+    if complete:
+        mark_document_completed(document_id)
+    return StageResult(document_id=document_id, complete=complete, detail={'vectors': len(chunks)})
+
+
+def mark_document_completed(document_id: str) -> None:
+    from rag_service.models import Chunk, Document
+
+    document = Document.objects.get(id=document_id)
+    document.storage_approach = 'chunked'
+    document.chunk_count = Chunk.objects.filter(document_id=document_id).count()
+    document.save(update_fields=['storage_approach', 'chunk_count'])
+    document.mark_processing_completed()
+
+
+def mark_document_failed(document_id: str, error: str) -> None:
+    from rag_service.models import Document
+
+    Document.objects.filter(id=document_id).update(
+        status='failed',
+        processing_error=error,
+        processed_at=timezone.now()
+    )
+
+
+# -- pluggable services -----------------------------------------------------
+
+
+def get_embedder(document):
+    """
+    Synchronous batch embedder for a document's knowledge base.
+
+    Returns a callable texts -> embeddings with a model_name attribute.
+    """
+    from .embedding.embedding_service import VoyageEmbeddingService
+
+    service = async_to_sync(VoyageEmbeddingService.create_for_knowledge_base)(document.knowledge_base)
+
+    def embed(texts: List[str]):
+        embeddings, _cost, _latency = async_to_sync(service.embed_chunks)(texts)
+        return embeddings
+
+    embed.model_name = service.model_name
+    return embed
+
+
+def get_vector_store():
+    """Vector store configured for the pipeline (None = chunk rows only)"""
+    store_type = get_pipeline_settings()['VECTOR_STORE']
+    if store_type == 'pinecone':
+        from .storage_retrieval.vector_stores.pinecone_store import PineconeStore
+        return PineconeStore()
+    if store_type == 'pgvector':
+        from .storage_retrieval.vector_stores.pgvector_store import PgVectorStore
+        return PgVectorStore()
+    return None
+
+
+def new_ingest_id() -> str:
+    return uuid.uuid4().hex
+
+
+def now_ms() -> float:
+    return time.time() * 1000
@@ -0,0 +1,292 @@
+# storage_retrieval/chunk_stats.py
+"""
+Chunk Statistics Buffer
+
+Aggregates chunk retrieval statistics in memory and writes them in periodic
+bulk UPDATEs, keeping per-chunk writes off the retrieval request path.
+Statistics are best-effort: while the database is unavailable the buffer
+keeps at most max_buffered chunks and drops hits for any others.
+"""
+
+import atexit
+import logging
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+# Merges buffered hits into rag_chunk. Mirrors Chunk.record_retrieval: the
+# average is taken over all retrievals, seeded by the first scored batch.
+_UPDATE_SQL = """
+    UPDATE rag_chunk AS c SET
+        retrieval_count = c.retrieval_count + v.hits,
+        relevance_score_avg = CASE
+            WHEN v.score_count = 0 THEN c.relevance_score_avg
+            WHEN c.relevance_score_avg IS NULL THEN v.score_sum / v.score_count
+            ELSE (c.relevance_score_avg * c.retrieval_count + v.score_sum) / (c.retrieval_count + v.hits)
+        END
+    FROM (VALUES {values}) AS v(key, hits, score_count, score_sum)
+    WHERE c.{column} = v.key
+"""
+
+_VALUES_ROW = {
+    'id': '(%s::uuid, %s::integer, %s::integer, %s::double precision)',
+    'embedding_vector_id': '(%s::varchar, %s::integer, %s::integer, %s::double precision)',
+}
+
+
+class ChunkStatisticsBuffer:
+    """
+    In-process aggregator for chunk retrieval statistics.
+
+    record() only touches an in-memory dict, so it never blocks the caller on
+    the database. A daemon thread flushes the accumulated increments and score
+    sums every flush_interval seconds (or early once max_pending chunks are
+    buffered) as one UPDATE ... FROM (VALUES ...) per key type, and the buffer
+    is flushed once more at interpreter shutdown.
+
+    Chunks are identified either by Chunk.id or, for Pinecone results, by
+    Chunk.embedding_vector_id.
+    """
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = 5.0,
+        max_pending: int = 10000,
+        batch_size: int = 1000,
+        max_buffered: int = 100000
+    ):
+        """
+        Initialize the buffer.
+
+        Args:
+            flush_interval: Seconds between background flushes; None disables
+                the background thread (call flush() manually)
+            max_pending: Buffered chunk count that triggers an early flush
+            batch_size: Maximum rows per UPDATE statement
+            max_buffered: Buffered chunk count beyond which hits for new
+                chunks are dropped (failed flushes keep rows buffered)
+        """
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_buffered = max(max_buffered, max_pending)
+
+        # key -> [hits, score_count, score_sum]
+        self._pending: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._dropping = False
+
+        self.stats = {
+            'recorded': 0,
+            'flushes': 0,
+            'rows_updated': 0,
+            'errors': 0,
+            'dropped': 0,
+        }
+
+    def record(self, chunk_id: str, relevance_score: Optional[float] = None) -> None:
+        """
+        Record a retrieval of a chunk.
+
+        Args:
+            chunk_id: Chunk ID or vector ID
+            relevance_score: Optional relevance score to fold into the average
+        """
+        if not chunk_id:
+            return
+
+        with self._lock:
+            scored = relevance_score is not None
+            self._merge(chunk_id, 1, int(scored), float(relevance_score) if scored else 0.0)
+            self.stats['recorded'] += 1
+            pending = len(self._pending)
+
+        self._ensure_started()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def record_many(self, results: Iterable[Dict]) -> None:
+        """
+        Record retrievals for a list of result dictionaries.
+
+        Args:
+            results: Dicts with 'chunk_id' and optional 'score'
+        """
+        for result in results:
+            self.record(result.get('chunk_id'), result.get('score'))
+
+    @property
+    def pending_count(self) -> int:
+        """Number of chunks with buffered statistics"""
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Write buffered statistics to the database.
+
+        Rows that fail to write are merged back into the buffer so the next
+        flush retries them.
+
+        Returns:
+            Number of chunk rows updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            by_id, by_vector_id = [], []
+            for key, (hits, score_count, score_sum) in pending.items():
+                row = (key, hits, score_count, score_sum)
+                if self._is_uuid(key):
+                    by_id.append(row)
+                else:
+                    by_vector_id.append(row)
+
+            try:
+                with transaction.atomic():
+                    updated = self._update_rows('id', by_id)
+                    updated += self._update_rows('embedding_vector_id', by_vector_id)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Failed to flush statistics for {len(pending)} chunks: {e}")
+                self._requeue(pending)
+                return 0
+
+            self._dropping = False
+            self.stats['flushes'] += 1
+            self.stats['rows_updated'] += updated
+            logger.debug(f"Flushed retrieval statistics for {len(pending)} chunks ({updated} rows)")
+            return updated
+
+    def stop(self, flush: bool = True) -> None:
+        """
+        Stop the background thread.
+
+        Args:
+            flush: Flush buffered statistics before returning
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=10)
+        if flush:
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _update_rows(self, column: str, rows: List[Tuple]) -> int:
+        """Run the bulk UPDATE for one key column in batches"""
+        updated = 0
+        # Consistent ordering keeps concurrent flushes from deadlocking
+        rows.sort(key=lambda row: row[0])
+
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                sql = _UPDATE_SQL.format(
+                    values=', '.join([_VALUES_ROW[column]] * len(batch)),
+                    column=column
+                )
+                cursor.execute(sql, [value for row in batch for value in row])
+                updated += cursor.rowcount
+        return updated
+
+    def _requeue(self, pending: Dict[str, List[float]]) -> None:
+        """Merge unflushed statistics back into the buffer, up to max_buffered chunks"""
+        with self._lock:
+            for key, (hits, score_count, score_sum) in pending.items():
+                self._merge(key, hits, score_count, score_sum)
+
+    def _merge(self, key: str, hits: int, score_count: int, score_sum: float) -> None:
+        """Add to a chunk's buffered statistics; caller holds the lock"""
+        entry = self._pending.get(key)
+        if entry is None:
+            if len(self._pending) >= self.max_buffered:
+                self.stats['dropped'] += hits
+                if not self._dropping:
+                    # Once per outage; reset by the next successful flush
+                    self._dropping = True
+                    logger.warning(
+                        f"⚠️ Chunk statistics buffer full ({self.max_buffered} chunks), "
+                        f"dropping retrievals of other chunks until a flush succeeds"
+                    )
+                return
+            entry = self._pending[key] = [0, 0, 0.0]
+        entry[0] += hits
+        entry[1] += score_count
+        entry[2] += score_sum
+
+    def _ensure_started(self) -> None:
+        """Start the background flush thread on first use"""
+        if self.flush_interval is None or self._thread is not None or self._stopped.is_set():
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name='chunk-stats-flusher',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Background loop: flush every interval or when woken early"""
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(timeout=self.flush_interval)
+                self._wakeup.clear()
+                if self._stopped.is_set():
+                    break
+                try:
+                    close_old_connections()
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Chunk statistics flush loop error: {e}", exc_info=True)
+        finally:
+            # This thread's connection is not managed by request signals
+            connection.close()
+
+    @staticmethod
+    def _is_uuid(value: str) -> bool:
+        try:
+            uuid.UUID(str(value))
+            return True
+        except ValueError:
+            return False
+
+
+_chunk_statistics_buffer = None
+_chunk_statistics_buffer_lock = threading.Lock()
+
+
+def get_chunk_statistics_buffer() -> ChunkStatisticsBuffer:
+    """Get the process-wide chunk statistics buffer configured from RAG_SETTINGS"""
+    global _chunk_statistics_buffer
+
+    if _chunk_statistics_buffer is None:
+        with _chunk_statistics_buffer_lock:
+            if _chunk_statistics_buffer is None:
+                config = getattr(settings, 'RAG_SETTINGS', {}).get('RETRIEVAL', {})
+                _chunk_statistics_buffer = ChunkStatisticsBuffer(
+                    flush_interval=config.get('STATS_FLUSH_INTERVAL', 5.0),
+                    max_pending=config.get('STATS_MAX_PENDING', 10000),
+                    max_buffered=config.get('STATS_MAX_BUFFERED', 100000)
+                )
+                atexit.register(_chunk_statistics_buffer.stop)
+    return _chunk_statistics_buffer
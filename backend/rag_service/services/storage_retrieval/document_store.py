@@ -9,18 +9,24 @@ This provides a simpler storage model for complete document content.
 
 import json
 import logging
+import re
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
 from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from django.db import transaction
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
 
-from rag_service.models import Document, DocumentPage
+from rag_service.models import Document, DocumentPage, FULL_TEXT_SEARCH_CONFIG
+from .filters import apply_chunk_filter
 
 # Import LayoutBlock for serialization
 from rag_service.services.extraction.layout_analyzer import LayoutBlock, BlockType
+from rag_service.services.extraction.page_fingerprint import PageFingerprint, text_fingerprint
 
 # Custom JSON encoder to handle UUIDs and custom objects
 class UUIDEncoder(json.JSONEncoder):
@@ -43,6 +49,72 @@ class UUIDEncoder(json.JSONEncoder):
 
 logger = logging.getLogger(__name__)
 
+# Word tokens used to build an OR'ed tsquery; anything else is dropped so user
+# input never reaches to_tsquery as operators
+KEYWORD_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+# Drawing element identifiers such as "BP3", "C12", "F-1" or "W12A"
+ELEMENT_ID_PATTERN = re.compile(r'\b([A-Za-z]{1,4}-?\d{1,4}[A-Za-z]?)\b')
+
+# Score added to chunks that contain an element ID from the query
+ELEMENT_ID_MATCH_BOOST = 1.0
+
+
+def build_keyword_tsquery(query: str) -> str:
+    """
+    Build a to_tsquery() expression that matches any word of the query.
+
+    websearch_to_tsquery() ANDs every term, which is too strict for natural
+    language questions; ts_rank_cd still favours chunks that cover more terms.
+    """
+    tokens = dict.fromkeys(token.lower() for token in KEYWORD_TOKEN_PATTERN.findall(query))
+    return ' | '.join(tokens)
+
+
+def extract_element_ids(query: str) -> List[str]:
+    """Extract element identifiers (e.g. "BP3", "C12") from a query"""
+    return list(dict.fromkeys(
+        match.upper() for match in ELEMENT_ID_PATTERN.findall(query)
+    ))
+
+
+def chunk_page_span(page_number: Optional[int], metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    First and last page a chunk draws content from.
+
+    Args:
+        page_number: Chunk.page_number
+        metadata: Chunk metadata (text chunks carry page_start/page_end)
+
+    Returns:
+        (first_page, last_page), or (None, None) for document-level chunks
+    """
+    metadata = metadata or {}
+    start = metadata.get('page_start') or page_number or metadata.get('page_number')
+    end = metadata.get('page_end') or start
+    return start, end
+
+
+def _kept_page_items(items: Optional[List[Dict[str, Any]]], pages_to_update: Iterable[int], page_count: int) -> List[Dict[str, Any]]:
+    """
+    Stored layout blocks or tables of the pages an incremental re-ingest keeps.
+
+    Args:
+        items: Stored extraction_metadata['layout_blocks'] or ['tables']
+        pages_to_update: Pages that were extracted again
+        page_count: Page count of the new revision
+
+    Returns:
+        Items on kept pages (items without a page are extracted again)
+    """
+    update_pages = set(pages_to_update)
+    kept = []
+    for item in items or []:
+        page = item.get('page_number', item.get('page')) if isinstance(item, dict) else None
+        if page is not None and page not in update_pages and page <= page_count:
+            kept.append(item)
+    return kept
+
 
 class DocumentStore:
     """
@@ -66,7 +138,8 @@ class DocumentStore:
         document_id: str,
         extraction_response: Dict[str, Any],
         file_metadata: Dict[str, Any],
-        knowledge_base_id: Optional[str] = None
+        knowledge_base_id: Optional[str] = None,
+        pages_to_update: Optional[Iterable[int]] = None
     ) -> bool:
         """
         Store the complete extraction response.
@@ -89,12 +162,25 @@ class DocumentStore:
                 - error: Optional[str]
                 - warnings: List[str]
             file_metadata: File metadata (name, size, type, etc.)
+            knowledge_base_id: Knowledge base ID (if not in file_metadata)
+            pages_to_update: 1-indexed pages to rewrite on incremental re-ingest;
+                other stored pages are kept and pages beyond the new page count
+                are removed (None rewrites every page). 'pages' may then hold
+                only these pages (each with its 'page_number') when
+                extraction_response['page_count'] gives the length of the
+                document; the document text is rebuilt from the stored pages
         
         Returns:
             Success status
         """
         from rag_service.models import Document
         
+        pages = extraction_response.get('pages', [])
+        page_count = extraction_response.get('page_count') or len(pages)
+        update_pages = set(pages_to_update) if pages_to_update is not None else None
+        # Only the changed pages were extracted
+        partial = update_pages is not None and len(pages) < page_count
+        
         try:
             # Ensure extraction_response and file_metadata have no UUID serialization issues
             extraction_response = json.loads(json.dumps(extraction_response, cls=UUIDEncoder))
@@ -148,46 +234,66 @@ class DocumentStore:
                 # Get title from metadata or use filename as fallback
                 title = document_metadata.get('title') or document_metadata.get('file_name', 'Untitled Document')
                 
-                document, created = Document.objects.update_or_create(
-                    id=document_id,
-                    defaults={
-                        'knowledge_base': knowledge_base,
-                        'title': title,  # Set the title field
-                        'extraction_metadata': extraction_metadata,
-                        'metadata': document_metadata,
-                        'extraction_method': extraction_response.get('extraction_method', 'unified'),
-                        'extraction_cost_usd': Decimal(str(extraction_response.get('cost_usd', 0))),
-                        'extraction_quality_score': self._calculate_quality_score(extraction_response),
-                        'content': extraction_response.get('text', ''),
-                        'status': 'completed' if extraction_response.get('success', True) else 'failed',
-                        'processing_error': extraction_response.get('error') or '',  # Ensure never null
-                        'processed_at': datetime.utcnow()
-                    }
-                )
+                defaults = {
+                    'knowledge_base': knowledge_base,
+                    'title': title,  # Set the title field
+                    'extraction_metadata': extraction_metadata,
+                    'metadata': document_metadata,
+                    'extraction_method': extraction_response.get('extraction_method', 'unified'),
+                    'extraction_cost_usd': Decimal(str(extraction_response.get('cost_usd', 0))),
+                    'extraction_quality_score': self._calculate_quality_score(extraction_response),
+                    'content': extraction_response.get('text', ''),
+                    'status': 'completed' if extraction_response.get('success', True) else 'failed',
+                    'processing_error': extraction_response.get('error') or '',  # Ensure never null
+                    'processed_at': datetime.utcnow()
+                }
+                if partial:
+                    # Rebuilt once the pages are stored
+                    del defaults['content']
+                    # Only the changed pages' layout blocks and tables were extracted
+                    previous = Document.objects.filter(id=document_id).values_list(
+                        'extraction_metadata', flat=True
+                    ).first() or {}
+                    for key in ('layout_blocks', 'tables'):
+                        extraction_metadata[key] = (
+                            _kept_page_items(previous.get(key), update_pages, page_count)
+                            + extraction_metadata[key]
+                        )
+                document, created = Document.objects.update_or_create(id=document_id, defaults=defaults)
                 return document, created
             
             document, created = await update_document()
             
             # Store document pages if available
-            pages = extraction_response.get('pages', [])
             logger.info(f"Found {len(pages)} pages in extraction response for document {document_id}")
-            if pages:
+            if pages or partial:
                 @sync_to_async
+                @transaction.atomic
                 def store_pages():
-                    # Delete existing pages first
-                    DocumentPage.objects.filter(document_id=document_id).delete()
+                    # Delete pages that are rewritten or no longer exist
+                    existing = DocumentPage.objects.filter(document_id=document_id)
+                    if update_pages is not None:
+                        existing = existing.filter(
+                            Q(page_number__in=update_pages) | Q(page_number__gt=page_count)
+                        )
+                    existing.delete()
                     
                     # Create new pages
                     page_objects = []
                     for i, page_data in enumerate(pages):
-                        logger.info(f"Processing page {i+1} with keys: {page_data.keys()}")
                         if not isinstance(page_data, dict):
                             logger.warning(f"Page data is not a dictionary: {type(page_data)}")
                             continue
+                        page_number = page_data.get('page_number', i + 1)  # 1-indexed
+                        if update_pages is not None and page_number not in update_pages:
+                            continue
+                        logger.info(f"Processing page {page_number} with keys: {page_data.keys()}")
                         page_objects.append(DocumentPage(
                             document_id=document_id,
-                            page_number=i + 1,  # 1-indexed
+                            page_number=page_number,
                             page_text=page_data.get('text', ''),  # Store text in page_text field
+                            text_hash=page_data.get('text_hash') or text_fingerprint(page_data.get('text', '')),
+                            graphics_hash=page_data.get('graphics_hash') or '',
                             metadata={
                                 'width': page_data.get('width'),
                                 'height': page_data.get('height'),
@@ -200,13 +306,22 @@ class DocumentStore:
                     # Bulk create pages
                     if page_objects:
                         DocumentPage.objects.bulk_create(page_objects)
-                        return len(page_objects)
-                    return 0
+                    
+                    if partial:
+                        # Kept pages plus the rewritten ones, joined as TextExtractor joins them
+                        content = '\n\n'.join(
+                            DocumentPage.objects.filter(document_id=document_id)
+                            .order_by('page_number').values_list('page_text', flat=True)
+                        )
+                        document.content = content
+                        document.extraction_metadata = {**(document.extraction_metadata or {}), 'text': content}
+                        document.save(update_fields=['content', 'extraction_metadata'])
+                    return len(page_objects)
                 
                 # Store pages
                 try:
-                    page_count = await store_pages()
-                    logger.info(f"Stored {page_count} pages for document {document_id}")
+                    stored_count = await store_pages()
+                    logger.info(f"Stored {stored_count} pages for document {document_id}")
                 except Exception as e:
                     logger.error(f"Failed to store pages for document {document_id}: {e}", exc_info=True)
             
@@ -221,6 +336,188 @@ class DocumentStore:
             logger.error(f"Failed to store extraction for document {document_id}: {e}", exc_info=True)
             return False
     
+    async def get_page_fingerprints(self, document_id: str) -> Dict[int, PageFingerprint]:
+        """
+        Get the stored content fingerprints of a document's pages.
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            Dict of page number -> PageFingerprint (empty if the document has
+            no fingerprinted pages)
+        """
+        @sync_to_async
+        def load_fingerprints():
+            rows = DocumentPage.objects.filter(document_id=document_id).values_list(
+                'page_number', 'text_hash', 'graphics_hash'
+            )
+            return {
+                page_number: PageFingerprint(text_hash, graphics_hash)
+                for page_number, text_hash, graphics_hash in rows
+            }
+        
+        try:
+            fingerprints = await load_fingerprints()
+        except Exception as e:
+            logger.error(f"Failed to load page fingerprints for document {document_id}: {e}", exc_info=True)
+            return {}
+        
+        # Pages stored before fingerprinting cannot be compared
+        if any(not fingerprint.text_hash for fingerprint in fingerprints.values()):
+            return {}
+        return fingerprints
+    
+    async def store_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict[str, Any]],
+        replace: bool = True
+    ) -> bool:
+        """
+        Store chunk dictionaries as Chunk rows, with the relations between them.
+        
+        Args:
+            document_id: Document ID
+            chunks: Chunk dictionaries (chunk_index, content, chunk_type,
+                metadata, token_count and optionally id and page_number; keep
+                the id the chunker assigned so schedule links in the metadata
+                resolve)
+            replace: Delete the document's existing chunks first; pass False
+                to append chunks for changed pages on incremental re-ingest
+            
+        Returns:
+            Success status
+        """
+        from rag_service.models import Chunk
+        from rag_service.services.chunking.chunk_links import build_chunk_relations, save_chunk_relations
+        
+        @sync_to_async
+        @transaction.atomic
+        def write_chunks():
+            if replace:
+                Chunk.objects.filter(document_id=document_id).delete()
+            
+            chunk_objects = []
+            for chunk in chunks:
+                metadata = json.loads(json.dumps(chunk.get('metadata') or {}, cls=UUIDEncoder))
+                chunk_objects.append(Chunk(
+                    **({'id': chunk['id']} if chunk.get('id') else {}),
+                    document_id=document_id,
+                    chunk_index=chunk['chunk_index'],
+                    content=chunk['content'],
+                    chunk_type=chunk.get('chunk_type', 'text'),
+                    metadata=metadata,
+                    token_count=chunk.get('token_count', 0),
+                    page_number=chunk.get('page_number', chunk_page_span(None, metadata)[0]),
+                    embedding_model=chunk.get('embedding_model', ''),
+                    # Matches the vector IDs written by StorageService._store_vectors
+                    embedding_vector_id=chunk.get('embedding_vector_id') or f"{document_id}_{chunk['chunk_index']}",
+                ))
+            created = Chunk.objects.bulk_create(chunk_objects, batch_size=500)
+            # Structural links only: similarity links need embeddings, which come later
+            save_chunk_relations(build_chunk_relations(created))
+            return created
+        
+        try:
+            await write_chunks()
+            logger.info(f"Stored {len(chunks)} chunks for document {document_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store chunks for document {document_id}: {e}", exc_info=True)
+            return False
+    
+    async def delete_chunks_for_pages(
+        self,
+        document_id: str,
+        page_numbers: Iterable[int],
+        include_document_level: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Delete the chunks that draw content from any of the given pages.
+        
+        Chunks spanning several pages are removed when any page they cover is
+        stale, and the other pages they covered are reported so the caller can
+        re-chunk them; chunks on those pages are removed as well so re-chunking
+        cannot duplicate content.
+        
+        Args:
+            document_id: Document ID
+            page_numbers: Stale pages (changed or removed)
+            include_document_level: Also delete chunks without page information
+                (drawing metadata, unplaced tables/visual groups)
+            
+        Returns:
+            Dict with 'deleted' and 'kept' (counts), 'vector_ids' (of deleted
+            chunks), 'rechunk_pages' (pages touched by deleted chunks) and
+            'next_chunk_index' (first free index after the kept chunks)
+        """
+        from rag_service.models import Chunk
+        
+        stale_pages = set(page_numbers)
+        
+        @sync_to_async
+        @transaction.atomic
+        def delete_chunks():
+            rows = list(Chunk.objects.filter(document_id=document_id).values_list(
+                'id', 'chunk_index', 'page_number', 'metadata', 'embedding_vector_id'
+            ))
+            spans = {row[0]: chunk_page_span(row[2], row[3]) for row in rows}
+            
+            # Grow the stale set until no kept chunk touches a stale page
+            delete_ids = set()
+            touched = set(stale_pages)
+            changed = True
+            while changed:
+                changed = False
+                for chunk_id, (start, end) in spans.items():
+                    if chunk_id in delete_ids:
+                        continue
+                    if start is None:
+                        if include_document_level:
+                            delete_ids.add(chunk_id)
+                        continue
+                    covered = set(range(start, end + 1))
+                    if covered & touched:
+                        delete_ids.add(chunk_id)
+                        if not covered <= touched:
+                            touched |= covered
+                            changed = True
+            
+            deleted = [row for row in rows if row[0] in delete_ids]
+            kept_indexes = [row[1] for row in rows if row[0] not in delete_ids]
+            if delete_ids:
+                Chunk.objects.filter(id__in=delete_ids).delete()
+            
+            return {
+                'deleted': len(deleted),
+                'vector_ids': [
+                    vector_id or f"{document_id}_{chunk_index}"
+                    for _, chunk_index, _, _, vector_id in deleted
+                ],
+                'rechunk_pages': sorted(touched - stale_pages),
+                'kept': len(kept_indexes),
+                'next_chunk_index': max(kept_indexes) + 1 if kept_indexes else 0,
+            }
+        
+        try:
+            result = await delete_chunks()
+            logger.info(
+                f"Deleted {result['deleted']} stale chunks for document {document_id} "
+                f"(pages: {sorted(stale_pages)})"
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Failed to delete stale chunks for document {document_id}: {e}", exc_info=True)
+            return {
+                'deleted': 0,
+                'kept': 0,
+                'vector_ids': [],
+                'rechunk_pages': [],
+                'next_chunk_index': None,
+                'error': str(e),
+            }
+    
     async def store_complete_extraction(
         self,
         document_id: str,
@@ -485,6 +782,101 @@ class DocumentStore:
             logger.error(f"Failed to retrieve chunk {chunk_id}: {e}")
             return None
     
+    async def search_chunks_by_keywords(
+        self,
+        knowledge_base_id: str,
+        query: str,
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text keyword search over chunk content.
+
+        Matches against the generated rag_chunk.content_tsv column (GIN
+        indexed) and ranks with ts_rank_cd. Element IDs in the query
+        ("BP3", "C12") are additionally matched as whole words through the
+        trigram index on content and boost the score of matching chunks.
+
+        Args:
+            knowledge_base_id: Knowledge base ID to search within
+            query: Query text
+            top_k: Number of results to return
+            filter: Optional Pinecone-style metadata filter
+
+        Returns:
+            List of result dictionaries with:
+                - chunk_id: str
+                - content: str
+                - score: float
+                - metadata: Dict
+                - document_id: str
+        """
+        from rag_service.models import Chunk
+
+        tsquery = build_keyword_tsquery(query)
+        element_ids = extract_element_ids(query)
+        if not tsquery and not element_ids:
+            return []
+
+        try:
+            def search_chunks():
+                ts_params = [FULL_TEXT_SEARCH_CONFIG, tsquery]
+                match_sql = '"rag_chunk"."content_tsv" @@ to_tsquery(%s::regconfig, %s)'
+                rank_sql = 'ts_rank_cd("rag_chunk"."content_tsv", to_tsquery(%s::regconfig, %s), 32)'
+                match_params = list(ts_params)
+                rank_params = list(ts_params)
+
+                if element_ids:
+                    element_regex = r'\m(' + '|'.join(re.escape(e) for e in element_ids) + r')\M'
+                    element_sql = '"rag_chunk"."content" ~* %s'
+                    match_sql = f'({match_sql} OR {element_sql})'
+                    match_params.append(element_regex)
+                    rank_sql = (
+                        f'{rank_sql} + CASE WHEN {element_sql} '
+                        f'THEN {ELEMENT_ID_MATCH_BOOST} ELSE 0 END'
+                    )
+                    rank_params.append(element_regex)
+
+                queryset = Chunk.objects.filter(
+                    document__knowledge_base_id=knowledge_base_id,
+                    document__is_active=True
+                ).filter(
+                    RawSQL(match_sql, match_params, output_field=BooleanField())
+                )
+                queryset = apply_chunk_filter(queryset, filter)
+
+                return list(queryset.annotate(
+                    keyword_score=RawSQL(rank_sql, rank_params, output_field=FloatField())
+                ).order_by('-keyword_score', 'id').values(
+                    'id', 'document_id', 'chunk_index', 'content', 'chunk_type',
+                    'metadata', 'page_number', 'embedding_vector_id', 'keyword_score'
+                )[:top_k])
+
+            # Own worker thread and connection: runs alongside the vector leg
+            chunks = await database_sync_to_async(search_chunks, thread_sensitive=False)()
+
+            return [
+                {
+                    'chunk_id': str(chunk['id']),
+                    'content': chunk['content'],
+                    'score': float(chunk['keyword_score']),
+                    'metadata': {
+                        **(chunk['metadata'] or {}),
+                        'document_id': str(chunk['document_id']),
+                        'chunk_index': chunk['chunk_index'],
+                        'chunk_type': chunk['chunk_type'],
+                        'page_number': chunk['page_number'],
+                    },
+                    'document_id': str(chunk['document_id']),
+                    'embedding_vector_id': chunk['embedding_vector_id'],
+                }
+                for chunk in chunks
+            ]
+
+        except Exception as e:
+            logger.error(f"Keyword search failed in knowledge base {knowledge_base_id}: {e}", exc_info=True)
+            return []
+
     async def update_chunk_statistics(
         self,
         chunk_id: str,
@@ -649,7 +1041,11 @@ class DocumentStore:
             
     async def search_documents_by_content(self, knowledge_base_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
-        Search for documents by content using simple text search.
+        Search for documents by content using PostgreSQL full-text search.
+
+        Matches against the generated rag_document.search_tsv column (title
+        weighted above content) and falls back to a trigram-indexed substring
+        match on the title.
         
         Args:
             knowledge_base_id: Knowledge base ID to search within
@@ -660,20 +1056,25 @@ class DocumentStore:
             List of document dictionaries matching the query
         """
         from rag_service.models import Document
-        from django.db.models import Q
         
         try:
             @sync_to_async
             def search_docs():
-                # Perform a simple text search across document content and metadata
+                title_pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+                match_sql = (
+                    '("rag_document"."search_tsv" @@ websearch_to_tsquery(%s::regconfig, %s) '
+                    'OR "rag_document"."title" ILIKE %s)'
+                )
+                rank_sql = 'ts_rank_cd("rag_document"."search_tsv", websearch_to_tsquery(%s::regconfig, %s), 32)'
+
                 return list(Document.objects.filter(
                     knowledge_base_id=knowledge_base_id,
                     is_active=True
                 ).filter(
-                    Q(content__icontains=query) |
-                    Q(title__icontains=query) |
-                    Q(extraction_metadata__text__icontains=query)
-                ).order_by('-created_at')[:limit].values(
+                    RawSQL(match_sql, [FULL_TEXT_SEARCH_CONFIG, query, title_pattern], output_field=BooleanField())
+                ).annotate(
+                    rank=RawSQL(rank_sql, [FULL_TEXT_SEARCH_CONFIG, query], output_field=FloatField())
+                ).order_by('-rank', '-created_at')[:limit].values(
                     'id', 'title', 'content', 'document_type', 'status',
                     'created_at', 'processed_at', 'metadata', 'extraction_metadata'
                 ))
@@ -0,0 +1,59 @@
+# storage_retrieval/filters.py
+"""
+Metadata Filters
+
+Translates Pinecone-style metadata filters into Chunk queryset filters so the
+SQL-backed search paths (pgvector, full-text) accept the same filter dicts as
+the Pinecone store.
+"""
+
+from typing import Dict, Any, Optional
+
+
+# Columns on Chunk that can be filtered directly instead of through metadata
+CHUNK_FILTER_COLUMNS = {
+    'document_id': 'document_id',
+    'chunk_type': 'chunk_type',
+    'page_number': 'page_number',
+    'chunk_index': 'chunk_index',
+}
+
+
+def apply_chunk_filter(queryset, filter: Optional[Dict[str, Any]]):
+    """
+    Apply a Pinecone-style metadata filter to a Chunk queryset.
+
+    Supports plain equality and the $eq, $ne, $in and $nin operators.
+    Known chunk columns are filtered directly; everything else is looked
+    up in Chunk.metadata.
+
+    Args:
+        queryset: Chunk queryset
+        filter: Filter dictionary, e.g. {"document_id": "doc123", "zone": {"$in": ["A", "B"]}}
+
+    Returns:
+        Filtered queryset
+    """
+    if not filter:
+        return queryset
+
+    for key, condition in filter.items():
+        lookup = CHUNK_FILTER_COLUMNS.get(key, f'metadata__{key}')
+
+        if not isinstance(condition, dict):
+            queryset = queryset.filter(**{lookup: condition})
+            continue
+
+        for operator, value in condition.items():
+            if operator == '$eq':
+                queryset = queryset.filter(**{lookup: value})
+            elif operator == '$ne':
+                queryset = queryset.exclude(**{lookup: value})
+            elif operator == '$in':
+                queryset = queryset.filter(**{f'{lookup}__in': list(value)})
+            elif operator == '$nin':
+                queryset = queryset.exclude(**{f'{lookup}__in': list(value)})
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+
+    return queryset
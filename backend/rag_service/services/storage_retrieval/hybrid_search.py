@@ -5,8 +5,12 @@ Hybrid Search
 Combines vector similarity search with keyword/BM25 search for better results.
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +29,9 @@ class HybridSearch:
         self,
         vector_weight: float = 0.7,
         keyword_weight: float = 0.3,
-        fusion_method: str = 'rrf'
+        fusion_method: str = 'rrf',
+        vector_timeout: Optional[float] = None,
+        keyword_timeout: Optional[float] = None
     ):
         """
         Initialize hybrid search.
@@ -34,10 +40,24 @@ class HybridSearch:
             vector_weight: Weight for vector search results (0-1)
             keyword_weight: Weight for keyword search results (0-1)
             fusion_method: Method to combine results ('rrf', 'weighted')
+            vector_timeout: Seconds before the vector leg is abandoned
+                (defaults to RAG_SETTINGS['RETRIEVAL']['VECTOR_SEARCH_TIMEOUT'])
+            keyword_timeout: Seconds before the keyword leg is abandoned
+                (defaults to RAG_SETTINGS['RETRIEVAL']['KEYWORD_SEARCH_TIMEOUT'])
         """
+        retrieval_settings = getattr(settings, 'RAG_SETTINGS', {}).get('RETRIEVAL', {})
+        
         self.vector_weight = vector_weight
         self.keyword_weight = keyword_weight
         self.fusion_method = fusion_method
+        self.vector_timeout = (
+            vector_timeout if vector_timeout is not None
+            else retrieval_settings.get('VECTOR_SEARCH_TIMEOUT', 2.0)
+        )
+        self.keyword_timeout = (
+            keyword_timeout if keyword_timeout is not None
+            else retrieval_settings.get('KEYWORD_SEARCH_TIMEOUT', 1.0)
+        )
     
     async def search(
         self,
@@ -64,29 +84,83 @@ class HybridSearch:
         Returns:
             List of search results
         """
+        response = await self.search_with_timings(
+            query=query,
+            query_vector=query_vector,
+            knowledge_base_id=knowledge_base_id,
+            top_k=top_k,
+            filter=filter,
+            vector_store=vector_store,
+            document_store=document_store
+        )
+        return response['results']
+    
+    async def search_with_timings(
+        self,
+        query: str,
+        query_vector: List[float],
+        knowledge_base_id: str,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        vector_store=None,
+        document_store=None
+    ) -> Dict[str, Any]:
+        """
+        Perform hybrid search and report per-leg timing.
+        
+        The vector and keyword legs run concurrently, each under its own
+        timeout. A leg that times out or fails contributes no results, so
+        fusion degrades to the remaining leg instead of blocking.
+        
+        Args:
+            query: Query text
+            query_vector: Query embedding vector
+            knowledge_base_id: Knowledge base ID
+            top_k: Number of results to return
+            filter: Optional metadata filter
+            vector_store: Vector store instance
+            document_store: Document store instance
+            
+        Returns:
+            Dictionary with:
+                - results: List of fused search results
+                - timings: Dict of vector/keyword/fusion/total latency in ms
+                - legs: Dict of leg name -> 'ok', 'timeout', 'error' or 'skipped'
+        """
+        start_time = time.time()
+        timings = {}
+        legs = {}
+        
         try:
-            # Perform vector search
-            vector_results = []
-            if vector_store:
-                vector_results = await vector_store.search(
+            vector_leg = self._run_leg(
+                'vector',
+                vector_store.search(
                     query_vector=query_vector,
                     top_k=top_k * 2,  # Get more candidates for fusion
                     filter=filter,
                     namespace=knowledge_base_id
-                )
-            
-            # Perform keyword search
-            keyword_results = []
-            if document_store:
-                keyword_results = await self._keyword_search(
+                ) if vector_store else None,
+                self.vector_timeout
+            )
+            keyword_leg = self._run_leg(
+                'keyword',
+                self._keyword_search(
                     query=query,
                     knowledge_base_id=knowledge_base_id,
                     top_k=top_k * 2,
                     filter=filter,
                     document_store=document_store
+                ) if document_store else None,
+                self.keyword_timeout
+            )
+            
+            (vector_results, timings['vector_ms'], legs['vector']), \
+                (keyword_results, timings['keyword_ms'], legs['keyword']) = await asyncio.gather(
+                    vector_leg, keyword_leg
                 )
             
             # Fuse results
+            stage_start = time.time()
             if self.fusion_method == 'rrf':
                 fused_results = self._reciprocal_rank_fusion(
                     vector_results=vector_results,
@@ -98,13 +172,65 @@ class HybridSearch:
                     vector_results=vector_results,
                     keyword_results=keyword_results
                 )
+            timings['fusion_ms'] = (time.time() - stage_start) * 1000
+            timings['total_ms'] = (time.time() - start_time) * 1000
+            
+            logger.info(
+                f"Hybrid search (KB: {knowledge_base_id}): "
+                f"vector {len(vector_results)} hits in {timings['vector_ms']:.1f}ms ({legs['vector']}), "
+                f"keyword {len(keyword_results)} hits in {timings['keyword_ms']:.1f}ms ({legs['keyword']}), "
+                f"{self.fusion_method} fusion in {timings['fusion_ms']:.1f}ms"
+            )
             
             # Return top_k results
-            return fused_results[:top_k]
+            return {
+                'results': fused_results[:top_k],
+                'timings': timings,
+                'legs': legs
+            }
             
         except Exception as e:
             logger.error(f"Error during hybrid search: {e}", exc_info=True)
-            return []
+            timings['total_ms'] = (time.time() - start_time) * 1000
+            return {
+                'results': [],
+                'timings': timings,
+                'legs': legs
+            }
+    
+    async def _run_leg(
+        self,
+        name: str,
+        coroutine,
+        timeout: Optional[float]
+    ) -> Tuple[List[Any], float, str]:
+        """
+        Await one search leg under a timeout.
+        
+        Args:
+            name: Leg name for logging
+            coroutine: Search coroutine, or None if the leg is not configured
+            timeout: Timeout in seconds (None or <= 0 disables it)
+            
+        Returns:
+            Tuple of (results, elapsed ms, status)
+        """
+        if coroutine is None:
+            return [], 0.0, 'skipped'
+        
+        start_time = time.time()
+        try:
+            if timeout and timeout > 0:
+                results = await asyncio.wait_for(coroutine, timeout=timeout)
+            else:
+                results = await coroutine
+            return results or [], (time.time() - start_time) * 1000, 'ok'
+        except asyncio.TimeoutError:
+            logger.warning(f"Hybrid search {name} leg timed out after {timeout}s; continuing without it")
+            return [], (time.time() - start_time) * 1000, 'timeout'
+        except Exception as e:
+            logger.error(f"Hybrid search {name} leg failed: {e}", exc_info=True)
+            return [], (time.time() - start_time) * 1000, 'error'
     
     async def _keyword_search(
         self,
@@ -117,6 +243,10 @@ class HybridSearch:
         """
         Perform keyword search using PostgreSQL full-text search.
         
+        Uses the GIN-indexed chunk tsvector ranked by ts_rank_cd, plus
+        trigram matching for element IDs (see
+        DocumentStore.search_chunks_by_keywords).
+        
         Args:
             query: Query text
             knowledge_base_id: Knowledge base ID
@@ -127,10 +257,34 @@ class HybridSearch:
         Returns:
             List of search results
         """
-        # TODO: Implement full-text search using PostgreSQL
-        # For now, return empty list
-        logger.warning("Keyword search not yet implemented")
-        return []
+        try:
+            return await document_store.search_chunks_by_keywords(
+                knowledge_base_id=knowledge_base_id,
+                query=query,
+                top_k=top_k,
+                filter=filter
+            )
+        except Exception as e:
+            logger.error(f"Keyword search failed: {e}", exc_info=True)
+            return []
+    
+    @staticmethod
+    def _fusion_key(result: Any) -> str:
+        """
+        Key used to merge the same chunk across vector and keyword results.
+        
+        Pinecone results are keyed by vector ID ("{document_id}_{chunk_index}")
+        while keyword results carry the chunk UUID, so prefer the
+        (document_id, chunk_index) pair both expose in their metadata.
+        """
+        if hasattr(result, 'chunk_id'):
+            chunk_id, metadata = result.chunk_id, result.metadata or {}
+        else:
+            chunk_id, metadata = result.get('chunk_id'), result.get('metadata') or {}
+        
+        if metadata.get('document_id') and metadata.get('chunk_index') is not None:
+            return f"{metadata['document_id']}_{metadata['chunk_index']}"
+        return chunk_id
     
     def _reciprocal_rank_fusion(
         self,
@@ -156,7 +310,7 @@ class HybridSearch:
         
         # Add vector results
         for rank, result in enumerate(vector_results, start=1):
-            chunk_id = result.chunk_id if hasattr(result, 'chunk_id') else result.get('chunk_id')
+            chunk_id = self._fusion_key(result)
             if chunk_id not in scores:
                 scores[chunk_id] = {
                     'rrf_score': 0,
@@ -166,7 +320,7 @@ class HybridSearch:
         
         # Add keyword results
         for rank, result in enumerate(keyword_results, start=1):
-            chunk_id = result.get('chunk_id')
+            chunk_id = self._fusion_key(result)
             if chunk_id not in scores:
                 scores[chunk_id] = {
                     'rrf_score': 0,
@@ -223,7 +377,7 @@ class HybridSearch:
         
         # Add vector results
         for result in vector_results:
-            chunk_id = result.chunk_id if hasattr(result, 'chunk_id') else result.get('chunk_id')
+            chunk_id = self._fusion_key(result)
             if chunk_id not in scores:
                 scores[chunk_id] = {
                     'vector_score': 0,
@@ -234,7 +388,7 @@ class HybridSearch:
         
         # Add keyword results
         for result in keyword_results:
-            chunk_id = result.get('chunk_id')
+            chunk_id = self._fusion_key(result)
             if chunk_id not in scores:
                 scores[chunk_id] = {
                     'vector_score': 0,
@@ -0,0 +1,127 @@
+# storage_retrieval/query_cache.py
+"""
+Query Embedding Cache
+
+In-process LRU + TTL cache for query embeddings so repeated queries (e.g. the
+same takeoff question asked again from the UI) skip the embedding API call.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for cache lookups (case and whitespace insensitive)"""
+    return _WHITESPACE_PATTERN.sub(' ', query).strip().casefold()
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for query embeddings.
+
+    Entries are keyed by (normalized query, embedding model) so knowledge
+    bases using different models never share vectors.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached embeddings
+            ttl_seconds: Seconds before an entry expires
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, query: str, model_name: str) -> Optional[List[float]]:
+        """
+        Get a cached embedding.
+
+        Args:
+            query: Query text
+            model_name: Embedding model name
+
+        Returns:
+            Embedding vector, or None on miss or expiry
+        """
+        key = (normalize_query(query), model_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            expires_at, embedding = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return embedding
+
+    def set(self, query: str, model_name: str, embedding) -> None:
+        """
+        Cache an embedding.
+
+        Args:
+            query: Query text
+            model_name: Embedding model name
+            embedding: Embedding vector (list or numpy array)
+        """
+        if hasattr(embedding, 'tolist'):
+            embedding = embedding.tolist()
+
+        key = (normalize_query(query), model_name)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(embedding))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """Remove all cached embeddings"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_query_embedding_cache = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Get the process-wide query embedding cache configured from RAG_SETTINGS"""
+    global _query_embedding_cache
+
+    if _query_embedding_cache is None:
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                config = getattr(settings, 'RAG_SETTINGS', {}).get('EMBEDDING', {})
+                _query_embedding_cache = QueryEmbeddingCache(
+                    max_size=config.get('QUERY_CACHE_SIZE', 1024),
+                    ttl_seconds=config.get('CACHE_TTL', 3600)
+                )
+    return _query_embedding_cache
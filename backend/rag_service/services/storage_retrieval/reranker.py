@@ -5,12 +5,123 @@ Result Reranker
 Reranks search results using cross-encoder models or LLM-based reranking.
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+# Cross-encoder models loaded in this process, keyed by (model name, max length)
+_cross_encoders: Dict[Tuple[str, int], Any] = {}
+_cross_encoder_lock = threading.Lock()
+
+# Single worker: CPU inference is already multi-threaded inside torch, and
+# serializing calls keeps concurrent requests from oversubscribing cores
+_inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cross-encoder')
+
+
+def get_cross_encoder(model_name: str, max_length: int):
+    """
+    Load a cross-encoder model once per process.
+
+    Args:
+        model_name: Hugging Face model name
+        max_length: Maximum (query + chunk) sequence length in tokens
+
+    Returns:
+        sentence_transformers.CrossEncoder instance
+
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    key = (model_name, max_length)
+    model = _cross_encoders.get(key)
+    if model is not None:
+        return model
+
+    with _cross_encoder_lock:
+        model = _cross_encoders.get(key)
+        if model is None:
+            from sentence_transformers import CrossEncoder
+
+            logger.info(f"Loading cross-encoder {model_name} (max_length={max_length})")
+            model = CrossEncoder(model_name, max_length=max_length, device='cpu')
+            _cross_encoders[key] = model
+    return model
+
+
+# (model, max length, query hash, chunk id, content hash)
+PairKey = Tuple[str, int, str, str, str]
+
+
+class PairScoreCache:
+    """
+    Thread-safe LRU cache of cross-encoder scores keyed by
+    (model, max length, query hash, chunk id, content hash).
+
+    The content hash keeps a chunk re-stored under the same id from being
+    served its old score; the max length separates scores computed over
+    differently truncated pairs.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._scores: "OrderedDict[PairKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        """Hash the whitespace-normalized query"""
+        return hashlib.sha1(' '.join(query.split()).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def get(self, key: PairKey) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.stats['misses'] += 1
+                return None
+            self._scores.move_to_end(key)
+            self.stats['hits'] += 1
+            return score
+
+    def set(self, key: PairKey, score: float) -> None:
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+
+
+_pair_score_cache = None
+
+
+def get_pair_score_cache() -> PairScoreCache:
+    """Get the process-wide cross-encoder pair score cache"""
+    global _pair_score_cache
+    if _pair_score_cache is None:
+        with _cross_encoder_lock:
+            if _pair_score_cache is None:
+                config = getattr(settings, 'RAG_SETTINGS', {}).get('RERANKING', {})
+                _pair_score_cache = PairScoreCache(max_size=config.get('PAIR_CACHE_SIZE', 10000))
+    return _pair_score_cache
+
+
 class Reranker:
     """
     Reranks search results to improve relevance.
@@ -21,14 +132,34 @@ class Reranker:
     - Hybrid scoring (vector + keyword + reranking)
     """
     
-    def __init__(self, strategy: str = 'simple'):
+    def __init__(
+        self,
+        strategy: Optional[str] = None,
+        model_name: Optional[str] = None,
+        max_length: Optional[int] = None,
+        use_thread_pool: Optional[bool] = None
+    ):
         """
         Initialize reranker.
         
         Args:
-            strategy: Reranking strategy ('simple', 'cross_encoder', 'llm')
+            strategy: Reranking strategy ('simple', 'cross_encoder', 'llm'; defaults to
+                RAG_SETTINGS['RERANKING']['STRATEGY'], else 'simple')
+            model_name: Cross-encoder model (defaults to RAG_SETTINGS['RERANKING']['CROSS_ENCODER_MODEL'])
+            max_length: Max tokens per (query, chunk) pair (defaults to RAG_SETTINGS['RERANKING']['MAX_LENGTH'])
+            use_thread_pool: Run inference in a worker thread so the event loop stays responsive
+                (defaults to RAG_SETTINGS['RERANKING']['USE_THREAD_POOL'])
         """
-        self.strategy = strategy
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('RERANKING', {})
+        
+        self.strategy = strategy or config.get('STRATEGY', 'simple')
+        self.model_name = model_name or config.get('CROSS_ENCODER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+        self.max_length = max_length or config.get('MAX_LENGTH', 256)
+        self.use_thread_pool = (
+            use_thread_pool if use_thread_pool is not None
+            else config.get('USE_THREAD_POOL', True)
+        )
+        self.score_cache = get_pair_score_cache()
     
     async def rerank(
         self,
@@ -56,9 +187,11 @@ class Reranker:
                 return await self._simple_rerank(results, top_k)
             
             elif self.strategy == 'cross_encoder':
-                # Cross-encoder reranking (future implementation)
-                logger.warning("Cross-encoder reranking not yet implemented, using simple")
-                return await self._simple_rerank(results, top_k)
+                try:
+                    return await self._cross_encoder_rerank(query, results, top_k)
+                except ImportError:
+                    logger.warning("sentence-transformers not installed, using simple reranking")
+                    return await self._simple_rerank(results, top_k)
             
             elif self.strategy == 'llm':
                 # LLM-based reranking (future implementation)
@@ -134,9 +267,10 @@ class Reranker:
         top_k: int
     ) -> List[Dict[str, Any]]:
         """
-        Cross-encoder reranking (future implementation).
+        Cross-encoder reranking.
         
-        Uses models like ms-marco-MiniLM-L-12-v2 to score query-document pairs.
+        Uses models like ms-marco-MiniLM-L-6-v2 to score query-document pairs
+        on CPU. Uncached pairs are scored in a single batched forward pass.
         
         Args:
             query: Query text
@@ -146,13 +280,75 @@ class Reranker:
         Returns:
             Reranked results
         """
-        # TODO: Implement cross-encoder reranking
-        # 1. Load cross-encoder model
-        # 2. Score each (query, document) pair
-        # 3. Sort by cross-encoder score
-        # 4. Return top_k
+        if self.use_thread_pool:
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(
+                _inference_executor, self._score_pairs, query, results
+            )
+        else:
+            scores = self._score_pairs(query, results)
+        
+        reranked = [
+            {
+                **result,
+                'original_score': result['score'],
+                'score': score,
+                'cross_encoder_score': score,
+                'reranking_applied': True
+            }
+            for result, score in zip(results, scores)
+        ]
+        reranked.sort(key=lambda x: x['score'], reverse=True)
+        
+        return reranked[:top_k]
+    
+    def _score_pairs(self, query: str, results: List[Dict[str, Any]]) -> List[float]:
+        """
+        Score (query, chunk) pairs, reusing cached scores.
+        
+        Args:
+            query: Query text
+            results: Search results with 'chunk_id' and 'content'
+            
+        Returns:
+            Cross-encoder score per result, in input order
+        """
+        query_hash = self.score_cache.query_hash(query)
+        keys: List[Optional[PairKey]] = []
+        scores: List[Optional[float]] = []
+        uncached = []
+        
+        for i, result in enumerate(results):
+            chunk_id = result.get('chunk_id')
+            key = (
+                self.model_name, self.max_length, query_hash, chunk_id,
+                self.score_cache.content_hash(result.get('content') or '')
+            ) if chunk_id else None
+            score = self.score_cache.get(key) if key else None
+            keys.append(key)
+            scores.append(score)
+            if score is None:
+                uncached.append(i)
+        
+        if uncached:
+            model = get_cross_encoder(self.model_name, self.max_length)
+            pairs = [(query, results[i].get('content') or '') for i in uncached]
+            predicted = model.predict(
+                pairs,
+                batch_size=len(pairs),
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+            for i, score in zip(uncached, predicted):
+                scores[i] = float(score)
+                if keys[i]:
+                    self.score_cache.set(keys[i], scores[i])
         
-        raise NotImplementedError("Cross-encoder reranking not yet implemented")
+        logger.debug(
+            f"Cross-encoder scored {len(uncached)} pairs "
+            f"({len(results) - len(uncached)} cached)"
+        )
+        return scores
     
     async def _llm_rerank(
         self,
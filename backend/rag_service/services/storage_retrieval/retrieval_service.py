@@ -6,10 +6,16 @@ Orchestrates document retrieval with vector search, hybrid search, and reranking
 """
 
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import time
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, Tuple
 
+from asgiref.sync import sync_to_async
+
+from .chunk_stats import get_chunk_statistics_buffer
 from .document_store import DocumentStore
+from .hybrid_search import HybridSearch
+from .query_cache import get_query_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,19 +29,24 @@ class RetrievalService:
     - Hybrid search (vector + keyword)
     - Result reranking
     - Metadata filtering
+    - Query embedding cache
     - Performance tracking
     """
     
-    def __init__(self, vector_store_type: str = 'pinecone'):
+    def __init__(self, vector_store_type: str = 'pinecone', embedding_model: str = 'voyage-3.5-lite'):
         """
         Initialize retrieval service.
         
         Args:
             vector_store_type: Type of vector store ('pinecone', 'pgvector', etc.)
+            embedding_model: Voyage model used to embed queries
         """
         self.document_store = DocumentStore()
         self.vector_store_type = vector_store_type
         self.vector_store = None
+        self.embedding_model = embedding_model
+        self.query_cache = get_query_embedding_cache()
+        self.chunk_stats = get_chunk_statistics_buffer()
         
         # Initialize vector store
         if vector_store_type == 'pinecone':
@@ -45,6 +56,10 @@ class RetrievalService:
                 logger.info("Initialized Pinecone vector store for retrieval")
             except ImportError:
                 logger.warning("Pinecone not available, retrieval limited to database only")
+        elif vector_store_type == 'pgvector':
+            from .vector_stores.pgvector_store import PgVectorStore
+            self.vector_store = PgVectorStore()
+            logger.info("Initialized pgvector vector store for retrieval")
     
     async def retrieve(
         self,
@@ -54,7 +69,9 @@ class RetrievalService:
         filter: Optional[Dict[str, Any]] = None,
         use_reranking: bool = False,
         rerank_top_k: int = 20,
-        organization=None
+        organization=None,
+        use_hybrid: bool = False,
+        rag_query=None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant chunks for a query.
@@ -67,6 +84,8 @@ class RetrievalService:
             use_reranking: Whether to use reranking
             rerank_top_k: Number of candidates to retrieve before reranking
             organization: Organization for API key lookup
+            use_hybrid: Whether to fuse vector search with keyword search
+            rag_query: Optional RAGQuery to record measured latencies on
             
         Returns:
             List of result dictionaries with:
@@ -76,33 +95,46 @@ class RetrievalService:
                 - metadata: Dict
                 - document_id: str
         """
-        start_time = datetime.utcnow()
+        start_time = time.time()
         
         try:
-            # Generate query embedding
-            from rag_service.services.embedding.embedding_service import EmbeddingService
-            
-            embedding_service = VoyageEmbeddingService()
-            embedding_result = await embedding_service.generate_embeddings(
-                texts=[query],
-                model_name='text-embedding-3-small'  # TODO: Make configurable
+            # Generate (or reuse) the query embedding
+            query_vector, embedding_latency_ms, embedding_cost = await self._embed_query(
+                query, organization
             )
-            
-            if not embedding_result['success']:
-                logger.error(f"Failed to generate query embedding: {embedding_result.get('error')}")
+            if query_vector is None:
+                await self._record_failure(rag_query, "Failed to generate query embedding")
                 return []
             
-            query_vector = embedding_result['embeddings'][0]
-            
             # Determine how many candidates to retrieve
             candidates_k = rerank_top_k if use_reranking else top_k
             
-            # Search vector store
-            if self.vector_store:
-                # Initialize if needed
-                if not self.vector_store.index:
-                    await self.vector_store.initialize(create_if_not_exists=False)
-                
+            if not self.vector_store:
+                logger.warning("No vector store available, cannot perform retrieval")
+                await self._record_failure(rag_query, "No vector store available")
+                return []
+            
+            # Initialize if needed
+            if not self.vector_store.index:
+                await self.vector_store.initialize(create_if_not_exists=False)
+            
+            retrieval_start = time.time()
+            if use_hybrid:
+                hybrid_search = HybridSearch()
+                response = await hybrid_search.search_with_timings(
+                    query=query,
+                    query_vector=query_vector,
+                    knowledge_base_id=knowledge_base_id,
+                    top_k=candidates_k,
+                    filter=filter,
+                    vector_store=self.vector_store,
+                    document_store=self.document_store
+                )
+                results = [
+                    {**result, 'document_id': result.get('metadata', {}).get('document_id', '')}
+                    for result in response['results']
+                ]
+            else:
                 # Search
                 search_results = await self.vector_store.search(
                     query_vector=query_vector,
@@ -122,46 +154,102 @@ class RetrievalService:
                         'metadata': result.metadata,
                         'document_id': result.metadata.get('document_id', ''),
                     })
-            else:
-                logger.warning("No vector store available, cannot perform retrieval")
-                return []
+            retrieval_latency_ms = int((time.time() - retrieval_start) * 1000)
             
             # Apply reranking if requested
+            reranking_latency_ms = None
             if use_reranking and results:
                 from .reranker import Reranker
                 
+                rerank_start = time.time()
                 reranker = Reranker()
                 results = await reranker.rerank(
                     query=query,
                     results=results,
                     top_k=top_k
                 )
+                reranking_latency_ms = int((time.time() - rerank_start) * 1000)
             else:
                 # Limit to top_k
                 results = results[:top_k]
             
-            # Update chunk statistics
-            for result in results:
-                await self.document_store.update_chunk_statistics(
-                    chunk_id=result['chunk_id'],
-                    relevance_score=result['score']
-                )
+            # Buffer chunk statistics; written in bulk by a background flush
+            self.chunk_stats.record_many(results)
             
             # Calculate retrieval time
-            end_time = datetime.utcnow()
-            retrieval_time_ms = int((end_time - start_time).total_seconds() * 1000)
+            total_latency_ms = int((time.time() - start_time) * 1000)
+            
+            if rag_query is not None:
+                await sync_to_async(rag_query.mark_completed)(
+                    latency_ms=total_latency_ms,
+                    embedding_latency_ms=embedding_latency_ms,
+                    retrieval_latency_ms=retrieval_latency_ms,
+                    reranking_latency_ms=reranking_latency_ms,
+                    embedding_cost=embedding_cost
+                )
             
             logger.info(
-                f"Retrieved {len(results)} chunks for query in {retrieval_time_ms}ms "
-                f"(KB: {knowledge_base_id}, reranking: {use_reranking})"
+                f"Retrieved {len(results)} chunks for query in {total_latency_ms}ms "
+                f"(embedding: {embedding_latency_ms}ms, retrieval: {retrieval_latency_ms}ms, "
+                f"KB: {knowledge_base_id}, hybrid: {use_hybrid}, reranking: {use_reranking})"
             )
             
             return results
             
         except Exception as e:
             logger.error(f"Error during retrieval: {e}", exc_info=True)
+            await self._record_failure(rag_query, str(e))
             return []
     
+    async def _embed_query(
+        self,
+        query: str,
+        organization=None
+    ) -> Tuple[Optional[List[float]], int, Decimal]:
+        """
+        Embed a query, reusing cached embeddings for repeated queries.
+        
+        Args:
+            query: Query text
+            organization: Organization for API key lookup
+            
+        Returns:
+            Tuple of (embedding vector or None on failure, measured latency in ms, cost in USD)
+        """
+        start_time = time.time()
+        
+        query_vector = self.query_cache.get(query, self.embedding_model)
+        if query_vector is not None:
+            latency_ms = int((time.time() - start_time) * 1000)
+            logger.debug(f"Query embedding cache hit ({latency_ms}ms)")
+            return query_vector, latency_ms, Decimal('0')
+        
+        from rag_service.services.embedding.embedding_service import VoyageEmbeddingService
+        
+        try:
+            embedding_service = VoyageEmbeddingService(
+                organization=organization,
+                model_name=self.embedding_model
+            )
+            embedding, cost, _ = await embedding_service.embed_query(query)
+        except Exception as e:
+            logger.error(f"Failed to generate query embedding: {e}")
+            return None, int((time.time() - start_time) * 1000), Decimal('0')
+        
+        self.query_cache.set(query, self.embedding_model, embedding)
+        query_vector = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+        
+        return query_vector, int((time.time() - start_time) * 1000), cost
+    
+    async def _record_failure(self, rag_query, error_message: str):
+        """Mark the RAGQuery (if any) as failed"""
+        if rag_query is None:
+            return
+        try:
+            await sync_to_async(rag_query.mark_failed)(error_message)
+        except Exception as e:
+            logger.error(f"Failed to record query failure: {e}")
+    
     async def retrieve_by_document(
         self,
         document_id: str,
@@ -10,6 +10,11 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from rag_service.services.extraction.page_fingerprint import (
+    PageDiff,
+    diff_page_fingerprints,
+    fingerprints_from_pages,
+)
 from .document_store import DocumentStore
 
 logger = logging.getLogger(__name__)
@@ -48,7 +53,9 @@ class StorageService:
             except ImportError:
                 logger.warning("Pinecone not available, vector storage disabled")
         elif vector_store_type == 'pgvector':
-            logger.info("PostgreSQL pgvector support coming soon")
+            from .vector_stores.pgvector_store import PgVectorStore
+            self.vector_store = PgVectorStore()
+            logger.info("Initialized pgvector vector store")
     
     async def store_document(
         self,
@@ -58,13 +65,20 @@ class StorageService:
         chunks: Optional[List[Dict[str, Any]]] = None,
         store_vectors: bool = True,
         knowledge_base_id: Optional[str] = None,
-        storage_approach: str = 'chunked'
+        storage_approach: str = 'chunked',
+        incremental: bool = False
     ) -> Dict[str, Any]:
         """
         Store a complete document with extraction results and chunks.
         
         This is the main entry point for storing processed documents.
         
+        With incremental=True, a re-ingested document is compared page by page
+        against the fingerprints stored for its previous revision: only
+        changed and added pages are rewritten, re-chunked and re-embedded,
+        chunks and vectors of changed or removed pages are deleted, and the
+        chunks of unchanged pages are kept as they are.
+        
         Args:
             document_id: Unique document ID
             extraction_response: Complete extraction response from UnifiedExtractor
@@ -73,9 +87,12 @@ class StorageService:
             store_vectors: Whether to store embeddings in vector store
             knowledge_base_id: Knowledge base ID for vector store namespace
             storage_approach: Storage approach to use ('complete' or 'chunked')
+            incremental: Reprocess only pages whose fingerprints changed
+                (chunked approach with generated chunks only)
             
         Returns:
-            Storage result dictionary with status and metrics
+            Storage result dictionary with status and metrics; incremental
+            runs add an 'incremental' summary of skipped/reprocessed pages
         """
         start_time = datetime.utcnow()
         result = {
@@ -92,12 +109,20 @@ class StorageService:
             # Add storage approach to file metadata
             file_metadata['storage_approach'] = storage_approach
             
+            # Compare against the previous revision before its pages are overwritten
+            incremental = incremental and storage_approach == 'chunked' and chunks is None
+            page_diff = None
+            if incremental:
+                page_diff = await self._diff_pages(document_id, extraction_response)
+            
             # Step 1: Store extraction response in PostgreSQL
             logger.info(f"Storing extraction for document: {document_id} using {storage_approach} approach")
             extraction_stored = await self.document_store.store_extraction(
                 document_id=document_id,
                 extraction_response=extraction_response,
-                file_metadata=file_metadata
+                file_metadata=file_metadata,
+                knowledge_base_id=knowledge_base_id,
+                pages_to_update=page_diff.reprocess if page_diff else None
             )
             
             if not extraction_stored:
@@ -105,11 +130,24 @@ class StorageService:
                 return result
             
             # Step 2: Generate and store chunks only if using chunked approach
+            replace_chunks = True
             if storage_approach == 'chunked':
+                # Replace only the chunks of changed pages
+                if page_diff is not None:
+                    update = await self._update_changed_pages(
+                        document_id, extraction_response, page_diff, knowledge_base_id
+                    )
+                    if update is not None:
+                        chunks = update['chunks']
+                        replace_chunks = False
+                        result['incremental'] = update['summary']
+                
                 # Generate chunks if not provided
                 if chunks is None:
                     logger.info(f"Generating chunks for document: {document_id}")
-                    chunks = await self._generate_chunks(document_id, extraction_response)
+                    chunks = await self._generate_chunks(
+                        document_id, extraction_response, page_bounded=incremental
+                    )
                     
                     if not chunks:
                         result['warnings'].append("No chunks generated from document")
@@ -119,7 +157,8 @@ class StorageService:
                     logger.info(f"Storing {len(chunks)} chunks for document: {document_id}")
                     chunks_stored = await self.document_store.store_chunks(
                         document_id=document_id,
-                        chunks=chunks
+                        chunks=chunks,
+                        replace=replace_chunks
                     )
                     
                     if chunks_stored:
@@ -167,7 +206,8 @@ class StorageService:
                         result['vectors_stored'] = vectors_result['count']
                     else:
                         result['warnings'].append(f"Vector storage failed: {vectors_result.get('error')}")
-                else:
+                elif 'incremental' not in result:
+                    # (an unchanged re-ingest reuses every stored vector)
                     result['warnings'].append("No content available for vector storage")
             
             # Calculate storage time
@@ -249,6 +289,83 @@ class StorageService:
         
         return result
     
+    async def rechunk_document(
+        self,
+        document_id: str,
+        extraction_response: Dict[str, Any],
+        page_diff: Optional[PageDiff] = None,
+        knowledge_base_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Re-chunk a stored document without embedding or storing vectors.
+        
+        With a page_diff, only the chunks of changed pages are replaced, as
+        in store_document's incremental mode. Otherwise every chunk is
+        replaced and the vectors of old chunks whose IDs the new chunks do not
+        reuse are deleted. New chunks keep to a single page so a later
+        revision can replace them page by page.
+        
+        Args:
+            document_id: Document ID
+            extraction_response: Stored extraction (pages, tables, layout blocks)
+            page_diff: Pages changed since the previous revision, if any
+            knowledge_base_id: Knowledge base ID for vector store namespace
+            
+        Returns:
+            Result dictionary with the new 'chunks', 'vectors_deleted' and,
+            for an incremental update, an 'incremental' summary
+        """
+        result = {
+            'success': False,
+            'chunks': [],
+            'vectors_deleted': 0,
+            'errors': [],
+        }
+        
+        try:
+            if page_diff is not None:
+                update = await self._update_changed_pages(
+                    document_id, extraction_response, page_diff, knowledge_base_id
+                )
+                if update is not None:
+                    if update['chunks'] and not await self.document_store.store_chunks(
+                        document_id=document_id,
+                        chunks=update['chunks'],
+                        replace=False
+                    ):
+                        result['errors'].append("Failed to store chunks")
+                        return result
+                    result['chunks'] = update['chunks']
+                    result['vectors_deleted'] = update['summary']['vectors_deleted']
+                    result['incremental'] = update['summary']
+                    result['success'] = True
+                    return result
+            
+            previous_ids = await self._vector_ids(document_id)
+            chunks = await self._generate_chunks(document_id, extraction_response, page_bounded=True)
+            
+            # Upserts overwrite reused IDs; a shorter revision leaves the rest
+            # behind. They go while the old chunks still list them, so a
+            # failed delete can be retried
+            stale_ids = sorted(set(previous_ids) - {f"{document_id}_{chunk['chunk_index']}" for chunk in chunks})
+            if stale_ids and self.vector_store and knowledge_base_id:
+                if not await self.vector_store.delete_vectors(ids=stale_ids, namespace=knowledge_base_id):
+                    result['errors'].append(f"Failed to delete {len(stale_ids)} stale vectors")
+                    return result
+                result['vectors_deleted'] = len(stale_ids)
+            
+            if not await self.document_store.store_chunks(document_id=document_id, chunks=chunks, replace=True):
+                result['errors'].append("Failed to store chunks")
+                return result
+            result['chunks'] = chunks
+            result['success'] = True
+            
+        except Exception as e:
+            logger.error(f"Error re-chunking document {document_id}: {e}", exc_info=True)
+            result['errors'].append(str(e))
+        
+        return result
+    
     async def delete_document(
         self,
         document_id: str,
@@ -378,10 +495,145 @@ class StorageService:
                 'documents': [],
             }
     
-    async def _generate_chunks(
+    async def _diff_pages(
         self,
         document_id: str,
         extraction_response: Dict[str, Any]
+    ) -> Optional[PageDiff]:
+        """
+        Compare a new revision's pages with the stored ones.
+        
+        Args:
+            document_id: Document ID
+            extraction_response: New extraction response
+            
+        Returns:
+            PageDiff, or None if there is no fingerprinted previous revision
+        """
+        pages = extraction_response.get('pages') or []
+        if not pages:
+            return None
+        
+        previous = await self.document_store.get_page_fingerprints(document_id)
+        if not previous:
+            return None
+        
+        page_diff = diff_page_fingerprints(previous, fingerprints_from_pages(pages))
+        logger.info(
+            f"Re-ingest of document {document_id}: {len(page_diff.unchanged)} pages unchanged, "
+            f"{len(page_diff.changed)} changed, {len(page_diff.added)} added, "
+            f"{len(page_diff.removed)} removed"
+        )
+        return page_diff
+    
+    async def _update_changed_pages(
+        self,
+        document_id: str,
+        extraction_response: Dict[str, Any],
+        page_diff: PageDiff,
+        knowledge_base_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Delete stale chunks and vectors and chunk the changed pages.
+        
+        Args:
+            document_id: Document ID
+            extraction_response: New extraction response
+            page_diff: Result of _diff_pages
+            knowledge_base_id: Knowledge base ID for vector store namespace
+            
+        Returns:
+            Dict with 'chunks' (new chunk dictionaries, indexed after the kept
+            chunks) and 'summary', or None to fall back to a full re-ingest
+        """
+        summary = {
+            **page_diff.summary(),
+            'chunks_deleted': 0,
+            'chunks_reused': 0,
+            'vectors_deleted': 0,
+        }
+        if not page_diff.has_changes:
+            summary['chunks_reused'] = await self._count_chunks(document_id)
+            return {'chunks': [], 'summary': summary}
+        
+        deletion = await self.document_store.delete_chunks_for_pages(document_id, page_diff.stale)
+        if deletion.get('error'):
+            return None
+        summary['chunks_deleted'] = deletion['deleted']
+        summary['chunks_reused'] = deletion['kept']
+        
+        # Vector IDs derive from chunk indexes, which new chunks may reuse, so
+        # stale vectors go before new ones are written
+        if deletion['vector_ids'] and self.vector_store and knowledge_base_id:
+            if await self.vector_store.delete_vectors(ids=deletion['vector_ids'], namespace=knowledge_base_id):
+                summary['vectors_deleted'] = len(deletion['vector_ids'])
+        
+        page_count = len(extraction_response.get('pages') or [])
+        rechunk_pages = sorted(
+            (set(page_diff.reprocess) | set(deletion['rechunk_pages'])) & set(range(1, page_count + 1))
+        )
+        summary['pages_rechunked'] = rechunk_pages
+        
+        chunks = await self._generate_chunks(
+            document_id,
+            self._select_pages(extraction_response, rechunk_pages),
+            start_index=deletion['next_chunk_index'],
+            page_bounded=True
+        )
+        return {'chunks': chunks, 'summary': summary}
+    
+    @staticmethod
+    def _select_pages(extraction_response: Dict[str, Any], page_numbers: List[int]) -> Dict[str, Any]:
+        """
+        Restrict an extraction response to some pages for re-chunking.
+        
+        Tables and layout blocks without a page are kept: document-level
+        chunks are always regenerated on an incremental update.
+        """
+        selected = set(page_numbers)
+        
+        def on_selected_page(item):
+            page = item.get('page_number', item.get('page')) if isinstance(item, dict) else None
+            return page is None or page in selected
+        
+        pages = [
+            {**page, 'page_number': page.get('page_number', i + 1)}
+            for i, page in enumerate(extraction_response.get('pages') or [])
+            if isinstance(page, dict) and page.get('page_number', i + 1) in selected
+        ]
+        return {
+            **extraction_response,
+            'text': '',  # Text comes from the selected pages only
+            'pages': pages,
+            'tables': [t for t in extraction_response.get('tables') or [] if on_selected_page(t)],
+            'layout_blocks': [
+                b for b in extraction_response.get('layout_blocks') or [] if on_selected_page(b)
+            ],
+        }
+    
+    async def _count_chunks(self, document_id: str) -> int:
+        from rag_service.models import Chunk
+        from asgiref.sync import sync_to_async
+        
+        return await sync_to_async(Chunk.objects.filter(document_id=document_id).count)()
+    
+    async def _vector_ids(self, document_id: str) -> List[str]:
+        from rag_service.models import Chunk
+        from asgiref.sync import sync_to_async
+        
+        @sync_to_async
+        def load_vector_ids():
+            rows = Chunk.objects.filter(document_id=document_id).values_list('chunk_index', 'embedding_vector_id')
+            return [vector_id or f"{document_id}_{chunk_index}" for chunk_index, vector_id in rows]
+        
+        return await load_vector_ids()
+    
+    async def _generate_chunks(
+        self,
+        document_id: str,
+        extraction_response: Dict[str, Any],
+        start_index: int = 0,
+        page_bounded: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Generate chunks from extraction response.
@@ -389,6 +641,8 @@ class StorageService:
         Args:
             document_id: Document ID
             extraction_response: Extraction response
+            start_index: Index of the first chunk
+            page_bounded: Keep text chunks within a single page
             
         Returns:
             List of chunk dictionaries
@@ -405,19 +659,27 @@ class StorageService:
             
             document = await get_document()
             
-            # Generate chunks
+            # Generate chunks in a worker thread: tokenizing is CPU-bound and
+            # pages may be streamed from the database
             chunking_service = ChunkingService()
-            chunk_objects = chunking_service.chunk_document(extraction_response, document)
+            chunk_objects = await sync_to_async(chunking_service.chunk_document)(
+                extraction_response,
+                document,
+                start_index=start_index,
+                page_bounded=page_bounded
+            )
             
             # Convert to dictionaries
             chunks = []
             for chunk in chunk_objects:
                 chunks.append({
+                    'id': str(chunk.id),
                     'chunk_index': chunk.chunk_index,
                     'content': chunk.content,
                     'chunk_type': chunk.chunk_type,
                     'metadata': chunk.metadata,
                     'token_count': chunk.token_count,
+                    'page_number': chunk.page_number,
                 })
             
             return chunks
@@ -0,0 +1,118 @@
+# storage_retrieval/tests/test_chunk_stats.py
+"""
+Tests for the buffered chunk statistics writer
+"""
+
+import time
+import uuid
+from unittest.mock import patch
+
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase, Document, Chunk
+from rag_service.services.storage_retrieval.chunk_stats import ChunkStatisticsBuffer
+
+
+class TestChunkStatisticsBuffer(TransactionTestCase):
+    """Test ChunkStatisticsBuffer aggregation and bulk flushes"""
+
+    def setUp(self):
+        """Set up a document with chunks"""
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        knowledge_base = KnowledgeBase.objects.create(organization=organization, name='Test KB')
+        document = Document.objects.create(knowledge_base=knowledge_base, title='Test Document')
+        self.chunks = [
+            Chunk.objects.create(
+                document=document,
+                chunk_index=i,
+                content=f'Chunk {i}',
+                embedding_model='test',
+                embedding_vector_id=f'{document.id}_{i}'
+            )
+            for i in range(3)
+        ]
+
+    def test_record_does_not_touch_database(self):
+        """Test recording is purely in-memory"""
+        buffer = ChunkStatisticsBuffer(flush_interval=None)
+        with self.assertNumQueries(0):
+            buffer.record(str(self.chunks[0].id), 0.5)
+            buffer.record_many([{'chunk_id': str(self.chunks[1].id), 'score': 0.7}])
+        assert buffer.pending_count == 2
+
+    def test_flush_matches_record_retrieval(self):
+        """Test bulk flush produces the same counts and averages as record_retrieval"""
+        expected = self.chunks[2]
+        Chunk.objects.filter(id=expected.id).update(relevance_score_avg=0.4, retrieval_count=2)
+        expected.refresh_from_db()
+        for score in (0.9, 0.6):
+            expected.record_retrieval(score)
+
+        chunk = self.chunks[0]
+        Chunk.objects.filter(id=chunk.id).update(relevance_score_avg=0.4, retrieval_count=2)
+
+        buffer = ChunkStatisticsBuffer(flush_interval=None)
+        buffer.record(str(chunk.id), 0.9)
+        buffer.record(str(chunk.id), 0.6)
+        # Pinecone results are keyed by vector ID; unscored hits only count
+        buffer.record(self.chunks[1].embedding_vector_id, 0.8)
+        buffer.record(self.chunks[1].embedding_vector_id)
+        buffer.record('unknown-vector-id', 0.1)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert buffer.flush() == 2
+        assert len([q for q in queries if q['sql'].lstrip().startswith('UPDATE')]) == 2
+
+        chunk.refresh_from_db()
+        assert chunk.retrieval_count == expected.retrieval_count == 4
+        assert abs(chunk.relevance_score_avg - expected.relevance_score_avg) < 1e-9
+
+        other = Chunk.objects.get(id=self.chunks[1].id)
+        assert other.retrieval_count == 2
+        assert other.relevance_score_avg == 0.8
+        assert buffer.pending_count == 0
+
+    def test_background_flush_and_stop(self):
+        """Test the background thread flushes and stop() drains the rest"""
+        buffer = ChunkStatisticsBuffer(flush_interval=0.05)
+        buffer.record(str(self.chunks[0].id), 1.0)
+
+        deadline = time.time() + 5
+        while buffer.stats['flushes'] == 0 and time.time() < deadline:
+            time.sleep(0.02)
+
+        buffer.record(str(self.chunks[0].id), 0.0)
+        buffer.stop()
+
+        chunk = Chunk.objects.get(id=self.chunks[0].id)
+        assert chunk.retrieval_count == 2
+        assert chunk.relevance_score_avg == 0.5
+
+    def test_buffer_is_capped_while_flushes_fail(self):
+        """Test failed flushes keep at most max_buffered chunks and drop the rest"""
+        buffer = ChunkStatisticsBuffer(flush_interval=None, max_pending=2, max_buffered=2)
+        buffer.record(str(self.chunks[0].id), 0.5)
+        buffer.record(str(self.chunks[1].id))
+
+        with patch.object(buffer, '_update_rows', side_effect=OperationalError('down')):
+            assert buffer.flush() == 0
+        buffer.record(str(self.chunks[0].id), 0.7)
+        with self.assertLogs('rag_service.services.storage_retrieval.chunk_stats', 'WARNING'):
+            buffer.record(str(self.chunks[2].id))
+        buffer.record(str(self.chunks[2].id))
+
+        assert buffer.pending_count == 2
+        assert buffer.stats['dropped'] == 2
+        assert buffer.flush() == 2
+        assert Chunk.objects.get(id=self.chunks[0].id).retrieval_count == 2
+        assert Chunk.objects.get(id=self.chunks[2].id).retrieval_count == 0
+
+        # Space again once the buffer has drained
+        buffer.record(str(self.chunks[2].id))
+        assert buffer.pending_count == 1
@@ -0,0 +1,252 @@
+# storage_retrieval/tests/test_incremental_ingest.py
+"""
+Tests for incremental re-ingest with per-page fingerprints
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import fitz  # PyMuPDF
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase, Document, DocumentPage, Chunk
+from rag_service.services import document_pipeline
+from rag_service.services.document_pipeline import DocumentPipeline
+from rag_service.services.extraction.layout_analyzer import LayoutAnalyzer
+from rag_service.services.extraction.text import TextExtractor
+from rag_service.services.storage_retrieval import StorageService
+
+
+class FakeVectorStore:
+    """Records deleted vector IDs"""
+
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_vectors(self, ids, namespace=None):
+        self.deleted.extend(ids)
+        return True
+
+
+def sheet_text(sheet: str, revision: str = 'A') -> str:
+    return (
+        f"GENERAL NOTES\n\n"
+        f"Sheet {sheet} revision {revision}. All footings bear on undisturbed soil. "
+        f"Concrete strength shall be 4000 psi at 28 days unless noted otherwise. "
+        f"Reinforcing steel shall conform to ASTM A615 grade 60."
+    )
+
+
+class TestIncrementalIngest(TransactionTestCase):
+    """Test StorageService.store_document(incremental=True)"""
+
+    def setUp(self):
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+        self.document_id = str(uuid.uuid4())
+        Document.objects.create(
+            id=self.document_id,
+            knowledge_base=self.knowledge_base,
+            title='Drawing Set'
+        )
+
+        self.service = StorageService(vector_store_type='none')
+        self.vector_store = FakeVectorStore()
+        self.service.vector_store = self.vector_store
+        self.service._store_vectors = AsyncMock(
+            side_effect=lambda document_id, chunks, knowledge_base_id: {
+                'success': True, 'count': len(chunks)
+            }
+        )
+
+    async def _ingest(self, sheets):
+        extraction_response = {
+            'text': '\n\n'.join(text for _, text in sheets),
+            'pages': [
+                {'page_number': i + 1, 'text': text, 'graphics_hash': graphics}
+                for i, (graphics, text) in enumerate(sheets)
+            ],
+            'success': True,
+        }
+        return await self.service.store_document(
+            document_id=self.document_id,
+            extraction_response=extraction_response,
+            file_metadata={'title': 'Drawing Set'},
+            knowledge_base_id=str(self.knowledge_base.id),
+            incremental=True
+        )
+
+    async def _chunks_by_page(self):
+        rows = await sync_to_async(list)(
+            Chunk.objects.filter(document_id=self.document_id).values_list('page_number', 'id', 'chunk_index')
+        )
+        by_page = {}
+        for page_number, chunk_id, chunk_index in rows:
+            by_page.setdefault(page_number, []).append((chunk_id, chunk_index))
+        return by_page
+
+    async def test_only_changed_pages_are_rechunked(self):
+        """Test unchanged pages keep their chunks and stale vectors are deleted"""
+        sheets = [('g1', sheet_text('S-101')), ('g2', sheet_text('S-102')), ('g3', sheet_text('S-103'))]
+        first = await self._ingest(sheets)
+        assert first['success'], first['errors']
+        assert 'incremental' not in first
+        before = await self._chunks_by_page()
+        assert set(before) == {1, 2, 3}
+
+        # Sheet 2 gets new notes, sheet 3 only moved linework
+        revised = [sheets[0], ('g2', sheet_text('S-102', 'B')), ('g3-moved', sheets[2][1])]
+        second = await self._ingest(revised)
+        assert second['success'], second['errors']
+
+        summary = second['incremental']
+        assert summary['pages_skipped'] == 1
+        assert summary['pages_reprocessed'] == 2
+        assert summary['changed_pages'] == [2, 3]
+
+        after = await self._chunks_by_page()
+        assert after[1] == before[1]
+        assert not set(after[2]) & set(before[2])
+        assert self.vector_store.deleted == [
+            f"{self.document_id}_{index}" for _, index in before[2] + before[3]
+        ]
+
+        page_two = await sync_to_async(DocumentPage.objects.get)(document_id=self.document_id, page_number=2)
+        assert 'revision B' in page_two.page_text
+
+    async def test_unchanged_revision_skips_everything(self):
+        """Test re-ingesting identical pages stores no chunks or vectors"""
+        sheets = [('g1', sheet_text('S-101')), ('g2', sheet_text('S-102'))]
+        await self._ingest(sheets)
+        self.service._store_vectors.reset_mock()
+
+        result = await self._ingest(sheets)
+
+        assert result['success'], result['errors']
+        assert result['incremental']['pages_skipped'] == 2
+        assert result['incremental']['pages_reprocessed'] == 0
+        assert result['chunks_stored'] == 0
+        assert not result['warnings']
+        self.service._store_vectors.assert_not_called()
+
+    async def test_removed_pages_drop_their_chunks(self):
+        """Test pages missing from the new revision lose their pages and chunks"""
+        sheets = [('g1', sheet_text('S-101')), ('g2', sheet_text('S-102'))]
+        await self._ingest(sheets)
+
+        result = await self._ingest(sheets[:1])
+
+        assert result['incremental']['removed_pages'] == [2]
+        assert set(await self._chunks_by_page()) == {1}
+        assert await sync_to_async(DocumentPage.objects.filter(document_id=self.document_id).count)() == 1
+
+
+class TestIncrementalPipeline(TransactionTestCase):
+    """Test DocumentPipeline extracts only the changed pages of a revision"""
+
+    def setUp(self):
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+        self.document_id = str(uuid.uuid4())
+        self.pipeline = DocumentPipeline()
+        self.pipeline._extract_tables = AsyncMock(return_value={'tables': [], 'tables_by_page': {}})
+
+    def _make_pdf(self, sheets):
+        """Write a PDF with one page per sheet title"""
+        handle, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        doc = fitz.open()
+        for title in sheets:
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), title, fontsize=18)
+            page.draw_rect(fitz.Rect(100, 300, 250, 400))
+        doc.save(path)
+        doc.close()
+        return path
+
+    async def _process(self, sheets):
+        return await self.pipeline.process_document(
+            file_path=self._make_pdf(sheets),
+            knowledge_base_id=str(self.knowledge_base.id),
+            document_id=self.document_id
+        )
+
+    async def test_revision_extracts_changed_pages_only(self):
+        """Test text and layout run on changed pages while kept pages stay stored"""
+        first = await self._process(['S-101', 'S-102', 'S-103'])
+        assert first['status'] == 'completed'
+
+        text_pages, layout_pages = [], []
+        extract_page = TextExtractor._process_pdf_page
+        analyze = LayoutAnalyzer._analyze_rule_based
+
+        def process_pdf_page(extractor, page, page_num, page_text):
+            text_pages.append(page_num + 1)
+            return extract_page(extractor, page, page_num, page_text)
+
+        def analyze_rule_based(analyzer, file_path, pages=None):
+            blocks = analyze(analyzer, file_path, pages)
+            layout_pages.extend(sorted({block.page for block in blocks}))
+            return blocks
+
+        with patch.object(TextExtractor, '_process_pdf_page', process_pdf_page), \
+                patch.object(LayoutAnalyzer, '_analyze_rule_based', analyze_rule_based):
+            second = await self._process(['S-101', 'S-102 REV B'])
+
+        assert text_pages == [2]
+        assert layout_pages == [2]
+        assert self.pipeline._extract_tables.call_args.kwargs['pages'] == [2]
+        assert second['incremental']['changed_pages'] == [2]
+        assert second['incremental']['removed_pages'] == [3]
+        assert second['page_count'] == 2
+
+        pages = await sync_to_async(list)(
+            DocumentPage.objects.filter(document_id=self.document_id).order_by('page_number')
+        )
+        assert [(page.page_number, page.page_text.strip()) for page in pages] == [(1, 'S-101'), (2, 'S-102 REV B')]
+        document = await sync_to_async(Document.objects.get)(id=self.document_id)
+        assert document.content == '\n\n'.join(page.page_text for page in pages)
+
+        # Nothing changed: nothing is extracted
+        text_pages.clear()
+        with patch.object(TextExtractor, '_process_pdf_page', process_pdf_page):
+            third = await self._process(['S-101', 'S-102 REV B'])
+        assert text_pages == []
+        assert third['incremental']['pages_skipped'] == 2
+        document = await sync_to_async(Document.objects.get)(id=self.document_id)
+        assert 'S-102 REV B' in document.content
+
+    async def test_fingerprinting_runs_on_render_thread(self):
+        """Test both fingerprinting passes open the PDF on the shared render thread"""
+        threads = []
+        fingerprint = document_pipeline.fingerprint_pdf_pages
+
+        def tracking_fingerprint(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return fingerprint(*args, **kwargs)
+
+        with patch.object(document_pipeline, 'fingerprint_pdf_pages', tracking_fingerprint):
+            await self._process(['S-101'])
+            await self._process(['S-101 REV B'])
+
+        # New document: after extraction; revision: diff before extraction
+        assert len(threads) == 2 and all(name.startswith('pdf-render') for name in threads)
@@ -0,0 +1,193 @@
+# storage_retrieval/tests/test_keyword_search.py
+"""
+Tests for full-text keyword search and its use in hybrid search
+"""
+
+import threading
+import uuid
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase, Document, Chunk
+from rag_service.services.storage_retrieval import document_store, filters
+from rag_service.services.storage_retrieval.document_store import (
+    DocumentStore,
+    build_keyword_tsquery,
+    extract_element_ids,
+)
+from rag_service.services.storage_retrieval.hybrid_search import HybridSearch
+from rag_service.services.storage_retrieval.vector_stores import PgVectorStore, pgvector_store
+from rag_service.services.storage_retrieval.vector_stores.base import SearchResult
+
+
+class TestKeywordSearch(TransactionTestCase):
+    """Test DocumentStore keyword search against the generated tsvector column"""
+
+    def setUp(self):
+        """Set up a knowledge base with a few chunks"""
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+        self.document = Document.objects.create(
+            knowledge_base=self.knowledge_base,
+            title='Foundation Plan',
+            content='Footing schedule and base plate details'
+        )
+
+        contents = [
+            'Base plate BP3 is 300x300x20 with four anchor bolts',
+            'Column C12 continues to the roof level',
+            'Footing F1 is reinforced with 16mm bars each way',
+            'General notes about concrete cover and anchor bolts',
+        ]
+        for i, content in enumerate(contents):
+            Chunk.objects.create(
+                document=self.document,
+                chunk_index=i,
+                content=content,
+                embedding_model='test',
+                embedding_vector_id=f'{self.document.id}_{i}',
+                metadata={'zone': 'A' if i % 2 else 'B'}
+            )
+
+        # Chunk in another knowledge base must never be returned
+        other_kb = KnowledgeBase.objects.create(organization=organization, name='Other KB')
+        other_document = Document.objects.create(knowledge_base=other_kb, title='Other')
+        Chunk.objects.create(
+            document=other_document,
+            chunk_index=0,
+            content='Base plate BP3 anchor bolts',
+            embedding_model='test'
+        )
+
+        self.store = DocumentStore()
+
+    def test_very_long_content_is_indexed(self):
+        """Test content past the tsvector size limit still saves and its start is searchable"""
+        # ~2.6MB of distinct words would overflow a 1MB tsvector
+        content = 'Anchorage ' + ' '.join(f'term{i}' for i in range(300000))
+        document = Document.objects.create(knowledge_base=self.knowledge_base, title='Spec', content=content)
+        Chunk.objects.create(document=document, chunk_index=0, content=content, embedding_model='test')
+
+        assert Chunk.objects.filter(document=document).extra(
+            where=["content_tsv @@ to_tsquery('english', 'anchorage')"]
+        ).exists()
+
+    def test_query_helpers(self):
+        """Test tsquery building and element ID extraction"""
+        assert build_keyword_tsquery("What's the BP3 base plate?") == 'what | s | the | bp3 | base | plate'
+        assert build_keyword_tsquery('!!&|') == ''
+        assert extract_element_ids('size of bp3 and column C12, footing F-1') == ['BP3', 'C12', 'F-1']
+
+    async def test_ranks_by_term_coverage(self):
+        """Test ts_rank_cd ranking within the knowledge base"""
+        results = await self.store.search_chunks_by_keywords(
+            knowledge_base_id=str(self.knowledge_base.id),
+            query='anchor bolts on the base plate',
+            top_k=10
+        )
+
+        assert [r['metadata']['chunk_index'] for r in results] == [0, 3]
+        assert results[0]['score'] > results[1]['score']
+        assert all(r['document_id'] == str(self.document.id) for r in results)
+
+    async def test_element_id_boost_and_filter(self):
+        """Test element IDs are matched and metadata filters apply"""
+        results = await self.store.search_chunks_by_keywords(
+            knowledge_base_id=str(self.knowledge_base.id),
+            query='c12',
+            top_k=10
+        )
+        assert results[0]['metadata']['chunk_index'] == 1
+        assert results[0]['score'] >= 1.0
+
+        results = await self.store.search_chunks_by_keywords(
+            knowledge_base_id=str(self.knowledge_base.id),
+            query='anchor bolts',
+            top_k=10,
+            filter={'zone': 'A'}
+        )
+        assert [r['metadata']['chunk_index'] for r in results] == [3]
+
+    async def test_search_documents_by_content(self):
+        """Test document search uses the document tsvector and title"""
+        results = await self.store.search_documents_by_content(
+            knowledge_base_id=str(self.knowledge_base.id),
+            query='footing schedule'
+        )
+        assert [r['id'] for r in results] == [str(self.document.id)]
+
+        results = await self.store.search_documents_by_content(
+            knowledge_base_id=str(self.knowledge_base.id),
+            query='ndation Pl'
+        )
+        assert [r['id'] for r in results] == [str(self.document.id)]
+
+    async def test_hybrid_search_fuses_keyword_results(self):
+        """Test keyword hits are merged with vector hits for the same chunk"""
+
+        class FakeVectorStore:
+            async def search(self, query_vector, top_k, filter=None, namespace=None):
+                return [
+                    SearchResult(
+                        chunk_id=f'{document_id}_2',
+                        score=0.9,
+                        metadata={'document_id': document_id, 'chunk_index': 2},
+                        content='Footing F1 is reinforced with 16mm bars each way'
+                    )
+                ]
+
+        document_id = str(self.document.id)
+        hybrid = HybridSearch(fusion_method='rrf')
+        results = await hybrid.search(
+            query='footing F1 reinforcement',
+            query_vector=[0.0],
+            knowledge_base_id=str(self.knowledge_base.id),
+            top_k=5,
+            vector_store=FakeVectorStore(),
+            document_store=self.store
+        )
+
+        assert len(results) == 1
+        assert results[0]['metadata']['chunk_index'] == 2
+        assert results[0]['score'] == 2 / 61
+
+    async def test_hybrid_legs_query_in_parallel(self):
+        """Test the pgvector and keyword legs run at the same time on separate threads"""
+        await sync_to_async(Chunk.objects.filter(document=self.document).update)(
+            embedding=[1.0, 0.0], embedding_dimensions=2
+        )
+        vector_store = PgVectorStore(metric='cosine')
+        assert await vector_store.initialize()
+
+        # Each leg waits for the other inside its query; run one after the
+        # other, the first would give up and its leg would report an error
+        both_querying = threading.Barrier(2, timeout=5)
+        threads = set()
+
+        def apply_filter(queryset, filter):
+            threads.add(threading.get_ident())
+            both_querying.wait()
+            return filters.apply_chunk_filter(queryset, filter)
+
+        with patch.object(document_store, 'apply_chunk_filter', apply_filter), \
+                patch.object(pgvector_store, 'apply_chunk_filter', apply_filter):
+            response = await HybridSearch(vector_timeout=10, keyword_timeout=10).search_with_timings(
+                query='footing F1',
+                query_vector=[1.0, 0.0],
+                knowledge_base_id=str(self.knowledge_base.id),
+                vector_store=vector_store,
+                document_store=self.store
+            )
+
+        assert len(threads) == 2
+        assert response['legs'] == {'vector': 'ok', 'keyword': 'ok'}
+        assert response['results'][0]['metadata']['chunk_index'] == 2
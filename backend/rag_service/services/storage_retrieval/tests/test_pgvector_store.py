@@ -0,0 +1,126 @@
+# storage_retrieval/tests/test_pgvector_store.py
+"""
+Tests for the pgvector vector store
+"""
+
+import uuid
+from io import StringIO
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase, Document, Chunk, VectorIndex
+from rag_service.services.storage_retrieval.vector_stores import PgVectorStore
+
+
+class TestPgVectorStore(TransactionTestCase):
+    """Test PgVectorStore against the rag_chunk table"""
+
+    def setUp(self):
+        """Set up a knowledge base with embedded chunks"""
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+        VectorIndex.objects.create(
+            knowledge_base=self.knowledge_base,
+            name='default',
+            collection_name='default',
+            dimensions=8,
+            status='active'
+        )
+        self.document = Document.objects.create(
+            knowledge_base=self.knowledge_base,
+            title='Test Document'
+        )
+
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(10, 8))
+        for i, vector in enumerate(self.vectors):
+            Chunk.objects.create(
+                document=self.document,
+                chunk_index=i,
+                content=f'Chunk {i}',
+                embedding_model='test',
+                embedding_vector_id=f'{self.document.id}_{i}',
+                embedding_vector=vector.tolist(),
+                metadata={'zone': 'A' if i % 2 else 'B'}
+            )
+
+        self.store = PgVectorStore(metric='cosine')
+
+    def test_backfill_command(self):
+        """Test JSON vectors are copied into the pgvector column"""
+        # Wrong width for this knowledge base; must be skipped
+        Chunk.objects.create(
+            document=self.document,
+            chunk_index=99,
+            content='Bad chunk',
+            embedding_model='test',
+            embedding_vector_id='bad',
+            embedding_vector=[1.0, 2.0]
+        )
+
+        call_command('backfill_pgvector', batch_size=3, stdout=StringIO())
+
+        assert Chunk.objects.filter(embedding_dimensions=8).count() == 10
+        assert Chunk.objects.get(embedding_vector_id='bad').embedding is None
+
+    async def test_search_ranks_nearest_first(self):
+        """Test top-k search orders by cosine similarity"""
+        await self._backfill()
+        assert await self.store.initialize()
+
+        results = await self.store.search(
+            query_vector=self.vectors[3].tolist(),
+            top_k=3,
+            namespace=str(self.knowledge_base.id)
+        )
+
+        assert len(results) == 3
+        assert results[0].metadata['chunk_index'] == 3
+        assert abs(results[0].score - 1.0) < 1e-6
+        assert results[0].score >= results[1].score >= results[2].score
+
+    async def test_search_applies_metadata_filter(self):
+        """Test metadata filters are evaluated in SQL"""
+        await self._backfill()
+        assert await self.store.initialize()
+
+        results = await self.store.search(
+            query_vector=self.vectors[3].tolist(),
+            top_k=10,
+            filter={'zone': 'B', 'chunk_index': {'$nin': [0]}},
+            namespace=str(self.knowledge_base.id)
+        )
+
+        assert len(results) == 4
+        assert all(r.metadata['zone'] == 'B' for r in results)
+
+    async def test_upsert_and_delete(self):
+        """Test upsert writes onto chunk rows and delete clears them"""
+        assert await self.store.initialize()
+        vector_id = f'{self.document.id}_4'
+
+        result = await self.store.upsert_vectors(
+            vectors=[{'id': vector_id, 'values': self.vectors[4].tolist(), 'metadata': {}}],
+            namespace=str(self.knowledge_base.id)
+        )
+        assert result['success'] and result['count'] == 1
+
+        stats = await self.store.get_stats(namespace=str(self.knowledge_base.id))
+        assert stats['total_vectors'] == 1
+
+        assert await self.store.delete_vectors([vector_id])
+        stats = await self.store.get_stats(namespace=str(self.knowledge_base.id))
+        assert stats['total_vectors'] == 0
+
+    async def _backfill(self):
+        await sync_to_async(call_command)('backfill_pgvector', stdout=StringIO())
@@ -0,0 +1,169 @@
+# storage_retrieval/tests/test_pinecone_writes.py
+"""
+Tests for concurrent Pinecone writes against an in-memory index
+"""
+
+import threading
+import time
+
+import pytest
+from django.test import SimpleTestCase
+
+from rag_service.services.storage_retrieval.vector_stores.batch_writer import (
+    estimate_payload_bytes,
+    plan_batches,
+)
+from rag_service.services.storage_retrieval.vector_stores.pinecone_store import PineconeStore
+
+
+class FakeIndex:
+    """
+    Thread-safe in-memory stand-in for a Pinecone Index.
+
+    Calls are slow enough to overlap; fail_batches maps the first vector ID
+    of a batch to how many times that batch should fail.
+    """
+
+    def __init__(self, delay=0.05, fail_batches=None):
+        self.delay = delay
+        self.fail_batches = dict(fail_batches or {})
+        self.vectors = {}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, name, key):
+        with self._lock:
+            self.calls.append((name, key))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failures = self.fail_batches.get(key, 0)
+            if failures:
+                self.fail_batches[key] = failures - 1
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if failures:
+            raise ConnectionError(f'503 for batch {key}')
+
+    def upsert(self, vectors, namespace=''):
+        self._enter('upsert', vectors[0]['id'])
+        with self._lock:
+            for vector in vectors:
+                self.vectors[(namespace, vector['id'])] = vector
+        return {'upserted_count': len(vectors)}
+
+    def delete(self, ids=None, namespace='', **kwargs):
+        self._enter('delete', ids[0])
+        with self._lock:
+            for vector_id in ids:
+                self.vectors.pop((namespace, vector_id), None)
+        return {}
+
+    def update(self, id, set_metadata=None, namespace=''):
+        self._enter('update', id)
+        with self._lock:
+            self.vectors[(namespace, id)]['metadata'].update(set_metadata or {})
+        return {}
+
+
+def make_vectors(count, dimensions=8, content_size=10):
+    return [
+        {'id': f'v{i}', 'values': [0.1] * dimensions, 'metadata': {'content': 'x' * content_size}}
+        for i in range(count)
+    ]
+
+
+class TestPineconeWrites(SimpleTestCase):
+    """Test batching, concurrency and per-batch retries"""
+
+    def make_store(self, index, concurrency=4, max_bytes=10_000, max_vectors=1000):
+        store = PineconeStore()
+        store.index = index
+        store.max_batch_bytes = max_bytes
+        store.max_batch_vectors = max_vectors
+        store.delete_batch_size = 10
+        store.writer.max_concurrency = concurrency
+        store.writer.retry_backoff = 0
+        return store
+
+    def test_batches_are_sized_by_bytes(self):
+        """Test wide vectors get smaller batches than narrow ones"""
+        narrow = plan_batches(make_vectors(100, dimensions=8), max_bytes=20_000, max_items=1000)
+        wide = plan_batches(make_vectors(100, dimensions=256), max_bytes=20_000, max_items=1000)
+
+        assert len(narrow) < len(wide)
+        for batch in wide:
+            assert sum(estimate_payload_bytes(v) for v in batch) <= 20_000
+        assert [v['id'] for batch in wide for v in batch] == [f'v{i}' for i in range(100)]
+        assert plan_batches(make_vectors(5), max_bytes=10_000_000, max_items=2)[-1][0]['id'] == 'v4'
+
+    @pytest.mark.asyncio
+    async def test_upsert_runs_batches_concurrently(self):
+        """Test batches overlap up to the concurrency limit and all vectors land"""
+        index = FakeIndex()
+        store = self.make_store(index, concurrency=3, max_bytes=3_000)
+
+        result = await store.upsert_vectors(make_vectors(60, dimensions=64), namespace='kb1')
+
+        assert result['success']
+        assert result['count'] == 60
+        assert len(result['batches']) > 3
+        assert index.max_active == 3
+        assert len(index.vectors) == 60
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried_alone(self):
+        """Test only the failing batch is resent and results are per batch"""
+        vectors = make_vectors(40, dimensions=64)
+        batches = plan_batches(vectors, 3_000, 1000)
+        flaky = batches[1][0]['id']
+        index = FakeIndex(fail_batches={flaky: 2})
+        store = self.make_store(index, max_bytes=3_000)
+
+        result = await store.upsert_vectors(vectors, namespace='kb1')
+
+        assert result['success']
+        assert [b['attempts'] for b in result['batches']] == [1, 3] + [1] * (len(batches) - 2)
+        assert [key for name, key in index.calls].count(flaky) == 3
+        assert [key for name, key in index.calls].count(batches[0][0]['id']) == 1
+        assert len(index.vectors) == 40
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_report_failed_batch(self):
+        """Test a batch failing past its retries is reported, others still succeed"""
+        vectors = make_vectors(40, dimensions=64)
+        batches = plan_batches(vectors, 3_000, 1000)
+        index = FakeIndex(fail_batches={batches[0][0]['id']: 10})
+        store = self.make_store(index, max_bytes=3_000)
+        store.writer.max_retries = 1
+
+        result = await store.upsert_vectors(vectors, namespace='kb1')
+
+        assert not result['success']
+        assert result['failed_count'] == len(batches[0])
+        assert result['count'] == 40 - len(batches[0])
+        assert result['batches'][0]['attempts'] == 2
+        assert '503' in result['batches'][0]['error']
+
+    @pytest.mark.asyncio
+    async def test_deletes_and_metadata_updates_are_concurrent(self):
+        """Test deletes batch by ID count and updates run in parallel"""
+        index = FakeIndex()
+        store = self.make_store(index, concurrency=4)
+        await store.upsert_vectors(make_vectors(30), namespace='kb1')
+        index.max_active = 0
+
+        updated = await store.update_metadata_many(
+            {f'v{i}': {'reviewed': True} for i in range(8)}, namespace='kb1'
+        )
+        assert updated['success'] and updated['count'] == 8
+        assert index.max_active == 4
+        assert index.vectors[('kb1', 'v3')]['metadata']['reviewed'] is True
+
+        deleted = await store.delete_vectors_batched([f'v{i}' for i in range(25)], namespace='kb1')
+        assert deleted['success'] and deleted['count'] == 25
+        assert [b['size'] for b in deleted['batches']] == [10, 10, 5]
+        assert sorted(vector_id for _, vector_id in index.vectors) == [f'v{i}' for i in range(25, 30)]
+        assert await store.delete_vectors(['v25'], namespace='kb1') is True
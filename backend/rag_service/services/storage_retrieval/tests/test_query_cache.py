@@ -0,0 +1,49 @@
+# storage_retrieval/tests/test_query_cache.py
+"""
+Tests for the query embedding cache
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from rag_service.services.storage_retrieval.query_cache import QueryEmbeddingCache, normalize_query
+
+
+class TestQueryEmbeddingCache(SimpleTestCase):
+    """Test QueryEmbeddingCache LRU and TTL behaviour"""
+
+    def test_normalized_keys_per_model(self):
+        """Test keys ignore case/whitespace but not the model"""
+        cache = QueryEmbeddingCache(max_size=10, ttl_seconds=60)
+        cache.set('Footing  F1 depth', 'voyage-3.5-lite', np.array([1.0, 2.0]))
+
+        assert normalize_query('  Footing\tF1  DEPTH ') == 'footing f1 depth'
+        assert cache.get('footing f1 DEPTH', 'voyage-3.5-lite') == [1.0, 2.0]
+        assert cache.get('footing f1 depth', 'voyage-3.5') is None
+        assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = QueryEmbeddingCache(max_size=2, ttl_seconds=60)
+        cache.set('a', 'm', [1.0])
+        cache.set('b', 'm', [2.0])
+        cache.get('a', 'm')
+        cache.set('c', 'm', [3.0])
+
+        assert cache.get('b', 'm') is None
+        assert cache.get('a', 'm') == [1.0]
+        assert cache.get('c', 'm') == [3.0]
+        assert cache.stats['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = QueryEmbeddingCache(max_size=2, ttl_seconds=10)
+        with patch('rag_service.services.storage_retrieval.query_cache.time.monotonic', return_value=100.0):
+            cache.set('a', 'm', [1.0])
+        with patch('rag_service.services.storage_retrieval.query_cache.time.monotonic', return_value=109.0):
+            assert cache.get('a', 'm') == [1.0]
+        with patch('rag_service.services.storage_retrieval.query_cache.time.monotonic', return_value=111.0):
+            assert cache.get('a', 'm') is None
+        assert len(cache) == 0
@@ -0,0 +1,117 @@
+# storage_retrieval/tests/test_reranker.py
+"""
+Tests for cross-encoder reranking
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.test import SimpleTestCase
+
+from rag_service.services.storage_retrieval import reranker as reranker_module
+from rag_service.services.storage_retrieval.reranker import Reranker, PairScoreCache
+
+
+class FakeCrossEncoder:
+    """Scores pairs by query word overlap and records each forward pass"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=None, convert_to_numpy=True):
+        self.calls.append((len(pairs), batch_size))
+        return np.array([
+            len(set(query.lower().split()) & set(content.lower().split()))
+            for query, content in pairs
+        ], dtype=np.float32)
+
+
+class TestCrossEncoderReranker(SimpleTestCase):
+    """Test Reranker cross_encoder strategy"""
+
+    def setUp(self):
+        self.model = FakeCrossEncoder()
+        self.models_patch = patch.dict(
+            reranker_module._cross_encoders,
+            {('fake-model', 128): self.model}
+        )
+        self.models_patch.start()
+        self.addCleanup(self.models_patch.stop)
+
+        self.results = [
+            {'chunk_id': f'chunk-{i}', 'content': content, 'score': 0.5}
+            for i, content in enumerate([
+                'general notes',
+                'base plate anchor bolts',
+                'base plate',
+            ])
+        ]
+
+    def _reranker(self, use_thread_pool):
+        reranker = Reranker(
+            strategy='cross_encoder',
+            model_name='fake-model',
+            max_length=128,
+            use_thread_pool=use_thread_pool
+        )
+        reranker.score_cache = PairScoreCache(max_size=100)
+        return reranker
+
+    @pytest.mark.asyncio
+    async def test_single_batched_pass_and_ordering(self):
+        """Test all pairs are scored in one forward pass and sorted by score"""
+        reranker = self._reranker(use_thread_pool=True)
+
+        reranked = await reranker.rerank('base plate anchor bolts', self.results, top_k=2)
+
+        assert self.model.calls == [(3, 3)]
+        assert [r['chunk_id'] for r in reranked] == ['chunk-1', 'chunk-2']
+        assert reranked[0]['cross_encoder_score'] == 4.0
+        assert reranked[0]['original_score'] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_pair_scores_are_cached(self):
+        """Test cached (query, chunk) pairs skip inference"""
+        reranker = self._reranker(use_thread_pool=False)
+
+        await reranker.rerank('base plate', self.results[:2], top_k=5)
+        await reranker.rerank('  base   plate ', self.results, top_k=5)
+
+        assert self.model.calls == [(2, 2), (1, 1)]
+        assert reranker.score_cache.stats['hits'] == 2
+
+    @pytest.mark.asyncio
+    async def test_changed_content_or_length_is_rescored(self):
+        """Test a chunk re-stored under the same id, or a different max_length, misses the cache"""
+        reranker = self._reranker(use_thread_pool=False)
+        await reranker.rerank('base plate', self.results[1:2], top_k=5)
+
+        restored = [{**self.results[1], 'content': 'general notes'}]
+        reranked = await reranker.rerank('base plate', restored, top_k=5)
+        assert reranked[0]['cross_encoder_score'] == 0.0
+
+        reranker.max_length = 256
+        with patch.dict(reranker_module._cross_encoders, {('fake-model', 256): self.model}):
+            await reranker.rerank('base plate', self.results[1:2], top_k=5)
+
+        assert self.model.calls == [(1, 1), (1, 1), (1, 1)]
+        assert reranker.score_cache.stats['hits'] == 0
+
+    def test_strategy_from_settings(self):
+        """Test the cross-encoder is enabled through RERANKING['STRATEGY']"""
+        with self.settings(RAG_SETTINGS={'RERANKING': {'STRATEGY': 'cross_encoder'}}):
+            assert Reranker().strategy == 'cross_encoder'
+        with self.settings(RAG_SETTINGS={}):
+            assert Reranker().strategy == 'simple'
+
+    @pytest.mark.asyncio
+    async def test_falls_back_without_sentence_transformers(self):
+        """Test missing sentence-transformers falls back to simple reranking"""
+        reranker = Reranker(strategy='cross_encoder', model_name='missing-model', use_thread_pool=False)
+
+        with patch.object(reranker_module, 'get_cross_encoder', side_effect=ImportError):
+            reranked = await reranker.rerank('base plate', self.results, top_k=3)
+
+        assert len(reranked) == 3
+        assert all('cross_encoder_score' not in r for r in reranked)
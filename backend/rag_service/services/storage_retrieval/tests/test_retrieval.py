@@ -3,12 +3,17 @@
 Tests for Retrieval Service
 """
 
+import asyncio
 import pytest
+from decimal import Decimal
 from django.test import TestCase
 from unittest.mock import Mock, patch, AsyncMock
 import uuid
 
-from rag_service.services.storage_retrieval import RetrievalService
+import numpy as np
+
+from rag_service.services.storage_retrieval import RetrievalService, HybridSearch
+from rag_service.services.storage_retrieval.chunk_stats import ChunkStatisticsBuffer
 from rag_service.services.storage_retrieval.vector_stores.base import SearchResult
 
 
@@ -18,6 +23,8 @@ class TestRetrievalService(TestCase):
     def setUp(self):
         """Set up test fixtures"""
         self.retrieval_service = RetrievalService(vector_store_type='pinecone')
+        self.retrieval_service.query_cache.clear()
+        self.retrieval_service.chunk_stats = ChunkStatisticsBuffer(flush_interval=None)
         self.knowledge_base_id = str(uuid.uuid4())
     
     @pytest.mark.asyncio
@@ -26,10 +33,7 @@ class TestRetrievalService(TestCase):
         query = "What are the safety requirements?"
         
         # Mock embedding service
-        mock_embedding_result = {
-            'success': True,
-            'embeddings': [[0.1] * 1536]  # Mock embedding vector
-        }
+        mock_embedding_result = (np.array([0.1] * 1024), Decimal('0.000002'), 120)
         
         # Mock search results
         mock_search_results = [
@@ -47,7 +51,7 @@ class TestRetrievalService(TestCase):
             )
         ]
         
-        with patch('rag_service.services.embedding.embedding_service.EmbeddingService') as MockEmbedding, \
+        with patch('rag_service.services.embedding.embedding_service.VoyageEmbeddingService') as MockEmbedding, \
              patch.object(self.retrieval_service.vector_store, 'initialize',
                          new_callable=AsyncMock) as mock_init, \
              patch.object(self.retrieval_service.vector_store, 'search',
@@ -57,7 +61,7 @@ class TestRetrievalService(TestCase):
             
             # Setup mocks
             mock_embedding_service = MockEmbedding.return_value
-            mock_embedding_service.generate_embeddings = AsyncMock(
+            mock_embedding_service.embed_query = AsyncMock(
                 return_value=mock_embedding_result
             )
             mock_init.return_value = True
@@ -83,10 +87,7 @@ class TestRetrievalService(TestCase):
         query = "What are the safety requirements?"
         
         # Mock embedding and search results
-        mock_embedding_result = {
-            'success': True,
-            'embeddings': [[0.1] * 1536]
-        }
+        mock_embedding_result = (np.array([0.1] * 1024), Decimal('0.000002'), 120)
         
         mock_search_results = [
             SearchResult(
@@ -98,7 +99,7 @@ class TestRetrievalService(TestCase):
             for i in range(10)
         ]
         
-        with patch('rag_service.services.embedding.embedding_service.EmbeddingService') as MockEmbedding, \
+        with patch('rag_service.services.embedding.embedding_service.VoyageEmbeddingService') as MockEmbedding, \
              patch.object(self.retrieval_service.vector_store, 'initialize',
                          new_callable=AsyncMock) as mock_init, \
              patch.object(self.retrieval_service.vector_store, 'search',
@@ -109,7 +110,7 @@ class TestRetrievalService(TestCase):
             
             # Setup mocks
             mock_embedding_service = MockEmbedding.return_value
-            mock_embedding_service.generate_embeddings = AsyncMock(
+            mock_embedding_service.embed_query = AsyncMock(
                 return_value=mock_embedding_result
             )
             mock_init.return_value = True
@@ -143,6 +144,80 @@ class TestRetrievalService(TestCase):
             assert len(results) == 5
             assert mock_reranker.rerank.called
     
+    @pytest.mark.asyncio
+    async def test_repeated_query_uses_embedding_cache(self):
+        """Test repeated queries are embedded once"""
+        with patch('rag_service.services.embedding.embedding_service.VoyageEmbeddingService') as MockEmbedding, \
+             patch.object(self.retrieval_service.vector_store, 'initialize',
+                         new_callable=AsyncMock), \
+             patch.object(self.retrieval_service.vector_store, 'search',
+                         new_callable=AsyncMock) as mock_search, \
+             patch.object(self.retrieval_service.document_store, 'update_chunk_statistics',
+                         new_callable=AsyncMock):
+            
+            mock_embed = MockEmbedding.return_value.embed_query = AsyncMock(
+                return_value=(np.array([0.1] * 1024), Decimal('0.000002'), 120)
+            )
+            mock_search.return_value = []
+            
+            await self.retrieval_service.retrieve(
+                query="Base plate  BP3 size?",
+                knowledge_base_id=self.knowledge_base_id
+            )
+            await self.retrieval_service.retrieve(
+                query="base plate bp3 SIZE?",
+                knowledge_base_id=self.knowledge_base_id
+            )
+            
+            assert mock_embed.call_count == 1
+            assert mock_search.call_count == 2
+            assert mock_search.call_args.kwargs['query_vector'] == [0.1] * 1024
+    
+    @pytest.mark.asyncio
+    async def test_records_latencies_on_rag_query(self):
+        """Test measured embedding/retrieval latencies are stored on the RAGQuery"""
+        from asgiref.sync import sync_to_async
+        from core.models import Organization
+        from rag_service.models import KnowledgeBase, RAGQuery
+        
+        @sync_to_async
+        def create_query():
+            organization = Organization.objects.create(name='Test Org', slug=f'org-{uuid.uuid4().hex[:8]}')
+            knowledge_base = KnowledgeBase.objects.create(organization=organization, name='Test KB')
+            return RAGQuery.objects.create(
+                knowledge_base=knowledge_base,
+                query_text='footing F1 depth',
+                retrieval_strategy='similarity'
+            )
+        
+        rag_query = await create_query()
+        
+        async def slow_search(**kwargs):
+            await asyncio.sleep(0.05)
+            return []
+        
+        with patch('rag_service.services.embedding.embedding_service.VoyageEmbeddingService') as MockEmbedding, \
+             patch.object(self.retrieval_service.vector_store, 'initialize',
+                         new_callable=AsyncMock), \
+             patch.object(self.retrieval_service.vector_store, 'search', slow_search):
+            
+            MockEmbedding.return_value.embed_query = AsyncMock(
+                return_value=(np.array([0.1] * 1024), Decimal('0.000002'), 120)
+            )
+            
+            await self.retrieval_service.retrieve(
+                query='footing F1 depth',
+                knowledge_base_id=str(rag_query.knowledge_base_id),
+                rag_query=rag_query
+            )
+        
+        await sync_to_async(rag_query.refresh_from_db)()
+        assert rag_query.status == 'completed'
+        assert rag_query.embedding_latency_ms is not None
+        assert rag_query.retrieval_latency_ms >= 50
+        assert rag_query.latency_ms >= rag_query.retrieval_latency_ms
+        assert rag_query.embedding_cost == Decimal('0.000002')
+    
     @pytest.mark.asyncio
     async def test_get_chunk_context(self):
         """Test getting chunk with context"""
@@ -185,3 +260,41 @@ class TestRetrievalService(TestCase):
             assert len(result['context_before']) == 2
             assert len(result['context_after']) == 2
             assert len(result['full_context']) == 5
+
+
+class TestHybridSearchFanOut(TestCase):
+    """Test concurrent hybrid search legs"""
+    
+    @pytest.mark.asyncio
+    async def test_slow_leg_times_out(self):
+        """Test a slow keyword leg is dropped instead of blocking fusion"""
+        vector_store = Mock()
+        vector_store.search = AsyncMock(return_value=[
+            SearchResult(
+                chunk_id='chunk-1',
+                score=0.9,
+                metadata={'document_id': 'doc-1', 'chunk_index': 0},
+                content='Vector hit'
+            )
+        ])
+        
+        async def slow_keyword_search(**kwargs):
+            await asyncio.sleep(5)
+            return []
+        
+        document_store = Mock()
+        document_store.search_chunks_by_keywords = slow_keyword_search
+        
+        hybrid_search = HybridSearch(vector_timeout=1.0, keyword_timeout=0.05)
+        response = await hybrid_search.search_with_timings(
+            query='vector hit',
+            query_vector=[0.1],
+            knowledge_base_id='kb-1',
+            vector_store=vector_store,
+            document_store=document_store
+        )
+        
+        assert [r['chunk_id'] for r in response['results']] == ['chunk-1']
+        assert response['legs'] == {'vector': 'ok', 'keyword': 'timeout'}
+        assert response['timings']['total_ms'] < 1000
+        assert set(response['timings']) == {'vector_ms', 'keyword_ms', 'fusion_ms', 'total_ms'}
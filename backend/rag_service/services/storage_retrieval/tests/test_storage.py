@@ -78,11 +78,14 @@ class TestDocumentStore(TestCase):
         ]
         
         with patch('rag_service.models.Document') as MockDocument, \
-             patch('rag_service.models.Chunk') as MockChunk:
+             patch('rag_service.models.Chunk') as MockChunk, \
+             patch('rag_service.services.chunking.chunk_links.build_chunk_relations') as build_relations, \
+             patch('rag_service.services.chunking.chunk_links.save_chunk_relations') as save_relations:
             
             MockDocument.objects.get = AsyncMock(return_value=Mock())
             MockChunk.objects.filter = Mock(return_value=Mock(delete=Mock()))
-            MockChunk.objects.bulk_create = Mock(return_value=[Mock(), Mock()])
+            created = [Mock(), Mock()]
+            MockChunk.objects.bulk_create = Mock(return_value=created)
             
             result = await self.document_store.store_chunks(
                 document_id=self.document_id,
@@ -90,6 +93,8 @@ class TestDocumentStore(TestCase):
             )
             
             assert result is True
+            build_relations.assert_called_once_with(created)
+            save_relations.assert_called_once_with(build_relations.return_value)
 
 
 class TestStorageService(TestCase):
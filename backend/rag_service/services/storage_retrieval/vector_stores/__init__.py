@@ -6,9 +6,11 @@ Provides pluggable vector store backends for RAG retrieval.
 
 from .base import BaseVectorStore, SearchResult
 from .pinecone_store import PineconeStore
+from .pgvector_store import PgVectorStore
 
 __all__ = [
     'BaseVectorStore',
     'SearchResult',
     'PineconeStore',
+    'PgVectorStore',
 ]
@@ -0,0 +1,185 @@
+# storage_retrieval/vector_stores/batch_writer.py
+"""
+Concurrent Batch Writer
+
+Runs blocking vector-store SDK writes (upsert, delete, update) off the event
+loop with bounded parallelism:
+
+- Batches are sized by estimated request payload bytes as well as item
+  count, so wide embeddings or large metadata never exceed the request limit
+- Each batch runs on a worker thread; a semaphore caps how many are in flight
+- A failed batch is retried on its own with exponential backoff, without
+  resending batches that succeeded
+- Every batch reports its own result (size, bytes, attempts, error)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+# Per-request framing around each item ("," separators, JSON keys)
+ITEM_OVERHEAD_BYTES = 32
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch write"""
+    index: int
+    size: int
+    payload_bytes: int
+    success: bool
+    count: int = 0
+    attempts: int = 0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def estimate_payload_bytes(item: Any) -> int:
+    """
+    Approximate serialized size of one request item.
+
+    Float vectors are estimated from their length (JSON floats average ~20
+    characters) instead of being serialized, since they dominate the payload.
+    """
+    if isinstance(item, dict) and 'values' in item:
+        values = item.get('values') or []
+        rest = {k: v for k, v in item.items() if k != 'values'}
+        return len(values) * 20 + len(json.dumps(rest, default=str)) + ITEM_OVERHEAD_BYTES
+    return len(json.dumps(item, default=str)) + ITEM_OVERHEAD_BYTES
+
+
+def plan_batches(
+    items: Sequence[Any],
+    max_bytes: int,
+    max_items: int,
+    size_of: Callable[[Any], int] = estimate_payload_bytes
+) -> List[List[Any]]:
+    """
+    Split items into consecutive batches under both limits.
+
+    An item larger than max_bytes on its own still gets a batch (the server
+    decides whether to reject it) rather than being dropped.
+
+    Args:
+        items: Items in write order
+        max_bytes: Payload budget per batch
+        max_items: Item count limit per batch
+        size_of: Payload size estimate per item
+
+    Returns:
+        List of batches
+    """
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    current_bytes = 0
+
+    for item in items:
+        item_bytes = size_of(item)
+        if current and (current_bytes + item_bytes > max_bytes or len(current) >= max_items):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(item)
+        current_bytes += item_bytes
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class ConcurrentBatchWriter:
+    """
+    Runs a blocking write function over batches concurrently.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        size_of: Callable[[Any], int] = estimate_payload_bytes
+    ):
+        """
+        Args:
+            max_concurrency: Batches in flight at once
+            max_retries: Extra attempts per failed batch
+            retry_backoff: Seconds before the first retry (doubles per attempt)
+            size_of: Payload size estimate per item (for reporting)
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.size_of = size_of
+
+    async def run(
+        self,
+        batches: List[List[Any]],
+        write: Callable[[List[Any]], Any],
+        count: Optional[Callable[[Any, List[Any]], int]] = None
+    ) -> List[BatchResult]:
+        """
+        Write all batches.
+
+        Args:
+            batches: Batches from plan_batches()
+            write: Blocking call taking one batch (runs in a worker thread)
+            count: Items written, from (response, batch); default len(batch)
+
+        Returns:
+            BatchResult per batch, in batch order
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        write_async = sync_to_async(write, thread_sensitive=False)
+
+        async def write_batch(index: int, batch: List[Any]) -> BatchResult:
+            result = BatchResult(
+                index=index,
+                size=len(batch),
+                payload_bytes=sum(self.size_of(item) for item in batch),
+                success=False
+            )
+            started = time.monotonic()
+            for attempt in range(self.max_retries + 1):
+                result.attempts = attempt + 1
+                try:
+                    async with semaphore:
+                        response = await write_async(batch)
+                    result.count = count(response, batch) if count else len(batch)
+                    result.success = True
+                    result.error = None
+                    break
+                except Exception as e:
+                    result.error = str(e)
+                    if attempt < self.max_retries:
+                        logger.warning(
+                            f"Batch {index} ({len(batch)} items) failed on attempt {attempt + 1}, retrying: {e}"
+                        )
+                        await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+            else:
+                logger.error(f"Batch {index} ({len(batch)} items) failed after {result.attempts} attempts: {result.error}")
+            result.duration_ms = (time.monotonic() - started) * 1000
+            return result
+
+        return list(await asyncio.gather(*(write_batch(i, batch) for i, batch in enumerate(batches))))
+
+
+def summarize(results: List[BatchResult]) -> Dict[str, Any]:
+    """Aggregate batch results into the vector-store result dict shape"""
+    failed = [r for r in results if not r.success]
+    return {
+        'success': not failed,
+        'count': sum(r.count for r in results if r.success),
+        'failed_count': sum(r.size for r in failed),
+        'batches': [r.to_dict() for r in results],
+        'error': '; '.join(f"batch {r.index}: {r.error}" for r in failed) or None,
+    }
@@ -0,0 +1,525 @@
+# storage_retrieval/vector_stores/pgvector_store.py
+"""
+PostgreSQL pgvector Vector Store Implementation
+
+Stores embeddings directly on Chunk rows and searches them with the partial
+HNSW indexes declared on the Chunk model, so filtering by knowledge base and
+metadata happens in the same SQL query as the nearest-neighbour scan.
+"""
+
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Cast
+from pgvector.django import CosineDistance, L2Distance, MaxInnerProduct, VectorField
+
+from ..filters import apply_chunk_filter
+from .base import BaseVectorStore, SearchResult
+
+logger = logging.getLogger(__name__)
+
+
+class PgVectorStore(BaseVectorStore):
+    """
+    pgvector-backed vector store using the rag_chunk table.
+
+    Features:
+    - No separate vector service: vectors live next to chunk content
+    - Namespaces map to knowledge base IDs (joined through Document)
+    - Metadata filters evaluated in SQL alongside the ANN scan
+    - Partial HNSW index per (dimension, metric)
+
+    Vectors are addressed by Chunk.embedding_vector_id. When a vector ID has
+    not been assigned yet, upserts fall back to locating the chunk by the
+    document_id/chunk_index carried in the vector metadata.
+    """
+
+    def __init__(
+        self,
+        organization=None,
+        dimension: int = 1024,
+        metric: str = "cosine",
+        ef_search: Optional[int] = None,
+        batch_size: int = 500
+    ):
+        """
+        Initialize pgvector store.
+
+        Args:
+            organization: Organization instance (kept for interface parity with PineconeStore)
+            dimension: Default embedding dimension (used for stats only)
+            metric: Distance metric (cosine, euclidean, dot)
+            ef_search: HNSW ef_search override (defaults to RAG_SETTINGS['PGVECTOR'])
+            batch_size: Batch size for bulk updates
+        """
+        from rag_service.models import PGVECTOR_METRIC_OPCLASSES
+
+        if metric not in PGVECTOR_METRIC_OPCLASSES:
+            raise ValueError(
+                f"Unsupported metric '{metric}'. "
+                f"Expected one of: {', '.join(PGVECTOR_METRIC_OPCLASSES)}"
+            )
+
+        pgvector_settings = getattr(settings, 'RAG_SETTINGS', {}).get('PGVECTOR', {})
+
+        self.organization = organization
+        self.dimension = dimension
+        self.metric = metric
+        self.ef_search = ef_search or pgvector_settings.get('EF_SEARCH', 100)
+        self.iterative_scan = pgvector_settings.get('ITERATIVE_SCAN')
+        self.batch_size = batch_size
+
+        self.index = None
+        self.extension_version = None
+
+    async def initialize(self, create_if_not_exists: bool = True) -> bool:
+        """
+        Verify the pgvector extension is available.
+
+        The extension and indexes are created by the rag_service migrations,
+        so create_if_not_exists only controls whether a missing extension is
+        created on the fly.
+
+        Args:
+            create_if_not_exists: Create the vector extension if it is missing
+
+        Returns:
+            Success status
+        """
+        from rag_service.models import Chunk
+
+        @sync_to_async
+        def get_extension_version():
+            with connection.cursor() as cursor:
+                if create_if_not_exists:
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+        try:
+            version = await get_extension_version()
+            if not version:
+                logger.error("pgvector extension is not installed in the database")
+                return False
+
+            self.extension_version = tuple(int(part) for part in version.split('.')[:2])
+            if self.iterative_scan and self.extension_version < (0, 8):
+                logger.info(f"pgvector {version} does not support iterative index scans; disabling")
+                self.iterative_scan = None
+
+            self.index = Chunk._meta.db_table
+            logger.info(
+                f"Connected to pgvector {version} store "
+                f"(table: {self.index}, metric: {self.metric})"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to initialize pgvector store: {e}", exc_info=True)
+            return False
+
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Write embeddings onto their Chunk rows.
+
+        Args:
+            vectors: List of vector dictionaries with:
+                - id: str - Vector ID (stored in Chunk.embedding_vector_id)
+                - values: List[float] - Embedding vector
+                - metadata: Dict - Must contain document_id and chunk_index
+                  when the chunk has no embedding_vector_id yet
+            namespace: Knowledge base ID (used to scope the chunk lookup)
+
+        Returns:
+            Result dictionary with success status and count
+        """
+        from rag_service.models import Chunk
+
+        @sync_to_async
+        def write_vectors():
+            by_vector_id = {vec['id']: vec for vec in vectors}
+
+            base_queryset = Chunk.objects.all()
+            if namespace:
+                base_queryset = base_queryset.filter(document__knowledge_base_id=namespace)
+
+            # Chunks that already carry a vector ID
+            chunks = {
+                chunk.embedding_vector_id: chunk
+                for chunk in base_queryset.filter(
+                    embedding_vector_id__in=list(by_vector_id)
+                ).only('id', 'embedding_vector_id')
+            }
+
+            # Remaining vectors are located by (document_id, chunk_index)
+            missing = defaultdict(dict)
+            for vector_id, vec in by_vector_id.items():
+                if vector_id in chunks:
+                    continue
+                metadata = vec.get('metadata') or {}
+                document_id = metadata.get('document_id')
+                chunk_index = metadata.get('chunk_index')
+                if document_id is None or chunk_index is None:
+                    continue
+                missing[str(document_id)][int(chunk_index)] = vector_id
+
+            for document_id, index_map in missing.items():
+                for chunk in base_queryset.filter(
+                    document_id=document_id,
+                    chunk_index__in=list(index_map)
+                ).only('id', 'chunk_index', 'embedding_vector_id'):
+                    chunks[index_map[chunk.chunk_index]] = chunk
+
+            to_update = []
+            for vector_id, chunk in chunks.items():
+                chunk.set_embedding(by_vector_id[vector_id]['values'])
+                chunk.embedding_vector_id = vector_id
+                to_update.append(chunk)
+
+            with transaction.atomic():
+                Chunk.objects.bulk_update(
+                    to_update,
+                    ['embedding', 'embedding_dimensions', 'embedding_vector_id'],
+                    batch_size=self.batch_size
+                )
+
+            return len(to_update), len(by_vector_id) - len(to_update)
+
+        try:
+            count, unmatched = await write_vectors()
+
+            if unmatched:
+                logger.warning(f"{unmatched} vectors did not match any chunk and were skipped")
+
+            logger.info(
+                f"Upserted {count} vectors to pgvector "
+                f"(namespace: {namespace or 'default'})"
+            )
+
+            return {
+                'success': True,
+                'count': count,
+                'skipped': unmatched,
+                'index_name': self.index,
+                'namespace': namespace
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to upsert vectors: {e}", exc_info=True)
+            return {
+                'success': False,
+                'error': str(e),
+                'count': 0
+            }
+
+    async def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
+        include_values: bool = False
+    ) -> List[SearchResult]:
+        """
+        Filtered top-k nearest-neighbour search in SQL.
+
+        Args:
+            query_vector: Query embedding vector
+            top_k: Number of results to return
+            filter: Metadata filter (e.g., {"document_id": "doc123"})
+            namespace: Knowledge base ID
+            include_metadata: Include metadata in results
+            include_values: Include vector values in results
+
+        Returns:
+            List of SearchResult objects
+        """
+        from rag_service.models import Chunk
+
+        if not self.index:
+            logger.error("pgvector store not initialized")
+            return []
+
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.tolist()
+        dimensions = len(query_vector)
+
+        def run_search():
+            # Cast must match the index expression for the planner to use it
+            embedding = Cast('embedding', output_field=VectorField(dimensions=dimensions))
+
+            queryset = Chunk.objects.filter(
+                embedding_dimensions=dimensions,
+                document__is_active=True
+            )
+            if namespace:
+                queryset = queryset.filter(document__knowledge_base_id=namespace)
+            queryset = apply_chunk_filter(queryset, filter)
+
+            fields = ['id', 'document_id', 'chunk_index', 'chunk_type', 'page_number',
+                      'content', 'embedding_vector_id']
+            if include_metadata:
+                fields.append('metadata')
+            if include_values:
+                fields.append('embedding')
+
+            queryset = queryset.annotate(
+                distance=self._distance_function()(embedding, query_vector)
+            ).order_by('distance').values(*fields, 'distance')[:top_k]
+
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL hnsw.ef_search = %s", [max(int(self.ef_search), top_k)])
+                    if self.iterative_scan:
+                        cursor.execute("SET LOCAL hnsw.iterative_scan = %s", [self.iterative_scan])
+                return list(queryset)
+
+        try:
+            # Off the thread-sensitive executor, on a connection of its own,
+            # so hybrid search's keyword leg can run at the same time
+            rows = await database_sync_to_async(run_search, thread_sensitive=False)()
+
+            results = []
+            for row in rows:
+                metadata = dict(row.get('metadata') or {}) if include_metadata else {}
+                metadata.update({
+                    'document_id': str(row['document_id']),
+                    'chunk_index': row['chunk_index'],
+                    'chunk_type': row['chunk_type'],
+                    'page_number': row['page_number'],
+                    'vector_id': row['embedding_vector_id'],
+                })
+
+                vector = None
+                if include_values and row.get('embedding') is not None:
+                    vector = [float(v) for v in row['embedding']]
+
+                results.append(SearchResult(
+                    chunk_id=str(row['id']),
+                    score=self._distance_to_score(row['distance']),
+                    metadata=metadata,
+                    content=row['content'],
+                    vector=vector
+                ))
+
+            logger.debug(
+                f"Found {len(results)} results for query "
+                f"(namespace: {namespace or 'default'})"
+            )
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to search vectors: {e}", exc_info=True)
+            return []
+
+    async def delete_vectors(
+        self,
+        ids: List[str],
+        namespace: Optional[str] = None
+    ) -> bool:
+        """
+        Clear embeddings for the given vector IDs.
+
+        Chunk rows are owned by DocumentStore, so only the vector is removed.
+
+        Args:
+            ids: List of vector IDs to delete
+            namespace: Optional knowledge base ID
+
+        Returns:
+            Success status
+        """
+        from rag_service.models import Chunk
+
+        @sync_to_async
+        def clear_vectors():
+            queryset = Chunk.objects.filter(embedding_vector_id__in=ids)
+            if namespace:
+                queryset = queryset.filter(document__knowledge_base_id=namespace)
+            return queryset.update(embedding=None, embedding_dimensions=None)
+
+        try:
+            count = await clear_vectors()
+            logger.info(
+                f"Deleted {count} vectors from pgvector "
+                f"(namespace: {namespace or 'default'})"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to delete vectors: {e}", exc_info=True)
+            return False
+
+    async def delete_namespace(self, namespace: str) -> bool:
+        """
+        Clear all embeddings for a knowledge base.
+
+        Args:
+            namespace: Knowledge base ID
+
+        Returns:
+            Success status
+        """
+        return await self.delete_by_filter(filter={}, namespace=namespace)
+
+    async def delete_by_filter(
+        self,
+        filter: Dict[str, Any],
+        namespace: Optional[str] = None
+    ) -> bool:
+        """
+        Clear embeddings for chunks matching a filter.
+
+        Args:
+            filter: Metadata filter
+            namespace: Optional knowledge base ID
+
+        Returns:
+            Success status
+        """
+        from rag_service.models import Chunk
+
+        if not filter and not namespace:
+            logger.error("Refusing to delete every vector without a filter or namespace")
+            return False
+
+        @sync_to_async
+        def clear_vectors():
+            queryset = Chunk.objects.filter(embedding__isnull=False)
+            if namespace:
+                queryset = queryset.filter(document__knowledge_base_id=namespace)
+            queryset = apply_chunk_filter(queryset, filter)
+            return queryset.update(embedding=None, embedding_dimensions=None)
+
+        try:
+            count = await clear_vectors()
+            logger.info(
+                f"Deleted {count} vectors matching filter: {filter} "
+                f"(namespace: {namespace or 'default'})"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to delete by filter: {e}", exc_info=True)
+            return False
+
+    async def get_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get vector statistics.
+
+        Args:
+            namespace: Optional knowledge base ID
+
+        Returns:
+            Statistics dictionary
+        """
+        from django.db.models import Count
+        from rag_service.models import Chunk
+
+        @sync_to_async
+        def collect_stats():
+            queryset = Chunk.objects.filter(embedding__isnull=False)
+            if namespace:
+                queryset = queryset.filter(document__knowledge_base_id=namespace)
+
+            by_dimension = {
+                row['embedding_dimensions']: row['count']
+                for row in queryset.values('embedding_dimensions').annotate(count=Count('id'))
+            }
+            return by_dimension
+
+        try:
+            by_dimension = await collect_stats()
+            return {
+                'total_vectors': sum(by_dimension.values()),
+                'dimensions': self.dimension,
+                'vectors_by_dimension': by_dimension,
+                'namespaces': {namespace: {'vector_count': sum(by_dimension.values())}} if namespace else {}
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get stats: {e}", exc_info=True)
+            return {
+                'total_vectors': 0,
+                'dimensions': self.dimension,
+                'namespaces': {}
+            }
+
+    async def update_metadata(
+        self,
+        id: str,
+        metadata: Dict[str, Any],
+        namespace: Optional[str] = None
+    ) -> bool:
+        """
+        Merge metadata into the chunk that owns a vector.
+
+        Args:
+            id: Vector ID
+            metadata: Metadata to merge
+            namespace: Optional knowledge base ID
+
+        Returns:
+            Success status
+        """
+        from rag_service.models import Chunk
+
+        @sync_to_async
+        def merge_metadata():
+            queryset = Chunk.objects.filter(embedding_vector_id=id)
+            if namespace:
+                queryset = queryset.filter(document__knowledge_base_id=namespace)
+
+            with transaction.atomic():
+                chunk = queryset.select_for_update().only('id', 'metadata').first()
+                if not chunk:
+                    return False
+                chunk.metadata = {**(chunk.metadata or {}), **metadata}
+                chunk.save(update_fields=['metadata'])
+                return True
+
+        try:
+            updated = await merge_metadata()
+            if updated:
+                logger.debug(f"Updated metadata for vector: {id}")
+            return updated
+
+        except Exception as e:
+            logger.error(f"Failed to update metadata: {e}", exc_info=True)
+            return False
+
+    def _distance_function(self):
+        """Get the pgvector distance expression for the configured metric"""
+        return {
+            'cosine': CosineDistance,
+            'euclidean': L2Distance,
+            'dot': MaxInnerProduct,
+        }[self.metric]
+
+    def _distance_to_score(self, distance: float) -> float:
+        """
+        Convert a pgvector distance into a similarity score (higher is better).
+
+        - cosine: <=> returns 1 - cosine similarity
+        - dot: <#> returns the negative inner product
+        - euclidean: mapped into (0, 1]
+        """
+        distance = float(distance)
+        if self.metric == 'cosine':
+            return 1.0 - distance
+        if self.metric == 'dot':
+            return -distance
+        return 1.0 / (1.0 + distance)
@@ -4,6 +4,10 @@ Pinecone Vector Store Implementation
 
 Integrates with ModelHub for API key management and cost tracking.
 Follows Pinecone best practices for serverless deployments.
+
+The Pinecone SDK is synchronous: every call runs in a worker thread so the
+event loop is never blocked, and bulk writes (upsert, delete, metadata
+updates) go out as concurrent, byte-sized batches via ConcurrentBatchWriter.
 """
 
 import json
@@ -13,8 +17,10 @@ from typing import List, Dict, Any, Optional
 import numpy as np
 
 from asgiref.sync import sync_to_async
+from django.conf import settings
 
 from .base import BaseVectorStore, SearchResult
+from .batch_writer import ConcurrentBatchWriter, plan_batches, summarize
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +79,16 @@ class PineconeStore(BaseVectorStore):
         self.pc = None
         self.index = None
         self.api_key = None
+        
+        config = getattr(settings, 'RAG_SETTINGS', {}).get('PINECONE', {})
+        self.max_batch_bytes = config.get('MAX_BATCH_BYTES', 2 * 1024 * 1024 - 64 * 1024)
+        self.max_batch_vectors = config.get('MAX_BATCH_VECTORS', 1000)
+        self.delete_batch_size = config.get('DELETE_BATCH_SIZE', 1000)
+        self.writer = ConcurrentBatchWriter(
+            max_concurrency=config.get('WRITE_CONCURRENCY', 8),
+            max_retries=config.get('WRITE_MAX_RETRIES', 3),
+            retry_backoff=config.get('WRITE_RETRY_BACKOFF', 0.5)
+        )
     
     async def initialize(self, create_if_not_exists: bool = True) -> bool:
         """
@@ -158,6 +174,9 @@ class PineconeStore(BaseVectorStore):
         """
         Upsert vectors to Pinecone.
         
+        Vectors are split into batches under the request size limit and sent
+        concurrently; a failed batch is retried on its own.
+        
         Args:
             vectors: List of vector dictionaries with:
                 - id: str - Unique identifier
@@ -166,7 +185,8 @@ class PineconeStore(BaseVectorStore):
             namespace: Optional namespace (use knowledge_base_id)
             
         Returns:
-            Result dictionary with success status and count
+            Result dictionary with success status, count, failed_count and
+            per-batch results ('batches')
         """
         if not self.index:
             return {
@@ -193,29 +213,21 @@ class PineconeStore(BaseVectorStore):
                     'metadata': clean_metadata
                 })
             
-            # Batch upsert (Pinecone recommends batches of 100-200)
-            batch_size = 100
-            total_upserted = 0
-            
-            for i in range(0, len(vectors_to_upsert), batch_size):
-                batch = vectors_to_upsert[i:i + batch_size]
-                
-                # Upsert batch
-                response = self.index.upsert(
-                    vectors=batch,
-                    namespace=namespace or ""
-                )
-                
-                total_upserted += response.get('upserted_count', len(batch))
+            batches = plan_batches(vectors_to_upsert, self.max_batch_bytes, self.max_batch_vectors)
+            results = await self.writer.run(
+                batches,
+                lambda batch: self.index.upsert(vectors=batch, namespace=namespace or ""),
+                count=lambda response, batch: _response_get(response, 'upserted_count', len(batch))
+            )
+            result = summarize(results)
             
             logger.info(
-                f"Upserted {total_upserted} vectors to Pinecone "
-                f"(namespace: {namespace or 'default'})"
+                f"Upserted {result['count']} vectors to Pinecone in {len(batches)} batches "
+                f"({result['failed_count']} failed, namespace: {namespace or 'default'})"
             )
             
             return {
-                'success': True,
-                'count': total_upserted,
+                **result,
                 'index_name': self.index_name,
                 'namespace': namespace
             }
@@ -261,8 +273,9 @@ class PineconeStore(BaseVectorStore):
             if isinstance(query_vec, np.ndarray):
                 query_vec = query_vec.tolist()
             
-            # Perform search
-            response = self.index.query(
+            # Perform search off the event loop so concurrent legs (keyword
+            # search, other queries) are not blocked on the HTTP round trip
+            response = await sync_to_async(self.index.query, thread_sensitive=False)(
                 vector=query_vec,
                 top_k=top_k,
                 filter=filter,
@@ -308,27 +321,48 @@ class PineconeStore(BaseVectorStore):
             namespace: Optional namespace
             
         Returns:
-            Success status
+            Success status (see delete_vectors_batched for per-batch results)
+        """
+        result = await self.delete_vectors_batched(ids, namespace)
+        return result['success']
+    
+    async def delete_vectors_batched(
+        self,
+        ids: List[str],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Delete vectors by ID in concurrent batches.
+        
+        Args:
+            ids: List of vector IDs to delete
+            namespace: Optional namespace
+            
+        Returns:
+            Result dictionary with success status, count, failed_count and
+            per-batch results ('batches')
         """
         if not self.index:
             logger.error("Pinecone not initialized")
-            return False
+            return {'success': False, 'error': 'Pinecone not initialized', 'count': 0}
         
         try:
-            self.index.delete(
-                ids=ids,
-                namespace=namespace or ""
+            batches = plan_batches(list(ids), self.max_batch_bytes, self.delete_batch_size)
+            results = await self.writer.run(
+                batches,
+                lambda batch: self.index.delete(ids=batch, namespace=namespace or "")
             )
+            result = summarize(results)
             
             logger.info(
-                f"Deleted {len(ids)} vectors from Pinecone "
-                f"(namespace: {namespace or 'default'})"
+                f"Deleted {result['count']} vectors from Pinecone in {len(batches)} batches "
+                f"({result['failed_count']} failed, namespace: {namespace or 'default'})"
             )
-            return True
+            return result
             
         except Exception as e:
             logger.error(f"Failed to delete vectors: {e}", exc_info=True)
-            return False
+            return {'success': False, 'error': str(e), 'count': 0}
     
     async def delete_namespace(self, namespace: str) -> bool:
         """
@@ -345,7 +379,7 @@ class PineconeStore(BaseVectorStore):
             return False
         
         try:
-            self.index.delete(
+            await sync_to_async(self.index.delete, thread_sensitive=False)(
                 delete_all=True,
                 namespace=namespace
             )
@@ -377,7 +411,7 @@ class PineconeStore(BaseVectorStore):
             return False
         
         try:
-            self.index.delete(
+            await sync_to_async(self.index.delete, thread_sensitive=False)(
                 filter=filter,
                 namespace=namespace or ""
             )
@@ -410,7 +444,7 @@ class PineconeStore(BaseVectorStore):
             }
         
         try:
-            stats = self.index.describe_index_stats()
+            stats = await sync_to_async(self.index.describe_index_stats, thread_sensitive=False)()
             
             result = {
                 'total_vectors': stats.get('total_vector_count', 0),
@@ -457,25 +491,52 @@ class PineconeStore(BaseVectorStore):
         Returns:
             Success status
         """
+        result = await self.update_metadata_many({id: metadata}, namespace)
+        return result['success']
+    
+    async def update_metadata_many(
+        self,
+        updates: Dict[str, Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Update metadata for many vectors concurrently.
+        
+        Pinecone updates one vector per request, so each update is its own
+        batch; concurrency and per-update retries follow the write settings.
+        
+        Args:
+            updates: Vector ID -> new metadata
+            namespace: Optional namespace
+            
+        Returns:
+            Result dictionary with success status, count, failed_count and
+            per-update results ('batches')
+        """
         if not self.index:
             logger.error("Pinecone not initialized")
-            return False
+            return {'success': False, 'error': 'Pinecone not initialized', 'count': 0}
         
         try:
-            clean_metadata = self._clean_metadata(metadata)
-            
-            self.index.update(
-                id=id,
-                set_metadata=clean_metadata,
-                namespace=namespace or ""
-            )
+            batches = [
+                [{'id': vector_id, 'metadata': self._clean_metadata(metadata)}]
+                for vector_id, metadata in updates.items()
+            ]
+            
+            def update(batch):
+                self.index.update(
+                    id=batch[0]['id'],
+                    set_metadata=batch[0]['metadata'],
+                    namespace=namespace or ""
+                )
             
-            logger.debug(f"Updated metadata for vector: {id}")
-            return True
+            result = summarize(await self.writer.run(batches, update))
+            logger.debug(f"Updated metadata for {result['count']} vectors ({result['failed_count']} failed)")
+            return result
             
         except Exception as e:
             logger.error(f"Failed to update metadata: {e}", exc_info=True)
-            return False
+            return {'success': False, 'error': str(e), 'count': 0}
     
     async def _get_pinecone_api_key(self) -> Optional[str]:
         """
@@ -570,3 +631,10 @@ class PineconeStore(BaseVectorStore):
                 clean[key] = str(value)[:2000]
         
         return clean
+
+
+def _response_get(response: Any, key: str, default: Any) -> Any:
+    """Read a field from an SDK response object or dict"""
+    if isinstance(response, dict):
+        return response.get(key, default)
+    return getattr(response, key, default)
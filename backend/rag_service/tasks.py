@@ -0,0 +1,258 @@
+"""
+Celery tasks for the staged ingestion pipeline.
+
+Each stage is a task on its own queue (see CELERY_TASK_ROUTES):
+
+    extract_document -> chunk_document -> embed_chunks (per batch) -> store_vectors (per batch)
+
+Tasks take IDs only and are idempotent; the stage bodies live in
+rag_service.services.ingest_stages. Usage:
+
+    from rag_service.tasks import enqueue_document_ingest
+    enqueue_document_ingest('/path/to/drawing.pdf', knowledge_base_id)
+"""
+
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from celery import shared_task
+from django.db import close_old_connections
+
+from rag_service.services import ingest_stages
+from rag_service.services.ingest_stages import NEXT_STAGE, StageTracker, get_pipeline_settings
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_document_ingest(
+    file_path: str,
+    knowledge_base_id: str,
+    title: Optional[str] = None,
+    document_id: Optional[str] = None,
+    created_by_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, str]:
+    """
+    Start the staged ingest of a file.
+
+    Returns:
+        Dict with ingest_id, document_id and the extract task_id
+    """
+    ingest_id = ingest_stages.new_ingest_id()
+    document_id = document_id or str(uuid.uuid4())
+
+    StageTracker().enqueued('extract')
+    result = extract_document.apply_async(kwargs={
+        'ingest_id': ingest_id,
+        'file_path': str(file_path),
+        'knowledge_base_id': str(knowledge_base_id),
+        'document_id': document_id,
+        'title': title,
+        'created_by_id': str(created_by_id) if created_by_id else None,
+        'metadata': metadata or {},
+        'enqueued_at': ingest_stages.now_ms(),
+    })
+    return {'ingest_id': ingest_id, 'document_id': document_id, 'task_id': result.id}
+
+
+def _run_stage(task, stage: str, body: Callable[[], ingest_stages.StageResult], kwargs: Dict[str, Any]):
+    """
+    Run a stage body with backpressure, retries and stage accounting.
+
+    Returns the StageResult, or None when the batch failed for good (the
+    document is then marked failed).
+    """
+    config = get_pipeline_settings()
+    tracker = StageTracker()
+    deferrals = kwargs.get('deferrals', 0)
+    failures = kwargs.get('failures', 0)
+
+    # Wait while the stage we feed is full. Eager tasks run inline, where
+    # nothing could drain the stage, so they never wait.
+    next_stage = NEXT_STAGE.get(stage)
+    if (
+        next_stage
+        and not task.request.is_eager
+        and deferrals < config['MAX_DEFERRALS']
+        and not tracker.has_capacity(next_stage)
+    ):
+        tracker.deferred(stage)
+        raise task.retry(
+            kwargs={**kwargs, 'deferrals': deferrals + 1},
+            countdown=config['DEFER_COUNTDOWN'],
+            max_retries=None
+        )
+
+    started = ingest_stages.now_ms()
+    enqueued_at = kwargs.get('enqueued_at')
+    wait_ms = started - enqueued_at if enqueued_at else None
+    close_old_connections()
+    try:
+        result = body()
+    except Exception as e:
+        duration = ingest_stages.now_ms() - started
+        if failures < config['MAX_RETRIES']:
+            logger.warning(f"Ingest {stage} stage failed for {kwargs.get('document_id')}, retrying: {e}")
+            raise task.retry(
+                exc=e,
+                kwargs={**kwargs, 'failures': failures + 1},
+                countdown=config['RETRY_BACKOFF'] * (2 ** failures),
+                max_retries=None
+            )
+        logger.error(f"Ingest {stage} stage failed for {kwargs.get('document_id')}: {e}", exc_info=True)
+        tracker.finished(stage, duration, wait_ms, ok=False, task_id=task.request.id)
+        ingest_stages.mark_document_failed(kwargs['document_id'], f"{stage} stage failed: {e}")
+        return None
+    finally:
+        close_old_connections()
+
+    tracker.finished(stage, ingest_stages.now_ms() - started, wait_ms, task_id=task.request.id)
+    return result
+
+
+def _hand_off(
+    task,
+    stage: str,
+    next_task,
+    batches: List[List[Any]],
+    base_kwargs: Dict[str, Any],
+    kwargs: Dict[str, Any]
+) -> None:
+    """
+    Enqueue one next-stage task per (batch_key, chunk_ids) batch, as far as
+    the next stage has room.
+
+    The batches that do not fit are handed off by a deferred retry of the
+    calling task (kwargs plus 'pending'), like the deferral in _run_stage.
+    Eager tasks and tasks past MAX_DEFERRALS hand off everything.
+    """
+    config = get_pipeline_settings()
+    tracker = StageTracker()
+    next_stage = NEXT_STAGE[stage]
+    deferrals = kwargs.get('deferrals', 0)
+
+    free = tracker.free_slots(next_stage)
+    if free is None or task.request.is_eager or deferrals >= config['MAX_DEFERRALS']:
+        free = len(batches)
+    ready, rest = batches[:free], batches[free:]
+
+    for batch_key, chunk_ids in ready:
+        tracker.enqueued(next_stage)
+        next_task.apply_async(kwargs={
+            **base_kwargs,
+            'chunk_ids': chunk_ids,
+            'batch_key': batch_key,
+            'enqueued_at': ingest_stages.now_ms(),
+        })
+
+    if rest:
+        tracker.deferred(stage)
+        raise task.retry(
+            kwargs={**kwargs, 'pending': rest, 'deferrals': deferrals + 1},
+            countdown=config['DEFER_COUNTDOWN'],
+            max_retries=None
+        )
+
+
+@shared_task(bind=True, name='rag_service.ingest.extract', acks_late=True)
+def extract_document(self, ingest_id, file_path, knowledge_base_id, document_id, title=None,
+                     created_by_id=None, metadata=None, enqueued_at=None, deferrals=0, failures=0):
+    """Stage 1: extract a file into Document/DocumentPage rows"""
+    kwargs = dict(
+        ingest_id=ingest_id, file_path=file_path, knowledge_base_id=knowledge_base_id,
+        document_id=document_id, title=title, created_by_id=created_by_id, metadata=metadata,
+        enqueued_at=enqueued_at, deferrals=deferrals, failures=failures
+    )
+    result = _run_stage(self, 'extract', lambda: ingest_stages.extract_stage(
+        file_path, knowledge_base_id, document_id, title, created_by_id, metadata
+    ), kwargs)
+    if result is None:
+        return {'document_id': document_id, 'status': 'failed'}
+
+    StageTracker().enqueued('chunk')
+    chunk_document.apply_async(kwargs={
+        'ingest_id': ingest_id,
+        'document_id': document_id,
+        'incremental': result.detail.get('incremental'),
+        'enqueued_at': ingest_stages.now_ms(),
+    })
+    return {'document_id': document_id, 'status': 'extracted', **result.detail}
+
+
+@shared_task(bind=True, name='rag_service.ingest.chunk', acks_late=True)
+def chunk_document(self, ingest_id, document_id, incremental=None, enqueued_at=None, deferrals=0, failures=0,
+                   pending=None):
+    """
+    Stage 2: chunk a stored document and fan out embed batches.
+
+    incremental is the page diff of a re-ingest (only changed pages are
+    re-chunked). pending holds the [batch_key, chunk_ids] batches a deferred
+    retry still has to hand off; the document is not chunked again.
+    """
+    kwargs = dict(
+        ingest_id=ingest_id, document_id=document_id, incremental=incremental,
+        enqueued_at=enqueued_at, deferrals=deferrals, failures=failures
+    )
+    base_kwargs = {'ingest_id': ingest_id, 'document_id': document_id}
+    if pending:
+        _hand_off(self, 'chunk', embed_chunks, pending, base_kwargs, kwargs)
+        return {'document_id': document_id, 'status': 'chunked', 'batches': len(pending)}
+
+    result = _run_stage(self, 'chunk', lambda: ingest_stages.chunk_stage(document_id, incremental=incremental), kwargs)
+    if result is None:
+        return {'document_id': document_id, 'status': 'failed'}
+
+    if result.complete:
+        # Nothing to embed
+        ingest_stages.mark_document_completed(document_id)
+        return {'document_id': document_id, 'status': 'completed', **result.detail}
+
+    generation = StageTracker().set_batches(ingest_id, len(result.batches))
+    batches = [[f'{generation}:{index}', batch] for index, batch in enumerate(result.batches)]
+    _hand_off(self, 'chunk', embed_chunks, batches, base_kwargs, kwargs)
+    return {'document_id': document_id, 'status': 'chunked', 'batches': len(result.batches), **result.detail}
+
+
+@shared_task(bind=True, name='rag_service.ingest.embed', acks_late=True)
+def embed_chunks(self, ingest_id, document_id, chunk_ids, batch_key, enqueued_at=None, deferrals=0, failures=0):
+    """Stage 3: embed a batch of chunks"""
+    kwargs = dict(
+        ingest_id=ingest_id, document_id=document_id, chunk_ids=chunk_ids, batch_key=batch_key,
+        enqueued_at=enqueued_at, deferrals=deferrals, failures=failures
+    )
+    result = _run_stage(self, 'embed', lambda: ingest_stages.embed_stage(document_id, chunk_ids), kwargs)
+    if result is None:
+        return {'document_id': document_id, 'status': 'failed'}
+
+    # A batch emptied by a re-chunk still reaches store so the ingest can complete
+    StageTracker().enqueued('store')
+    store_vectors.apply_async(kwargs={
+        'ingest_id': ingest_id,
+        'document_id': document_id,
+        'chunk_ids': result.batches[0] if result.batches else [],
+        'batch_key': batch_key,
+        'enqueued_at': ingest_stages.now_ms(),
+    })
+    return {'document_id': document_id, 'status': 'embedded', **result.detail}
+
+
+@shared_task(bind=True, name='rag_service.ingest.store', acks_late=True)
+def store_vectors(self, ingest_id, document_id, chunk_ids, batch_key, enqueued_at=None, deferrals=0, failures=0):
+    """Stage 4: upsert a batch of embedded chunks into the vector store"""
+    kwargs = dict(
+        ingest_id=ingest_id, document_id=document_id, chunk_ids=chunk_ids, batch_key=batch_key,
+        enqueued_at=enqueued_at, deferrals=deferrals, failures=failures
+    )
+    result = _run_stage(
+        self, 'store',
+        lambda: ingest_stages.store_stage(ingest_id, document_id, chunk_ids, batch_key),
+        kwargs
+    )
+    if result is None:
+        return {'document_id': document_id, 'status': 'failed'}
+    return {
+        'document_id': document_id,
+        'status': 'completed' if result.complete else 'stored',
+        **result.detail
+    }
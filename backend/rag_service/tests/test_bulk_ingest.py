@@ -0,0 +1,233 @@
+"""
+Tests for resumable bulk ingest
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from functools import partial
+from io import StringIO
+from unittest.mock import AsyncMock, patch
+
+import fitz  # PyMuPDF
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from core.models import Organization
+from rag_service.models import KnowledgeBase
+from rag_service.services.bulk_ingest import BulkIngestRunner, IngestCheckpoint, discover_files
+from rag_service.services.document_pipeline import DocumentPipeline
+from rag_service.services.extraction.layout_analyzer import LayoutAnalyzer
+from rag_service.services.extraction.text import TextExtractor
+from rag_service.services.extraction.page_image_cache import file_content_hash
+
+
+class FakePipeline:
+    """Records processed files; fails for names in fail_names"""
+
+    calls = []
+    fail_names = set()
+    query_threads = []
+    _lock = threading.Lock()
+
+    async def process_document(self, file_path, knowledge_base_id, title=None, document_id=None,
+                               created_by_id=None, metadata=None):
+        # Where the pipeline's ORM calls (thread-sensitive sync_to_async) run
+        query_thread = await sync_to_async(threading.current_thread)()
+        with self._lock:
+            self.calls.append((os.path.basename(file_path), document_id, metadata['content_hash']))
+            self.query_threads.append(query_thread.name)
+        if os.path.basename(file_path) in self.fail_names:
+            return {'document_id': document_id, 'status': 'failed', 'error': 'corrupt file'}
+        return {
+            'document_id': document_id or str(uuid.uuid4()),
+            'status': 'completed',
+            'page_count': 3,
+        }
+
+
+class TestBulkIngest(TransactionTestCase):
+    """Test BulkIngestRunner and the bulk_ingest command"""
+
+    def setUp(self):
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.source = os.path.join(self.tmp, 'docs')
+        os.makedirs(os.path.join(self.source, 'nested'))
+        self._write('a.txt', 'alpha')
+        self._write('b.txt', 'bravo')
+        self._write('nested/c.txt', 'charlie')
+        self._write('copy-of-a.txt', 'alpha')
+        self._write('ignored.bin', 'binary')
+
+        FakePipeline.calls = []
+        FakePipeline.fail_names = set()
+        FakePipeline.query_threads = []
+        self.checkpoint = IngestCheckpoint(os.path.join(self.tmp, 'checkpoint.sqlite3'))
+        self.addCleanup(self.checkpoint.close)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.source, name), 'w') as f:
+            f.write(content)
+
+    def _run(self, max_attempts=3):
+        runner = BulkIngestRunner(
+            knowledge_base_id=str(self.knowledge_base.id),
+            checkpoint=self.checkpoint,
+            workers=3,
+            max_attempts=max_attempts,
+            pipeline_factory=FakePipeline
+        )
+        return runner.run(discover_files(directory=self.source, extensions=['.txt']))
+
+    def test_rerun_skips_ingested_and_duplicate_files(self):
+        """Test a second run processes nothing and duplicates are skipped by hash"""
+        first = self._run()
+
+        assert first.total == 4
+        assert first.ingested + first.skipped == 4
+        assert first.failed == 0
+        processed = sorted(name for name, _, _ in FakePipeline.calls)
+        assert processed[1:] == ['b.txt', 'c.txt']
+        # Only one of the two identical files reaches the pipeline
+        assert processed[0] in ('a.txt', 'copy-of-a.txt')
+        assert first.ingested == 3
+
+        FakePipeline.calls = []
+        second = self._run()
+
+        assert FakePipeline.calls == []
+        assert second.skipped == 4
+        assert second.ingested == 0
+
+    def test_queries_run_on_the_worker_threads(self):
+        """Test the pipeline's queries use the worker thread's connection, which the worker closes"""
+        self._run()
+
+        assert len(FakePipeline.query_threads) == 3
+        assert all(name.startswith('bulk-ingest') for name in FakePipeline.query_threads)
+
+    def test_pdf_work_runs_on_the_render_thread(self):
+        """Test workers never drive PyMuPDF themselves: text and layout run on the render thread"""
+        for name in ('s-101.pdf', 's-102.pdf', 's-103.pdf'):
+            doc = fitz.open()
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), name, fontsize=18)
+            doc.save(os.path.join(self.source, name))
+            doc.close()
+
+        threads = set()
+        extract_pdf = TextExtractor._extract_pdf
+        analyze = LayoutAnalyzer._analyze_rule_based
+
+        def tracking_extract_pdf(extractor, *args):
+            threads.add(threading.current_thread().name)
+            return extract_pdf(extractor, *args)
+
+        def tracking_analyze(analyzer, *args):
+            threads.add(threading.current_thread().name)
+            return analyze(analyzer, *args)
+
+        def pipeline_factory():
+            pipeline = DocumentPipeline()
+            pipeline._extract_tables = AsyncMock(return_value={'tables': [], 'tables_by_page': {}})
+            return pipeline
+
+        runner = BulkIngestRunner(
+            knowledge_base_id=str(self.knowledge_base.id),
+            checkpoint=self.checkpoint,
+            workers=3,
+            pipeline_factory=pipeline_factory
+        )
+        with patch.object(TextExtractor, '_extract_pdf', tracking_extract_pdf), \
+                patch.object(LayoutAnalyzer, '_analyze_rule_based', tracking_analyze):
+            progress = runner.run(discover_files(directory=self.source, extensions=['.pdf']))
+
+        assert progress.ingested == 3
+        assert len(threads) == 1 and threads.pop().startswith('pdf-render')
+
+    def test_failed_files_are_retried_until_max_attempts(self):
+        """Test failures are counted, retried on resume and eventually left alone"""
+        FakePipeline.fail_names = {'b.txt'}
+
+        first = self._run(max_attempts=2)
+        assert first.failed == 1
+        assert first.failures[0][1] == 'corrupt file'
+
+        FakePipeline.calls = []
+        second = self._run(max_attempts=2)
+        assert [name for name, _, _ in FakePipeline.calls] == ['b.txt']
+        assert second.failed == 1
+
+        FakePipeline.calls = []
+        third = self._run(max_attempts=2)
+        assert FakePipeline.calls == []
+        assert third.failed == 0
+
+    def test_changed_file_reuses_its_document(self):
+        """Test a modified file is re-ingested into the same document"""
+        self._run()
+        document_id = self.checkpoint.get(os.path.join(self.source, 'b.txt')).document_id
+
+        self._write('b.txt', 'bravo revision 2')
+        FakePipeline.calls = []
+        progress = self._run()
+
+        assert progress.ingested == 1
+        assert [(name, doc_id) for name, doc_id, _ in FakePipeline.calls] == [('b.txt', document_id)]
+
+    def test_interrupted_file_is_redone(self):
+        """Test a file left 'processing' by an interrupted run is processed again"""
+        path = os.path.join(self.source, 'a.txt')
+        self.checkpoint.mark_started(path, file_content_hash(path), None)
+
+        self._run()
+
+        assert 'a.txt' in {name for name, _, _ in FakePipeline.calls}
+        assert self.checkpoint.get(path).status == 'done'
+
+    def test_manifest_paths_and_titles(self):
+        """Test manifest lines resolve relative to the manifest"""
+        manifest = os.path.join(self.source, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('# drawings\na.txt\n\n{"path": "nested/c.txt", "title": "Sheet C"}\n')
+
+        files = discover_files(manifest=manifest)
+
+        assert files == [
+            (os.path.join(self.source, 'a.txt'), None),
+            (os.path.join(self.source, 'nested', 'c.txt'), 'Sheet C'),
+        ]
+
+    def test_command_reports_progress(self):
+        """Test the management command runs and prints rates"""
+        stdout = StringIO()
+
+        with patch(
+            'rag_service.management.commands.bulk_ingest.BulkIngestRunner',
+            partial(BulkIngestRunner, pipeline_factory=FakePipeline)
+        ):
+            call_command(
+                'bulk_ingest',
+                kb_id=str(self.knowledge_base.id),
+                dir=self.source,
+                extensions='txt',
+                checkpoint=os.path.join(self.tmp, 'command.sqlite3'),
+                stdout=stdout
+            )
+
+        output = stdout.getvalue()
+        assert 'docs/min' in output and 'pages/min' in output
+        assert 'Bulk ingest finished' in output
@@ -0,0 +1,292 @@
+"""
+Tests for the staged Celery ingestion pipeline
+"""
+
+import os
+import tempfile
+import uuid
+from unittest.mock import patch
+
+import fitz
+from celery.exceptions import Retry
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+
+from core.models import Organization
+from rag_service import tasks
+from rag_service.models import Chunk, Document, KnowledgeBase
+from rag_service.services import ingest_stages
+from rag_service.services.ingest_stages import StageTracker, get_ingest_redis
+
+
+PIPELINE_SETTINGS = {
+    **settings.RAG_SETTINGS,
+    'INGEST_PIPELINE': {
+        'REDIS_URL': 'memory://',
+        'CHUNK_BATCH_SIZE': 2,
+        'MAX_IN_FLIGHT': {'extract': 4, 'chunk': 4, 'embed': 4, 'store': 1},
+        'MAX_RETRIES': 2,
+        'RETRY_BACKOFF': 0,
+    },
+}
+
+
+class FakeEmbedder:
+    """Deterministic 3-d embeddings; raises for the first fail_calls calls"""
+
+    model_name = 'fake-embed'
+
+    def __init__(self, fail_calls=0):
+        self.calls = []
+        self.fail_calls = fail_calls
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if len(self.calls) <= self.fail_calls:
+            raise RuntimeError('embedding provider unavailable')
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+
+class FakeVectorStore:
+    """Records upserted vector IDs"""
+
+    def __init__(self):
+        self.upserted = []
+        self.deleted = []
+
+    async def upsert_vectors(self, vectors, namespace=None):
+        self.upserted.extend(vector['id'] for vector in vectors)
+        return {'success': True, 'count': len(vectors)}
+
+    async def delete_vectors(self, ids, namespace=None):
+        self.deleted.extend(ids)
+        return True
+
+
+@override_settings(
+    RAG_SETTINGS=PIPELINE_SETTINGS,
+    CELERY_TASK_ALWAYS_EAGER=True,
+)
+class TestStagedIngest(TransactionTestCase):
+    """Test the extract -> chunk -> embed -> store tasks in eager mode"""
+
+    def setUp(self):
+        organization = Organization.objects.create(
+            name='Test Org',
+            slug=f'test-org-{uuid.uuid4().hex[:8]}'
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            organization=organization,
+            name='Test KB'
+        )
+
+        handle, self.file_path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as f:
+            f.write('\n\n'.join(
+                f"Note {i}. Concrete strength shall be 4000 psi at 28 days for footing F{i}. " * 12
+                for i in range(6)
+            ))
+        self.addCleanup(os.remove, self.file_path)
+
+        get_ingest_redis('memory://').flushdb()
+        self.embedder = FakeEmbedder()
+        self.vector_store = FakeVectorStore()
+        for target, value in (
+            ('get_embedder', lambda document: self.embedder),
+            ('get_vector_store', lambda: self.vector_store),
+        ):
+            patcher = patch.object(ingest_stages, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_document_flows_through_all_stages(self):
+        """Test an eager ingest stores embedded chunks and completes the document"""
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id), title='Notes')
+
+        document = Document.objects.get(id=started['document_id'])
+        chunks = list(Chunk.objects.filter(document=document))
+        assert document.status == 'completed'
+        assert document.chunk_count == len(chunks) > 2
+        assert all(chunk.embedding_vector and chunk.embedding_model == 'fake-embed' for chunk in chunks)
+        assert sorted(self.vector_store.upserted) == sorted(c.embedding_vector_id for c in chunks)
+
+        stats = StageTracker().stats()
+        assert {stage: row['in_flight'] for stage, row in stats.items()} == {
+            'extract': 0, 'chunk': 0, 'embed': 0, 'store': 0
+        }
+        assert stats['extract']['processed'] == 1
+        assert stats['embed']['processed'] == stats['store']['processed'] == (len(chunks) + 1) // 2
+        assert stats['store']['latency_ms_p95'] is not None
+
+    def test_staged_chunks_are_linked(self):
+        """Test the chunk stage writes relations between the chunks it stores"""
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id))
+
+        chunks = list(Chunk.objects.filter(document_id=started['document_id']).order_by('chunk_index'))
+        relations = set(Chunk.related_chunks.through.objects.filter(
+            from_chunk__document_id=started['document_id']
+        ).values_list('from_chunk_id', 'to_chunk_id'))
+        # Reading-order neighbours are linked both ways
+        for first, second in zip(chunks, chunks[1:]):
+            assert (first.id, second.id) in relations and (second.id, first.id) in relations
+
+    def _make_pdf(self, sheets):
+        """Write a PDF with one page per sheet title"""
+        handle, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        doc = fitz.open()
+        for title in sheets:
+            page = doc.new_page(width=612, height=792)
+            page.insert_text((72, 72), f"{title} Concrete strength shall be 4000 psi at 28 days.", fontsize=12)
+        doc.save(path)
+        doc.close()
+        return path
+
+    def test_reingest_rechunks_changed_pages_only(self):
+        """Test a staged re-ingest embeds the changed page and drops the vectors of changed and removed pages"""
+        knowledge_base_id = str(self.knowledge_base.id)
+        first = tasks.enqueue_document_ingest(self._make_pdf(['S-101', 'S-102', 'S-103']), knowledge_base_id)
+        document_id = first['document_id']
+        kept = {
+            chunk.id: chunk.embedding_vector_id
+            for chunk in Chunk.objects.filter(document_id=document_id, page_number=1)
+        }
+        stale = set(
+            Chunk.objects.filter(document_id=document_id, page_number__in=[2, 3])
+            .values_list('embedding_vector_id', flat=True)
+        )
+        self.embedder.calls.clear()
+        self.vector_store.upserted.clear()
+
+        tasks.enqueue_document_ingest(
+            self._make_pdf(['S-101', 'S-102 REV B']), knowledge_base_id, document_id=document_id
+        )
+
+        document = Document.objects.get(id=document_id)
+        chunks = list(Chunk.objects.filter(document_id=document_id))
+        assert document.status == 'completed'
+        assert document.chunk_count == len(chunks)
+        assert all(chunk.embedding_vector for chunk in chunks)
+        # Page 1 kept its chunks; only page 2 was embedded again
+        assert {chunk.id for chunk in chunks if chunk.page_number == 1} == set(kept)
+        embedded = [text for call in self.embedder.calls for text in call]
+        assert embedded and all('S-102 REV B' in text for text in embedded)
+        assert not {chunk.page_number for chunk in chunks} - {1, 2}
+        assert set(self.vector_store.deleted) == stale
+        assert set(self.vector_store.upserted).isdisjoint(kept.values())
+
+    def test_shorter_revision_deletes_stale_vectors(self):
+        """Test re-chunking a document into fewer chunks deletes the vectors past the new end"""
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id))
+        document_id = started['document_id']
+        before = set(Chunk.objects.filter(document_id=document_id).values_list('embedding_vector_id', flat=True))
+
+        with open(self.file_path, 'w') as f:
+            f.write("Note 0. Concrete strength shall be 4000 psi at 28 days for footing F0.")
+        tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id), document_id=document_id)
+
+        after = set(Chunk.objects.filter(document_id=document_id).values_list('embedding_vector_id', flat=True))
+        assert len(after) < len(before)
+        assert set(self.vector_store.deleted) == before - after
+
+    def test_repeated_batches_are_idempotent(self):
+        """Test re-running embed/store for a batch re-embeds and re-counts nothing"""
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id))
+        document_id = started['document_id']
+        chunk_ids = [str(i) for i in Chunk.objects.filter(document_id=document_id).values_list('id', flat=True)[:2]]
+        embed_calls = len(self.embedder.calls)
+
+        StageTracker().enqueued('embed')
+        result = tasks.embed_chunks.delay(
+            ingest_id=started['ingest_id'], document_id=document_id, chunk_ids=chunk_ids, batch_key='0'
+        ).get()
+
+        assert result['embedded'] == 0 and result['reused'] == 2
+        assert len(self.embedder.calls) == embed_calls
+        # The repeated store of batch 0 did not complete the ingest a second time
+        assert StageTracker().stats()['store']['in_flight'] == 0
+
+    def test_failed_stage_is_retried(self):
+        """Test a transient embedding error is retried and the ingest completes"""
+        self.embedder.fail_calls = 1
+
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id))
+
+        assert Document.objects.get(id=started['document_id']).status == 'completed'
+        assert StageTracker().stats()['embed']['failed'] == 0
+
+    def test_persistent_failure_marks_document_failed(self):
+        """Test a stage failing past MAX_RETRIES fails the document"""
+        self.embedder.fail_calls = 100
+
+        started = tasks.enqueue_document_ingest(self.file_path, str(self.knowledge_base.id))
+
+        document = Document.objects.get(id=started['document_id'])
+        assert document.status == 'failed'
+        assert 'embed stage failed' in document.processing_error
+        assert StageTracker().stats()['embed']['failed'] >= 1
+
+    def test_embed_defers_while_store_is_full(self):
+        """Test backpressure: embedding waits for storage to drain"""
+        tracker = StageTracker()
+        tracker.enqueued('store')  # store limit is 1
+
+        tasks.embed_chunks.push_request(is_eager=False, retries=0)
+        try:
+            with patch.object(tasks.embed_chunks, 'retry', side_effect=Retry()) as retry:
+                with self.assertRaises(Retry):
+                    tasks.embed_chunks.run(
+                        ingest_id='x', document_id=str(uuid.uuid4()), chunk_ids=['1'], batch_key='0'
+                    )
+        finally:
+            tasks.embed_chunks.pop_request()
+
+        assert retry.call_args.kwargs['kwargs']['deferrals'] == 1
+        assert self.embedder.calls == []
+        assert tracker.stats()['embed']['deferred'] == 1
+
+    def test_chunk_hand_off_is_bounded_by_embed_capacity(self):
+        """Test only as many batches as embed has room for are enqueued; the rest wait for a retry"""
+        tracker = StageTracker()
+        tracker.enqueued('embed')  # embed limit is 4, so 3 slots are free
+        pending = [[f'g:{index}', [str(index)]] for index in range(5)]
+
+        tasks.chunk_document.push_request(is_eager=False, retries=0)
+        try:
+            with patch.object(tasks.embed_chunks, 'apply_async') as enqueue, \
+                    patch.object(tasks.chunk_document, 'retry', side_effect=Retry()) as retry:
+                with self.assertRaises(Retry):
+                    tasks.chunk_document.run(ingest_id='x', document_id=str(uuid.uuid4()), pending=pending)
+        finally:
+            tasks.chunk_document.pop_request()
+
+        assert [call.kwargs['kwargs']['batch_key'] for call in enqueue.call_args_list] == ['g:0', 'g:1', 'g:2']
+        assert retry.call_args.kwargs['kwargs']['pending'] == pending[3:]
+        assert tracker.stats()['embed']['in_flight'] == 4
+        assert tracker.stats()['chunk']['deferred'] == 1
+
+    def test_redelivered_chunk_task_restarts_batch_counting(self):
+        """Test a re-chunked ingest completes on its own batches, not the earlier chunking's"""
+        tracker = StageTracker()
+        first = tracker.set_batches('ingest', 2)
+        assert not tracker.batch_stored('ingest', f'{first}:0')
+
+        second = tracker.set_batches('ingest', 2)
+        # Late batches of the first chunking are not counted
+        assert not tracker.batch_stored('ingest', f'{first}:1')
+        assert not tracker.batch_stored('ingest', f'{second}:0')
+        assert not tracker.batch_stored('ingest', f'{second}:0')
+        assert tracker.batch_stored('ingest', f'{second}:1')
+
+    def test_redelivered_task_finishes_once(self):
+        """Test the in-flight count drops once per task id"""
+        tracker = StageTracker()
+        tracker.enqueued('embed', 2)
+
+        tracker.finished('embed', 10, task_id='task-1')
+        tracker.finished('embed', 10, task_id='task-1')
+
+        assert tracker.in_flight('embed') == 1
+        assert tracker.stats()['embed']['processed'] == 1
@@ -234,7 +234,8 @@ class LLMExtractionService:
             model_type="TEXT",
             request_context=request_context,
             prompt=prompt,
-            messages=None  # Using prompt format, not messages
+            messages=None,  # Using prompt format, not messages
+            dedupe=True  # Retries and concurrent runs on the same drawing share one call
         )
         
         # Extract the response text and metadata
@@ -0,0 +1,21 @@
+"""
+Celery application for takeoff_tool.
+
+Configuration is read from Django settings (CELERY_* names) and tasks are
+discovered from each installed app's tasks module.
+
+Workers per ingestion stage:
+    celery -A takeoff_tool worker -Q ingest.extract -c 2
+    celery -A takeoff_tool worker -Q ingest.chunk,ingest.store -c 4
+    celery -A takeoff_tool worker -Q ingest.embed -c 8
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'takeoff_tool.settings')
+
+app = Celery('takeoff_tool')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -71,6 +71,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 # Third-party apps
@@ -256,6 +257,7 @@ RAG_SETTINGS = {
     'EMBEDDING': {
         'DEFAULT_STRATEGY': 'balanced',  # cost_optimized, balanced, premium
         'CACHE_TTL': 3600,  # 1 hour
+        'QUERY_CACHE_SIZE': 1024,  # in-process query embedding cache entries
         'MAX_BATCH_SIZE': 100,
         'FALLBACK_ENABLED': True,
     },
@@ -266,6 +268,37 @@ RAG_SETTINGS = {
         'SIMILARITY_THRESHOLD': 0.7,
         'MAX_CONTEXT_LENGTH': 8000,
         'INDEX_UPDATE_BATCH_SIZE': 1000,
+        'VECTOR_SEARCH_TIMEOUT': 2.0,  # seconds; a slow leg is dropped from hybrid fusion
+        'KEYWORD_SEARCH_TIMEOUT': 1.0,
+        'STATS_FLUSH_INTERVAL': 5.0,  # seconds between bulk chunk statistics writes
+        'STATS_MAX_PENDING': 10000,  # buffered chunks that trigger an early flush
+        'STATS_MAX_BUFFERED': 100000,  # buffered chunks kept while flushes fail; others are dropped
+    },
+    
+    # pgvector ANN search
+    'PGVECTOR': {
+        'EF_SEARCH': 100,  # HNSW candidate list size per query
+        'ITERATIVE_SCAN': 'relaxed_order',  # pgvector >= 0.8; keeps filtered searches from under-filling top_k
+        'BACKFILL_BATCH_SIZE': 1000,
+    },
+
+    # Pinecone writes (concurrent, byte-sized batches)
+    'PINECONE': {
+        'WRITE_CONCURRENCY': 8,  # batches in flight per upsert/delete call
+        'MAX_BATCH_BYTES': 2 * 1024 * 1024 - 64 * 1024,  # under the 2MB request limit
+        'MAX_BATCH_VECTORS': 1000,
+        'DELETE_BATCH_SIZE': 1000,  # IDs per delete request
+        'WRITE_MAX_RETRIES': 3,  # per failed batch
+        'WRITE_RETRY_BACKOFF': 0.5,  # seconds, doubled per retry
+    },
+    
+    # Cross-encoder reranking (CPU, sentence-transformers)
+    'RERANKING': {
+        'STRATEGY': 'simple',  # 'cross_encoder' reranks retrieval results with CROSS_ENCODER_MODEL
+        'CROSS_ENCODER_MODEL': 'cross-encoder/ms-marco-MiniLM-L-6-v2',
+        'MAX_LENGTH': 256,  # tokens per (query, chunk) pair; longer chunks are truncated
+        'USE_THREAD_POOL': True,  # run inference off the event loop
+        'PAIR_CACHE_SIZE': 10000,
     },
     
     # Document Processing
@@ -278,9 +311,58 @@ RAG_SETTINGS = {
         ],
         'DEFAULT_CHUNK_SIZE': 1000,
         'DEFAULT_OVERLAP': 200,
+        'CHUNK_TARGET_TOKENS': 512,  # token budget per text chunk
+        'CHUNK_OVERLAP_TOKENS': 64,
+        'TOKENIZER_ENCODING': 'cl100k_base',  # tiktoken encoding used for chunk sizing
+        'SIMILARITY_LINK_TOP_K': 0,  # similar chunks linked per chunk (0 = off)
+        'SIMILARITY_LINK_THRESHOLD': 0.8,
         'PROCESSING_TIMEOUT': 300,
     },
     
+    # Per-page vision LLM calls (limits are per provider, shared per process)
+    'VISION': {
+        'MAX_CONCURRENCY': {'default': 4, 'openai': 8, 'google': 8},
+        'REQUESTS_PER_MINUTE': {'default': 60, 'anthropic': 50, 'openai': 500},
+        'MAX_RETRIES': 3,
+        'RETRY_BASE_DELAY': 1.0,  # seconds; exponential backoff with full jitter
+        'RETRY_MAX_DELAY': 30.0,
+    },
+    
+    # Rendered page images reused across vision extraction runs and workers
+    'PAGE_IMAGE_CACHE': {
+        'ENABLED': True,
+        'DIR': os.getenv('PAGE_IMAGE_CACHE_DIR', os.path.join(MEDIA_ROOT, 'page_image_cache')),
+        'MAX_SIZE_MB': 2048,
+    },
+
+    # Table extraction (Camelot/pdfplumber) on classifier-selected pages
+    'TABLES': {
+        'CLASSIFY_PAGES': True,  # skip pages without ruling grids, aligned text columns or schedule keywords
+        'MAX_WORKERS': min(4, os.cpu_count() or 1),  # worker processes (0 = run in a thread)
+        'PAGE_TIMEOUT': 60,  # seconds before a page's extraction is abandoned
+        'CACHE_ENABLED': True,  # per-page results keyed by page content hash
+        'CACHE_DIR': os.getenv('TABLE_CACHE_DIR', os.path.join(MEDIA_ROOT, 'table_cache')),
+        'CACHE_MAX_SIZE_MB': 256,
+    },
+
+    # bulk_ingest management command
+    'BULK_INGEST': {
+        'WORKERS': int(os.getenv('BULK_INGEST_WORKERS', '4')),  # documents processed concurrently
+    },
+
+    # Staged Celery ingestion (extract -> chunk -> embed -> store)
+    'INGEST_PIPELINE': {
+        # In-flight counters and stage stats ('memory://' = per-process stand-in)
+        'REDIS_URL': os.getenv('INGEST_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0')),
+        'CHUNK_BATCH_SIZE': 64,  # chunk IDs per embed/store task
+        'MAX_IN_FLIGHT': {'extract': 8, 'chunk': 8, 'embed': 16, 'store': 16},  # batches queued or running per stage
+        'DEFER_COUNTDOWN': 5,  # seconds a task waits while the stage it feeds is full
+        'MAX_DEFERRALS': 720,  # then run anyway, in case a counter leaked
+        'MAX_RETRIES': 3,  # failed attempts before the document is marked failed
+        'RETRY_BACKOFF': 10,  # seconds, doubled per retry
+        'VECTOR_STORE': 'pgvector',  # 'pgvector', 'pinecone' or 'none'
+    },
+
     # Cost Optimization
     'COST': {
         'DEFAULT_BUDGET_PER_QUERY': Decimal('0.10'),
@@ -289,9 +371,91 @@ RAG_SETTINGS = {
     }
 }
 
+MODELHUB_SETTINGS = {
+    # Cross-process coordination (catalog invalidation); '' = per process only
+    'REDIS_URL': os.getenv('MODELHUB_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0')),
+
+    # Cached providers, models, API types and pricing (modelhub.services.model_catalog)
+    'MODEL_CATALOG': {
+        'TTL': 300,  # seconds; saves to Provider/Model invalidate immediately
+        'VERSION_KEY': 'modelhub:catalog:version',
+        'CHANNEL': 'modelhub:catalog',  # pub/sub channel for version bumps
+    },
+
+    # Compiled routing rules (modelhub.services.routing.rule_engine)
+    'ROUTING_RULES': {
+        'TTL': 300,  # seconds; saves to rules, rule models and models recompile immediately
+        'VERSION_KEY': 'modelhub:routing_rules:version',
+        'CHANNEL': 'modelhub:routing_rules',
+    },
+
+    # Monthly API key spend counters (modelhub.services.quota_service)
+    'QUOTAS': {
+        'KEY_PREFIX': 'modelhub:quota',
+        'RECONCILE_INTERVAL': 300,  # seconds before a key's counter is recomputed from ModelMetrics
+        'LOCAL_TTL': 5,  # seconds counters are served from process memory
+        'REDIS_RETRY_AFTER': 30,  # seconds to stay off Redis after an error
+    },
+
+    # Complexity results (modelhub.services.complexity.cache); Redis TTLs are confidence-based
+    'COMPLEXITY_CACHE': {
+        'LOCAL_MAX_ENTRIES': 4096,  # results kept in process memory, same TTL as in Redis
+        'NEGATIVE_TTL': 10,  # seconds a miss is remembered before Redis is asked again
+    },
+
+    # Buffered ModelMetrics writes (modelhub.services.metrics_writer)
+    'METRICS_WRITER': {
+        'ENABLED': True,  # False = insert each row when it is logged
+        'BATCH_SIZE': 200,  # rows per bulk_create; a full batch is written right away
+        'FLUSH_INTERVAL': 2.0,  # seconds between writes of a partial batch
+        'MAX_BUFFER': 20000,  # rows held in memory before the oldest are spilled to disk
+        'SPILL_DIR': os.getenv('MODELHUB_METRICS_SPILL_DIR', ''),  # '' = <tmp>/modelhub-metrics
+        'RETRY_INTERVAL': 30,  # seconds to spill instead of writing after a database error
+    },
+
+    # Identical LLM calls (modelhub.services.request_coalescer); opt-in per call_llm call site
+    'LLM_COALESCING': {
+        'LOCAL_MAX_ENTRIES': 1024,  # cached responses kept in process memory
+        'KEY_PREFIX': 'modelhub:llm_response',
+        'MAX_CACHE_TTL': 24 * 3600,  # upper bound for a call site's cache_ttl
+        'REDIS_RETRY_AFTER': 30,  # seconds to stay off Redis after an error
+    },
+
+    # Latency/error tracking per (provider, model) (modelhub.services.provider_health)
+    'PROVIDER_HEALTH': {
+        'WINDOW_SIZE': 200,  # most recent calls kept per model
+        'WINDOW_SECONDS': 300,  # calls older than this are dropped from the window
+        'MIN_SAMPLES': 20,  # calls needed before the breaker or hedging acts
+        'ERROR_RATE_THRESHOLD': 0.5,  # error rate that opens the circuit
+        'P99_LATENCY_THRESHOLD_MS': 60000,  # p99 latency that opens the circuit
+        'OPEN_SECONDS': 30,  # seconds traffic is diverted before a probe call
+        'HEDGING_ENABLED': os.getenv('MODELHUB_HEDGING_ENABLED', 'False').lower() == 'true',
+        'HEDGE_MIN_DELAY_MS': 1000,  # never hedge earlier than this, whatever the p95
+    },
+
+    # Long-lived provider SDK clients (modelhub.services.client_pool)
+    'CLIENT_POOL': {
+        'MAX_CLIENTS': 256,  # (provider, key, base URL) clients kept per event loop
+        'IDLE_TTL': 900,  # seconds an unused client is kept
+        'MAX_CONNECTIONS': 100,  # per shared HTTP pool
+        'MAX_KEEPALIVE_CONNECTIONS': 20,
+        'KEEPALIVE_EXPIRY': 60.0,  # seconds an idle connection stays open
+        'HTTP2': True,  # used when the h2 package is installed
+    },
+}
+
 # Celery for async processing
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+CELERY_TASK_ACKS_LATE = True  # stage tasks are idempotent; redeliver if a worker dies mid-task
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # long tasks: do not hoard messages
+CELERY_TASK_ROUTES = {
+    'rag_service.ingest.extract': {'queue': 'ingest.extract'},
+    'rag_service.ingest.chunk': {'queue': 'ingest.chunk'},
+    'rag_service.ingest.embed': {'queue': 'ingest.embed'},
+    'rag_service.ingest.store': {'queue': 'ingest.store'},
+}
 
 
 REST_FRAMEWORK = {